@@ -3,12 +3,106 @@ Analytics services for calculating KPIs and metrics.
 """
 from datetime import datetime, timedelta
 from decimal import Decimal
-from django.db.models import Sum, Count, Avg, F, Q, Case, When, Value, IntegerField
+from django.db.models import (
+    Sum, Count, Avg, F, Q, Case, When, Value, IntegerField, DecimalField, ExpressionWrapper
+)
+from django.db.models.functions import Coalesce
 from django.db.models.functions import TruncDate, TruncMonth, TruncWeek
 from django.utils import timezone
 from django.core.cache import cache
 
 
+class RevenueEngine:
+    """
+    SQL-side order revenue calculations.
+
+    Mirrors ``Order.total_price``: the maintained ``total_amount`` column
+    is used when present; otherwise orders with items are valued at
+    ``sum(item.quantity * item.price)`` and legacy orders without items
+    fall back to ``quantity * price_per_unit``. Everything is computed in
+    grouped queries instead of touching each order in Python.
+    """
+
+    MONEY = DecimalField(max_digits=14, decimal_places=2)
+
+    @classmethod
+    def item_revenue(cls):
+        """Revenue contributed by the order's items (joined rows)."""
+        return Sum(
+            ExpressionWrapper(F('items__quantity') * F('items__price'), output_field=cls.MONEY),
+            output_field=cls.MONEY,
+        )
+
+    @classmethod
+    def legacy_revenue(cls):
+        """Revenue of orders without items, from the legacy order columns."""
+        # An order without items yields exactly one row in the LEFT JOIN,
+        # so it is counted once here.
+        return Sum(
+            Case(
+                When(items__isnull=True, then=ExpressionWrapper(
+                    F('quantity') * F('price_per_unit'), output_field=cls.MONEY
+                )),
+                default=Value(0),
+                output_field=cls.MONEY,
+            ),
+            output_field=cls.MONEY,
+        )
+
+    @classmethod
+    def daily_breakdown(cls, orders):
+        """
+        Return ``[{'order_date', 'count', 'revenue'}]`` for the given order
+        queryset, ordered by date.
+
+        Orders with a maintained ``total_amount`` are summed directly; only
+        orders that have not been backfilled yet go through the items join.
+        """
+        days = {}
+
+        stored_rows = orders.filter(total_amount__isnull=False).order_by().annotate(
+            order_date=TruncDate('created_at')
+        ).values('order_date').annotate(
+            count=Count('id'),
+            revenue=Sum('total_amount'),
+        )
+        for row in stored_rows:
+            days[row['order_date']] = [row['count'], Decimal(row['revenue'] or 0)]
+
+        pending_rows = orders.filter(total_amount__isnull=True).order_by().annotate(
+            order_date=TruncDate('created_at')
+        ).values('order_date').annotate(
+            count=Count('id', distinct=True),
+            item_revenue=Coalesce(cls.item_revenue(), Value(Decimal('0')), output_field=cls.MONEY),
+            legacy_revenue=Coalesce(cls.legacy_revenue(), Value(Decimal('0')), output_field=cls.MONEY),
+        )
+        for row in pending_rows:
+            day = days.setdefault(row['order_date'], [0, Decimal('0')])
+            day[0] += row['count']
+            day[1] += Decimal(row['item_revenue']) + Decimal(row['legacy_revenue'])
+
+        return [
+            {'order_date': order_date, 'count': count, 'revenue': revenue}
+            for order_date, (count, revenue) in sorted(days.items())
+        ]
+
+    @classmethod
+    def total(cls, orders):
+        """Total revenue of the given order queryset."""
+        stored = orders.filter(total_amount__isnull=False).order_by().aggregate(
+            total=Sum('total_amount')
+        )
+        pending = orders.filter(total_amount__isnull=True).order_by().aggregate(
+            item_revenue=cls.item_revenue(),
+            legacy_revenue=cls.legacy_revenue(),
+        )
+        return (
+            Decimal(stored['total'] or 0)
+            + Decimal(pending['item_revenue'] or 0)
+            + Decimal(pending['legacy_revenue'] or 0)
+        )
+
+
 class OrderAnalytics:
     """Order-related analytics and KPIs."""
 
@@ -29,27 +123,24 @@ class OrderAnalytics:
 
         orders = Order.objects.filter(created_at__gte=start_date)
 
-        # Calculate metrics
-        total_orders = orders.count()
-        total_revenue = sum(order.total_price for order in orders)
+        # Daily trend with revenue - grouped queries; totals derive from it
+        daily_rows = RevenueEngine.daily_breakdown(orders)
+        total_orders = sum(row['count'] for row in daily_rows)
+        total_revenue = sum((row['revenue'] for row in daily_rows), Decimal('0'))
+        daily_trend_data = [
+            {
+                'order_date': row['order_date'],
+                'count': row['count'],
+                'revenue': float(row['revenue'])
+            }
+            for row in daily_rows
+        ]
 
         # Status breakdown
         status_breakdown = orders.values('status').annotate(
             count=Count('id')
         ).order_by('-count')
 
-        # Daily trend - calculate revenue from OrderItems
-        from orders.models import OrderItem
-        daily_trend_data = []
-        for date_obj in orders.dates('created_at', 'day'):
-            day_orders = orders.filter(created_at__date=date_obj)
-            day_revenue = sum(order.total_price for order in day_orders)
-            daily_trend_data.append({
-                'order_date': date_obj,
-                'count': day_orders.count(),
-                'revenue': float(day_revenue)
-            })
-
         result = {
             'total_orders': total_orders,
             'total_revenue': float(total_revenue),
@@ -211,7 +302,7 @@ class FinanceAnalytics:
             status__in=['confirmed', 'dispatched', 'delivered']
         )
 
-        order_revenue = sum(order.total_price for order in orders)
+        order_revenue = RevenueEngine.total(orders)
 
         # Daily revenue trend
         daily_revenue = payments.annotate(
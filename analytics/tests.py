@@ -1,3 +1,112 @@
+"""
+Unit tests for analytics services
+Tests: RevenueEngine, OrderAnalytics.get_order_summary
+"""
+
+from decimal import Decimal
+from datetime import timedelta
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
 from django.test import TestCase
+from django.utils import timezone
+
+from analytics.services import OrderAnalytics, RevenueEngine
+from orders.models import Order, OrderItem
+from sellers.models import Product
+
+User = get_user_model()
+
+
+class RevenueEngineTests(TestCase):
+    """
+    Test suite for SQL-side revenue calculations
+    Covers: item revenue, legacy fallback, daily trend grouping
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        """Set up orders with and without items across two days"""
+        cls.seller = User.objects.create_user(
+            username='seller@test.com',
+            email='seller@test.com',
+            password='testpass123'
+        )
+        cls.product = Product.objects.create(
+            name_en='Analytics Product',
+            name_ar='Analytics Product',
+            code='ANL-001',
+            selling_price=Decimal('50.00'),
+            stock_quantity=100,
+            seller=cls.seller,
+        )
+
+        now = timezone.now()
+        yesterday = now - timedelta(days=1)
+
+        # Order with two items: 2 x 50 + 1 x 30 = 130
+        cls.order_items = Order.objects.create(
+            customer='Customer A',
+            store_link='https://example.com/a',
+            quantity=5,
+            price_per_unit=Decimal('999.00'),
+            created_at=now,
+        )
+        OrderItem.objects.create(order=cls.order_items, product=cls.product, quantity=2, price=Decimal('50.00'))
+        OrderItem.objects.create(order=cls.order_items, product=cls.product, quantity=1, price=Decimal('30.00'))
+
+        # Legacy order without items: 3 x 20 = 60
+        cls.order_legacy = Order.objects.create(
+            customer='Customer B',
+            store_link='https://example.com/b',
+            quantity=3,
+            price_per_unit=Decimal('20.00'),
+            created_at=now,
+        )
+
+        # Yesterday's order: 1 x 10 = 10
+        cls.order_yesterday = Order.objects.create(
+            customer='Customer C',
+            store_link='https://example.com/c',
+            quantity=1,
+            price_per_unit=Decimal('10.00'),
+            created_at=yesterday,
+        )
+
+    def setUp(self):
+        cache.clear()
+
+    def test_total_matches_total_price_property(self):
+        """Engine total equals the sum of Order.total_price"""
+        orders = Order.objects.all()
+        expected = sum(order.total_price for order in orders)
+        self.assertEqual(RevenueEngine.total(orders), expected)
+        self.assertEqual(RevenueEngine.total(orders), Decimal('200.00'))
+
+    def test_total_without_maintained_column(self):
+        """Orders not yet backfilled are valued through the items join"""
+        Order.objects.update(total_amount=None)
+        self.assertEqual(RevenueEngine.total(Order.objects.all()), Decimal('200.00'))
+        rows = RevenueEngine.daily_breakdown(Order.objects.all())
+        self.assertEqual([row['revenue'] for row in rows], [Decimal('10.00'), Decimal('190.00')])
+
+    def test_daily_breakdown_groups_by_day(self):
+        """Each day reports distinct order count and revenue"""
+        rows = RevenueEngine.daily_breakdown(Order.objects.all())
+        self.assertEqual(len(rows), 2)
+        self.assertEqual(rows[0]['count'], 1)
+        self.assertEqual(rows[0]['revenue'], Decimal('10.00'))
+        self.assertEqual(rows[1]['count'], 2)
+        self.assertEqual(rows[1]['revenue'], Decimal('190.00'))
+
+    def test_order_summary_shape_and_query_count(self):
+        """Summary keeps its dict shape and runs a fixed number of queries"""
+        with self.assertNumQueries(3):
+            summary = OrderAnalytics.get_order_summary(days=30)
 
-# Create your tests here.
+        self.assertEqual(summary['total_orders'], 3)
+        self.assertEqual(summary['total_revenue'], 200.0)
+        self.assertAlmostEqual(summary['average_order_value'], 200.0 / 3)
+        self.assertEqual(len(summary['daily_trend']), 2)
+        self.assertEqual(summary['period_days'], 30)
+        self.assertEqual(sum(row['count'] for row in summary['status_breakdown']), 3)
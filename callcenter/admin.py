@@ -1,7 +1,8 @@
 from django.contrib import admin
 from .models import (
     CallLog, AgentPerformance, AgentSession, CustomerInteraction,
-    OrderStatusHistory, OrderAssignment, ManagerNote, TeamPerformance
+    OrderStatusHistory, OrderAssignment, ManagerNote, TeamPerformance,
+    AgentRoutingProfile
 )
 
 @admin.register(CallLog)
@@ -67,3 +68,9 @@ class TeamPerformanceAdmin(admin.ModelAdmin):
     search_fields = ['team']
     readonly_fields = ['created_at']
     date_hierarchy = 'date'
+
+@admin.register(AgentRoutingProfile)
+class AgentRoutingProfileAdmin(admin.ModelAdmin):
+    list_display = ['agent', 'languages', 'emirates', 'updated_at']
+    search_fields = ['agent__first_name', 'agent__last_name', 'agent__email']
+    readonly_fields = ['updated_at']
@@ -4,3 +4,6 @@ from django.apps import AppConfig
 class CallcenterConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'callcenter'
+
+    def ready(self):
+        import callcenter.signals
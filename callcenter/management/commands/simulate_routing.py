@@ -0,0 +1,65 @@
+from datetime import datetime
+
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+
+from callcenter import routing
+from orders.models import Order
+
+
+class Command(BaseCommand):
+    help = "Replay a day's orders through the weighted call center routing under different weightings"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--date', help='Day to replay (YYYY-MM-DD, defaults to yesterday)')
+        parser.add_argument(
+            '--weights',
+            action='append',
+            default=[],
+            help='Weighting to compare, e.g. "workload=0.5,language=0.3"; repeatable. '
+                 'Defaults to the configured weights and workload only',
+        )
+        parser.add_argument('--handle-minutes', type=float, default=6.0, help='Minutes an agent spends per order')
+
+    def handle(self, *args, **options):
+        if options['date']:
+            try:
+                date = datetime.strptime(options['date'], '%Y-%m-%d').date()
+            except ValueError:
+                raise CommandError('--date must be YYYY-MM-DD')
+        else:
+            date = timezone.now().date() - timezone.timedelta(days=1)
+
+        try:
+            weightings = [routing.parse_weights(text) for text in options['weights']] or [
+                routing.get_weights(),
+                routing.get_weights({'workload': 1, 'confirmation_rate': 0, 'language': 0, 'emirate': 0}),
+            ]
+        except ValueError as e:
+            raise CommandError(f'Invalid --weights: {e}')
+
+        table = routing.build_routing_table(date)
+        if not table['agents']:
+            raise CommandError('No call center agents to route to')
+        # Replay from the start of the day
+        for features in table['agents'].values():
+            features['workload'] = 0
+
+        orders = list(
+            Order.objects.filter(date__date=date).order_by('date').values(*routing.ORDER_FIELDS)
+        )
+        self.stdout.write(f"Replaying {len(orders)} orders from {date} across {len(table['agents'])} agents")
+
+        for weights in weightings:
+            result = routing.simulate(orders, table, weights, handle_minutes=options['handle_minutes'])
+            label = ','.join(f'{name}={value:g}' for name, value in weights.items())
+            self.stdout.write(self.style.MIGRATE_HEADING(label))
+            self.stdout.write(
+                f"  load {result['min_load']}-{result['max_load']} over {result['agents_used']} agents, "
+                f"language match {result['language_match_rate']:.0%}, "
+                f"emirate match {result['emirate_match_rate']:.0%}"
+            )
+            self.stdout.write(
+                f"  expected confirmations {result['expected_confirmed']}, "
+                f"done in {result['makespan_hours']}h ({result['confirmed_per_hour']}/h)"
+            )
@@ -0,0 +1,105 @@
+"""
+Call center real-time metrics, served from a precomputed snapshot.
+
+``compute_real_time_metrics`` runs one aggregate query per table with
+conditional counts. ``callcenter.tasks.refresh_real_time_metrics`` stores
+the result in the cache every SNAPSHOT_INTERVAL seconds, so every manager
+polling the dashboard reads the same cache entry instead of querying.
+
+``get_metrics_snapshot`` adds staleness metadata. When the snapshot is
+missing, or older than STALE_AFTER because the worker is down, the first
+reader to take the refresh lock recomputes it; the others keep serving the
+previous snapshot. Every refresh is also pushed to open dashboards as a
+``metrics-updated`` event (see notifications.push).
+"""
+from datetime import datetime, timedelta
+
+from django.core.cache import cache
+from django.db.models import Count, Q
+from django.utils import timezone
+
+from notifications.push import publish
+from orders.models import Order
+
+from .models import AgentSession, CallLog, CustomerInteraction
+
+SNAPSHOT_KEY = 'callcenter_real_time_metrics'
+REFRESH_LOCK_KEY = 'callcenter_real_time_metrics_lock'
+# Seconds between refreshes (the beat schedule in crm_fulfillment/celery.py)
+SNAPSHOT_INTERVAL = 15
+# A snapshot older than this is reported stale and rebuilt by a reader
+STALE_AFTER = SNAPSHOT_INTERVAL * 3
+SNAPSHOT_TIMEOUT = 60 * 60
+
+
+def compute_real_time_metrics(now=None):
+    """Dashboard metrics with one query per table"""
+    now = now or timezone.now()
+    start_of_day = timezone.make_aware(datetime.combine(timezone.localdate(now), datetime.min.time()))
+    active_since = now - timedelta(minutes=5)
+
+    sessions = AgentSession.objects.filter(last_activity__gte=now - timedelta(minutes=30)).aggregate(
+        active=Count('id', filter=Q(status__in=['available', 'busy'], last_activity__gte=active_since)),
+        available=Count('id', filter=Q(status='available', last_activity__gte=active_since)),
+        busy=Count('id', filter=Q(status='busy', last_activity__gte=active_since)),
+        on_break=Count('id', filter=Q(status='break')),
+    )
+    calls = CallLog.objects.filter(call_time__gte=min(start_of_day, now - timedelta(hours=1))).aggregate(
+        today_total=Count('id', filter=Q(call_time__gte=start_of_day)),
+        last_hour=Count('id', filter=Q(call_time__gte=now - timedelta(hours=1))),
+    )
+    orders = Order.objects.aggregate(
+        pending=Count('id', filter=Q(status='pending')),
+        confirmed_today=Count('id', filter=Q(status='confirmed', updated_at__gte=start_of_day)),
+    )
+    interactions = CustomerInteraction.objects.filter(
+        Q(resolution_status='follow_up_required') | Q(resolution_status='escalated', interaction_time__gte=start_of_day)
+    ).aggregate(
+        pending_followups=Count('id', filter=Q(
+            resolution_status='follow_up_required', follow_up_date__lte=now + timedelta(hours=2)
+        )),
+        escalated=Count('id', filter=Q(resolution_status='escalated')),
+    )
+
+    return {
+        'timestamp': now.isoformat(),
+        'agents': sessions,
+        'calls': {
+            'today_total': calls['today_total'],
+            'last_hour': calls['last_hour'],
+            'in_progress': sessions['busy'],
+        },
+        'orders': orders,
+        'alerts': interactions,
+    }
+
+
+def refresh_metrics_snapshot():
+    """Recompute the metrics and store them as the current snapshot"""
+    snapshot = compute_real_time_metrics()
+    cache.set(SNAPSHOT_KEY, snapshot, SNAPSHOT_TIMEOUT)
+    publish('metrics-updated', snapshot, topics=['callcenter_metrics'])
+    return snapshot
+
+
+def get_metrics_snapshot():
+    """The current metrics with ``generated_at``, ``age_seconds`` and ``stale``"""
+    snapshot = cache.get(SNAPSHOT_KEY)
+    now = timezone.now()
+    age = (now - datetime.fromisoformat(snapshot['timestamp'])).total_seconds() if snapshot else None
+
+    if (snapshot is None or age > STALE_AFTER) and cache.add(REFRESH_LOCK_KEY, 1, SNAPSHOT_INTERVAL):
+        snapshot = refresh_metrics_snapshot()
+        age = 0
+    if snapshot is None:
+        # Another reader is building the first snapshot
+        snapshot = compute_real_time_metrics(now)
+        age = 0
+
+    return {
+        **snapshot,
+        'generated_at': snapshot['timestamp'],
+        'age_seconds': round(age, 1),
+        'refresh_interval': SNAPSHOT_INTERVAL,
+        'stale': age > STALE_AFTER,
+    }
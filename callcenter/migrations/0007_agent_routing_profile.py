@@ -0,0 +1,30 @@
+# Generated by Django 5.2.18 on 2026-10-17 16:15
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('callcenter', '0006_alter_orderassignment_agent'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='AgentRoutingProfile',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('languages', models.JSONField(blank=True, default=list, help_text='Language codes the agent speaks (ar, en); empty means both')),
+                ('emirates', models.JSONField(blank=True, default=list, help_text='Emirate codes the agent knows best (AD, DXB, SHJ, ...)')),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('agent', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, related_name='routing_profile', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'verbose_name': 'Agent Routing Profile',
+                'verbose_name_plural': 'Agent Routing Profiles',
+            },
+        ),
+    ]
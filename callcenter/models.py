@@ -138,6 +138,13 @@ class OrderAssignment(models.Model):
         verbose_name = 'Order Assignment'
         verbose_name_plural = 'Order Assignments'
 
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        # Stored agent, so reassignments can move the agent workload counters
+        instance._loaded_agent_id = instance.__dict__.get('agent_id')
+        return instance
+
 class ManagerNote(models.Model):
     NOTE_TYPES = (
         ('instruction', 'Instruction'),
@@ -203,4 +210,24 @@ class AgentPerformance(models.Model):
         unique_together = ('agent', 'date')
         ordering = ['-date']
         verbose_name = 'Agent Performance'
-        verbose_name_plural = 'Agent Performances'
\ No newline at end of file
+        verbose_name_plural = 'Agent Performances'
+
+
+class AgentRoutingProfile(models.Model):
+    """Languages and emirates an agent is best placed to handle, used by callcenter.routing"""
+    LANGUAGE_CHOICES = (
+        ('ar', 'Arabic'),
+        ('en', 'English'),
+    )
+    
+    agent = models.OneToOneField('users.User', on_delete=models.CASCADE, related_name='routing_profile')
+    languages = models.JSONField(default=list, blank=True, help_text='Language codes the agent speaks (ar, en); empty means both')
+    emirates = models.JSONField(default=list, blank=True, help_text='Emirate codes the agent knows best (AD, DXB, SHJ, ...)')
+    updated_at = models.DateTimeField(auto_now=True)
+    
+    class Meta:
+        verbose_name = 'Agent Routing Profile'
+        verbose_name_plural = 'Agent Routing Profiles'
+    
+    def __str__(self):
+        return f"Routing profile for {self.agent}"
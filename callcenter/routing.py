@@ -0,0 +1,261 @@
+"""
+Weighted order routing for call center agents.
+
+Each agent is scored for an order as a weighted sum of
+
+* ``workload``: 1 / (1 + open assignments), so idle agents score highest;
+* ``confirmation_rate``: share of recently assigned orders that were confirmed;
+* ``language``: 1 when the agent speaks the customer's language (Arabic when
+  the customer name or address is written in Arabic, English otherwise);
+* ``emirate``: 1 when the order's emirate is one the agent knows best
+  (AgentRoutingProfile).
+
+Agent features are precomputed with a handful of grouped queries into a
+routing table kept in the cache (``get_routing_table``), refreshed every
+few minutes by ``callcenter.tasks.refresh_routing_table``, so routing an
+order never queries per agent. Weights come from
+``settings.CALLCENTER_ROUTING_WEIGHTS``.
+
+``simulate`` replays orders against a routing table in memory to compare
+weightings; see ``manage.py simulate_routing``.
+"""
+import re
+from collections import Counter
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models import Count, Q
+from django.utils import timezone
+
+from orders.area_search import resolve_area
+from orders.area_utils import CITY_MAPPING
+
+from .workload import OPEN_ORDER_STATUSES, get_workload_registry
+
+DEFAULT_WEIGHTS = {
+    'workload': 0.4,
+    'confirmation_rate': 0.3,
+    'language': 0.2,
+    'emirate': 0.1,
+}
+# Order statuses counted as a successful confirmation
+CONFIRMED_STATUSES = ('confirmed', 'packaged', 'shipped', 'delivered')
+# Days of assignments the confirmation rate looks at (yesterday and today)
+CONFIRMATION_WINDOW_DAYS = 1
+# Rate assumed for agents without recent assignments
+DEFAULT_CONFIRMATION_RATE = 0.5
+
+ROUTING_TABLE_KEY = 'callcenter_routing_table'
+ROUTING_TABLE_TIMEOUT = 60 * 10
+
+# Fields of Order the routing features are read from
+ORDER_FIELDS = ('customer', 'shipping_address', 'street_address', 'emirate', 'city', 'state')
+
+_ARABIC = re.compile('[\u0600-\u06ff]')
+
+
+def get_weights(overrides=None):
+    """Routing weights: defaults, then settings.CALLCENTER_ROUTING_WEIGHTS, then ``overrides``"""
+    weights = dict(DEFAULT_WEIGHTS)
+    weights.update(getattr(settings, 'CALLCENTER_ROUTING_WEIGHTS', {}) or {})
+    weights.update(overrides or {})
+    unknown = set(weights) - set(DEFAULT_WEIGHTS)
+    if unknown:
+        raise ValueError(f"Unknown routing weights: {', '.join(sorted(unknown))}")
+    return weights
+
+
+def order_language(order):
+    """'ar' when the customer's name or address is written in Arabic, else 'en'"""
+    text = ' '.join(str(_get(order, field) or '') for field in ('customer', 'shipping_address', 'street_address'))
+    return 'ar' if _ARABIC.search(text) else 'en'
+
+
+def order_emirate(order):
+    """Emirate code (AD, DXB, ...) from the order's emirate, city or area, or ''"""
+    for field in ('emirate', 'city', 'state'):
+        value = _get(order, field)
+        if not value:
+            continue
+        entry = resolve_area(value)
+        if entry is not None and entry.city in CITY_MAPPING:
+            return CITY_MAPPING[entry.city][1]
+    return ''
+
+
+def order_features(order):
+    """(language, emirate) of an Order or a dict of ORDER_FIELDS"""
+    return order_language(order), order_emirate(order)
+
+
+def _get(order, field):
+    return order.get(field) if isinstance(order, dict) else getattr(order, field, None)
+
+
+def build_routing_table(date=None):
+    """
+    Compute {agent id: features} for every active call center agent:
+    ``workload``, ``confirmation_rate``, ``languages`` and ``emirates``.
+    """
+    from .models import AgentRoutingProfile, OrderAssignment
+    from .services import AutoOrderDistributionService
+
+    date = date or timezone.now().date()
+    agent_ids = list(
+        AutoOrderDistributionService.get_available_agents().filter(is_active=True).values_list('id', flat=True)
+    )
+
+    workloads = dict(
+        OrderAssignment.objects.filter(
+            agent_id__in=agent_ids,
+            assignment_date__date=date,
+            order__status__in=OPEN_ORDER_STATUSES
+        )
+        .values('agent_id')
+        .annotate(count=Count('id'))
+        .values_list('agent_id', 'count')
+    )
+
+    recent = {
+        row['agent_id']: row
+        for row in OrderAssignment.objects.filter(
+            agent_id__in=agent_ids,
+            assignment_date__date__gte=date - timedelta(days=CONFIRMATION_WINDOW_DAYS),
+            assignment_date__date__lte=date
+        )
+        .values('agent_id')
+        .annotate(
+            total=Count('id'),
+            confirmed=Count('id', filter=Q(order__status__in=CONFIRMED_STATUSES))
+        )
+    }
+
+    profiles = {
+        profile.agent_id: profile
+        for profile in AgentRoutingProfile.objects.filter(agent_id__in=agent_ids)
+    }
+
+    table = {}
+    for agent_id in agent_ids:
+        stats = recent.get(agent_id)
+        profile = profiles.get(agent_id)
+        table[agent_id] = {
+            'workload': workloads.get(agent_id, 0),
+            'assigned_recently': stats['total'] if stats else 0,
+            'confirmation_rate': stats['confirmed'] / stats['total'] if stats else DEFAULT_CONFIRMATION_RATE,
+            'languages': list(profile.languages) if profile and profile.languages else ['ar', 'en'],
+            'emirates': list(profile.emirates) if profile else [],
+        }
+    return {'built_at': timezone.now(), 'date': date, 'agents': table}
+
+
+def refresh_routing_table():
+    """Rebuild the cached routing table"""
+    table = build_routing_table()
+    cache.set(ROUTING_TABLE_KEY, table, ROUTING_TABLE_TIMEOUT)
+    return table
+
+
+def get_routing_table():
+    """The cached routing table, built when missing or from a previous day"""
+    table = cache.get(ROUTING_TABLE_KEY)
+    if table is None or table['date'] != timezone.now().date():
+        table = refresh_routing_table()
+    return table
+
+
+class RoutingEngine:
+    """Scores agents for orders from a routing table"""
+
+    def __init__(self, table=None, weights=None, live_workloads=True):
+        self.table = table or get_routing_table()
+        self.weights = get_weights(weights)
+        self.agents = self.table['agents']
+        self.workloads = {agent_id: features['workload'] for agent_id, features in self.agents.items()}
+        if live_workloads:
+            # The registry is more current than the table, when it is running
+            live = get_workload_registry().current_workloads(self.table['date'])
+            if live:
+                self.workloads.update({agent_id: count for agent_id, count in live.items() if agent_id in self.agents})
+
+    def score(self, agent_id, language, emirate):
+        features = self.agents[agent_id]
+        weights = self.weights
+        return (
+            weights['workload'] / (1 + self.workloads[agent_id])
+            + weights['confirmation_rate'] * features['confirmation_rate']
+            + weights['language'] * (language in features['languages'])
+            + weights['emirate'] * (bool(emirate) and emirate in features['emirates'])
+        )
+
+    def choose(self, order, agent_ids=None):
+        """Best agent id for ``order`` (ties go to the lowest id), counted as one more open order"""
+        language, emirate = order_features(order)
+        candidates = self.agents if agent_ids is None else [agent_id for agent_id in agent_ids if agent_id in self.agents]
+        if not candidates:
+            return None
+        best = max(candidates, key=lambda agent_id: (self.score(agent_id, language, emirate), -agent_id))
+        self.workloads[best] += 1
+        return best
+
+    def performance_score(self, agent_id):
+        """OrderDistributionService performance score (0.1 - 2.0) from the table"""
+        features = self.agents.get(agent_id)
+        if not features or not features['assigned_recently']:
+            return 1.0
+        return max(0.1, min(2.0, features['confirmation_rate'] * 0.7 + 0.3))
+
+
+def parse_weights(text):
+    """'workload=0.5,language=0.3' -> {'workload': 0.5, 'language': 0.3}"""
+    weights = {}
+    for part in filter(None, (part.strip() for part in text.split(','))):
+        name, _, value = part.partition('=')
+        weights[name.strip()] = float(value)
+    return get_weights(weights)
+
+
+def simulate(orders, table, weights=None, handle_minutes=6.0):
+    """
+    Route ``orders`` (Orders or dicts of ORDER_FIELDS) against ``table`` in
+    memory with ``weights`` and report the outcome. Each agent handles its
+    orders one after another in ``handle_minutes``; an order is confirmed
+    with the agent's confirmation rate, plus a 10% penalty when the agent
+    does not speak the customer's language.
+    """
+    engine = RoutingEngine(table, weights, live_workloads=False)
+    start_workloads = dict(engine.workloads)
+    routed = Counter()
+    expected_confirmed = 0.0
+    language_matches = emirate_matches = emirate_orders = 0
+
+    for order in orders:
+        language, emirate = order_features(order)
+        agent_id = engine.choose(order)
+        if agent_id is None:
+            break
+        features = engine.agents[agent_id]
+        routed[agent_id] += 1
+        speaks = language in features['languages']
+        language_matches += speaks
+        expected_confirmed += features['confirmation_rate'] * (1.0 if speaks else 0.9)
+        if emirate:
+            emirate_orders += 1
+            emirate_matches += emirate in features['emirates']
+
+    total = sum(routed.values())
+    loads = [start_workloads[agent_id] + routed[agent_id] for agent_id in engine.agents] or [0]
+    makespan_hours = max(loads) * handle_minutes / 60
+    return {
+        'weights': engine.weights,
+        'orders': total,
+        'agents_used': len(routed),
+        'max_load': max(loads),
+        'min_load': min(loads),
+        'expected_confirmed': round(expected_confirmed, 1),
+        'language_match_rate': round(language_matches / total, 3) if total else 0,
+        'emirate_match_rate': round(emirate_matches / emirate_orders, 3) if emirate_orders else 0,
+        'makespan_hours': round(makespan_hours, 2),
+        'confirmed_per_hour': round(expected_confirmed / makespan_hours, 1) if makespan_hours else 0,
+    }
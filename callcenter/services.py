@@ -1,11 +1,19 @@
 # callcenter/services.py
-from django.db.models import Count, Q
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Count, Exists, OuterRef, Q
+from django.db.models.query import QuerySet
 from django.utils import timezone
 from django.contrib.auth import get_user_model
 from .models import OrderAssignment, AgentSession
+from .routing import ORDER_FIELDS, RoutingEngine
+from .workload import OPEN_ORDER_STATUSES, get_workload_registry
 from orders.models import Order
 from roles.models import Role, UserRole
+import bisect
+import heapq
 import math
+from collections import Counter
 from datetime import datetime, timedelta
 
 User = get_user_model()
@@ -37,137 +45,57 @@ class OrderDistributionService:
     
     @staticmethod
     def get_agent_performance_score(agent):
-        """Calculate performance score for an agent based on recent performance."""
-        today = timezone.now().date()
-        yesterday = today - timezone.timedelta(days=1)
-        
-        # Get recent performance data
-        recent_assignments = OrderAssignment.objects.filter(
-            agent=agent,
-            assignment_date__date__gte=yesterday
-        )
-        
-        if not recent_assignments.exists():
-            return 1.0  # Default score for new agents
-        
-        # Calculate success rate
-        total_orders = recent_assignments.count()
-        successful_orders = recent_assignments.filter(
-            order__status='confirmed'
-        ).count()
-        
-        success_rate = successful_orders / total_orders if total_orders > 0 else 0.5
-        
-        # Calculate average completion time (simplified)
-        avg_completion_time = 1.0  # Default value
-        
-        # Combine factors for final score
-        performance_score = (success_rate * 0.7) + (avg_completion_time * 0.3)
-        
-        return max(0.1, min(2.0, performance_score))  # Clamp between 0.1 and 2.0
+        """Calculate performance score for an agent from the recent confirmation rate in the routing table."""
+        return RoutingEngine(live_workloads=False).performance_score(agent.id)
     
     @staticmethod
     def distribute_orders_automatically():
-        """Automatically distribute unassigned orders among available agents."""
-        # Get unassigned orders
+        """Distribute unassigned orders among available agents with weighted routing (callcenter.routing)."""
         unassigned_orders = Order.objects.filter(
             status__in=['pending', 'processing'],
             assignments__isnull=True
         ).order_by('date')
         
-        if not unassigned_orders.exists():
+        scheduler = RoutingScheduler(OrderDistributionService.get_available_agents())
+        
+        if not scheduler:
             return {
-                'success': True,
-                'message': 'No unassigned orders to distribute',
+                'success': False,
+                'message': 'No available call center agents found',
                 'distributed_count': 0
             }
         
-        # Get available agents
-        available_agents = OrderDistributionService.get_available_agents()
-        
-        if not available_agents.exists():
+        manager = AutoOrderDistributionService.get_assigning_manager()
+        if not manager:
             return {
                 'success': False,
-                'message': 'No available call center agents found',
+                'message': 'No call center manager found to record the assignments',
                 'distributed_count': 0
             }
         
-        # Calculate distribution
-        total_orders = unassigned_orders.count()
-        total_agents = available_agents.count()
-        orders_per_agent = math.ceil(total_orders / total_agents)
-        
-        # Get current workloads and performance scores
-        agent_data = []
-        for agent in available_agents:
-            workload = OrderDistributionService.get_agent_workload(agent)
-            performance_score = OrderDistributionService.get_agent_performance_score(agent)
-            
-            # Calculate adjusted capacity (higher performance = more capacity)
-            adjusted_capacity = max(0, orders_per_agent - workload)
-            adjusted_capacity = int(adjusted_capacity * performance_score)
-            
-            agent_data.append({
-                'agent': agent,
-                'workload': workload,
-                'performance_score': performance_score,
-                'adjusted_capacity': adjusted_capacity,
-                'assigned_count': 0
-            })
+        assignments = scheduler.assign(
+            unassigned_orders,
+            manager=manager,
+            manager_notes='Automatically distributed by system',
+            assignment_reason='Automatic distribution'
+        )
         
-        # Sort agents by adjusted capacity (descending)
-        agent_data.sort(key=lambda x: x['adjusted_capacity'], reverse=True)
+        if not assignments:
+            return {
+                'success': True,
+                'message': 'No unassigned orders to distribute',
+                'distributed_count': 0
+            }
         
-        # Distribute orders
-        distributed_count = 0
-        agent_index = 0
-        
-        for order in unassigned_orders:
-            # Find agent with available capacity
-            assigned = False
-            attempts = 0
-            
-            while not assigned and attempts < len(agent_data):
-                agent_info = agent_data[agent_index]
-                
-                if agent_info['assigned_count'] < agent_info['adjusted_capacity']:
-                    # Assign order to this agent
-                    OrderAssignment.objects.create(
-                        order=order,
-                        manager=User.objects.filter(is_superuser=True).first(),  # System assignment
-                        agent=agent_info['agent'],
-                        priority_level='medium',
-                        manager_notes='Automatically distributed by system',
-                        assignment_reason='Automatic distribution'
-                    )
-                    
-                    agent_info['assigned_count'] += 1
-                    distributed_count += 1
-                    assigned = True
-                
-                # Move to next agent
-                agent_index = (agent_index + 1) % len(agent_data)
-                attempts += 1
-            
-            # If no agent available, assign to first agent
-            if not assigned:
-                first_agent = agent_data[0]['agent']
-                OrderAssignment.objects.create(
-                    order=order,
-                    manager=User.objects.filter(is_superuser=True).first(),
-                    agent=first_agent,
-                    priority_level='medium',
-                    manager_notes='Automatically distributed by system (fallback)',
-                    assignment_reason='Automatic distribution - fallback'
-                )
-                distributed_count += 1
+        distributed_count = len(assignments)
+        total_agents = len(scheduler.agents)
         
         return {
             'success': True,
             'message': f'Successfully distributed {distributed_count} orders among {total_agents} agents',
             'distributed_count': distributed_count,
             'total_agents': total_agents,
-            'orders_per_agent': orders_per_agent
+            'orders_per_agent': math.ceil(distributed_count / total_agents)
         }
     
     @staticmethod
@@ -228,25 +156,31 @@ class OrderDistributionService:
     def get_agent_distribution_summary():
         """Get summary of current order distribution among agents."""
         today = timezone.now().date()
-        available_agents = OrderDistributionService.get_available_agents()
+        available_agents = list(OrderDistributionService.get_available_agents())
+        engine = RoutingEngine(live_workloads=False)
+        
+        workloads = dict(
+            OrderAssignment.objects.filter(
+                agent__in=available_agents,
+                assignment_date__date=today,
+                order__status__in=['pending', 'processing', 'confirmed']
+            )
+            .values('agent_id')
+            .annotate(count=Count('id'))
+            .values_list('agent_id', 'count')
+        )
         
         summary = []
         total_assigned = 0
         
         for agent in available_agents:
-            workload = OrderAssignment.objects.filter(
-                agent=agent,
-                assignment_date__date=today,
-                order__status__in=['pending', 'processing', 'confirmed']
-            ).count()
-            
-            performance_score = OrderDistributionService.get_agent_performance_score(agent)
+            workload = workloads.get(agent.id, 0)
             
             summary.append({
                 'agent': agent,
                 'agent_name': agent.get_full_name() or agent.username,
                 'workload': workload,
-                'performance_score': performance_score,
+                'performance_score': engine.performance_score(agent.id),
                 'status': 'Available' if workload < 10 else 'Busy'
             })
             
@@ -265,9 +199,179 @@ class OrderDistributionService:
             'total_agents': len(summary)
         } 
 
+class AgentWorkloadScheduler:
+    """
+    Hand out orders to the call center agents with the lowest workload.
+
+    Today's open orders of all agents are counted with one grouped COUNT
+    (the metric of the workload registry) and kept in a min-heap, so each pick is O(log agents). A batch of orders
+    is assigned in memory and written with bulk_create in one transaction.
+    The orders are locked with SELECT ... FOR UPDATE SKIP LOCKED and orders
+    that already have an assignment are skipped, so two distributors running
+    at once never assign the same order twice.
+    """
+
+    BATCH_SIZE = 1000
+    # Order fields pick_agents needs to see, besides the primary key
+    order_fields = ()
+
+    def __init__(self, agents, date=None):
+        self.agents = {agent.id: agent for agent in agents}
+        self.date = date or timezone.now().date()
+        self.workloads = self.get_workloads(self.agents, self.date)
+        # Ties go to the lowest agent id, keeping picks deterministic
+        self.heap = [(workload, agent_id) for agent_id, workload in self.workloads.items()]
+        heapq.heapify(self.heap)
+
+    @staticmethod
+    def get_workloads(agent_ids, date):
+        """{agent id: open orders assigned on ``date``} for every agent, in one query"""
+        counts = dict(
+            OrderAssignment.objects.filter(
+                agent_id__in=agent_ids,
+                assignment_date__date=date,
+                order__status__in=OPEN_ORDER_STATUSES
+            )
+            .values('agent_id')
+            .annotate(count=Count('id'))
+            .values_list('agent_id', 'count')
+        )
+        return {agent_id: counts.get(agent_id, 0) for agent_id in agent_ids}
+
+    def __bool__(self):
+        return bool(self.heap)
+
+    def next_agent(self):
+        """The least loaded agent, counted as having one more order"""
+        workload, agent_id = self.heap[0]
+        heapq.heapreplace(self.heap, (workload + 1, agent_id))
+        self.workloads[agent_id] = workload + 1
+        return self.agents[agent_id]
+
+    def pick_agents(self, count, orders=None):
+        """Agents for the next ``count`` orders (dicts of ``order_fields``)"""
+        if not self.heap:
+            return []
+        return [self.next_agent() for _ in range(count)]
+
+    def record(self, assignments):
+        """Count the new assignments in the live workload registry once they are committed"""
+        registry = get_workload_registry()
+        transaction.on_commit(lambda: registry.record_assignments(assignments))
+
+    def assign(self, orders, manager, manager_notes, assignment_reason, priority_level='medium'):
+        """
+        Assign ``orders`` (a queryset or a list of orders) and return the new
+        assignments. Orders already assigned, or being assigned by another
+        distributor, are left out.
+        """
+        instances = {}
+        if not isinstance(orders, QuerySet):
+            instances = {order.pk: order for order in orders}
+            orders = Order.objects.filter(pk__in=list(instances))
+
+        with transaction.atomic():
+            rows = list(
+                orders.select_for_update(skip_locked=True)
+                .filter(~Exists(OrderAssignment.objects.filter(order_id=OuterRef('pk'))))
+                .values('pk', *self.order_fields)
+            )
+            order_ids = [row['pk'] for row in rows]
+            assignments = []
+            for order_id, agent in zip(order_ids, self.pick_agents(len(rows), rows)):
+                assignment = OrderAssignment(
+                    order_id=order_id,
+                    manager=manager,
+                    agent=agent,
+                    priority_level=priority_level,
+                    manager_notes=manager_notes,
+                    assignment_reason=assignment_reason
+                )
+                if order_id in instances:
+                    assignment.order = instances[order_id]
+                assignments.append(assignment)
+            OrderAssignment.objects.bulk_create(assignments, batch_size=self.BATCH_SIZE)
+            self.record(assignments)
+        return assignments
+
+
+class RegistryWorkloadScheduler(AgentWorkloadScheduler):
+    """
+    AgentWorkloadScheduler that picks agents from the live workload registry
+    (callcenter.workload) instead of counting assignments in the database.
+    Only agents with an available or busy AgentSession are picked; if none
+    are left, the remaining orders fall back to the database count.
+    """
+
+    def __init__(self, registry, agents):
+        self.registry = registry
+        # Queryset of every call center agent, only evaluated for the fallback
+        self.available_agents = agents
+        self.fallback = None
+        self.acquired = 0
+
+    def __bool__(self):
+        return True
+
+    def pick_agents(self, count, orders=None):
+        picked = []
+        while len(picked) < count:
+            agent_ids = self.registry.acquire(count - len(picked))
+            if not agent_ids:
+                break
+            agents = self.available_agents.filter(is_active=True).in_bulk(agent_ids)
+            stale = Counter(agent_id for agent_id in agent_ids if agent_id not in agents)
+            for agent_id, reserved in stale.items():
+                # Deleted, deactivated or no longer an agent since the registry was built
+                self.registry.set_eligible(agent_id, False)
+                self.registry.adjust({agent_id: -reserved})
+            picked += [agents[agent_id] for agent_id in agent_ids if agent_id in agents]
+
+        self.acquired = len(picked)
+        if len(picked) < count:
+            self.fallback = AgentWorkloadScheduler(self.available_agents)
+            picked += self.fallback.pick_agents(count - len(picked))
+        return picked
+
+    def record(self, assignments):
+        # Registry picks were counted when they were acquired
+        if len(assignments) > self.acquired:
+            super().record(assignments[self.acquired:])
+
+
+class RoutingScheduler(AgentWorkloadScheduler):
+    """
+    AgentWorkloadScheduler that sends each order to the agent with the best
+    weighted routing score (callcenter.routing) instead of the least loaded
+    one. Agent features come from the cached routing table, so picking costs
+    no queries per order or per agent.
+    """
+
+    order_fields = ORDER_FIELDS
+
+    def __init__(self, agents, engine=None, only=None):
+        self.engine = engine or RoutingEngine()
+        agent_ids = list(self.engine.agents)
+        if only is not None:
+            agent_ids = [agent_id for agent_id in agent_ids if agent_id in only]
+        self.agents = agents.filter(is_active=True).in_bulk(agent_ids) if agent_ids else {}
+        self.date = self.engine.table['date']
+        self.workloads = self.engine.workloads
+
+    def __bool__(self):
+        return bool(self.agents)
+
+    def pick_agents(self, count, orders=None):
+        agent_ids = list(self.agents)
+        return [self.agents[self.engine.choose(order, agent_ids)] for order in orders[:count]]
+
+
 class AutoOrderDistributionService:
     """Service for automatically distributing orders to call center agents equally"""
     
+    # Most assignments one balance_workloads run may move
+    MAX_BALANCE_MOVES = 500
+    
     @staticmethod
     def get_available_agents():
         """Get all available call center agents"""
@@ -290,186 +394,266 @@ class AutoOrderDistributionService:
         
         return today_orders
     
+    @staticmethod
+    def get_assigning_manager():
+        """Manager recorded on automatic assignments: a Call Center Manager, else a superuser"""
+        manager = User.objects.filter(
+            user_roles__role__name='Call Center Manager'
+        ).first()
+
+        if not manager:
+            manager = User.objects.filter(is_superuser=True).first()
+
+        return manager
+    
     @staticmethod
     def distribute_orders_equally():
         """Distribute all unassigned orders equally among available agents"""
-        # Get all unassigned orders
+        # Already assigned orders are skipped by the scheduler
         unassigned_orders = Order.objects.filter(
-            status__in=['pending', 'pending_confirmation'],
-            assignments__isnull=True
+            status__in=['pending', 'pending_confirmation']
         ).order_by('date')
         
-        # Get available agents
-        available_agents = AutoOrderDistributionService.get_available_agents()
+        scheduler = AgentWorkloadScheduler(AutoOrderDistributionService.get_available_agents())
         
-        if not available_agents.exists():
+        if not scheduler:
             return {
                 'success': False,
                 'message': 'No available call center agents found',
                 'distributed_count': 0
             }
         
-        if not unassigned_orders.exists():
+        manager = AutoOrderDistributionService.get_assigning_manager()
+        if not manager:
             return {
-                'success': True,
-                'message': 'No unassigned orders to distribute',
+                'success': False,
+                'message': 'No call center manager found to record the assignments',
                 'distributed_count': 0
             }
         
-        # Get current workloads for each agent
-        agent_workloads = {}
-        for agent in available_agents:
-            workload = AutoOrderDistributionService.get_agent_workload(agent)
-            agent_workloads[agent.id] = {
-                'agent': agent,
-                'workload': workload,
-                'assigned_count': 0
-            }
-        
-        # Sort agents by current workload (ascending)
-        sorted_agents = sorted(agent_workloads.values(), key=lambda x: x['workload'])
-        
-        # Distribute orders equally
-        total_orders = unassigned_orders.count()
-        total_agents = len(sorted_agents)
-        orders_per_agent = total_orders // total_agents
-        extra_orders = total_orders % total_agents
-        
-        distributed_count = 0
-        
-        # Get first available manager or superuser
-        manager = User.objects.filter(
-            user_roles__role__name='Call Center Manager'
-        ).first()
+        assignments = scheduler.assign(
+            unassigned_orders,
+            manager=manager,
+            manager_notes='Auto-distributed equally by system',
+            assignment_reason='Automatic equal distribution among agents'
+        )
         
-        if not manager:
-            manager = User.objects.filter(is_superuser=True).first()
+        if not assignments:
+            return {
+                'success': True,
+                'message': 'No unassigned orders to distribute',
+                'distributed_count': 0
+            }
         
-        # Distribute orders
-        for i, order in enumerate(unassigned_orders):
-            # Calculate which agent should get this order
-            agent_index = i % total_agents
-            agent_info = sorted_agents[agent_index]
-            
-            # Create assignment
-            OrderAssignment.objects.create(
-                order=order,
-                manager=manager,
-                agent=agent_info['agent'],
-                priority_level='medium',
-                manager_notes='Auto-distributed equally by system',
-                assignment_reason='Automatic equal distribution among agents'
-            )
-            
-            # Update workload count
-            agent_info['assigned_count'] += 1
-            distributed_count += 1
+        distributed_count = len(assignments)
+        total_agents = len(scheduler.agents)
         
         return {
             'success': True,
             'message': f'Successfully distributed {distributed_count} orders equally among {total_agents} agents',
             'distributed_count': distributed_count,
             'total_agents': total_agents,
-            'orders_per_agent': orders_per_agent,
-            'extra_orders': extra_orders
+            'orders_per_agent': distributed_count // total_agents,
+            'extra_orders': distributed_count % total_agents
         }
     
+    @staticmethod
+    def distribute_orders():
+        """Entry point of the distribute_orders views"""
+        return AutoOrderDistributionService.distribute_orders_equally()
+    
     @staticmethod
     def auto_assign_new_order(order):
         """Automatically assign a new order to the agent with lowest workload"""
-        available_agents = AutoOrderDistributionService.get_available_agents()
+        assignments = AutoOrderDistributionService.auto_assign_orders([order])
         
-        if not available_agents.exists():
+        if not assignments:
             return False, "No available call center agents found"
         
-        # Find agent with lowest workload
-        best_agent = None
-        lowest_workload = float('inf')
-        
-        for agent in available_agents:
-            workload = AutoOrderDistributionService.get_agent_workload(agent)
-            if workload < lowest_workload:
-                lowest_workload = workload
-                best_agent = agent
-        
-        if not best_agent:
-            return False, "No available agents"
-        
-        # Get manager
-        manager = User.objects.filter(
-            user_roles__role__name='Call Center Manager'
-        ).first()
-        
+        return True, assignments[0].agent
+    
+    @staticmethod
+    def auto_assign_orders(orders):
+        """
+        Assign a batch of new orders to the agents with the lowest workload.
+        Agents with an open AgentSession are picked from the live workload
+        registry; without any, workloads are counted in the database. With
+        settings.CALLCENTER_WEIGHTED_ROUTING, orders go to the best scoring
+        agent instead (callcenter.routing).
+        Returns the created assignments (empty when no agent or manager exists).
+        """
+        orders = list(orders)
+        if not orders:
+            return []
+
+        manager = AutoOrderDistributionService.get_assigning_manager()
         if not manager:
-            manager = User.objects.filter(is_superuser=True).first()
-        
-        # Create assignment
-        OrderAssignment.objects.create(
-            order=order,
+            return []
+
+        agents = AutoOrderDistributionService.get_available_agents()
+        registry = get_workload_registry()
+        if getattr(settings, 'CALLCENTER_WEIGHTED_ROUTING', False):
+            # Prefer agents with an open session, when any are known
+            ready = registry.snapshot()[1] if registry.has_ready_agents() else None
+            scheduler = RoutingScheduler(agents, only=ready)
+            if not scheduler:
+                return []
+        elif registry.has_ready_agents():
+            scheduler = RegistryWorkloadScheduler(registry, agents)
+        else:
+            scheduler = AgentWorkloadScheduler(agents)
+            if not scheduler:
+                return []
+
+        return scheduler.assign(
+            orders,
             manager=manager,
-            agent=best_agent,
-            priority_level='medium',
             manager_notes='Auto-assigned to agent with lowest workload',
             assignment_reason='Automatic assignment for new order'
         )
-        
-        return True, best_agent
     
     @staticmethod
-    def balance_workloads():
-        """Balance workloads between agents by redistributing orders if needed"""
-        available_agents = AutoOrderDistributionService.get_available_agents()
+    def plan_balance_moves(workloads, max_moves=None):
+        """
+        Plan moves that level ``{agent_id: open orders}`` to within one order.
+
+        Greedy pass over the workload vector sorted by load: the most loaded
+        agent gives one order to the least loaded until the spread is at most
+        one or ``max_moves`` is reached, which moves the fewest orders.
+        Returns {(from_agent_id, to_agent_id): count} and the new workloads.
+        """
+        workloads = dict(workloads)
+
+        def load(agent_id):
+            # Ties go to the lowest agent id, keeping plans deterministic
+            return (workloads[agent_id], agent_id)
+
+        vector = sorted(workloads, key=load)
+        moves = Counter()
+        moved = 0
+        while len(vector) > 1 and (max_moves is None or moved < max_moves):
+            lowest, highest = vector[0], vector[-1]
+            if workloads[highest] - workloads[lowest] <= 1:
+                break
+            # Take both ends out before their loads change so the rest stays sorted
+            vector = vector[1:-1]
+            workloads[highest] -= 1
+            workloads[lowest] += 1
+            moves[(highest, lowest)] += 1
+            moved += 1
+            bisect.insort(vector, lowest, key=load)
+            bisect.insort(vector, highest, key=load)
+        return moves, workloads
+    
+    @staticmethod
+    def balance_workloads(max_moves=None, dry_run=False, user=None):
+        """
+        Balance today's open orders between agents, moving at most
+        ``max_moves`` (default MAX_BALANCE_MOVES) of the most recently
+        assigned ones. Reassignments are written with one bulk_update and
+        audited with one bulk_create. With ``dry_run`` nothing is written
+        and the result lists the planned moves.
+        """
+        if max_moves is None:
+            max_moves = AutoOrderDistributionService.MAX_BALANCE_MOVES
+        today = timezone.now().date()
+        agent_ids = list(
+            AutoOrderDistributionService.get_available_agents().filter(is_active=True).values_list('id', flat=True)
+        )
         
-        if available_agents.count() < 2:
-            return "Need at least 2 agents to balance workloads"
+        if len(agent_ids) < 2:
+            return {
+                'success': False,
+                'message': 'Need at least 2 agents to balance workloads',
+                'moves': [],
+                'moved_count': 0,
+                'dry_run': dry_run
+            }
         
-        # Get current workloads
-        agent_workloads = {}
-        for agent in available_agents:
-            workload = AutoOrderDistributionService.get_agent_workload(agent)
-            agent_workloads[agent.id] = workload
+        open_assignments = OrderAssignment.objects.filter(
+            assignment_date__date=today,
+            order__status__in=OPEN_ORDER_STATUSES
+        )
+        counts = dict(
+            open_assignments.filter(agent_id__in=agent_ids)
+            .values('agent_id')
+            .annotate(count=Count('id'))
+            .values_list('agent_id', 'count')
+        )
+        workloads = {agent_id: counts.get(agent_id, 0) for agent_id in agent_ids}
+        planned, balanced = AutoOrderDistributionService.plan_balance_moves(workloads, max_moves)
         
-        # Find agents with highest and lowest workloads
-        max_workload = max(agent_workloads.values())
-        min_workload = min(agent_workloads.values())
+        if not planned:
+            return {
+                'success': True,
+                'message': 'Workloads are already balanced',
+                'moves': [],
+                'moved_count': 0,
+                'dry_run': dry_run
+            }
         
-        # If difference is more than 1 order, redistribute
-        if max_workload - min_workload > 1:
-            # Find overloaded agents
-            overloaded_agents = [
-                agent_id for agent_id, workload in agent_workloads.items()
-                if workload == max_workload
-            ]
-            
-            # Find underloaded agents
-            underloaded_agents = [
-                agent_id for agent_id, workload in agent_workloads.items()
-                if workload == min_workload
-            ]
+        with transaction.atomic():
+            candidates = open_assignments.filter(agent_id__in={source for source, _ in planned})
+            if not dry_run:
+                candidates = candidates.select_for_update(of=('self',))
+            by_agent = {}
+            for assignment in candidates.select_related('order').order_by('-assignment_date', '-id'):
+                by_agent.setdefault(assignment.agent_id, []).append(assignment)
             
-            # Redistribute one order from overloaded to underloaded
-            for overloaded_id in overloaded_agents:
-                if underloaded_agents:
-                    # Get one order from overloaded agent
-                    order_to_move = OrderAssignment.objects.filter(
-                        agent_id=overloaded_id,
-                        assignment_date__date=timezone.now().date()
-                    ).first()
-                    
-                    if order_to_move and underloaded_agents:
-                        # Move to underloaded agent
-                        underloaded_id = underloaded_agents.pop(0)
-                        order_to_move.agent_id = underloaded_id
-                        order_to_move.assignment_reason = 'Redistributed for workload balance'
-                        order_to_move.save()
-                        
-                        # Update workload counts
-                        agent_workloads[overloaded_id] -= 1
-                        agent_workloads[underloaded_id] += 1
-                        
-                        if agent_workloads[overloaded_id] - min(agent_workloads.values()) <= 1:
-                            break
+            moved = []
+            moves = []
+            for (source, target), count in sorted(planned.items()):
+                for assignment in by_agent.get(source, [])[:count]:
+                    moves.append({
+                        'assignment_id': assignment.id,
+                        'order_id': assignment.order_id,
+                        'order_code': assignment.order.order_code,
+                        'from_agent_id': source,
+                        'to_agent_id': target,
+                    })
+                    assignment.previous_agent_id = source
+                    assignment.agent_id = target
+                    assignment.assignment_reason = 'Redistributed for workload balance'
+                    moved.append(assignment)
+                del by_agent.get(source, [])[:count]
             
-            return f"Workloads balanced. Max: {max(agent_workloads.values())}, Min: {min(agent_workloads.values())}"
-        
-        return "Workloads are already balanced" 
\ No newline at end of file
+            if not dry_run and moved:
+                from users.models import AuditLog
+                
+                OrderAssignment.objects.bulk_update(
+                    moved, ['agent', 'previous_agent', 'assignment_reason'],
+                    batch_size=AgentWorkloadScheduler.BATCH_SIZE
+                )
+                AuditLog.objects.bulk_create([
+                    AuditLog(
+                        user=user,
+                        action='update',
+                        entity_type='OrderAssignment',
+                        entity_id=str(move['assignment_id']),
+                        description=(
+                            f"Moved order {move['order_code']} from agent {move['from_agent_id']} "
+                            f"to agent {move['to_agent_id']} for workload balance"
+                        )
+                    )
+                    for move in moves
+                ], batch_size=AgentWorkloadScheduler.BATCH_SIZE)
+                
+                # bulk_update skips the signals that keep the live counters in step
+                deltas = Counter()
+                for move in moves:
+                    deltas[move['from_agent_id']] -= 1
+                    deltas[move['to_agent_id']] += 1
+                registry = get_workload_registry()
+                transaction.on_commit(lambda: registry.adjust(deltas, today))
+        
+        verb = 'Would move' if dry_run else 'Moved'
+        return {
+            'success': True,
+            'message': (
+                f"{verb} {len(moves)} orders. "
+                f"Max: {max(balanced.values())}, Min: {min(balanced.values())}"
+            ),
+            'moves': moves,
+            'moved_count': len(moves),
+            'dry_run': dry_run
+        }
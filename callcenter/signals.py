@@ -0,0 +1,74 @@
+from collections import Counter
+
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from orders.side_effects import order_side_effect
+
+from .models import AgentSession, OrderAssignment
+from .workload import ELIGIBLE_SESSION_STATUSES, OPEN_ORDER_STATUSES, get_workload_registry
+
+
+def _adjust_after_commit(deltas, date):
+    registry = get_workload_registry()
+    transaction.on_commit(lambda: registry.adjust(deltas, date))
+
+
+@receiver(post_save, sender=OrderAssignment)
+def track_assignment_workload(sender, instance, created, raw=False, **kwargs):
+    """Move the agent workload counters for assignments saved one at a time"""
+    if raw or instance.order.status not in OPEN_ORDER_STATUSES:
+        instance._loaded_agent_id = instance.agent_id
+        return
+
+    previous_agent_id = None if created else getattr(instance, '_loaded_agent_id', instance.agent_id)
+    if previous_agent_id != instance.agent_id:
+        deltas = Counter({instance.agent_id: 1})
+        if previous_agent_id:
+            deltas[previous_agent_id] -= 1
+        _adjust_after_commit(deltas, instance.assignment_date.date())
+    instance._loaded_agent_id = instance.agent_id
+
+
+@receiver(post_delete, sender=OrderAssignment)
+def release_assignment_workload(sender, instance, origin=None, **kwargs):
+    """Stop counting deleted assignments"""
+    if origin is not None and origin.__class__.__name__ == 'Order':
+        # The order itself is gone; the periodic reconcile catches up
+        return
+    if instance.order.status in OPEN_ORDER_STATUSES:
+        _adjust_after_commit({instance.agent_id: -1}, instance.assignment_date.date())
+
+
+@receiver(post_save, sender=AgentSession)
+def track_agent_eligibility(sender, instance, raw=False, **kwargs):
+    """Agents only receive orders from the registry while their session is available or busy"""
+    if raw:
+        return
+    registry = get_workload_registry()
+    eligible = instance.status in ELIGIBLE_SESSION_STATUSES and instance.logout_time is None
+    transaction.on_commit(lambda: registry.set_eligible(instance.agent_id, eligible))
+
+
+@order_side_effect(fields=('status',))
+def track_order_workload(events):
+    """Orders leaving the call center free up their agent; reopened orders count again"""
+    changes = {}
+    for event in events:
+        was_open = event.previous.get('status') in OPEN_ORDER_STATUSES
+        is_open = event.order.status in OPEN_ORDER_STATUSES
+        if was_open != is_open:
+            changes[event.order.pk] = 1 if is_open else -1
+    if not changes:
+        return
+
+    by_date = {}
+    for order_id, agent_id, assigned_at in OrderAssignment.objects.filter(
+        order_id__in=changes
+    ).values_list('order_id', 'agent_id', 'assignment_date'):
+        by_date.setdefault(assigned_at.date(), Counter())[agent_id] += changes[order_id]
+
+    registry = get_workload_registry()
+    for date, deltas in by_date.items():
+        registry.adjust(deltas, date)
@@ -0,0 +1,60 @@
+"""
+Celery tasks for Call Center module
+"""
+from celery import shared_task
+import logging
+
+logger = logging.getLogger('atlas_crm')
+
+
+@shared_task
+def reconcile_agent_workloads():
+    """
+    Rebuild today's live agent workload counters from the database
+    Runs every 10 minutes
+    """
+    from .workload import get_workload_registry
+
+    try:
+        corrected = get_workload_registry().reconcile()
+        if corrected:
+            logger.warning(f"Agent workload registry drifted for {corrected} agents; rebuilt from the database")
+        return {'status': 'success', 'corrected_agents': corrected}
+
+    except Exception as e:
+        logger.error(f"Error reconciling agent workloads: {str(e)}")
+        return {'status': 'error', 'message': str(e)}
+
+
+@shared_task
+def refresh_routing_table():
+    """
+    Precompute the agent features used for weighted order routing
+    Runs every 5 minutes
+    """
+    from .routing import refresh_routing_table as refresh
+
+    try:
+        table = refresh()
+        return {'status': 'success', 'agents': len(table['agents'])}
+
+    except Exception as e:
+        logger.error(f"Error refreshing routing table: {str(e)}")
+        return {'status': 'error', 'message': str(e)}
+
+
+@shared_task
+def refresh_real_time_metrics():
+    """
+    Precompute the real-time dashboard metrics served to polling managers
+    Runs every 15 seconds
+    """
+    from .metrics import refresh_metrics_snapshot
+
+    try:
+        snapshot = refresh_metrics_snapshot()
+        return {'status': 'success', 'timestamp': snapshot['timestamp']}
+
+    except Exception as e:
+        logger.error(f"Error refreshing real-time metrics: {str(e)}")
+        return {'status': 'error', 'message': str(e)}
@@ -1,3 +1,546 @@
+"""
+Unit tests for call center order distribution
+Tests: AgentWorkloadScheduler, AutoOrderDistributionService, AgentWorkloadRegistry, weighted routing, balancing,
+real-time metrics snapshot
+"""
+
+import time
+from datetime import timedelta
+from io import StringIO
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.management import call_command
+from django.db.models import Count
 from django.test import TestCase
+from django.urls import reverse
+from django.utils import timezone
+
+from callcenter import metrics, routing
+from callcenter.models import AgentRoutingProfile, AgentSession, CallLog, CustomerInteraction, OrderAssignment
+from callcenter.services import (
+    AgentWorkloadScheduler, AutoOrderDistributionService, OrderDistributionService, RoutingScheduler,
+)
+from callcenter.workload import get_workload_registry
+from orders.models import Order
+from roles.models import Role, UserRole
+from users.models import AuditLog
+
+User = get_user_model()
+
+
+class AgentWorkloadSchedulerTests(TestCase):
+    """
+    Test suite for AgentWorkloadScheduler and the services built on it
+    Covers: grouped workload query, least loaded picks, skipping assigned orders, bulk redistribution
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        agent_role, _ = Role.objects.get_or_create(name='Call Center Agent')
+        manager_role, _ = Role.objects.get_or_create(name='Call Center Manager')
+        cls.agents = []
+        for i in range(3):
+            agent = User.objects.create_user(
+                email=f'scheduler-agent{i}@test.com',
+                password='testpass123',
+                is_active=True,
+            )
+            UserRole.objects.create(user=agent, role=agent_role, is_primary=True)
+            cls.agents.append(agent)
+        cls.manager = User.objects.create_user(
+            email='scheduler-manager@test.com',
+            password='testpass123',
+            is_active=True,
+        )
+        UserRole.objects.create(user=cls.manager, role=manager_role, is_primary=True)
+
+    def setUp(self):
+        cache.clear()
+
+    def create_orders(self, count, prefix='SCH'):
+        return Order.objects.bulk_create([
+            Order(
+                order_code=f'{prefix}-{i}',
+                customer=f'Customer {i}',
+                store_link='https://example.com/p',
+            )
+            for i in range(count)
+        ])
+
+    def assign_existing(self, agent, count):
+        """Give ``agent`` ``count`` assignments today"""
+        OrderAssignment.objects.bulk_create([
+            OrderAssignment(order=order, manager=self.manager, agent=agent)
+            for order in self.create_orders(count, prefix=f'OLD-{agent.pk}')
+        ])
+
+    def test_workloads_in_one_query(self):
+        """Only open orders count, as in the workload registry"""
+        self.assign_existing(self.agents[0], 3)
+        self.assign_existing(self.agents[2], 1)
+        self.assign_existing(self.agents[1], 2)
+        Order.objects.filter(order_code__startswith=f'OLD-{self.agents[1].pk}').update(status='confirmed')
+        with self.assertNumQueries(1):
+            workloads = AgentWorkloadScheduler.get_workloads(
+                [agent.id for agent in self.agents], timezone.now().date()
+            )
+        self.assertEqual(workloads, {self.agents[0].id: 3, self.agents[1].id: 0, self.agents[2].id: 1})
+
+    def test_least_loaded_agent_first(self):
+        """Picks fill the least loaded agents until workloads level out"""
+        self.assign_existing(self.agents[0], 3)
+        self.assign_existing(self.agents[2], 1)
+        scheduler = AgentWorkloadScheduler(self.agents)
+        picks = [scheduler.next_agent() for _ in range(5)]
+        self.assertEqual(picks, [self.agents[1], self.agents[1], self.agents[2], self.agents[1], self.agents[2]])
+        self.assertEqual(set(scheduler.workloads.values()), {3})
+
+    def test_assign_skips_assigned_orders(self):
+        orders = self.create_orders(4)
+        OrderAssignment.objects.create(order=orders[0], manager=self.manager, agent=self.agents[0])
+
+        scheduler = AgentWorkloadScheduler(self.agents)
+        assignments = scheduler.assign(orders, self.manager, 'notes', 'reason')
+        self.assertEqual({assignment.order for assignment in assignments}, set(orders[1:]))
+        self.assertEqual(OrderAssignment.objects.filter(order__in=orders).count(), 4)
+
+        # A second distributor finds nothing left to assign
+        self.assertEqual(AgentWorkloadScheduler(self.agents).assign(orders, self.manager, 'notes', 'reason'), [])
+
+    def test_distribute_orders_equally(self):
+        self.create_orders(5000)
+        started = time.perf_counter()
+        result = AutoOrderDistributionService.distribute_orders_equally()
+        elapsed = time.perf_counter() - started
+
+        self.assertTrue(result['success'])
+        self.assertEqual(result['distributed_count'], 5000)
+        self.assertLess(elapsed, 1.0)
+        counts = sorted(
+            OrderAssignment.objects.values('agent_id').annotate(count=Count('id')).values_list('count', flat=True)
+        )
+        self.assertEqual(counts, [1666, 1667, 1667])
+
+        result = AutoOrderDistributionService.distribute_orders_equally()
+        self.assertEqual(result['distributed_count'], 0)
+
+    def test_auto_assign_new_order(self):
+        self.assign_existing(self.agents[0], 1)
+        self.assign_existing(self.agents[1], 1)
+        [order] = self.create_orders(1)
+        success, agent = AutoOrderDistributionService.auto_assign_new_order(order)
+        self.assertTrue(success)
+        self.assertEqual(agent, self.agents[2])
+        self.assertEqual(OrderAssignment.objects.get(order=order).manager, self.manager)
+
+
+class AgentWorkloadRegistryTests(TestCase):
+    """
+    Test suite for the live agent workload registry (local memory store)
+    Covers: reconcile, acquire, session eligibility, counter updates, auto-assignment
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        agent_role, _ = Role.objects.get_or_create(name='Call Center Agent')
+        manager_role, _ = Role.objects.get_or_create(name='Call Center Manager')
+        cls.agents = []
+        for i in range(3):
+            agent = User.objects.create_user(
+                email=f'registry-agent{i}@test.com',
+                password='testpass123',
+                is_active=True,
+            )
+            UserRole.objects.create(user=agent, role=agent_role, is_primary=True)
+            cls.agents.append(agent)
+        cls.manager = User.objects.create_user(
+            email='registry-manager@test.com',
+            password='testpass123',
+            is_active=True,
+        )
+        UserRole.objects.create(user=cls.manager, role=manager_role, is_primary=True)
+
+    def setUp(self):
+        cache.clear()
+        self.addCleanup(cache.clear)
+        self.registry = get_workload_registry()
+
+    def create_order(self, **kwargs):
+        defaults = {'customer': 'Customer', 'store_link': 'https://example.com/p'}
+        defaults.update(kwargs)
+        return Order.objects.create(**defaults)
+
+    def open_session(self, agent, status='available'):
+        with self.captureOnCommitCallbacks(execute=True):
+            return AgentSession.objects.create(agent=agent, status=status)
+
+    def test_reconcile(self):
+        """Counts today's assignments of open orders; eligibility follows the latest session"""
+        for status in ('pending', 'pending', 'confirmed'):
+            OrderAssignment.objects.create(
+                order=self.create_order(status=status), manager=self.manager, agent=self.agents[0]
+            )
+        AgentSession.objects.create(agent=self.agents[0], status='offline',
+                                    login_time=timezone.now() - timezone.timedelta(hours=2))
+        AgentSession.objects.create(agent=self.agents[0], status='available')
+        AgentSession.objects.create(agent=self.agents[1], status='break')
+
+        self.assertEqual(self.registry.reconcile(), 3)
+        workloads, ready = self.registry.snapshot()
+        self.assertEqual(workloads, {self.agents[0].id: 2, self.agents[1].id: 0, self.agents[2].id: 0})
+        self.assertEqual(ready, {self.agents[0].id})
+        self.assertEqual(self.registry.reconcile(), 0)
+
+    def test_acquire_least_loaded_ready_agent(self):
+        self.registry.reconcile()
+        self.assertEqual(self.registry.acquire(1), [])
+
+        self.open_session(self.agents[1])
+        self.open_session(self.agents[2])
+        self.registry.adjust({self.agents[1].id: 2})
+        self.assertEqual(self.registry.acquire(3), [self.agents[2].id, self.agents[2].id, self.agents[1].id])
+
+        self.open_session(self.agents[2], status='offline')
+        self.assertEqual(self.registry.acquire(1), [self.agents[1].id])
+
+    def test_counters_follow_assignments_and_orders(self):
+        self.registry.reconcile()
+        with self.captureOnCommitCallbacks(execute=True):
+            order = self.create_order()
+            assignment = OrderAssignment.objects.create(order=order, manager=self.manager, agent=self.agents[0])
+        self.assertEqual(self.registry.snapshot()[0][self.agents[0].id], 1)
+
+        # Reassigned
+        assignment = OrderAssignment.objects.get(pk=assignment.pk)
+        with self.captureOnCommitCallbacks(execute=True):
+            assignment.agent = self.agents[1]
+            assignment.save()
+        workloads = self.registry.snapshot()[0]
+        self.assertEqual((workloads[self.agents[0].id], workloads[self.agents[1].id]), (0, 1))
+
+        # Completed
+        order = Order.objects.get(pk=order.pk)
+        with self.captureOnCommitCallbacks(execute=True):
+            order.status = 'confirmed'
+            order.save()
+        self.assertEqual(self.registry.snapshot()[0][self.agents[1].id], 0)
+
+    def test_auto_assign_uses_registry(self):
+        """New orders go to agents with an open session, without counting assignments"""
+        self.open_session(self.agents[2])
+        self.registry.reconcile()
+        orders = Order.objects.bulk_create([
+            Order(order_code=f'REG-{i}', customer='Customer', store_link='https://example.com/p')
+            for i in range(3)
+        ])
+        with self.captureOnCommitCallbacks(execute=True):
+            assignments = AutoOrderDistributionService.auto_assign_orders(orders)
+        self.assertEqual({assignment.agent for assignment in assignments}, {self.agents[2]})
+        self.assertEqual(self.registry.snapshot()[0][self.agents[2].id], 3)
+
+    def test_auto_assign_drops_stale_agents(self):
+        """Agents deactivated since the registry was built are skipped"""
+        self.open_session(self.agents[0])
+        self.open_session(self.agents[1])
+        self.registry.reconcile()
+        User.objects.filter(pk=self.agents[0].pk).update(is_active=False)
+
+        orders = Order.objects.bulk_create([
+            Order(order_code=f'STALE-{i}', customer='Customer', store_link='https://example.com/p')
+            for i in range(2)
+        ])
+        assignments = AutoOrderDistributionService.auto_assign_orders(orders)
+        self.assertEqual([assignment.agent for assignment in assignments], [self.agents[1], self.agents[1]])
+        self.assertEqual(self.registry.snapshot()[1], {self.agents[1].id})
+
+
+class WeightedRoutingTests(TestCase):
+    """
+    Test suite for weighted order routing
+    Covers: order features, routing table queries, language/emirate affinity, simulation
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        agent_role, _ = Role.objects.get_or_create(name='Call Center Agent')
+        manager_role, _ = Role.objects.get_or_create(name='Call Center Manager')
+        cls.agents = []
+        for i, (languages, emirates) in enumerate([(['ar'], ['DXB']), (['en'], ['AD']), ([], [])]):
+            agent = User.objects.create_user(
+                email=f'routing-agent{i}@test.com',
+                password='testpass123',
+                is_active=True,
+            )
+            UserRole.objects.create(user=agent, role=agent_role, is_primary=True)
+            AgentRoutingProfile.objects.create(agent=agent, languages=languages, emirates=emirates)
+            cls.agents.append(agent)
+        cls.manager = User.objects.create_user(
+            email='routing-manager@test.com',
+            password='testpass123',
+            is_active=True,
+        )
+        UserRole.objects.create(user=cls.manager, role=manager_role, is_primary=True)
+
+    def setUp(self):
+        cache.clear()
+        self.addCleanup(cache.clear)
+
+    def create_orders(self, specs, prefix='RT'):
+        with self.captureOnCommitCallbacks(execute=True):
+            return Order.objects.bulk_create([
+                Order(order_code=f'{prefix}-{i}', store_link='https://example.com/p', **spec)
+                for i, spec in enumerate(specs)
+            ])
+
+    def test_order_features(self):
+        self.assertEqual(routing.order_features({'customer': 'محمد علي', 'emirate': 'Dubai'}), ('ar', 'DXB'))
+        self.assertEqual(routing.order_features({'customer': 'John', 'city': 'ابوظبي'}), ('en', 'AD'))
+        self.assertEqual(routing.order_features({'customer': 'John', 'state': 'Dubai Marina'}), ('en', 'DXB'))
+        self.assertEqual(routing.order_features({'customer': 'John', 'state': 'Nowhere'}), ('en', ''))
+
+    def test_routing_table_queries(self):
+        """Agent count does not change the number of queries"""
+        orders = self.create_orders([{'customer': 'A', 'status': 'confirmed'}, {'customer': 'B'}])
+        for order in orders:
+            OrderAssignment.objects.create(order=order, manager=self.manager, agent=self.agents[0])
+
+        with self.assertNumQueries(4):
+            table = routing.build_routing_table()
+        features = table['agents'][self.agents[0].id]
+        self.assertEqual((features['workload'], features['confirmation_rate']), (1, 0.5))
+        self.assertEqual(features['languages'], ['ar'])
+        self.assertEqual(table['agents'][self.agents[2].id]['languages'], ['ar', 'en'])
+        self.assertEqual(table['agents'][self.agents[2].id]['confirmation_rate'], routing.DEFAULT_CONFIRMATION_RATE)
+
+        routing.refresh_routing_table()
+        with self.assertNumQueries(0):
+            self.assertEqual(routing.get_routing_table()['agents'], table['agents'])
+        self.assertAlmostEqual(OrderDistributionService.get_agent_performance_score(self.agents[0]), 0.65)
+
+    def test_routes_by_language_and_emirate(self):
+        orders = self.create_orders([
+            {'customer': 'فاطمة', 'emirate': 'Dubai'},
+            {'customer': 'Jane Doe', 'city': 'ابوظبي'},
+        ])
+        with self.assertNumQueries(9):
+            # Routing table (4), agents, savepoint, order rows, insert, release
+            assignments = RoutingScheduler(AutoOrderDistributionService.get_available_agents()).assign(
+                Order.objects.filter(pk__in=[order.pk for order in orders]).order_by('pk'),
+                self.manager, 'notes', 'reason'
+            )
+        self.assertEqual(
+            [(assignment.order_id, assignment.agent) for assignment in assignments],
+            [(orders[0].pk, self.agents[0]), (orders[1].pk, self.agents[1])]
+        )
+
+    def test_distribute_orders_automatically(self):
+        self.create_orders([{'customer': 'Customer'} for _ in range(6)])
+        result = OrderDistributionService.distribute_orders_automatically()
+        self.assertTrue(result['success'])
+        self.assertEqual((result['distributed_count'], result['total_agents'], result['orders_per_agent']), (6, 3, 2))
+        self.assertEqual(OrderAssignment.objects.values('agent').distinct().count(), 3)
+        self.assertEqual(OrderDistributionService.distribute_orders_automatically()['distributed_count'], 0)
+
+    def test_simulate_weightings(self):
+        """Affinity weights trade load balance for language and emirate matches"""
+        orders = [{'customer': 'سارة', 'emirate': 'DXB'}] * 30 + [{'customer': 'Sam', 'emirate': 'AD'}] * 10
+        table = routing.build_routing_table()
+
+        balanced = routing.simulate(orders, table, {'workload': 1, 'confirmation_rate': 0, 'language': 0, 'emirate': 0})
+        affinity = routing.simulate(orders, table, {'workload': 0.1, 'confirmation_rate': 0, 'language': 1, 'emirate': 1})
+
+        self.assertEqual(balanced['orders'], 40)
+        self.assertLessEqual(balanced['max_load'] - balanced['min_load'], 1)
+        self.assertEqual((affinity['language_match_rate'], affinity['emirate_match_rate']), (1.0, 1.0))
+        self.assertLess(balanced['language_match_rate'], 1.0)
+        self.assertGreater(affinity['makespan_hours'], balanced['makespan_hours'])
+
+    def test_simulate_routing_command(self):
+        self.create_orders([{'customer': 'سارة', 'emirate': 'DXB'}, {'customer': 'Sam', 'emirate': 'AD'}])
+        out = StringIO()
+        call_command(
+            'simulate_routing', date=str(timezone.now().date()), weights=['language=1', 'workload=1,language=0'],
+            stdout=out
+        )
+        output = out.getvalue()
+        self.assertIn('Replaying 2 orders', output)
+        self.assertIn('language=1', output)
+        self.assertIn('language match 100%', output)
+
+
+class BalanceWorkloadsTests(TestCase):
+    """
+    Test suite for AutoOrderDistributionService.balance_workloads
+    Covers: greedy move plan, move cap, dry run, bulk writes and audit rows
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        agent_role, _ = Role.objects.get_or_create(name='Call Center Agent')
+        cls.agents = []
+        for i in range(3):
+            agent = User.objects.create_user(
+                email=f'balance-agent{i}@test.com',
+                password='testpass123',
+                is_active=True,
+            )
+            UserRole.objects.create(user=agent, role=agent_role, is_primary=True)
+            cls.agents.append(agent)
+        cls.manager = User.objects.create_user(email='balance-manager@test.com', password='testpass123', is_active=True)
+
+    def setUp(self):
+        cache.clear()
+        self.addCleanup(cache.clear)
+
+    def assign(self, agent, count, status='pending'):
+        with self.captureOnCommitCallbacks(execute=True):
+            orders = Order.objects.bulk_create([
+                Order(order_code=f'BAL-{agent.pk}-{status}-{i}', customer='Customer',
+                      store_link='https://example.com/p', status=status)
+                for i in range(count)
+            ])
+            OrderAssignment.objects.bulk_create([
+                OrderAssignment(order=order, manager=self.manager, agent=agent) for order in orders
+            ])
+
+    def workloads(self):
+        return dict(
+            OrderAssignment.objects.filter(order__status='pending')
+            .values('agent_id').annotate(count=Count('id')).values_list('agent_id', 'count')
+        )
+
+    def test_plan_balance_moves(self):
+        moves, balanced = AutoOrderDistributionService.plan_balance_moves({1: 10, 2: 0, 3: 5})
+        self.assertEqual(sum(moves.values()), 5)
+        self.assertEqual(dict(moves), {(1, 2): 5})
+        self.assertEqual(balanced, {1: 5, 2: 5, 3: 5})
+
+        moves, balanced = AutoOrderDistributionService.plan_balance_moves({1: 10, 2: 0, 3: 0}, max_moves=4)
+        self.assertEqual(dict(moves), {(1, 2): 2, (1, 3): 2})
+        self.assertEqual(balanced, {1: 6, 2: 2, 3: 2})
+
+        self.assertEqual(AutoOrderDistributionService.plan_balance_moves({1: 2, 2: 1})[0], {})
+
+    def test_plan_balance_moves_with_tied_loads(self):
+        """Agents whose loads tie after a move, with the receiver's id above the giver's, stay in the plan"""
+        moves, balanced = AutoOrderDistributionService.plan_balance_moves({1: 2, 2: 2, 3: 0, 4: 0, 5: 0, 6: 0})
+        self.assertEqual(dict(moves), {(2, 3): 1, (1, 4): 1})
+        self.assertEqual(balanced, {1: 1, 2: 1, 3: 1, 4: 1, 5: 0, 6: 0})
+
+    def test_dry_run(self):
+        self.assign(self.agents[0], 6)
+        before = self.workloads()
+        result = AutoOrderDistributionService.balance_workloads(dry_run=True)
+        self.assertTrue(result['dry_run'])
+        self.assertEqual(result['moved_count'], 4)
+        self.assertEqual(
+            sorted((move['from_agent_id'], move['to_agent_id']) for move in result['moves']),
+            [(self.agents[0].id, self.agents[1].id)] * 2 + [(self.agents[0].id, self.agents[2].id)] * 2
+        )
+        self.assertEqual(self.workloads(), before)
+        self.assertFalse(AuditLog.objects.filter(entity_type='OrderAssignment').exists())
+
+    def test_balance_in_bulk(self):
+        """Only open orders move; writes are one bulk update and one audit insert"""
+        self.assign(self.agents[0], 7)
+        self.assign(self.agents[0], 3, status='confirmed')
+        self.assign(self.agents[1], 2)
+        registry = get_workload_registry()
+        registry.reconcile()
+
+        with self.assertNumQueries(7), self.captureOnCommitCallbacks(execute=True):
+            # Agents, workloads, savepoint, candidates, update, audit insert, release
+            result = AutoOrderDistributionService.balance_workloads(user=self.manager)
+        self.assertEqual(result['moved_count'], 4)
+        self.assertEqual(self.workloads(), {self.agents[0].id: 3, self.agents[1].id: 3, self.agents[2].id: 3})
+        self.assertEqual(registry.snapshot()[0], self.workloads())
+        self.assertEqual(
+            OrderAssignment.objects.filter(order__status='confirmed', agent=self.agents[0]).count(), 3
+        )
+        moved = OrderAssignment.objects.filter(previous_agent=self.agents[0])
+        self.assertEqual(moved.count(), 4)
+        self.assertEqual(
+            AuditLog.objects.filter(entity_type='OrderAssignment', user=self.manager).count(), 4
+        )
+
+        self.assertEqual(AutoOrderDistributionService.balance_workloads()['message'], 'Workloads are already balanced')
+
+    def test_move_cap(self):
+        self.assign(self.agents[0], 9)
+        result = AutoOrderDistributionService.balance_workloads(max_moves=2)
+        self.assertEqual(result['moved_count'], 2)
+        self.assertEqual(sorted(self.workloads().values()), [1, 1, 7])
+
+
+class RealTimeMetricsTests(TestCase):
+    """
+    Test suite for the real-time metrics snapshot
+    Covers: aggregate queries, cached reads, staleness metadata, API endpoint
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        agent_role, _ = Role.objects.get_or_create(name='Call Center Agent')
+        cls.agent = User.objects.create_user(email='metrics-agent@test.com', password='testpass123', is_active=True)
+        UserRole.objects.create(user=cls.agent, role=agent_role, is_primary=True)
+
+    def setUp(self):
+        cache.clear()
+        self.addCleanup(cache.clear)
+
+    def test_compute_metrics(self):
+        now = timezone.now()
+        AgentSession.objects.create(agent=self.agent, status='busy')
+        AgentSession.objects.create(agent=self.agent, status='break')
+        with self.captureOnCommitCallbacks(execute=True):
+            pending = Order.objects.create(customer='A', store_link='https://example.com/p', status='pending')
+            Order.objects.create(customer='B', store_link='https://example.com/p', status='confirmed')
+        CallLog.objects.create(order=pending, agent=self.agent, status='completed')
+        CallLog.objects.create(order=pending, agent=self.agent, status='completed', call_time=now - timedelta(days=2))
+        CustomerInteraction.objects.create(
+            order=pending, agent=self.agent, interaction_type='call',
+            resolution_status='follow_up_required', follow_up_date=now + timedelta(hours=1)
+        )
+        CustomerInteraction.objects.create(
+            order=pending, agent=self.agent, interaction_type='call', resolution_status='escalated'
+        )
+
+        with self.assertNumQueries(4):
+            data = metrics.compute_real_time_metrics()
+        self.assertEqual(data['agents'], {'active': 1, 'available': 0, 'busy': 1, 'on_break': 1})
+        self.assertEqual(data['calls'], {'today_total': 1, 'last_hour': 1, 'in_progress': 1})
+        self.assertEqual(data['orders'], {'pending': 1, 'confirmed_today': 1})
+        self.assertEqual(data['alerts'], {'pending_followups': 1, 'escalated': 1})
+
+    def test_snapshot_served_from_cache(self):
+        metrics.refresh_metrics_snapshot()
+        with self.assertNumQueries(0):
+            data = metrics.get_metrics_snapshot()
+        self.assertFalse(data['stale'])
+        self.assertEqual(data['refresh_interval'], metrics.SNAPSHOT_INTERVAL)
+
+    def test_stale_snapshot_rebuilt_once(self):
+        old = metrics.compute_real_time_metrics(timezone.now() - timedelta(minutes=10))
+        cache.set(metrics.SNAPSHOT_KEY, old)
+
+        data = metrics.get_metrics_snapshot()
+        self.assertNotEqual(data['generated_at'], old['timestamp'])
+        self.assertLess(data['age_seconds'], 1)
+
+        # Worker still down: only the lock holder rebuilds, others serve the stale copy
+        cache.set(metrics.SNAPSHOT_KEY, old)
+        with self.assertNumQueries(0):
+            data = metrics.get_metrics_snapshot()
+        self.assertTrue(data['stale'])
+        self.assertGreater(data['age_seconds'], 500)
 
-# Create your tests here.
+    def test_api(self):
+        self.client.force_login(self.agent)
+        response = self.client.get(reverse('callcenter:real_time_metrics'))
+        self.assertEqual(response.status_code, 200)
+        data = response.json()
+        self.assertEqual(set(data), {
+            'timestamp', 'agents', 'calls', 'orders', 'alerts',
+            'generated_at', 'age_seconds', 'refresh_interval', 'stale',
+        })
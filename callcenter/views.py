@@ -10,7 +10,9 @@ from .models import (
     CallLog, AgentPerformance, AgentSession, CustomerInteraction,
     OrderStatusHistory, OrderAssignment, ManagerNote, TeamPerformance
 )
+from .metrics import get_metrics_snapshot
 from .services import OrderDistributionService, AutoOrderDistributionService
+from utils.exports import Column, Export, export_response, super_admin_export
 from orders.models import Order, StatusLog
 from users.models import User
 from inventory.models import Stock
@@ -1676,8 +1678,14 @@ def balance_agent_workloads(request):
     """Balance workloads between agents"""
     if request.method == 'POST':
         try:
-            result = AutoOrderDistributionService.balance_workloads()
-            messages.success(request, result)
+            result = AutoOrderDistributionService.balance_workloads(
+                dry_run=bool(request.POST.get('dry_run')),
+                user=request.user
+            )
+            if result['success']:
+                messages.success(request, result['message'])
+            else:
+                messages.error(request, result['message'])
         except Exception as e:
             messages.error(request, f'Error balancing workloads: {str(e)}')
     
@@ -3305,58 +3313,8 @@ def enhanced_dashboard(request):
 @login_required
 @user_passes_test(has_callcenter_role)
 def real_time_metrics(request):
-    """API endpoint for real-time dashboard metrics."""
-    now = timezone.now()
-    today = now.date()
-    start_of_day = timezone.make_aware(datetime.combine(today, datetime.min.time()))
-    
-    # Get current metrics
-    active_agents = AgentSession.objects.filter(
-        status__in=['available', 'busy'],
-        last_activity__gte=now - timedelta(minutes=5)
-    )
-    
-    metrics = {
-        'timestamp': now.isoformat(),
-        'agents': {
-            'active': active_agents.count(),
-            'available': active_agents.filter(status='available').count(),
-            'busy': active_agents.filter(status='busy').count(),
-            'on_break': AgentSession.objects.filter(
-                status='break',
-                last_activity__gte=now - timedelta(minutes=30)
-            ).count(),
-        },
-        'calls': {
-            'today_total': CallLog.objects.filter(call_time__gte=start_of_day).count(),
-            'last_hour': CallLog.objects.filter(
-                call_time__gte=now - timedelta(hours=1)
-            ).count(),
-            'in_progress': AgentSession.objects.filter(
-                status='busy',
-                last_activity__gte=now - timedelta(minutes=5)
-            ).count(),
-        },
-        'orders': {
-            'pending': Order.objects.filter(status='PENDING').count(),
-            'confirmed_today': Order.objects.filter(
-                status='CONFIRMED',
-                updated_at__gte=start_of_day
-            ).count(),
-        },
-        'alerts': {
-            'pending_followups': CustomerInteraction.objects.filter(
-                follow_up_date__lte=now + timedelta(hours=2),
-                resolution_status='follow_up_required'
-            ).count(),
-            'escalated': CustomerInteraction.objects.filter(
-                resolution_status='escalated',
-                interaction_time__gte=start_of_day
-            ).count(),
-        }
-    }
-    
-    return JsonResponse(metrics)
+    """API endpoint for real-time dashboard metrics, served from the cached snapshot."""
+    return JsonResponse(get_metrics_snapshot())
 
 # Bulk Operations Views
 
@@ -3562,75 +3520,38 @@ def bulk_create_followups(request):
 
 
 @login_required
+@super_admin_export(entity_type='order', label='orders')
 def export_orders_csv(request):
     """Export orders to CSV - RESTRICTED TO SUPER ADMIN ONLY."""
-    import csv
-    from django.http import HttpResponse
-    from users.models import AuditLog
-
-    # SECURITY: Restrict data export to Super Admin only (P0 CRITICAL requirement)
-    if not request.user.is_superuser:
-        from utils.views import permission_denied_authenticated
-        AuditLog.objects.create(
-            user=request.user,
-            action='unauthorized_export_attempt',
-            entity_type='order',
-            description=f"Unauthorized attempt to export orders by {request.user.email}",
-            ip_address=request.META.get('REMOTE_ADDR'),
-            user_agent=request.META.get('HTTP_USER_AGENT', '')
-        )
-        return permission_denied_authenticated(
-            request,
-            message="Data export is restricted to Super Admin only for security compliance."
-        )
-    
     order_ids = request.GET.getlist('order_ids[]')
     status_filter = request.GET.get('status')
     
     # Build query
-    query = Order.objects.all()
+    query = Order.objects.order_by('-created_at')
     if order_ids:
         query = query.filter(id__in=order_ids)
     if status_filter:
         query = query.filter(status=status_filter)
     
-    query = query.select_related('customer', 'call_center_agent')[:1000]
-    
-    # Create CSV response
-    response = HttpResponse(content_type='text/csv; charset=utf-8')
-    response['Content-Disposition'] = f'attachment; filename="orders_{timezone.now().strftime("%Y%m%d_%H%M%S")}.csv"'
-    response.write('\ufeff')  # UTF-8 BOM for Excel
-    
-    writer = csv.writer(response)
-    writer.writerow([
-        'Order ID', 'Customer Name', 'Customer Phone', 'Status',
-        'Agent', 'Created Date', 'Total Amount', 'Payment Status'
+    export = Export(query, [
+        Column('Order ID', 'id'),
+        Column('Order Code', 'order_code'),
+        Column('Customer Name', 'customer', default='N/A'),
+        Column('Customer Phone', 'customer_phone', default='N/A'),
+        Column('Status', 'status'),
+        Column('Agent', 'agent__full_name', default='Unassigned'),
+        Column('Created Date', 'created_at', date_format='%Y-%m-%d %H:%M'),
+        Column('Total Amount', 'total_amount'),
+        Column('Workflow Status', 'workflow_status'),
     ])
     
-    for order in query:
-        writer.writerow([
-            order.id,
-            order.customer.get_full_name() if order.customer else 'N/A',
-            order.customer_phone or 'N/A',
-            order.status,
-            order.call_center_agent.get_full_name() if order.call_center_agent else 'Unassigned',
-            order.created_at.strftime('%Y-%m-%d %H:%M'),
-            order.total_amount,
-            order.payment_status
-        ])
-
-    # Audit log for successful export (P0 CRITICAL security requirement)
-    AuditLog.objects.create(
-        user=request.user,
-        action='data_export',
+    return export_response(
+        request, export.rows(),
+        filename=f'orders_{timezone.now().strftime("%Y%m%d_%H%M%S")}',
         entity_type='order',
-        description=f"Exported {query.count()} orders to CSV",
-        ip_address=request.META.get('REMOTE_ADDR'),
-        user_agent=request.META.get('HTTP_USER_AGENT', '')
+        describe=lambda fmt: f"Exported {export.count} orders to {fmt}",
     )
 
-    return response
-
 
 # ============================================
 # Callbacks Management Views
@@ -0,0 +1,309 @@
+"""
+Live per-agent workload counters used to auto-assign new orders.
+
+For every day the registry keeps two sorted sets of agent id -> open
+assignments (assigned that day, order still with the call center):
+
+* ``workload`` holds every call center agent;
+* ``ready`` holds only the agents whose latest AgentSession is available
+  or busy, with the same scores.
+
+Picking the next agent is ZRANGE ready 0 0 plus ZINCRBY on both sets, run
+as one Lua script so concurrent assigners never pick from stale counts.
+Counters are adjusted when assignments are created, reassigned or
+deleted and when their order leaves (or re-enters) an open status.
+
+With Redis as the default cache the sets live in Redis. Other deployments
+fall back to a dict in the default cache guarded by a process lock, which
+is exact for a single process. ``reconcile`` rebuilds a day from the
+database; it runs on the first use of each day and periodically from
+``callcenter.tasks.reconcile_agent_workloads`` to repair drift.
+"""
+import threading
+from collections import Counter
+
+from django.core.cache import cache
+from django.core.cache.backends.redis import RedisCache
+from django.db.models import Count
+from django.utils import timezone
+
+# Order statuses that still need the call center
+OPEN_ORDER_STATUSES = (
+    'pending', 'pending_confirmation', 'processing',
+    'no_answer_1st', 'no_answer_2nd', 'postponed', 'call_back_later', 'escalate_manager',
+)
+# Latest AgentSession statuses that can receive new orders
+ELIGIBLE_SESSION_STATUSES = ('available', 'busy')
+
+KEY_TIMEOUT = 60 * 60 * 48
+
+_ACQUIRE_SCRIPT = """
+local picked = {}
+for i = 1, tonumber(ARGV[1]) do
+    local top = redis.call('ZRANGE', KEYS[2], 0, 0)
+    if #top == 0 then
+        break
+    end
+    redis.call('ZINCRBY', KEYS[1], 1, top[1])
+    redis.call('ZINCRBY', KEYS[2], 1, top[1])
+    picked[#picked + 1] = top[1]
+end
+redis.call('EXPIRE', KEYS[1], ARGV[2])
+redis.call('EXPIRE', KEYS[2], ARGV[2])
+return picked
+"""
+
+_ADJUST_SCRIPT = """
+for i = 2, #ARGV, 2 do
+    local agent = ARGV[i]
+    local score = redis.call('ZINCRBY', KEYS[1], ARGV[i + 1], agent)
+    if tonumber(score) < 0 then
+        score = 0
+        redis.call('ZADD', KEYS[1], 0, agent)
+    end
+    if redis.call('ZSCORE', KEYS[2], agent) then
+        redis.call('ZADD', KEYS[2], score, agent)
+    end
+end
+redis.call('EXPIRE', KEYS[1], ARGV[1])
+redis.call('EXPIRE', KEYS[2], ARGV[1])
+"""
+
+_ELIGIBILITY_SCRIPT = """
+if ARGV[2] == '1' then
+    local score = redis.call('ZSCORE', KEYS[1], ARGV[1]) or 0
+    redis.call('ZADD', KEYS[2], score, ARGV[1])
+else
+    redis.call('ZREM', KEYS[2], ARGV[1])
+end
+"""
+
+
+class RedisWorkloadStore:
+    """Sorted sets in the Redis cache"""
+
+    def __init__(self, redis_cache):
+        self.cache = redis_cache
+        self.client = redis_cache._cache.get_client(write=True)
+        self.acquire_script = self.client.register_script(_ACQUIRE_SCRIPT)
+        self.adjust_script = self.client.register_script(_ADJUST_SCRIPT)
+        self.eligibility_script = self.client.register_script(_ELIGIBILITY_SCRIPT)
+
+    def keys(self, date):
+        return [
+            self.cache.make_key(f'callcenter_workload:{date}'),
+            self.cache.make_key(f'callcenter_workload_ready:{date}'),
+        ]
+
+    def built_key(self, date):
+        return self.cache.make_key(f'callcenter_workload_built:{date}')
+
+    def is_built(self, date):
+        return bool(self.client.exists(self.built_key(date)))
+
+    def acquire(self, date, count):
+        picked = self.acquire_script(keys=self.keys(date), args=[count, KEY_TIMEOUT])
+        return [int(agent_id) for agent_id in picked]
+
+    def adjust(self, date, deltas):
+        args = [KEY_TIMEOUT]
+        for agent_id, delta in deltas.items():
+            args += [agent_id, delta]
+        self.adjust_script(keys=self.keys(date), args=args)
+
+    def set_eligible(self, date, agent_id, eligible):
+        self.eligibility_script(keys=self.keys(date), args=[agent_id, '1' if eligible else '0'])
+
+    def has_ready_agents(self, date):
+        return self.client.zcard(self.keys(date)[1]) > 0
+
+    def snapshot(self, date):
+        workload_key, ready_key = self.keys(date)
+        workloads = {int(agent_id): int(score) for agent_id, score in self.client.zrange(workload_key, 0, -1, withscores=True)}
+        ready = {int(agent_id) for agent_id in self.client.zrange(ready_key, 0, -1)}
+        return workloads, ready
+
+    def replace(self, date, workloads, ready):
+        workload_key, ready_key = self.keys(date)
+        pipe = self.client.pipeline(transaction=True)
+        pipe.delete(workload_key, ready_key)
+        if workloads:
+            pipe.zadd(workload_key, workloads)
+            pipe.expire(workload_key, KEY_TIMEOUT)
+        ready_scores = {agent_id: workloads.get(agent_id, 0) for agent_id in ready}
+        if ready_scores:
+            pipe.zadd(ready_key, ready_scores)
+            pipe.expire(ready_key, KEY_TIMEOUT)
+        pipe.set(self.built_key(date), 1, ex=KEY_TIMEOUT)
+        pipe.execute()
+
+
+class LocalWorkloadStore:
+    """Dicts in the default (local memory) cache, for deployments without Redis"""
+
+    _lock = threading.Lock()
+
+    def __init__(self, local_cache):
+        self.cache = local_cache
+
+    def key(self, date):
+        return f'callcenter_workload:{date}'
+
+    def is_built(self, date):
+        return self.cache.get(self.key(date)) is not None
+
+    def _state(self, date):
+        return self.cache.get(self.key(date)) or {'workloads': {}, 'ready': set()}
+
+    def _save(self, date, state):
+        self.cache.set(self.key(date), state, KEY_TIMEOUT)
+
+    def acquire(self, date, count):
+        with self._lock:
+            state = self._state(date)
+            workloads, ready = state['workloads'], state['ready']
+            picked = []
+            for _ in range(count):
+                if not ready:
+                    break
+                agent_id = min(ready, key=lambda agent: (workloads.get(agent, 0), agent))
+                workloads[agent_id] = workloads.get(agent_id, 0) + 1
+                picked.append(agent_id)
+            self._save(date, state)
+        return picked
+
+    def adjust(self, date, deltas):
+        with self._lock:
+            state = self.cache.get(self.key(date))
+            if state is None:
+                # Not built yet; reconcile will count these
+                return
+            for agent_id, delta in deltas.items():
+                state['workloads'][agent_id] = max(0, state['workloads'].get(agent_id, 0) + delta)
+            self._save(date, state)
+
+    def set_eligible(self, date, agent_id, eligible):
+        with self._lock:
+            state = self._state(date)
+            if eligible:
+                state['ready'].add(agent_id)
+            else:
+                state['ready'].discard(agent_id)
+            self._save(date, state)
+
+    def has_ready_agents(self, date):
+        return bool(self._state(date)['ready'])
+
+    def snapshot(self, date):
+        state = self._state(date)
+        return dict(state['workloads']), set(state['ready'])
+
+    def replace(self, date, workloads, ready):
+        with self._lock:
+            self._save(date, {'workloads': dict(workloads), 'ready': set(ready)})
+
+
+class AgentWorkloadRegistry:
+    """Per-day open assignment counters for call center agents"""
+
+    def __init__(self, store):
+        self.store = store
+
+    @staticmethod
+    def today():
+        return timezone.now().date()
+
+    def acquire(self, count, date=None):
+        """
+        Reserve the ``count`` next least loaded ready agents, counting one
+        more open assignment for each. Returns agent ids (fewer than
+        ``count`` only when no agent is ready).
+        """
+        date = date or self.today()
+        self.ensure(date)
+        return self.store.acquire(date, count)
+
+    def adjust(self, deltas, date=None):
+        """Add ``{agent_id: delta}`` to the open assignment counts"""
+        deltas = {agent_id: delta for agent_id, delta in deltas.items() if agent_id and delta}
+        if deltas:
+            self.store.adjust(date or self.today(), deltas)
+
+    def record_assignments(self, assignments):
+        """Count newly created assignments"""
+        by_date = {}
+        for assignment in assignments:
+            by_date.setdefault(assignment.assignment_date.date(), Counter())[assignment.agent_id] += 1
+        for date, deltas in by_date.items():
+            self.adjust(deltas, date)
+
+    def set_eligible(self, agent_id, eligible, date=None):
+        date = date or self.today()
+        if self.store.is_built(date):
+            self.store.set_eligible(date, agent_id, eligible)
+
+    def has_ready_agents(self, date=None):
+        date = date or self.today()
+        self.ensure(date)
+        return self.store.has_ready_agents(date)
+
+    def snapshot(self, date=None):
+        """({agent_id: open assignments}, {ready agent ids}) as currently recorded"""
+        return self.store.snapshot(date or self.today())
+
+    def current_workloads(self, date=None):
+        """{agent_id: open assignments} when the day's counters are built, else None"""
+        date = date or self.today()
+        if not self.store.is_built(date):
+            return None
+        return self.store.snapshot(date)[0]
+
+    def ensure(self, date):
+        if not self.store.is_built(date):
+            self.reconcile(date)
+
+    def reconcile(self, date=None):
+        """Rebuild a day's counters from the database; returns how many agents were corrected"""
+        from .models import AgentSession, OrderAssignment
+        from .services import AutoOrderDistributionService
+
+        date = date or self.today()
+        agent_ids = list(AutoOrderDistributionService.get_available_agents().filter(is_active=True).values_list('id', flat=True))
+
+        counts = dict(
+            OrderAssignment.objects.filter(
+                agent_id__in=agent_ids,
+                assignment_date__date=date,
+                order__status__in=OPEN_ORDER_STATUSES
+            )
+            .values('agent_id')
+            .annotate(count=Count('id'))
+            .values_list('agent_id', 'count')
+        )
+        workloads = {agent_id: counts.get(agent_id, 0) for agent_id in agent_ids}
+
+        # Latest session per agent decides eligibility
+        latest_status = {}
+        for agent_id, status in (
+            AgentSession.objects.filter(agent_id__in=agent_ids)
+            .order_by('agent_id', '-login_time', '-id')
+            .values_list('agent_id', 'status')
+        ):
+            latest_status.setdefault(agent_id, status)
+        ready = {agent_id for agent_id, status in latest_status.items() if status in ELIGIBLE_SESSION_STATUSES}
+
+        previous_workloads, previous_ready = self.store.snapshot(date)
+        corrected = sum(
+            1 for agent_id in set(workloads) | set(previous_workloads)
+            if workloads.get(agent_id) != previous_workloads.get(agent_id)
+            or (agent_id in ready) != (agent_id in previous_ready)
+        )
+        self.store.replace(date, workloads, ready)
+        return corrected
+
+
+def get_workload_registry():
+    """The registry backed by Redis when it is the default cache, else by local memory"""
+    if isinstance(cache, RedisCache):
+        return AgentWorkloadRegistry(RedisWorkloadStore(cache))
+    return AgentWorkloadRegistry(LocalWorkloadStore(cache))
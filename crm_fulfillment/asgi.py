@@ -3,6 +3,10 @@ ASGI config for crm_fulfillment project.
 
 It exposes the ASGI callable as a module-level variable named ``application``.
 
+Serve it to enable the live event stream (notifications.views.event_stream),
+e.g. ``gunicorn crm_fulfillment.asgi:application -k uvicorn.workers.UvicornWorker``.
+Under the WSGI application pages fall back to polling.
+
 For more information on this file, see
 https://docs.djangoproject.com/en/5.2/howto/deployment/asgi/
 """
@@ -24,11 +24,41 @@ app.conf.beat_schedule = {
         'task': 'inventory.tasks.check_low_stock_alerts',
         'schedule': crontab(minute='*/30'),
     },
+    # Close yesterday's stock ledger balances into a snapshot
+    'snapshot-stock-ledger': {
+        'task': 'inventory.tasks.snapshot_stock_ledger',
+        'schedule': crontab(hour=0, minute=15),  # 12:15 AM daily
+    },
     # Send daily order summary
     'daily-order-summary': {
         'task': 'orders.tasks.send_daily_order_summary',
         'schedule': crontab(hour=8, minute=0),  # 8 AM daily
     },
+    # Repair drift in the live agent workload counters
+    'reconcile-agent-workloads': {
+        'task': 'callcenter.tasks.reconcile_agent_workloads',
+        'schedule': crontab(minute='*/10'),
+    },
+    # Precompute call center routing scores
+    'refresh-routing-table': {
+        'task': 'callcenter.tasks.refresh_routing_table',
+        'schedule': crontab(minute='*/5'),
+    },
+    # Call center dashboard metrics snapshot (callcenter.metrics.SNAPSHOT_INTERVAL)
+    'refresh-real-time-metrics': {
+        'task': 'callcenter.tasks.refresh_real_time_metrics',
+        'schedule': 15.0,
+    },
+    # Move expired and old read notifications to the archive table
+    'archive-old-notifications': {
+        'task': 'notifications.tasks.archive_old_notifications',
+        'schedule': crontab(minute=20),  # Hourly
+    },
+    # Delete background export files whose download links have expired
+    'expire-export-files': {
+        'task': 'dashboard.tasks.expire_export_files',
+        'schedule': crontab(minute=40),  # Hourly
+    },
     # Check pending deliveries
     'check-pending-deliveries': {
         'task': 'delivery.tasks.check_pending_deliveries',
@@ -503,6 +503,26 @@ else:
 # Axes Cache Backend
 AXES_CACHE = 'axes'
 
+# Send heavy Order side effects (orders.side_effects) to Celery when a broker is configured
+ORDER_SIDE_EFFECTS_ASYNC = os.environ.get('ORDER_SIDE_EFFECTS_ASYNC', str(REDIS_AVAILABLE)).lower() == 'true'
+
+# Notification retention (notifications.retention): read notifications are archived after this many days
+NOTIFICATION_READ_RETENTION_DAYS = int(os.environ.get('NOTIFICATION_READ_RETENTION_DAYS', '30'))
+NOTIFICATION_ARCHIVE_BATCH_SIZE = int(os.environ.get('NOTIFICATION_ARCHIVE_BATCH_SIZE', '1000'))
+
+# Exports over this many rows run as background jobs (utils.exports.export_report)
+EXPORT_ASYNC_ROW_THRESHOLD = int(os.environ.get('EXPORT_ASYNC_ROW_THRESHOLD', '100000'))
+# Hours a background export file stays downloadable
+EXPORT_FILE_TTL_HOURS = int(os.environ.get('EXPORT_FILE_TTL_HOURS', '24'))
+
+# Compiled UAE area index (manage.py build_area_index), loaded by orders.area_utils
+AREAS_INDEX_FILE = os.environ.get('AREAS_INDEX_FILE', os.path.join(BASE_DIR, 'areas_index.json'))
+
+# Route new orders by weighted agent score (callcenter.routing) instead of lowest workload
+CALLCENTER_WEIGHTED_ROUTING = os.environ.get('CALLCENTER_WEIGHTED_ROUTING', 'False').lower() == 'true'
+# Overrides of callcenter.routing.DEFAULT_WEIGHTS, e.g. {'language': 0.3}
+CALLCENTER_ROUTING_WEIGHTS = {}
+
 # ============================================
 # LOGGING CONFIGURATION
 # ============================================
@@ -1,3 +1,15 @@
 from django.contrib import admin
 
-# Register your models here.
+from .models import ExportJob
+
+
+@admin.register(ExportJob)
+class ExportJobAdmin(admin.ModelAdmin):
+    list_display = ['id', 'file_name', 'file_format', 'user', 'status', 'processed_rows', 'created_at', 'expires_at']
+    list_filter = ['status', 'file_format', 'entity_type', 'created_at']
+    search_fields = ['file_name', 'user__email']
+    readonly_fields = [field.name for field in ExportJob._meta.fields]
+    date_hierarchy = 'created_at'
+
+    def has_add_permission(self, request):
+        return False
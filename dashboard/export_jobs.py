@@ -0,0 +1,178 @@
+"""
+Background export jobs.
+
+``utils.exports.export_report`` queues exports too large to stream within
+a request as an ExportJob (see dashboard.tasks.export_data_task). The
+worker rebuilds the Report from the job's stored filters, writes it to a
+temporary file - gzip CSV, or XLSX in constant memory - recording progress
+on the job as it goes, and saves it to the default file storage. The
+requester is notified with a download link that stops working after
+EXPORT_FILE_TTL_HOURS; ``expire_export_jobs`` then deletes the file.
+"""
+import gzip
+import logging
+import tempfile
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.files import File
+from django.db import transaction
+from django.urls import reverse
+from django.utils import timezone
+from django.utils.module_loading import import_string
+
+from utils.exports import FORMAT_LABELS, log_export, write_csv, write_xlsx
+
+from .models import ExportJob
+
+logger = logging.getLogger('atlas_crm')
+
+DEFAULT_FILE_TTL_HOURS = 24
+# Rows written between progress updates on the job
+PROGRESS_EVERY = 5000
+
+
+def _save_progress(job, **fields):
+    for name, value in fields.items():
+        setattr(job, name, value)
+    ExportJob.objects.filter(pk=job.pk).update(**fields)
+
+
+def _track_progress(job, report):
+    """Yield the report's rows, recording how many records were written"""
+    reported = 0
+    for row in report.rows:
+        yield row
+        if report.count - reported >= PROGRESS_EVERY:
+            reported = report.count
+            _save_progress(job, processed_rows=reported)
+
+
+def _write_gzip_csv(rows, fileobj):
+    with gzip.open(fileobj, 'wt', encoding='utf-8', newline='') as text:
+        write_csv(rows, text)
+
+
+def run_export_job(job_id):
+    """Write an export job's file, marking the job failed if the report cannot be produced"""
+    job = ExportJob.objects.select_related('user').get(pk=job_id)
+    if job.is_finished or job.status == 'processing':
+        return job
+
+    _save_progress(job, status='processing', started_at=timezone.now())
+    try:
+        report = import_string(job.report)(job.params, job.user)
+        _save_progress(job, total_rows=report.estimate_rows())
+
+        with tempfile.TemporaryFile() as fileobj:
+            rows = _track_progress(job, report)
+            if job.file_format == 'xlsx':
+                write_xlsx(rows, fileobj)
+            else:
+                _write_gzip_csv(rows, fileobj)
+            fileobj.seek(0)
+            job.file.save(job.download_name, File(fileobj), save=False)
+    except Exception as e:
+        logger.error(f"Export job {job_id} failed: {str(e)}")
+        _save_progress(job, status='failed', finished_at=timezone.now(), message=str(e))
+        notify_export_finished(job)
+        return job
+
+    now = timezone.now()
+    ttl = getattr(settings, 'EXPORT_FILE_TTL_HOURS', DEFAULT_FILE_TTL_HOURS)
+    _save_progress(
+        job,
+        file=job.file.name,
+        status='completed',
+        processed_rows=report.count,
+        finished_at=now,
+        expires_at=now + timedelta(hours=ttl),
+        message=f"{report.count} records exported.",
+    )
+    log_export(
+        job.user, 'data_export', job.entity_type, report.describe(FORMAT_LABELS[job.file_format]),
+        ip_address=job.ip_address, user_agent=job.user_agent
+    )
+    notify_export_finished(job)
+    return job
+
+
+def notify_export_finished(job):
+    """Tell the requester their export is ready (with an expiring download link) or has failed"""
+    from notifications.models import Notification
+
+    try:
+        if job.status == 'completed':
+            Notification.create_notification(
+                user=job.user,
+                title="Export Ready",
+                message=(
+                    f"Your export {job.download_name} ({job.processed_rows} records) is ready. "
+                    f"The download link expires on {timezone.localtime(job.expires_at):%Y-%m-%d %H:%M}."
+                ),
+                notification_type='data_export',
+                priority='medium',
+                related_object_type='export_job',
+                related_object_id=job.pk,
+                related_url=job.get_download_url(),
+                expires_at=job.expires_at
+            )
+        else:
+            Notification.create_notification(
+                user=job.user,
+                title="Export Failed",
+                message=f"Your export {job.download_name} could not be completed: {job.message}",
+                notification_type='data_export',
+                priority='high',
+                related_object_type='export_job',
+                related_object_id=job.pk,
+                related_url=reverse('dashboard:export_job', args=[job.pk])
+            )
+    except Exception as e:
+        logger.error(f"Error sending export job notification: {str(e)}")
+
+
+def start_export_job(request, builder, params, fmt, filename, entity_type):
+    """
+    Record an export of ``builder(params, user)`` as an ExportJob and queue it.
+
+    The job is handed to Celery once the surrounding transaction commits;
+    if the broker is unreachable the export runs in-process instead.
+    """
+    job = ExportJob.objects.create(
+        user=request.user,
+        entity_type=entity_type,
+        report=f"{builder.__module__}.{builder.__qualname__}",
+        params=params,
+        file_format=fmt,
+        file_name=filename[:255],
+        ip_address=request.META.get('REMOTE_ADDR'),
+        user_agent=request.META.get('HTTP_USER_AGENT', ''),
+    )
+
+    def enqueue():
+        from .tasks import export_data_task
+
+        try:
+            export_data_task.delay(job.pk)
+        except Exception as e:
+            logger.warning(f"Could not queue export job {job.pk}, running inline: {str(e)}")
+            run_export_job(job.pk)
+
+    transaction.on_commit(enqueue)
+    return job
+
+
+def expire_export_jobs(now=None):
+    """Delete the files of export jobs whose download links have expired; returns how many"""
+    now = now or timezone.now()
+    expired = 0
+    for job in ExportJob.objects.filter(status='completed', expires_at__lte=now).only('id', 'file').iterator():
+        if job.file:
+            try:
+                job.file.delete(save=False)
+            except Exception as e:
+                logger.warning(f"Could not delete export file {job.file.name}: {str(e)}")
+        ExportJob.objects.filter(pk=job.pk).update(status='expired', file='')
+        expired += 1
+    return expired
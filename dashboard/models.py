@@ -1,3 +1,74 @@
 from django.db import models
+from django.urls import reverse
+from django.utils import timezone
+from django.utils.translation import gettext_lazy as _
 
-# Create your models here.
+
+class ExportJob(models.Model):
+    """Background export (see dashboard.export_jobs); the file is downloadable until expires_at"""
+    STATUS_CHOICES = [
+        ('pending', _('Pending')),
+        ('processing', _('Processing')),
+        ('completed', _('Completed')),
+        ('failed', _('Failed')),
+        ('expired', _('Expired')),
+    ]
+
+    FORMAT_CHOICES = [
+        ('csv', _('CSV (gzip)')),
+        ('xlsx', _('Excel')),
+    ]
+
+    user = models.ForeignKey('users.User', on_delete=models.CASCADE, related_name='export_jobs', verbose_name=_('Requested By'))
+    entity_type = models.CharField(max_length=50, verbose_name=_('Entity Type'))
+    # Dotted path of the function building the utils.exports.Report
+    report = models.CharField(max_length=255, verbose_name=_('Report'))
+    params = models.JSONField(default=dict, blank=True, verbose_name=_('Filters'))
+    file_format = models.CharField(max_length=10, choices=FORMAT_CHOICES, default='csv', verbose_name=_('Format'))
+    file_name = models.CharField(max_length=255, verbose_name=_('File Name'))
+    file = models.FileField(upload_to='exports/%Y/%m/', blank=True, verbose_name=_('File'))
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='pending', verbose_name=_('Status'))
+    total_rows = models.PositiveIntegerField(default=0, verbose_name=_('Total Rows'))
+    processed_rows = models.PositiveIntegerField(default=0, verbose_name=_('Processed Rows'))
+    message = models.TextField(blank=True, verbose_name=_('Message'))
+    # Where the export was requested from, for the audit log entry
+    ip_address = models.GenericIPAddressField(null=True, blank=True, verbose_name=_('IP Address'))
+    user_agent = models.TextField(blank=True, verbose_name=_('User Agent'))
+    created_at = models.DateTimeField(auto_now_add=True, verbose_name=_('Created At'))
+    started_at = models.DateTimeField(null=True, blank=True, verbose_name=_('Started At'))
+    finished_at = models.DateTimeField(null=True, blank=True, verbose_name=_('Finished At'))
+    expires_at = models.DateTimeField(null=True, blank=True, verbose_name=_('Expires At'))
+
+    class Meta:
+        ordering = ['-created_at']
+        verbose_name = _('Export Job')
+        verbose_name_plural = _('Export Jobs')
+        indexes = [
+            models.Index(fields=['status', 'expires_at'], name='export_job_expiry_idx'),
+        ]
+
+    def __str__(self):
+        return f"Export #{self.pk} {self.file_name} ({self.get_status_display()})"
+
+    @property
+    def is_finished(self):
+        return self.status in ('completed', 'failed', 'expired')
+
+    @property
+    def is_available(self):
+        return self.status == 'completed' and bool(self.file) and (
+            self.expires_at is None or self.expires_at > timezone.now()
+        )
+
+    @property
+    def progress_percent(self):
+        if not self.total_rows:
+            return 100 if self.is_finished else 0
+        return min(100, int(self.processed_rows * 100 / self.total_rows))
+
+    @property
+    def download_name(self):
+        return f"{self.file_name}.csv.gz" if self.file_format == 'csv' else f"{self.file_name}.xlsx"
+
+    def get_download_url(self):
+        return reverse('dashboard:export_download', args=[self.pk])
@@ -0,0 +1,37 @@
+"""
+Celery tasks for the Dashboard module
+"""
+from celery import shared_task
+import logging
+
+logger = logging.getLogger('atlas_crm')
+
+
+@shared_task
+def export_data_task(job_id):
+    """
+    Write the file of a background export job queued by utils.exports.export_report
+    Progress is recorded on the ExportJob and polled by the UI
+    """
+    from .export_jobs import run_export_job
+
+    job = run_export_job(job_id)
+    logger.info(f"Export job {job_id}: {job.status}, {job.processed_rows} records")
+    return {'status': job.status, 'rows': job.processed_rows}
+
+
+@shared_task
+def expire_export_files():
+    """
+    Delete export files whose download links have expired
+    Runs hourly
+    """
+    from .export_jobs import expire_export_jobs
+
+    try:
+        expired = expire_export_jobs()
+        return {'status': 'success', 'expired': expired}
+
+    except Exception as e:
+        logger.error(f"Error expiring export files: {str(e)}")
+        return {'status': 'error', 'message': str(e)}
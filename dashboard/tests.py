@@ -1,3 +1,136 @@
-from django.test import TestCase
+"""
+Unit tests for background export jobs
+Tests: Queueing large exports, gzip CSV/XLSX files, progress, notifications, expiring downloads
+"""
 
-# Create your tests here.
+import csv
+import gzip
+import io
+import shutil
+import tempfile
+from datetime import timedelta
+from unittest import mock
+
+from django.contrib.auth import get_user_model
+from django.core.files.base import ContentFile
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from django.utils import timezone
+
+from finance.models import Payment
+from notifications.models import Notification
+from orders.models import Order
+from users.models import AuditLog
+
+from .export_jobs import expire_export_jobs, run_export_job
+from .models import ExportJob
+
+User = get_user_model()
+
+
+class ExportJobTests(TestCase):
+    """
+    Test suite for dashboard.export_jobs
+    Covers: queueing over the row threshold, gzip CSV and XLSX files, audit entries,
+    ready/failed notifications, download link expiry, file cleanup
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.admin = User.objects.create_superuser(email='export-jobs@test.com', password='testpass123', full_name='Admin', phone_number='1')
+        cls.other = User.objects.create_superuser(email='export-jobs-other@test.com', password='testpass123', full_name='Other', phone_number='2')
+        order = Order.objects.create(customer='Month End', quantity=1, price_per_unit=10, store_link='https://example.com')
+        for i in range(3):
+            Payment.objects.create(order=order, amount=10 + i, payment_method='cod', customer_name=f'Customer {i}')
+
+    def setUp(self):
+        self.media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.media_root, ignore_errors=True)
+        media = override_settings(MEDIA_ROOT=self.media_root)
+        media.enable()
+        self.addCleanup(media.disable)
+
+    def create_job(self, **fields):
+        defaults = {
+            'user': self.admin,
+            'entity_type': 'payment',
+            'report': 'finance.exports.payments_report',
+            'file_name': 'payments_test',
+        }
+        defaults.update(fields)
+        return ExportJob.objects.create(**defaults)
+
+    @override_settings(EXPORT_ASYNC_ROW_THRESHOLD=2)
+    def test_large_export_is_queued(self):
+        self.client.force_login(self.admin)
+        with mock.patch('dashboard.tasks.export_data_task.delay') as delay:
+            with self.captureOnCommitCallbacks(execute=True):
+                response = self.client.get(reverse('finance:export_payments'), {'status': 'pending', 'format': 'xlsx'})
+
+        job = ExportJob.objects.get()
+        self.assertRedirects(response, reverse('dashboard:export_job', args=[job.id]), fetch_redirect_response=False)
+        self.assertEqual(job.params, {'status': 'pending'})
+        self.assertEqual(job.file_format, 'xlsx')
+        delay.assert_called_once_with(job.id)
+
+    def test_small_export_downloads_directly(self):
+        self.client.force_login(self.admin)
+        response = self.client.get(reverse('finance:export_payments'))
+        self.assertTrue(response.streaming)
+        self.assertFalse(ExportJob.objects.exists())
+
+    def test_gzip_csv_job(self):
+        job = run_export_job(self.create_job().id)
+
+        self.assertEqual(job.status, 'completed')
+        self.assertEqual((job.total_rows, job.processed_rows), (3, 3))
+        self.assertGreater(job.expires_at, timezone.now())
+        with job.file.open('rb') as fileobj:
+            text = gzip.decompress(fileobj.read()).decode('utf-8-sig')
+        rows = list(csv.reader(io.StringIO(text)))
+        self.assertEqual(rows[0][0], 'Payment ID')
+        self.assertEqual(len(rows), 4)
+
+        notification = Notification.objects.get(user=self.admin, notification_type='data_export')
+        self.assertEqual(notification.related_url, reverse('dashboard:export_download', args=[job.id]))
+        self.assertEqual(notification.expires_at, job.expires_at)
+        audit = AuditLog.objects.get(user=self.admin, action='data_export')
+        self.assertEqual(audit.description, 'Exported 3 payment records to CSV')
+
+    def test_xlsx_job(self):
+        job = run_export_job(self.create_job(file_format='xlsx').id)
+        self.assertEqual(job.status, 'completed')
+        self.assertTrue(job.file.name.endswith('.xlsx'))
+
+    def test_failed_job_notifies(self):
+        job = run_export_job(self.create_job(report='finance.exports.missing_report').id)
+        self.assertEqual(job.status, 'failed')
+        notification = Notification.objects.get(user=self.admin, notification_type='data_export')
+        self.assertEqual(notification.title, 'Export Failed')
+        self.assertFalse(AuditLog.objects.filter(action='data_export').exists())
+
+    def test_download_until_expiry(self):
+        job = run_export_job(self.create_job().id)
+        url = reverse('dashboard:export_download', args=[job.id])
+
+        self.client.force_login(self.other)
+        self.assertEqual(self.client.get(url).status_code, 404)
+
+        self.client.force_login(self.admin)
+        response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        self.assertIn('payments_test.csv.gz', response['Content-Disposition'])
+
+        ExportJob.objects.filter(pk=job.pk).update(expires_at=timezone.now() - timedelta(minutes=1))
+        self.assertRedirects(self.client.get(url), reverse('dashboard:export_job', args=[job.id]), fetch_redirect_response=False)
+
+    def test_expired_files_are_deleted(self):
+        job = self.create_job(status='completed', expires_at=timezone.now() - timedelta(hours=1))
+        job.file.save('old.csv.gz', ContentFile(b'data'))
+        storage, name = job.file.storage, job.file.name
+
+        self.assertEqual(expire_export_jobs(), 1)
+        job.refresh_from_db()
+        self.assertEqual(job.status, 'expired')
+        self.assertFalse(job.file)
+        self.assertFalse(storage.exists(name))
@@ -11,6 +11,11 @@ urlpatterns = [
     path('audit-log/', views.audit_log, name='audit_log'),
     path('audit-log/export/', views.export_audit_log, name='export_audit_log'),
 
+    # Background Exports
+    path('exports/<int:job_id>/', views.export_job_progress, name='export_job'),
+    path('exports/<int:job_id>/status/', views.export_job_status, name='export_job_status'),
+    path('exports/<int:job_id>/download/', views.download_export, name='export_download'),
+
     # Help Center
     path('help/', views.help, name='help'),
 
@@ -558,6 +558,56 @@ def export_audit_log(request):
     return response
 
 
+def _get_export_job(request, job_id):
+    from .models import ExportJob
+
+    return get_object_or_404(ExportJob, id=job_id, user=request.user)
+
+
+@login_required
+def export_job_progress(request, job_id):
+    """Progress page for a background export."""
+    from django.conf import settings
+    from .export_jobs import DEFAULT_FILE_TTL_HOURS
+
+    job = _get_export_job(request, job_id)
+    ttl_hours = getattr(settings, 'EXPORT_FILE_TTL_HOURS', DEFAULT_FILE_TTL_HOURS)
+    return render(request, 'dashboard/export_progress.html', {'job': job, 'ttl_hours': ttl_hours})
+
+
+@login_required
+def export_job_status(request, job_id):
+    """JSON progress of a background export, polled by the progress page."""
+    from django.http import JsonResponse
+
+    job = _get_export_job(request, job_id)
+    return JsonResponse({
+        'id': job.id,
+        'status': job.status,
+        'status_display': job.get_status_display(),
+        'finished': job.is_finished,
+        'progress': job.progress_percent,
+        'total_rows': job.total_rows,
+        'processed_rows': job.processed_rows,
+        'message': job.message,
+        'download_url': job.get_download_url() if job.is_available else None,
+    })
+
+
+@login_required
+def download_export(request, job_id):
+    """Download the file of a finished background export while its link is valid."""
+    from django.contrib import messages
+    from django.http import FileResponse
+
+    job = _get_export_job(request, job_id)
+    if not job.is_available:
+        messages.error(request, 'This export is no longer available for download. Please export the data again.')
+        return redirect('dashboard:export_job', job_id=job.id)
+
+    return FileResponse(job.file.open('rb'), as_attachment=True, filename=job.download_name)
+
+
 # Example views using the new permission decorators
 @login_required
 def example_permission_view(request):
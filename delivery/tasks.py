@@ -35,26 +35,23 @@ def check_pending_deliveries():
             # Notify delivery managers
             delivery_managers = User.objects.filter(
                 is_active=True,
-                userrole__role__role_type__in=['admin', 'delivery_manager']
+                user_roles__role__role_type__in=['admin', 'delivery_manager']
             ).distinct()
 
-            for manager in delivery_managers:
-                # Check if notification already sent in last hour
-                recent_notification = Notification.objects.filter(
-                    user=manager,
-                    notification_type='delivery_alert',
-                    created_at__gte=timezone.now() - timedelta(hours=1)
-                ).exists()
-
-                if not recent_notification:
-                    Notification.objects.create(
-                        user=manager,
-                        title="Pending Deliveries Alert",
-                        message=f"There are {pending_count} deliveries scheduled for today "
-                               f"that are still pending. Please review and assign drivers.",
-                        notification_type='delivery_alert',
-                        priority='high'
-                    )
+            # Skip managers already notified in the last hour
+            recently_notified = Notification.objects.filter(
+                notification_type='delivery_alert',
+                created_at__gte=timezone.now() - timedelta(hours=1)
+            ).values('user_id')
+
+            Notification.create_bulk_notifications(
+                delivery_managers.exclude(id__in=recently_notified),
+                title="Pending Deliveries Alert",
+                message=f"There are {pending_count} deliveries scheduled for today "
+                       f"that are still pending. Please review and assign drivers.",
+                notification_type='delivery_alert',
+                priority='high'
+            )
 
         logger.info(f"Pending delivery check completed. Found: {pending_count}")
         return {'status': 'success', 'pending_deliveries': pending_count}
@@ -211,7 +208,7 @@ def assign_drivers_automatically():
         # Get available drivers
         available_drivers = User.objects.filter(
             is_active=True,
-            userrole__role__role_type='driver',
+            user_roles__role__role_type='driver',
             driver_profile__is_available=True
         ).annotate(
             active_deliveries=Count('delivery_assignments', filter=Q(
@@ -0,0 +1,108 @@
+"""
+Finance exports, built from plain filter parameters so they can be
+downloaded directly or run as a background export job (utils.exports).
+"""
+import heapq
+from datetime import datetime
+
+from django.db.models import Q
+
+from utils.exports import Column, Export, Report
+
+from .models import Payment, TruvoPayment
+
+DATE_FORMAT = '%Y-%m-%d %H:%M:%S'
+
+
+def _parse_date(value):
+    try:
+        return datetime.strptime(value, '%Y-%m-%d').date()
+    except (TypeError, ValueError):
+        return None
+
+
+def payments_report(params, user):
+    """Payments and Truvo payments matching the payment management filters, newest first"""
+    status_filter = params.get('status', '')
+    payment_method_filter = params.get('payment_method', '')
+    date_from = _parse_date(params.get('date_from'))
+    date_to = _parse_date(params.get('date_to'))
+    search_query = params.get('search', '')
+
+    # Base queryset - sellers see only their payments, admins see all
+    if user.has_role('Seller'):
+        payments = Payment.objects.filter(seller=user).order_by('-payment_date')
+        truvo_payments = TruvoPayment.objects.filter(seller=user).order_by('-created_at')
+    else:
+        payments = Payment.objects.order_by('-payment_date')
+        truvo_payments = TruvoPayment.objects.all().order_by('-created_at')
+
+    # Apply filters (same logic as payment_management)
+    if status_filter:
+        payments = payments.filter(payment_status=status_filter)
+        truvo_payments = truvo_payments.filter(payment_status=status_filter)
+
+    if payment_method_filter:
+        if payment_method_filter == 'truvo':
+            payments = payments.none()
+        else:
+            payments = payments.filter(payment_method=payment_method_filter)
+
+    if date_from:
+        payments = payments.filter(payment_date__date__gte=date_from)
+        truvo_payments = truvo_payments.filter(created_at__date__gte=date_from)
+
+    if date_to:
+        payments = payments.filter(payment_date__date__lte=date_to)
+        truvo_payments = truvo_payments.filter(created_at__date__lte=date_to)
+
+    if search_query:
+        payments = payments.filter(
+            Q(order__order_code__icontains=search_query) |
+            Q(customer_name__icontains=search_query) |
+            Q(transaction_id__icontains=search_query) |
+            Q(notes__icontains=search_query)
+        )
+        truvo_payments = truvo_payments.filter(
+            Q(payment_id__icontains=search_query) |
+            Q(customer_name__icontains=search_query) |
+            Q(truvo_transaction_id__icontains=search_query)
+        )
+
+    payment_export = Export(payments, [
+        Column('Payment ID', 'id'),
+        Column('Order ID', 'order__order_code', default='N/A'),
+        Column('Customer', 'customer_name'),
+        Column('Amount', 'amount'),
+        Column('Currency', 'currency', default='AED'),
+        Column('Method', 'payment_method'),
+        Column('Status', 'payment_status'),
+        Column('Date', 'payment_date', date_format=DATE_FORMAT),
+        Column('Seller', 'seller__full_name', default='N/A'),
+        Column('Transaction ID', 'transaction_id'),
+        Column('Notes', 'notes'),
+    ])
+    truvo_export = Export(truvo_payments, [
+        Column('Payment ID', 'payment_id'),
+        Column('Order ID', 'order__order_code', default='N/A'),
+        Column('Customer', 'customer_name'),
+        Column('Amount', 'amount'),
+        Column('Currency', 'currency', default='AED'),
+        Column('Method', 'payment_method'),
+        Column('Status', 'payment_status'),
+        Column('Date', 'created_at', date_format=DATE_FORMAT),
+        Column('Seller', 'seller__full_name', default='N/A'),
+        Column('Transaction ID', 'truvo_transaction_id'),
+        Column('Notes', value=lambda row: ''),
+    ])
+
+    def rows():
+        yield payment_export.header
+        # Both streams are newest first; merge them on the formatted date
+        date_column = payment_export.header.index('Date')
+        yield from heapq.merge(
+            payment_export.rows(header=False), truvo_export.rows(header=False),
+            key=lambda row: row[date_column], reverse=True
+        )
+
+    return Report(rows(), [payment_export, truvo_export], 'Exported {count} payment records')
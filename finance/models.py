@@ -212,6 +212,11 @@ class OrderFee(models.Model):
         return f"Fees for Order {self.order.order_code}"
     
     def save(self, *args, **kwargs):
+        self.calculate_totals()
+        super().save(*args, **kwargs)
+
+    def calculate_totals(self):
+        """Calculate total fees, tax and final total from the fee fields"""
         # Auto-calculate totals - ensure all values are Decimal
         self.total_fees = (
             Decimal(str(self.seller_fee or 0)) + Decimal(str(self.upsell_fee or 0)) + 
@@ -227,8 +232,65 @@ class OrderFee(models.Model):
         
         # Calculate final total
         self.final_total = base_price + self.total_fees + self.tax_amount
-        
-        super().save(*args, **kwargs)
+
+    @classmethod
+    def build_for_order(cls, order, seller_fee_percentage=None):
+        """Build (unsaved) default fees for a new order"""
+        # Calculate base price using Decimal
+        price = Decimal(str(order.price_per_unit or 0))
+        qty = Decimal(str(order.quantity or 1))
+        base_price = price * qty
+
+        seller_fee_amount = Decimal('0.00')
+        if seller_fee_percentage is not None:
+            seller_fee_amount = base_price * (Decimal(str(seller_fee_percentage)) / Decimal('100'))
+
+        order_fee = cls(
+            order=order,
+            seller_fee=seller_fee_amount,
+            upsell_fee=base_price * Decimal('0.03'),  # 3% of order value
+            confirmation_fee=Decimal('10.00'),  # Fixed fee
+            fulfillment_fee=base_price * Decimal('0.02'),  # 2% of order value
+            shipping_fee=Decimal('12.00'),  # Fixed shipping fee
+            warehouse_fee=base_price * Decimal('0.01'),  # 1% warehouse fee
+            tax_rate=Decimal('5.00'),  # 5% VAT
+        )
+        order_fee.calculate_totals()
+        return order_fee
+
+    @classmethod
+    def create_for_orders(cls, orders):
+        """
+        Create default fees for many new orders with one SellerFee lookup and
+        one bulk insert. Orders that already have fees are skipped.
+        """
+        orders = list(orders)
+        if not orders:
+            return []
+
+        existing = set(cls.objects.filter(order__in=orders).values_list('order_id', flat=True))
+        orders = [order for order in orders if order.pk not in existing]
+
+        # Orders without a seller are charged to the product's seller
+        from sellers.models import Product
+        product_sellers = dict(Product.objects.filter(
+            id__in={order.product_id for order in orders if not order.seller_id and order.product_id}
+        ).values_list('id', 'seller_id'))
+        order_sellers = {
+            order.pk: order.seller_id or product_sellers.get(order.product_id)
+            for order in orders
+        }
+
+        fee_percentages = {}
+        for seller_id, percentage in SellerFee.objects.filter(
+            seller_id__in={seller_id for seller_id in order_sellers.values() if seller_id}, is_active=True
+        ).order_by('id').values_list('seller_id', 'fee_percentage'):
+            fee_percentages.setdefault(seller_id, percentage)
+
+        return cls.objects.bulk_create([
+            cls.build_for_order(order, fee_percentages.get(order_sellers[order.pk]))
+            for order in orders
+        ])
     
     def get_fees_dict(self):
         """Return fees as dictionary"""
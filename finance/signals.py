@@ -1,86 +1,77 @@
 """
 Finance module signals for automatic OrderFee creation and order-finance integration.
 """
-from django.db.models.signals import post_save
-from django.dispatch import receiver
+from django.utils import timezone
 from decimal import Decimal
+from orders.side_effects import order_side_effect
 
 
-@receiver(post_save, sender='orders.Order')
-def create_order_fee(sender, instance, created, **kwargs):
+@order_side_effect(on_create=True)
+def create_order_fees(events):
     """
-    Automatically create OrderFee when a new Order is created.
+    Automatically create OrderFee when new Orders are created.
     This ensures every order has associated fee tracking from the start.
     """
-    if created:
-        from .models import OrderFee, SellerFee
+    from .models import OrderFee
 
-        # Check if OrderFee already exists (shouldn't but just in case)
-        if not hasattr(instance, 'order_fees') or not OrderFee.objects.filter(order=instance).exists():
-            # Calculate base price using Decimal
-            price = Decimal(str(instance.price_per_unit or 0))
-            qty = Decimal(str(instance.quantity or 1))
-            base_price = price * qty
-
-            # Get seller fee if seller exists
-            seller_fee_amount = Decimal('0.00')
-            if instance.seller:
-                seller_fee_obj = SellerFee.objects.filter(seller=instance.seller, is_active=True).first()
-                if seller_fee_obj:
-                    seller_fee_amount = base_price * (Decimal(str(seller_fee_obj.fee_percentage)) / Decimal('100'))
-            elif instance.product and instance.product.seller:
-                seller_fee_obj = SellerFee.objects.filter(seller=instance.product.seller, is_active=True).first()
-                if seller_fee_obj:
-                    seller_fee_amount = base_price * (Decimal(str(seller_fee_obj.fee_percentage)) / Decimal('100'))
-
-            # Create OrderFee with calculated values using Decimal arithmetic
-            OrderFee.objects.create(
-                order=instance,
-                seller_fee=seller_fee_amount,
-                upsell_fee=base_price * Decimal('0.03'),  # 3% of order value
-                confirmation_fee=Decimal('10.00'),  # Fixed fee
-                fulfillment_fee=base_price * Decimal('0.02'),  # 2% of order value
-                shipping_fee=Decimal('12.00'),  # Fixed shipping fee
-                warehouse_fee=base_price * Decimal('0.01'),  # 1% warehouse fee
-                tax_rate=Decimal('5.00'),  # 5% VAT
-            )
+    OrderFee.create_for_orders(event.order for event in events)
 
 
-@receiver(post_save, sender='orders.Order')
-def update_order_fee_on_status_change(sender, instance, created, **kwargs):
+@order_side_effect(fields=('status',))
+def update_order_fees_on_status_change(events):
     """
     Update OrderFee when order status changes (e.g., add cancellation fee).
     """
-    if not created:
-        from .models import OrderFee
-
-        try:
-            order_fee = OrderFee.objects.get(order=instance)
+    from .models import OrderFee
 
-            # Add cancellation fee if order is cancelled
-            if instance.status == 'cancelled' and order_fee.cancellation_fee == 0:
-                order_fee.cancellation_fee = Decimal('5.00')
-                order_fee.save()
+    orders = {event.order.pk: event.order for event in events}
+    fees = {fee.order_id: fee for fee in OrderFee.objects.filter(order_id__in=orders)}
+    new_fees = []
+    changed_fees = []
 
-            # Add return fee if order is returned
-            if instance.status == 'returned' and order_fee.return_fee == 0:
-                order_fee.return_fee = Decimal('15.00')
-                order_fee.save()
+    for order_id, order in orders.items():
+        order_fee = fees.get(order_id)
 
-        except OrderFee.DoesNotExist:
+        if order_fee is None:
             # Create OrderFee if it doesn't exist for existing orders
-            price = Decimal(str(instance.price_per_unit or 0))
-            qty = Decimal(str(instance.quantity or 1))
+            price = Decimal(str(order.price_per_unit or 0))
+            qty = Decimal(str(order.quantity or 1))
             base_price = price * qty
-            
-            OrderFee.objects.create(
-                order=instance,
+
+            order_fee = OrderFee(
+                order=order,
                 upsell_fee=base_price * Decimal('0.03'),
                 confirmation_fee=Decimal('10.00'),
                 fulfillment_fee=base_price * Decimal('0.02'),
                 shipping_fee=Decimal('12.00'),
                 warehouse_fee=base_price * Decimal('0.01'),
-                cancellation_fee=Decimal('5.00') if instance.status == 'cancelled' else Decimal('0.00'),
-                return_fee=Decimal('15.00') if instance.status == 'returned' else Decimal('0.00'),
+                cancellation_fee=Decimal('5.00') if order.status == 'cancelled' else Decimal('0.00'),
+                return_fee=Decimal('15.00') if order.status == 'returned' else Decimal('0.00'),
                 tax_rate=Decimal('5.00'),
             )
+            order_fee.calculate_totals()
+            new_fees.append(order_fee)
+            continue
+
+        changed = False
+
+        # Add cancellation fee if order is cancelled
+        if order.status == 'cancelled' and order_fee.cancellation_fee == 0:
+            order_fee.cancellation_fee = Decimal('5.00')
+            changed = True
+
+        # Add return fee if order is returned
+        if order.status == 'returned' and order_fee.return_fee == 0:
+            order_fee.return_fee = Decimal('15.00')
+            changed = True
+
+        if changed:
+            order_fee.order = order
+            order_fee.calculate_totals()
+            order_fee.updated_at = timezone.now()
+            changed_fees.append(order_fee)
+
+    OrderFee.objects.bulk_create(new_fees)
+    OrderFee.objects.bulk_update(changed_fees, [
+        'cancellation_fee', 'return_fee', 'total_fees', 'tax_amount', 'final_total', 'updated_at'
+    ])
@@ -66,20 +66,19 @@ def generate_daily_report():
         # Notify finance managers
         finance_users = User.objects.filter(
             is_active=True,
-            userrole__role__role_type__in=['admin', 'finance_manager', 'accountant']
+            user_roles__role__role_type__in=['admin', 'finance_manager', 'accountant']
         ).distinct()
 
-        for user in finance_users:
-            Notification.objects.create(
-                user=user,
-                title=f"Daily Finance Report - {today.strftime('%B %d, %Y')}",
-                message=f"Revenue: ${report['revenue']:,.2f}, "
-                       f"Expenses: ${report['expenses']:,.2f}, "
-                       f"Net: ${report['net_profit']:,.2f}, "
-                       f"Transactions: {report['transactions']}",
-                notification_type='report',
-                priority='normal'
-            )
+        Notification.create_bulk_notifications(
+            finance_users,
+            title=f"Daily Finance Report - {today.strftime('%B %d, %Y')}",
+            message=f"Revenue: ${report['revenue']:,.2f}, "
+                   f"Expenses: ${report['expenses']:,.2f}, "
+                   f"Net: ${report['net_profit']:,.2f}, "
+                   f"Transactions: {report['transactions']}",
+            notification_type='report',
+            priority='normal'
+        )
 
         logger.info(f"Daily finance report generated: {report}")
         return {'status': 'success', 'report': report}
@@ -173,19 +172,18 @@ def check_overdue_invoices():
             # Notify finance team
             finance_users = User.objects.filter(
                 is_active=True,
-                userrole__role__role_type__in=['admin', 'finance_manager', 'accountant']
+                user_roles__role__role_type__in=['admin', 'finance_manager', 'accountant']
             ).distinct()
 
-            for user in finance_users:
-                Notification.objects.create(
-                    user=user,
-                    title="Overdue Invoices Alert",
-                    message=f"There are {overdue_count} overdue invoices "
-                           f"totaling ${float(total_overdue_amount):,.2f}. "
-                           f"Please follow up with customers.",
-                    notification_type='finance_alert',
-                    priority='high'
-                )
+            Notification.create_bulk_notifications(
+                finance_users,
+                title="Overdue Invoices Alert",
+                message=f"There are {overdue_count} overdue invoices "
+                       f"totaling ${float(total_overdue_amount):,.2f}. "
+                       f"Please follow up with customers.",
+                notification_type='finance_alert',
+                priority='high'
+            )
 
         logger.info(f"Overdue invoice check completed. Found: {overdue_count}")
         return {
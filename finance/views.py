@@ -4,7 +4,7 @@ from django.contrib import messages
 from django.db.models import Sum, Count, Avg, Q, F
 from django.utils import timezone
 from django.core.paginator import Paginator
-from django.http import JsonResponse, HttpResponse
+from django.http import JsonResponse
 from datetime import datetime, timedelta
 from dateutil.relativedelta import relativedelta
 import json
@@ -17,6 +17,7 @@ from .forms import PaymentForm, TruvoPaymentForm, PaymentPlatformForm, PlatformC
 from orders.models import Order
 from sellers.models import Product, Seller
 from users.models import User
+from utils.exports import export_report, super_admin_export
 from inventory.models import Warehouse, InventoryRecord, InventoryMovement
 
 @login_required
@@ -1187,130 +1188,19 @@ def truvo_payment_create(request):
     return render(request, 'finance/truvo_payment_create.html', context)
 
 @login_required
+@super_admin_export(entity_type='payment', label='payments')
 def export_payments(request):
-    """Export payments to CSV - RESTRICTED TO SUPER ADMIN ONLY."""
-    import csv
-    from io import StringIO
-    from users.models import AuditLog
-
-    # SECURITY: Restrict data export to Super Admin only (P0 CRITICAL requirement)
-    if not request.user.is_superuser:
-        from utils.views import permission_denied_authenticated
-        AuditLog.objects.create(
-            user=request.user,
-            action='unauthorized_export_attempt',
-            entity_type='payment',
-            description=f"Unauthorized attempt to export payments by {request.user.email}",
-            ip_address=request.META.get('REMOTE_ADDR'),
-            user_agent=request.META.get('HTTP_USER_AGENT', '')
-        )
-        return permission_denied_authenticated(
-            request,
-            message="Data export is restricted to Super Admin only for security compliance."
-        )
+    """
+    Export payments to CSV - RESTRICTED TO SUPER ADMIN ONLY.
+    Large (e.g. month-end) exports are prepared in a background export job.
+    """
+    from .exports import payments_report
 
-    # Check user role for access control (legacy - now only superuser can reach here)
-    is_seller = request.user.has_role('Seller')
-    is_admin = request.user.has_role('Admin') or request.user.has_role('Super Admin') or request.user.is_superuser
-    
-    # Get filter parameters (same as payment_management)
-    status_filter = request.GET.get('status', '')
-    payment_method_filter = request.GET.get('payment_method', '')
-    date_from = request.GET.get('date_from', '')
-    date_to = request.GET.get('date_to', '')
-    search_query = request.GET.get('search', '')
-    
-    # Base queryset - sellers see only their payments, admins see all
-    if is_seller:
-        payments = Payment.objects.filter(seller=request.user).select_related('order').order_by('-payment_date')
-        truvo_payments = TruvoPayment.objects.filter(seller=request.user).order_by('-created_at')
-    else:
-        payments = Payment.objects.select_related('order').order_by('-payment_date')
-        truvo_payments = TruvoPayment.objects.all().order_by('-created_at')
-    
-    # Apply filters (same logic as payment_management)
-    if status_filter:
-        payments = payments.filter(payment_status=status_filter)
-        truvo_payments = truvo_payments.filter(payment_status=status_filter)
-    
-    if payment_method_filter:
-        payments = payments.filter(payment_method=payment_method_filter)
-        if payment_method_filter == 'truvo':
-            payments = truvo_payments
-            truvo_payments = TruvoPayment.objects.none()
-    
-    if date_from:
-        try:
-            date_from_obj = datetime.strptime(date_from, '%Y-%m-%d').date()
-            payments = payments.filter(payment_date__date__gte=date_from_obj)
-            truvo_payments = truvo_payments.filter(created_at__date__gte=date_from_obj)
-        except ValueError:
-            pass
-    
-    if date_to:
-        try:
-            date_to_obj = datetime.strptime(date_to, '%Y-%m-%d').date()
-            payments = payments.filter(payment_date__date__lte=date_to_obj)
-            truvo_payments = truvo_payments.filter(created_at__date__lte=date_to_obj)
-        except ValueError:
-            pass
-    
-    if search_query:
-        payments = payments.filter(
-            Q(order__order_code__icontains=search_query) |
-            Q(customer_name__icontains=search_query) |
-            Q(transaction_id__icontains=search_query) |
-            Q(notes__icontains=search_query)
-        )
-        truvo_payments = truvo_payments.filter(
-            Q(payment_id__icontains=search_query) |
-            Q(customer_name__icontains=search_query) |
-            Q(truvo_transaction_id__icontains=search_query)
-        )
-    
-    # Combine payments
-    all_payments = list(payments) + list(truvo_payments)
-    all_payments.sort(key=lambda x: x.payment_date if hasattr(x, 'payment_date') else x.created_at, reverse=True)
-    
-    # Create CSV response
-    response = HttpResponse(content_type='text/csv')
-    filename = f"payments_{timezone.now().strftime('%Y%m%d_%H%M%S')}.csv"
-    if is_seller:
-        filename = f"my_payments_{timezone.now().strftime('%Y%m%d_%H%M%S')}.csv"
-    response['Content-Disposition'] = f'attachment; filename="{filename}"'
-    
-    writer = csv.writer(response)
-    writer.writerow([
-        'Payment ID', 'Order ID', 'Customer', 'Amount', 'Currency', 'Method', 
-        'Status', 'Date', 'Seller', 'Transaction ID', 'Notes'
-    ])
-    
-    for payment in all_payments:
-        writer.writerow([
-            getattr(payment, 'payment_id', payment.id),
-            payment.order.order_code if payment.order else 'N/A',
-            payment.customer_name,
-            payment.amount,
-            getattr(payment, 'currency', 'AED'),
-            payment.payment_method,
-            payment.payment_status,
-            payment.payment_date.strftime('%Y-%m-%d %H:%M:%S') if hasattr(payment, 'payment_date') else payment.created_at.strftime('%Y-%m-%d %H:%M:%S'),
-            payment.seller.get_full_name() if payment.seller else 'N/A',
-            getattr(payment, 'transaction_id', getattr(payment, 'truvo_transaction_id', '')),
-            payment.notes
-        ])
-
-    # Audit log for successful export (P0 CRITICAL security requirement)
-    AuditLog.objects.create(
-        user=request.user,
-        action='data_export',
-        entity_type='payment',
-        description=f"Exported {len(all_payments)} payment records to CSV",
-        ip_address=request.META.get('REMOTE_ADDR'),
-        user_agent=request.META.get('HTTP_USER_AGENT', '')
-    )
+    filename = f"payments_{timezone.now().strftime('%Y%m%d_%H%M%S')}"
+    if request.user.has_role('Seller'):
+        filename = f"my_payments_{timezone.now().strftime('%Y%m%d_%H%M%S')}"
 
-    return response
+    return export_report(request, payments_report, filename=filename, entity_type='payment')
 
 @login_required
 def payment_platforms(request):
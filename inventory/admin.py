@@ -1,5 +1,5 @@
 from django.contrib import admin
-from .models import Warehouse, WarehouseLocation, Stock, InventoryRecord, InventoryMovement
+from .models import Warehouse, WarehouseLocation, Stock, InventoryRecord, InventoryMovement, StockAvailability, StockLedgerEntry
 
 @admin.register(Warehouse)
 class WarehouseAdmin(admin.ModelAdmin):
@@ -31,3 +31,29 @@ class InventoryMovementAdmin(admin.ModelAdmin):
     list_filter = ('movement_type', 'from_warehouse', 'to_warehouse', 'created_at')
     search_fields = ('product__name_en', 'product__code', 'reference', 'notes')
     readonly_fields = ('created_at',)
+
+@admin.register(StockAvailability)
+class StockAvailabilityAdmin(admin.ModelAdmin):
+    """Read only: rows are maintained from inventory and reservations (manage.py rebuild_stock_availability)"""
+    list_display = ('product', 'warehouse', 'on_hand', 'reserved', 'available', 'updated_at')
+    list_filter = ('warehouse',)
+    search_fields = ('product__name_en', 'product__code')
+    readonly_fields = ('product', 'warehouse', 'on_hand', 'reserved', 'available', 'updated_at')
+
+    def has_add_permission(self, request):
+        return False
+
+@admin.register(StockLedgerEntry)
+class StockLedgerEntryAdmin(admin.ModelAdmin):
+    """Read only: the ledger is append-only"""
+    list_display = ('created_at', 'product', 'warehouse', 'location', 'delta', 'movement_type', 'reference', 'created_by')
+    list_filter = ('movement_type', 'warehouse')
+    search_fields = ('product__name_en', 'product__code', 'reference')
+    readonly_fields = ('product', 'warehouse', 'location', 'delta', 'movement_type', 'reference', 'created_by', 'created_at')
+    date_hierarchy = 'created_at'
+
+    def has_add_permission(self, request):
+        return False
+
+    def has_delete_permission(self, request, obj=None):
+        return False
@@ -0,0 +1,225 @@
+"""
+Set-based stock alert sweep (inventory.tasks.check_low_stock_alerts).
+
+Stock levels are read with one query per level: product-wide totals
+(Stock thresholds against the sum of InventoryRecords) and warehouse rows
+(WarehouseInventory thresholds), each joined with its reserved quantity
+from the available-to-promise table (inventory.availability). Open
+alerts are loaded once and compared with those levels in memory: new
+alerts are inserted with ``bulk_create``, recovered ones
+are resolved with one UPDATE per chunk of ids, and the notifications for
+all new alerts are created in one batch.
+
+Alerts are keyed by (product_id, warehouse_id); product-wide alerts have
+no warehouse.
+"""
+from collections import namedtuple
+
+from django.db.models import IntegerField, OuterRef, Subquery, Sum, Value
+from django.db.models.functions import Coalesce
+from django.utils import timezone
+
+from .models import InventoryAlert, InventoryRecord, Stock, StockAvailability
+
+LOW_STOCK_TYPES = ('low_stock', 'out_of_stock')
+# Rows per bulk_create and ids per UPDATE ... WHERE id IN (...)
+BATCH_SIZE = 1000
+
+NOTIFY_ROLES = ['admin', 'warehouse_manager', 'stock_keeper']
+URGENT_NOTIFY_ROLES = NOTIFY_ROLES + ['inventory_manager']
+
+
+class StockLevel(namedtuple('StockLevel', [
+    'product_id', 'warehouse_id', 'product_name', 'warehouse_name',
+    'on_hand', 'reserved', 'threshold', 'maximum',
+])):
+    """Quantities of a product, product-wide (no warehouse) or in one warehouse"""
+
+    @property
+    def key(self):
+        return (self.product_id, self.warehouse_id)
+
+    @property
+    def available(self):
+        return max(0, self.on_hand - self.reserved)
+
+    @property
+    def is_low(self):
+        # Warehouse rows without a minimum level are not watched
+        if self.warehouse_id is not None and self.threshold <= 0:
+            return False
+        return self.available <= self.threshold
+
+    @property
+    def is_overstocked(self):
+        return self.maximum > 0 and self.on_hand > self.maximum
+
+
+def _summed(queryset, group_by, field='quantity'):
+    """Correlated subquery summing ``field`` over ``queryset``; 0 when it is empty"""
+    total = queryset.order_by().values(*group_by).annotate(total=Sum(field)).values('total')
+    return Coalesce(Subquery(total, output_field=IntegerField()), Value(0))
+
+
+def stock_levels():
+    """Yield the product-wide and per-warehouse StockLevels"""
+    from stock_keeper.models import WarehouseInventory
+
+    products = Stock.objects.annotate(
+        on_hand=_summed(InventoryRecord.objects.filter(product=OuterRef('product_id')), ['product']),
+        reserved=_summed(StockAvailability.objects.filter(product=OuterRef('product_id')), ['product'], 'reserved'),
+    ).values_list('product_id', 'product__name_en', 'on_hand', 'reserved', 'min_quantity', 'max_quantity')
+
+    for product_id, name, on_hand, reserved, threshold, maximum in products.iterator(chunk_size=BATCH_SIZE):
+        yield StockLevel(product_id, None, name, None, on_hand, reserved, threshold, maximum)
+
+    warehouses = WarehouseInventory.objects.annotate(
+        reserved=_summed(StockAvailability.objects.filter(
+            product=OuterRef('product_id'), warehouse=OuterRef('warehouse_id')
+        ), ['product', 'warehouse'], 'reserved'),
+    ).values_list(
+        'product_id', 'warehouse_id', 'product__name_en', 'warehouse__name',
+        'quantity', 'reserved', 'min_stock_level', 'max_stock_level'
+    )
+
+    for row in warehouses.iterator(chunk_size=BATCH_SIZE):
+        yield StockLevel(*row)
+
+
+def _low_stock_alert(level):
+    available = level.available
+    label = 'Out of Stock' if available == 0 else 'Low Stock'
+    remaining = 'no stock remaining' if available == 0 else f'only {available} units remaining'
+    where = f" at {level.warehouse_name}" if level.warehouse_id else " across all warehouses"
+    return InventoryAlert(
+        product_id=level.product_id,
+        warehouse_id=level.warehouse_id,
+        alert_type='out_of_stock' if available == 0 else 'low_stock',
+        priority='critical' if available == 0 else 'high' if available <= level.threshold // 2 else 'medium',
+        title=f"{label}: {level.product_name}",
+        message=f"{level.product_name}{where} has {remaining} (threshold: {level.threshold})",
+        current_quantity=available,
+        threshold_quantity=level.threshold
+    )
+
+
+def _overstock_alert(level):
+    if level.warehouse_id:
+        title = f"Overstock: {level.product_name} at {level.warehouse_name}"
+        message = f"Warehouse has {level.on_hand} units, exceeding maximum of {level.maximum}"
+    else:
+        title = f"Overstock: {level.product_name}"
+        message = f"Product has {level.on_hand} units, exceeding maximum of {level.maximum}"
+    return InventoryAlert(
+        product_id=level.product_id,
+        warehouse_id=level.warehouse_id,
+        alert_type='overstock',
+        priority='low',
+        title=title,
+        message=message,
+        current_quantity=level.on_hand,
+        threshold_quantity=level.maximum
+    )
+
+
+def _chunks(ids):
+    for start in range(0, len(ids), BATCH_SIZE):
+        yield ids[start:start + BATCH_SIZE]
+
+
+def resolve_alerts(alert_ids, notes='Auto-resolved: Stock level recovered', now=None):
+    """Resolve the given open alerts; returns how many were resolved"""
+    now = now or timezone.now()
+    resolved = 0
+    for ids in _chunks(list(alert_ids)):
+        resolved += InventoryAlert.objects.filter(id__in=ids, is_resolved=False).update(
+            is_resolved=True,
+            resolved_at=now,
+            resolution_notes=notes
+        )
+    return resolved
+
+
+def notify_alerts(alerts, now=None):
+    """Notify the stock roles of new alerts in one batch; returns the number of notifications"""
+    from notifications.models import Notification
+    from users.models import User
+
+    if not alerts:
+        return 0
+
+    recipients = {}
+
+    def users_for(urgent):
+        if urgent not in recipients:
+            recipients[urgent] = list(User.objects.filter(
+                is_active=True,
+                user_roles__role__role_type__in=URGENT_NOTIFY_ROLES if urgent else NOTIFY_ROLES
+            ).distinct().values_list('id', flat=True))
+        return recipients[urgent]
+
+    notifications = []
+    for alert in alerts:
+        urgent = alert.priority in ('high', 'critical')
+        for user_id in users_for(urgent):
+            notifications.append(Notification(
+                user_id=user_id,
+                title=alert.title,
+                message=alert.message,
+                notification_type='stock_alert',
+                priority='high' if urgent else 'medium',
+                related_object_type='inventory_alert',
+                related_object_id=alert.id
+            ))
+    Notification.objects.bulk_create(notifications, batch_size=BATCH_SIZE)
+
+    now = now or timezone.now()
+    for ids in _chunks([alert.id for alert in alerts]):
+        InventoryAlert.objects.filter(id__in=ids).update(notification_sent=True, notification_sent_at=now)
+    return len(notifications)
+
+
+def sweep_stock_alerts(now=None):
+    """
+    Create low stock, out of stock and overstock alerts for current levels
+    and resolve low stock alerts whose levels have recovered
+    """
+    now = now or timezone.now()
+    levels = {level.key: level for level in stock_levels()}
+
+    open_low = {}
+    open_overstock = set()
+    open_alerts = InventoryAlert.objects.filter(
+        is_resolved=False, alert_type__in=LOW_STOCK_TYPES + ('overstock',)
+    ).values_list('id', 'product_id', 'warehouse_id', 'alert_type')
+    for alert_id, product_id, warehouse_id, alert_type in open_alerts.iterator(chunk_size=BATCH_SIZE):
+        if alert_type == 'overstock':
+            open_overstock.add((product_id, warehouse_id))
+        else:
+            open_low.setdefault((product_id, warehouse_id), []).append(alert_id)
+
+    low_stock = [
+        _low_stock_alert(level) for key, level in levels.items()
+        if level.is_low and key not in open_low
+    ]
+    overstock = [
+        _overstock_alert(level) for key, level in levels.items()
+        if level.is_overstocked and key not in open_overstock
+    ]
+    recovered = [
+        alert_id for key, alert_ids in open_low.items()
+        if key in levels and not levels[key].is_low
+        for alert_id in alert_ids
+    ]
+
+    low_stock = InventoryAlert.objects.bulk_create(low_stock, batch_size=BATCH_SIZE)
+    InventoryAlert.objects.bulk_create(overstock, batch_size=BATCH_SIZE)
+    resolved = resolve_alerts(recovered, now=now)
+    notified = notify_alerts(low_stock, now=now)
+
+    return {
+        'alerts_created': len(low_stock) + len(overstock),
+        'alerts_resolved': resolved,
+        'notifications_sent': notified,
+        'levels_checked': len(levels),
+    }
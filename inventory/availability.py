@@ -0,0 +1,211 @@
+"""
+Materialized available-to-promise (ATP) quantities (StockAvailability).
+
+One row per (product, warehouse) holds on_hand (WarehouseInventory
+quantity), reserved (active StockReservations) and available (on_hand -
+reserved), so order placement, picking and alerting read one row instead
+of re-aggregating reservations. The WarehouseInventory and
+StockReservation signals in inventory.signals maintain the rows within the
+transaction of the change: an inventory save sets on_hand, and a
+reservation change adds its quantity delta to reserved with an F()
+update. A pair without a row is computed from the source tables and
+inserted. New reservations are claimed with ``claim_available``, a
+conditional update that never takes a row below zero available.
+
+QuerySet.update() bypasses those signals; code that changes quantities or
+reservation statuses that way calls ``refresh_availability`` for the
+affected pairs. ``sync_availability`` (the rebuild_stock_availability
+command) recomputes every row and reports or repairs any drift.
+"""
+from collections import Counter
+
+from django.db import transaction
+from django.db.models import F, Sum
+from django.utils import timezone
+
+from .models import StockAvailability, StockReservation
+
+ACTIVE_RESERVATION_STATUSES = ('pending', 'confirmed')
+BATCH_SIZE = 1000
+# Reservation state when its status or quantity was not loaded
+UNKNOWN = 'unknown'
+
+
+def _source_quantities(product_ids):
+    """{(product_id, warehouse_id): (on_hand, reserved)} of the given products, from the source tables"""
+    from stock_keeper.models import WarehouseInventory
+
+    on_hand = Counter()
+    for product_id, warehouse_id, quantity in WarehouseInventory.objects.filter(
+        product_id__in=product_ids
+    ).order_by().values('product_id', 'warehouse_id').annotate(
+        total=Sum('quantity')
+    ).values_list('product_id', 'warehouse_id', 'total'):
+        on_hand[(product_id, warehouse_id)] = quantity or 0
+
+    reserved = Counter()
+    for product_id, warehouse_id, quantity in StockReservation.objects.filter(
+        product_id__in=product_ids, status__in=ACTIVE_RESERVATION_STATUSES
+    ).order_by().values('product_id', 'warehouse_id').annotate(
+        total=Sum('quantity')
+    ).values_list('product_id', 'warehouse_id', 'total'):
+        reserved[(product_id, warehouse_id)] = quantity or 0
+
+    return {key: (on_hand[key], reserved[key]) for key in set(on_hand) | set(reserved)}
+
+
+def _row(key, on_hand, reserved, now):
+    product_id, warehouse_id = key
+    return StockAvailability(
+        product_id=product_id,
+        warehouse_id=warehouse_id,
+        on_hand=on_hand,
+        reserved=reserved,
+        available=on_hand - reserved,
+        updated_at=now
+    )
+
+
+def _upsert(rows):
+    StockAvailability.objects.bulk_create(
+        rows,
+        batch_size=BATCH_SIZE,
+        update_conflicts=True,
+        unique_fields=['product', 'warehouse'],
+        update_fields=['on_hand', 'reserved', 'available', 'updated_at'],
+    )
+
+
+def refresh_availability(pairs):
+    """Recompute the rows of the given (product_id, warehouse_id) pairs from the source tables"""
+    pairs = {pair for pair in pairs if all(pair)}
+    if not pairs:
+        return
+    quantities = _source_quantities({product_id for product_id, _ in pairs})
+    now = timezone.now()
+    _upsert([_row(pair, *quantities.get(pair, (0, 0)), now) for pair in pairs])
+
+
+def set_on_hand(product_id, warehouse_id, quantity, create=True):
+    """
+    Record a new on hand quantity for a product in a warehouse. Without
+    ``create`` a missing row is left missing (deletes, which may be
+    cascading from the product or warehouse itself).
+    """
+    updated = StockAvailability.objects.filter(product_id=product_id, warehouse_id=warehouse_id).update(
+        on_hand=quantity,
+        available=quantity - F('reserved'),
+        updated_at=timezone.now()
+    )
+    if not updated and create:
+        refresh_availability([(product_id, warehouse_id)])
+
+
+def adjust_reserved(deltas, create=True):
+    """Add ``{(product_id, warehouse_id): delta}`` to the reserved quantities"""
+    now = timezone.now()
+    missing = []
+    for (product_id, warehouse_id), delta in deltas.items():
+        if not delta:
+            continue
+        updated = StockAvailability.objects.filter(product_id=product_id, warehouse_id=warehouse_id).update(
+            reserved=F('reserved') + delta,
+            available=F('available') - delta,
+            updated_at=now
+        )
+        if not updated:
+            missing.append((product_id, warehouse_id))
+    if create:
+        refresh_availability(missing)
+
+
+def claim_available(product_id, warehouse_id, quantity):
+    """
+    Take ``quantity`` off the available quantity of a row only if that much
+    is available (UPDATE ... WHERE available >= quantity), so concurrent
+    reservations cannot promise the same units twice. True when claimed;
+    the reservation saved for the claim must set ``_availability_claimed``
+    so its signal does not count it again.
+    """
+    return bool(StockAvailability.objects.filter(
+        product_id=product_id, warehouse_id=warehouse_id, available__gte=quantity
+    ).update(
+        reserved=F('reserved') + quantity,
+        available=F('available') - quantity,
+        updated_at=timezone.now()
+    ))
+
+
+def reservation_state(reservation):
+    """(product_id, warehouse_id, quantity) of an active reservation, None when inactive"""
+    values = reservation.__dict__
+    if 'status' not in values or 'quantity' not in values:
+        return UNKNOWN
+    if values['status'] in ACTIVE_RESERVATION_STATUSES and values['quantity']:
+        return (values.get('product_id'), values.get('warehouse_id'), values['quantity'])
+    return None
+
+
+def reservation_changed(reservation, created=False, deleted=False):
+    """Apply the change of one reservation, compared with its state when loaded"""
+    if created:
+        # A claimed reservation is already counted in its row
+        old = reservation_state(reservation) if getattr(reservation, '_availability_claimed', False) else None
+    else:
+        old = getattr(reservation, '_availability_state', UNKNOWN)
+    new = None if deleted else reservation_state(reservation)
+    if UNKNOWN in (old, new):
+        if not deleted:
+            refresh_availability([(reservation.product_id, reservation.warehouse_id)])
+    else:
+        deltas = Counter()
+        if old:
+            deltas[old[:2]] -= old[2]
+        if new:
+            deltas[new[:2]] += new[2]
+        adjust_reserved(deltas, create=not deleted)
+    reservation._availability_state = new
+
+
+def sync_availability(fix=True, batch_size=BATCH_SIZE):
+    """
+    Compare every row with the source tables, product by product in
+    batches; with ``fix`` missing and drifted rows are rewritten. Returns
+    counts and a sample of the mismatches found.
+    """
+    from sellers.models import Product
+
+    stats = {'checked': 0, 'missing': 0, 'mismatched': 0, 'samples': []}
+    last_id = 0
+    while True:
+        product_ids = list(
+            Product.objects.filter(pk__gt=last_id).order_by('pk').values_list('pk', flat=True)[:batch_size]
+        )
+        if not product_ids:
+            break
+        last_id = product_ids[-1]
+
+        expected = _source_quantities(product_ids)
+        actual = {
+            (product_id, warehouse_id): (on_hand, reserved, available)
+            for product_id, warehouse_id, on_hand, reserved, available in StockAvailability.objects.filter(
+                product_id__in=product_ids
+            ).values_list('product_id', 'warehouse_id', 'on_hand', 'reserved', 'available')
+        }
+
+        now = timezone.now()
+        repairs = []
+        for key in set(expected) | set(actual):
+            on_hand, reserved = expected.get(key, (0, 0))
+            stats['checked'] += 1
+            if actual.get(key) == (on_hand, reserved, on_hand - reserved):
+                continue
+            stats['missing' if key not in actual else 'mismatched'] += 1
+            if len(stats['samples']) < 20:
+                stats['samples'].append({'product_id': key[0], 'warehouse_id': key[1], 'expected': (on_hand, reserved), 'actual': actual.get(key)})
+            repairs.append(_row(key, on_hand, reserved, now))
+
+        if fix and repairs:
+            with transaction.atomic():
+                _upsert(repairs)
+    return stats
@@ -0,0 +1,308 @@
+"""
+Append-only stock ledger (StockLedgerEntry) with daily snapshots (StockSnapshot).
+
+Every change to an InventoryRecord quantity appends an entry holding the
+delta for its (product, warehouse, location). The InventoryRecord signals
+in inventory.signals write the entries for saves and deletes,
+StockService.decrement writes them for its conditional updates, and
+``label`` tags a record with the movement type and reference of the change
+about to be saved. Entries are never edited; a correction is a new entry.
+
+``snapshot_ledger`` (the daily snapshot_stock_ledger task) stores every
+non-zero balance at the end of a day from the previous snapshot and that
+day's entries. Balances at any time and their value are the latest
+snapshot before it plus the entries since (``balances_at``,
+``stock_valuation``), so history is never rescanned.
+
+The quantity columns are caches of the ledger: InventoryRecord.quantity
+per location, WarehouseInventory.quantity per warehouse and
+Product.stock_quantity per product. The warehouse and product caches are
+refreshed whenever entries are appended; ``rebuild_stock_caches`` (the
+rebuild_stock_caches command) recomputes all three and writes only the
+rows that differ.
+"""
+from collections import Counter
+from datetime import datetime, time, timedelta
+from decimal import Decimal
+
+from django.db import transaction
+from django.db.models import Max, Sum
+from django.utils import timezone
+
+from .models import InventoryRecord, StockLedgerEntry, StockSnapshot
+
+BATCH_SIZE = 1000
+# Record state when its key or quantity was not loaded
+UNKNOWN = 'unknown'
+
+
+def label(record, movement_type, reference='', user=None):
+    """Describe the next change saved to ``record`` in its ledger entries"""
+    record._ledger_label = (movement_type, reference, user)
+
+
+def _day_end(day):
+    """Start of the day after ``day``; a snapshot holds the entries created before it"""
+    return timezone.make_aware(datetime.combine(day + timedelta(days=1), time.min))
+
+
+def _balances(before_day, entries, product_ids=None, warehouse_id=None):
+    """
+    {(product_id, warehouse_id, location_id): quantity}: the latest snapshot
+    taken before ``before_day`` plus the ``entries`` created after it
+    """
+    day = StockSnapshot.objects.filter(day__lt=before_day).aggregate(day=Max('day'))['day']
+
+    snapshots = StockSnapshot.objects.filter(day=day)
+    if day:
+        entries = entries.filter(created_at__gte=_day_end(day))
+    if product_ids is not None:
+        snapshots = snapshots.filter(product_id__in=product_ids)
+        entries = entries.filter(product_id__in=product_ids)
+    if warehouse_id is not None:
+        snapshots = snapshots.filter(warehouse_id=warehouse_id)
+        entries = entries.filter(warehouse_id=warehouse_id)
+
+    balances = Counter()
+    if day:
+        for product_id, warehouse_id, location_id, quantity in snapshots.values_list(
+            'product_id', 'warehouse_id', 'location_id', 'quantity'
+        ):
+            balances[(product_id, warehouse_id, location_id)] += quantity
+
+    for product_id, warehouse_id, location_id, delta in entries.order_by().values(
+        'product_id', 'warehouse_id', 'location_id'
+    ).annotate(total=Sum('delta')).values_list('product_id', 'warehouse_id', 'location_id', 'total'):
+        balances[(product_id, warehouse_id, location_id)] += delta or 0
+
+    return balances
+
+
+def balances_at(when=None, product_ids=None, warehouse_id=None):
+    """Balances per (product_id, warehouse_id, location_id) at ``when`` (default: now)"""
+    entries = StockLedgerEntry.objects.all()
+    if when is None:
+        when = timezone.now()
+    else:
+        entries = entries.filter(created_at__lte=when)
+    return _balances(timezone.localdate(when), entries, product_ids, warehouse_id)
+
+
+def stock_valuation(when=None, warehouse_id=None):
+    """
+    Units on hand and their value at purchase price at ``when`` (default:
+    now). Products have no cost history, so past stock is valued at
+    current prices.
+    """
+    from sellers.models import Product
+
+    quantities = Counter()
+    for (product_id, _, _), quantity in balances_at(when, warehouse_id=warehouse_id).items():
+        quantities[product_id] += quantity
+
+    value = Decimal('0')
+    product_ids = list(quantities)
+    for start in range(0, len(product_ids), BATCH_SIZE):
+        for product_id, price in Product.objects.filter(
+            pk__in=product_ids[start:start + BATCH_SIZE]
+        ).values_list('pk', 'purchase_price'):
+            value += quantities[product_id] * (price or 0)
+
+    return {'quantity': sum(quantities.values()), 'value': value}
+
+
+def snapshot_ledger(day=None):
+    """Store the balances at the end of ``day`` (default: yesterday), replacing any earlier snapshot of it"""
+    day = day or timezone.localdate() - timedelta(days=1)
+
+    with transaction.atomic():
+        balances = _balances(day, StockLedgerEntry.objects.filter(created_at__lt=_day_end(day)))
+        StockSnapshot.objects.filter(day=day).delete()
+        StockSnapshot.objects.bulk_create([
+            StockSnapshot(
+                day=day,
+                product_id=product_id,
+                warehouse_id=warehouse_id,
+                location_id=location_id,
+                quantity=quantity
+            )
+            for (product_id, warehouse_id, location_id), quantity in balances.items()
+            if quantity
+        ], batch_size=BATCH_SIZE)
+
+    return {'day': day.isoformat(), 'balances': sum(1 for quantity in balances.values() if quantity)}
+
+
+def append(deltas, movement_type='adjustment', reference='', user=None):
+    """
+    Append ``{(product_id, warehouse_id, location_id): delta}`` to the
+    ledger and refresh the warehouse and product caches of those products
+    """
+    now = timezone.now()
+    entries = [
+        StockLedgerEntry(
+            product_id=product_id,
+            warehouse_id=warehouse_id,
+            location_id=location_id,
+            delta=delta,
+            movement_type=movement_type,
+            reference=reference[:100],
+            created_by=user,
+            created_at=now
+        )
+        for (product_id, warehouse_id, location_id), delta in deltas.items()
+        if delta
+    ]
+    if entries:
+        StockLedgerEntry.objects.bulk_create(entries, batch_size=BATCH_SIZE)
+        rebuild_stock_caches({entry.product_id for entry in entries}, records=False)
+    return entries
+
+
+def record_state(record):
+    """(product_id, warehouse_id, location_id, quantity) of a loaded InventoryRecord"""
+    values = record.__dict__
+    if any(field not in values for field in ('product_id', 'warehouse_id', 'location_id', 'quantity')):
+        return UNKNOWN
+    if not isinstance(values['quantity'], int):
+        # An F() expression not yet applied
+        return UNKNOWN
+    return (values['product_id'], values['warehouse_id'], values['location_id'], values['quantity'])
+
+
+def record_changed(record, created=False, deleted=False):
+    """Append the change of one InventoryRecord, compared with its state when loaded"""
+    old = None if created else getattr(record, '_ledger_state', UNKNOWN)
+    new = None if deleted else record_state(record)
+    if new == UNKNOWN:
+        record.refresh_from_db(fields=['product', 'warehouse', 'location', 'quantity'])
+        new = record_state(record)
+
+    deltas = Counter()
+    if old == UNKNOWN:
+        # Not known what the record held; bring its key's balance up to date
+        current = record_state(record) if deleted else new
+        if current == UNKNOWN:
+            return
+        key = current[:3]
+        deltas[key] = (new[3] if new else 0) - balances_at(product_ids=[key[0]]).get(key, 0)
+    else:
+        if old:
+            deltas[old[:3]] -= old[3]
+        if new:
+            deltas[new[:3]] += new[3]
+
+    movement_type, reference, user = getattr(record, '_ledger_label', ('adjustment', '', None))
+    append(deltas, movement_type, reference, user)
+    record._ledger_state = new
+    record._ledger_label = ('adjustment', '', None)
+
+
+def _sync_records(product_ids, balances, now):
+    """Set InventoryRecord quantities to the balances; returns (updated, created)"""
+    remaining = dict(balances)
+    changed = []
+    for record in InventoryRecord.objects.filter(product_id__in=product_ids).only(
+        'pk', 'product', 'warehouse', 'location', 'quantity', 'last_updated'
+    ).order_by('pk'):
+        key = (record.product_id, record.warehouse_id, record.location_id)
+        # A key may hold several rows (NULL locations); the first one carries the balance
+        quantity = remaining.pop(key, 0)
+        if record.quantity != quantity:
+            record.quantity = quantity
+            record.last_updated = now
+            changed.append(record)
+
+    created = [
+        InventoryRecord(product_id=product_id, warehouse_id=warehouse_id, location_id=location_id, quantity=quantity)
+        for (product_id, warehouse_id, location_id), quantity in remaining.items()
+        if quantity
+    ]
+    # bulk_update/bulk_create skip the signals, so the caches do not write entries of their own
+    InventoryRecord.objects.bulk_update(changed, ['quantity', 'last_updated'], batch_size=BATCH_SIZE)
+    InventoryRecord.objects.bulk_create(created, batch_size=BATCH_SIZE)
+    return len(changed), len(created)
+
+
+def _sync_warehouses(product_ids, balances, now):
+    """Set WarehouseInventory quantities to the warehouse balances; returns (updated, created)"""
+    from stock_keeper.models import WarehouseInventory
+
+    from .availability import refresh_availability
+
+    remaining = Counter()
+    for (product_id, warehouse_id, _), quantity in balances.items():
+        remaining[(product_id, warehouse_id)] += quantity
+
+    changed = []
+    for inventory in WarehouseInventory.objects.filter(product_id__in=product_ids).only(
+        'pk', 'product', 'warehouse', 'quantity', 'last_movement', 'updated_at'
+    ):
+        quantity = max(0, remaining.pop((inventory.product_id, inventory.warehouse_id), 0))
+        if inventory.quantity != quantity:
+            inventory.quantity = quantity
+            inventory.last_movement = inventory.updated_at = now
+            changed.append(inventory)
+
+    created = [
+        WarehouseInventory(product_id=product_id, warehouse_id=warehouse_id, quantity=quantity)
+        for (product_id, warehouse_id), quantity in remaining.items()
+        if quantity > 0
+    ]
+    WarehouseInventory.objects.bulk_update(changed, ['quantity', 'last_movement', 'updated_at'], batch_size=BATCH_SIZE)
+    WarehouseInventory.objects.bulk_create(created, batch_size=BATCH_SIZE)
+
+    # bulk writes skip the availability signals
+    refresh_availability(
+        [(inventory.product_id, inventory.warehouse_id) for inventory in changed + created]
+    )
+    return len(changed), len(created)
+
+
+def _sync_products(product_ids, balances):
+    """Set Product.stock_quantity to the product balances; returns the number updated"""
+    from sellers.models import Product
+
+    totals = Counter()
+    for (product_id, _, _), quantity in balances.items():
+        totals[product_id] += quantity
+
+    changed = []
+    for product in Product.objects.filter(pk__in=product_ids).only('pk', 'stock_quantity'):
+        quantity = max(0, totals[product.pk])
+        if product.stock_quantity != quantity:
+            product.stock_quantity = quantity
+            changed.append(product)
+    Product.objects.bulk_update(changed, ['stock_quantity'], batch_size=BATCH_SIZE)
+    return len(changed)
+
+
+def rebuild_stock_caches(product_ids=None, records=True, batch_size=BATCH_SIZE):
+    """
+    Recompute the cached quantities of the given products (default: every
+    product in the ledger) from the ledger, writing only rows that differ.
+    InventoryRecords are left alone without ``records`` (they are what the
+    entries were written from). Returns counts of the rows written.
+    """
+    if product_ids is None:
+        product_ids = StockLedgerEntry.objects.order_by('product_id').values_list('product_id', flat=True).distinct()
+    product_ids = sorted(set(product_ids))
+
+    stats = Counter()
+    for start in range(0, len(product_ids), batch_size):
+        batch = product_ids[start:start + batch_size]
+        balances = balances_at(product_ids=batch)
+        now = timezone.now()
+
+        with transaction.atomic():
+            if records:
+                updated, created = _sync_records(batch, balances, now)
+                stats['records_updated'] += updated
+                stats['records_created'] += created
+            updated, created = _sync_warehouses(batch, balances, now)
+            stats['warehouse_inventory_updated'] += updated
+            stats['warehouse_inventory_created'] += created
+            stats['products_updated'] += _sync_products(batch, balances)
+        stats['products_checked'] += len(batch)
+
+    return dict(stats)
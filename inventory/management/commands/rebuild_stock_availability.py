@@ -0,0 +1,40 @@
+from django.core.management.base import BaseCommand
+
+from inventory.availability import BATCH_SIZE, sync_availability
+
+
+class Command(BaseCommand):
+    help = 'Check the available-to-promise table against inventory and reservations, and repair drifted rows'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--verify',
+            action='store_true',
+            help='Only report rows that differ from the source tables',
+        )
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=BATCH_SIZE,
+            help='Number of products compared per batch',
+        )
+
+    def handle(self, *args, **options):
+        fix = not options['verify']
+        stats = sync_availability(fix=fix, batch_size=options['batch_size'])
+
+        for sample in stats['samples']:
+            self.stdout.write(
+                f"Product {sample['product_id']} in warehouse {sample['warehouse_id']}: "
+                f"expected on hand/reserved {sample['expected']}, found {sample['actual']}"
+            )
+
+        summary = (
+            f"Checked {stats['checked']} rows: {stats['missing']} missing, {stats['mismatched']} mismatched"
+        )
+        if not (stats['missing'] or stats['mismatched']):
+            self.stdout.write(self.style.SUCCESS(summary))
+        elif fix:
+            self.stdout.write(self.style.SUCCESS(f"{summary}; all repaired."))
+        else:
+            self.stdout.write(self.style.WARNING(summary))
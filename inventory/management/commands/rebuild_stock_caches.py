@@ -0,0 +1,34 @@
+from django.core.management.base import BaseCommand
+
+from inventory.ledger import BATCH_SIZE, rebuild_stock_caches
+
+
+class Command(BaseCommand):
+    help = 'Recompute inventory records, warehouse inventory and product stock quantities from the stock ledger'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--product',
+            type=int,
+            action='append',
+            dest='products',
+            help='Only rebuild this product (repeatable)',
+        )
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=BATCH_SIZE,
+            help='Number of products rebuilt per batch',
+        )
+
+    def handle(self, *args, **options):
+        stats = rebuild_stock_caches(options['products'], batch_size=options['batch_size'])
+
+        self.stdout.write(self.style.SUCCESS(
+            f"Checked {stats.get('products_checked', 0)} products: "
+            f"{stats.get('records_updated', 0)} inventory records updated, "
+            f"{stats.get('records_created', 0)} created; "
+            f"{stats.get('warehouse_inventory_updated', 0)} warehouse inventory rows updated, "
+            f"{stats.get('warehouse_inventory_created', 0)} created; "
+            f"{stats.get('products_updated', 0)} product stock quantities updated."
+        ))
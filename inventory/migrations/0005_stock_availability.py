@@ -0,0 +1,60 @@
+# Generated by Django 5.2.18 on 2026-10-17 18:40
+
+import django.db.models.deletion
+import django.utils.timezone
+from django.db import migrations, models
+
+
+def populate_availability(apps, schema_editor):
+    """Build the available-to-promise rows from current inventory and active reservations"""
+    WarehouseInventory = apps.get_model('stock_keeper', 'WarehouseInventory')
+    StockReservation = apps.get_model('inventory', 'StockReservation')
+    StockAvailability = apps.get_model('inventory', 'StockAvailability')
+
+    quantities = {}
+    for row in WarehouseInventory.objects.order_by().values('product_id', 'warehouse_id').annotate(total=models.Sum('quantity')):
+        quantities[(row['product_id'], row['warehouse_id'])] = [row['total'] or 0, 0]
+    for row in StockReservation.objects.filter(status__in=['pending', 'confirmed']).order_by().values(
+        'product_id', 'warehouse_id'
+    ).annotate(total=models.Sum('quantity')):
+        quantities.setdefault((row['product_id'], row['warehouse_id']), [0, 0])[1] = row['total'] or 0
+
+    now = django.utils.timezone.now()
+    StockAvailability.objects.bulk_create([
+        StockAvailability(
+            product_id=product_id, warehouse_id=warehouse_id,
+            on_hand=on_hand, reserved=reserved, available=on_hand - reserved, updated_at=now,
+        )
+        for (product_id, warehouse_id), (on_hand, reserved) in quantities.items()
+    ], batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('inventory', '0004_add_stock_reservation_and_inventory_alert'),
+        ('sellers', '0018_alter_product_image'),
+        ('stock_keeper', '0004_alter_physicalcountrecord_counted_quantity_and_more'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='StockAvailability',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('on_hand', models.IntegerField(default=0)),
+                ('reserved', models.IntegerField(default=0)),
+                ('available', models.IntegerField(default=0)),
+                ('updated_at', models.DateTimeField(default=django.utils.timezone.now)),
+                ('product', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='availability', to='sellers.product')),
+                ('warehouse', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='availability', to='inventory.warehouse')),
+            ],
+            options={
+                'verbose_name': 'Stock Availability',
+                'verbose_name_plural': 'Stock Availability',
+                'constraints': [models.UniqueConstraint(fields=('product', 'warehouse'), name='stock_availability_unique')],
+                'indexes': [models.Index(fields=['product', 'available'], name='stock_availability_idx')],
+            },
+        ),
+        migrations.RunPython(populate_availability, migrations.RunPython.noop),
+    ]
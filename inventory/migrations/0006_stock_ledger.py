@@ -0,0 +1,78 @@
+# Generated by Django 5.2.18 on 2026-10-17 19:30
+
+import django.db.models.deletion
+import django.utils.timezone
+from django.conf import settings
+from django.db import migrations, models
+
+
+def record_opening_balances(apps, schema_editor):
+    """Open the ledger with one entry per existing InventoryRecord"""
+    InventoryRecord = apps.get_model('inventory', 'InventoryRecord')
+    StockLedgerEntry = apps.get_model('inventory', 'StockLedgerEntry')
+
+    now = django.utils.timezone.now()
+    entries = []
+    for product_id, warehouse_id, location_id, quantity in InventoryRecord.objects.exclude(
+        quantity=0
+    ).values_list('product_id', 'warehouse_id', 'location_id', 'quantity').iterator(chunk_size=1000):
+        entries.append(StockLedgerEntry(
+            product_id=product_id, warehouse_id=warehouse_id, location_id=location_id,
+            delta=quantity, movement_type='opening', reference='Opening balance', created_at=now,
+        ))
+        if len(entries) >= 1000:
+            StockLedgerEntry.objects.bulk_create(entries)
+            entries = []
+    StockLedgerEntry.objects.bulk_create(entries)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('inventory', '0005_stock_availability'),
+        ('sellers', '0018_alter_product_image'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='StockLedgerEntry',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('delta', models.IntegerField()),
+                ('movement_type', models.CharField(choices=[('opening', 'Opening Balance'), ('stock_in', 'Stock In'), ('stock_out', 'Stock Out'), ('transfer', 'Transfer'), ('return', 'Return'), ('adjustment', 'Adjustment')], default='adjustment', max_length=20)),
+                ('reference', models.CharField(blank=True, max_length=100)),
+                ('created_at', models.DateTimeField(default=django.utils.timezone.now)),
+                ('created_by', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='stock_ledger_entries', to=settings.AUTH_USER_MODEL)),
+                ('location', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='ledger_entries', to='inventory.warehouselocation')),
+                ('product', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='ledger_entries', to='sellers.product')),
+                ('warehouse', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='ledger_entries', to='inventory.warehouse')),
+            ],
+            options={
+                'verbose_name': 'Stock Ledger Entry',
+                'verbose_name_plural': 'Stock Ledger',
+                'ordering': ['-created_at'],
+                'indexes': [
+                    models.Index(fields=['created_at'], name='stock_ledger_created_idx'),
+                    models.Index(fields=['product', 'created_at'], name='stock_ledger_product_idx'),
+                ],
+            },
+        ),
+        migrations.CreateModel(
+            name='StockSnapshot',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('day', models.DateField()),
+                ('quantity', models.IntegerField()),
+                ('location', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='stock_snapshots', to='inventory.warehouselocation')),
+                ('product', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='stock_snapshots', to='sellers.product')),
+                ('warehouse', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='stock_snapshots', to='inventory.warehouse')),
+            ],
+            options={
+                'verbose_name': 'Stock Snapshot',
+                'verbose_name_plural': 'Stock Snapshots',
+                'indexes': [models.Index(fields=['day', 'product'], name='stock_snapshot_day_idx')],
+            },
+        ),
+        migrations.RunPython(record_opening_balances, migrations.RunPython.noop),
+    ]
@@ -51,6 +51,9 @@ class InventoryRecord(models.Model):
     warehouse = models.ForeignKey(Warehouse, on_delete=models.CASCADE)
     location = models.ForeignKey(WarehouseLocation, on_delete=models.SET_NULL, null=True, blank=True)
     quantity = models.IntegerField()
+    # Valuation at the product's purchase price (inventory.tasks.update_inventory_valuations)
+    unit_cost = models.DecimalField(max_digits=10, decimal_places=2, null=True, blank=True)
+    total_value = models.DecimalField(max_digits=14, decimal_places=2, null=True, blank=True)
     last_updated = models.DateTimeField(auto_now=True)
     
     class Meta:
@@ -183,34 +186,117 @@ class StockReservation(models.Model):
     @classmethod
     def get_reserved_quantity(cls, product, warehouse=None):
         """Get total reserved quantity for a product (optionally in a specific warehouse)."""
-        queryset = cls.objects.filter(
-            product=product,
-            status__in=['pending', 'confirmed']
-        )
+        queryset = StockAvailability.objects.filter(product=product)
         if warehouse:
             queryset = queryset.filter(warehouse=warehouse)
 
         return queryset.aggregate(
-            total=models.Sum('quantity')
+            total=models.Sum('reserved')
         )['total'] or 0
 
     @classmethod
     def get_available_quantity(cls, product, warehouse):
         """Get available quantity (total stock minus reservations)."""
-        from stock_keeper.models import WarehouseInventory
-
-        inventory = WarehouseInventory.objects.filter(
+        available = StockAvailability.objects.filter(
             product=product,
             warehouse=warehouse
-        ).first()
+        ).values_list('available', flat=True).first()
+
+        return max(0, available or 0)
+
+
+class StockAvailability(models.Model):
+    """
+    Available-to-promise quantity of a product in a warehouse: on hand
+    (WarehouseInventory) minus active reservations. Kept up to date by
+    inventory.availability whenever either changes; check or rebuild it
+    with ``manage.py rebuild_stock_availability``.
+    """
+    product = models.ForeignKey('sellers.Product', on_delete=models.CASCADE, related_name='availability')
+    warehouse = models.ForeignKey(Warehouse, on_delete=models.CASCADE, related_name='availability')
+
+    on_hand = models.IntegerField(default=0)
+    reserved = models.IntegerField(default=0)
+    # on_hand - reserved; negative when reservations exceed the stock
+    available = models.IntegerField(default=0)
+
+    updated_at = models.DateTimeField(default=timezone.now)
+
+    class Meta:
+        verbose_name = 'Stock Availability'
+        verbose_name_plural = 'Stock Availability'
+        constraints = [
+            models.UniqueConstraint(fields=['product', 'warehouse'], name='stock_availability_unique'),
+        ]
+        indexes = [
+            models.Index(fields=['product', 'available'], name='stock_availability_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.product_id}@{self.warehouse_id}: {self.available} available"
+
+
+
+class StockLedgerEntry(models.Model):
+    """
+    One change in the quantity of a product at a warehouse location. The
+    ledger is append-only: entries are never edited, a correction is a new
+    entry. InventoryRecord, WarehouseInventory and Product.stock_quantity
+    are caches of its balances (inventory.ledger).
+    """
+    MOVEMENT_TYPES = (
+        ('opening', 'Opening Balance'),
+        ('stock_in', 'Stock In'),
+        ('stock_out', 'Stock Out'),
+        ('transfer', 'Transfer'),
+        ('return', 'Return'),
+        ('adjustment', 'Adjustment'),
+    )
 
-        if not inventory:
-            return 0
+    product = models.ForeignKey('sellers.Product', on_delete=models.CASCADE, related_name='ledger_entries')
+    warehouse = models.ForeignKey(Warehouse, on_delete=models.CASCADE, related_name='ledger_entries')
+    location = models.ForeignKey(WarehouseLocation, on_delete=models.SET_NULL, null=True, blank=True, related_name='ledger_entries')
+    delta = models.IntegerField()
+    movement_type = models.CharField(max_length=20, choices=MOVEMENT_TYPES, default='adjustment')
+    reference = models.CharField(max_length=100, blank=True)  # Order number, transfer, etc.
+    created_by = models.ForeignKey('users.User', on_delete=models.SET_NULL, null=True, blank=True, related_name='stock_ledger_entries')
+    created_at = models.DateTimeField(default=timezone.now)
 
-        reserved = cls.get_reserved_quantity(product, warehouse)
-        return max(0, inventory.quantity - reserved)
+    class Meta:
+        verbose_name = 'Stock Ledger Entry'
+        verbose_name_plural = 'Stock Ledger'
+        ordering = ['-created_at']
+        indexes = [
+            models.Index(fields=['created_at'], name='stock_ledger_created_idx'),
+            models.Index(fields=['product', 'created_at'], name='stock_ledger_product_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.get_movement_type_display()}: {self.delta:+d} of {self.product_id} at {self.warehouse_id}"
 
 
+class StockSnapshot(models.Model):
+    """
+    Balance of a product at a warehouse location at the end of ``day``:
+    the previous snapshot plus that day's ledger entries. Only non-zero
+    balances are stored.
+    """
+    day = models.DateField()
+    product = models.ForeignKey('sellers.Product', on_delete=models.CASCADE, related_name='stock_snapshots')
+    warehouse = models.ForeignKey(Warehouse, on_delete=models.CASCADE, related_name='stock_snapshots')
+    location = models.ForeignKey(WarehouseLocation, on_delete=models.SET_NULL, null=True, blank=True, related_name='stock_snapshots')
+    quantity = models.IntegerField()
+
+    class Meta:
+        verbose_name = 'Stock Snapshot'
+        verbose_name_plural = 'Stock Snapshots'
+        indexes = [
+            models.Index(fields=['day', 'product'], name='stock_snapshot_day_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.day}: {self.quantity} of {self.product_id} at {self.warehouse_id}"
+
 class InventoryAlert(models.Model):
     """
     Model to track inventory alerts for products.
@@ -3,20 +3,24 @@ Inventory Alert Service - Handles alert management and notifications
 """
 from django.db import models, transaction
 from django.utils import timezone
+from collections import Counter
 from datetime import timedelta
 import logging
 
 logger = logging.getLogger('atlas_crm')
 
 
+class InsufficientStock(ValueError):
+    """A stock line cannot be covered; raised inside the transaction, which rolls back."""
+
+
 class InventoryAlertService:
     """Service for managing inventory alerts and notifications."""
 
     @staticmethod
     def check_stock_levels(product, warehouse=None):
         """Check stock levels and create alerts if needed."""
-        from .models import Stock, InventoryAlert, StockReservation
-        from stock_keeper.models import WarehouseInventory
+        from .models import Stock, InventoryAlert, StockAvailability
 
         alerts_created = []
 
@@ -26,10 +30,13 @@ class InventoryAlertService:
             if not stock:
                 return alerts_created
 
-            # Calculate available quantity
-            total_qty = stock.total_quantity
-            reserved_qty = StockReservation.get_reserved_quantity(product, warehouse)
-            available_qty = max(0, total_qty - reserved_qty)
+            # Read on hand and available quantity from the available-to-promise table
+            levels = StockAvailability.objects.filter(product=product)
+            if warehouse:
+                levels = levels.filter(warehouse=warehouse)
+            totals = levels.aggregate(on_hand=models.Sum('on_hand'), available=models.Sum('available'))
+            total_qty = totals['on_hand'] or 0
+            available_qty = max(0, totals['available'] or 0)
 
             # Check for low stock
             if available_qty <= stock.min_quantity:
@@ -83,19 +90,18 @@ class InventoryAlertService:
 
         users = User.objects.filter(
             is_active=True,
-            userrole__role__role_type__in=roles
+            user_roles__role__role_type__in=roles
         ).distinct()
 
-        for user in users:
-            Notification.objects.create(
-                user=user,
-                title=alert.title,
-                message=alert.message,
-                notification_type='stock_alert',
-                priority='high' if alert.priority in ['high', 'critical'] else 'medium',
-                related_object_type='inventory_alert',
-                related_object_id=str(alert.id)
-            )
+        Notification.create_bulk_notifications(
+            users,
+            title=alert.title,
+            message=alert.message,
+            notification_type='stock_alert',
+            priority='high' if alert.priority in ['high', 'critical'] else 'medium',
+            related_object_type='inventory_alert',
+            related_object_id=alert.id
+        )
 
     @staticmethod
     def resolve_alerts_for_product(product, warehouse=None, notes=''):
@@ -144,19 +150,17 @@ class StockReservationService:
     @transaction.atomic
     def create_reservation(order, order_item, warehouse, user=None, expires_hours=24):
         """Create a stock reservation for an order item."""
+        from .availability import claim_available
         from .models import StockReservation
 
-        # Check available quantity
-        available = StockReservation.get_available_quantity(
-            order_item.product, warehouse
-        )
-
-        if available < order_item.quantity:
-            raise ValueError(
+        # Claim the quantity first; the conditional update fails instead of overselling
+        if not claim_available(order_item.product_id, warehouse.pk, order_item.quantity):
+            available = StockReservation.get_available_quantity(order_item.product, warehouse)
+            raise InsufficientStock(
                 f"Insufficient stock. Available: {available}, Requested: {order_item.quantity}"
             )
 
-        reservation = StockReservation.objects.create(
+        reservation = StockReservation(
             product=order_item.product,
             warehouse=warehouse,
             order=order,
@@ -166,12 +170,83 @@ class StockReservationService:
             reserved_by=user,
             expires_at=timezone.now() + timedelta(hours=expires_hours)
         )
+        reservation._availability_claimed = True
+        reservation.save()
 
         # Check if this creates a low stock situation
         InventoryAlertService.check_stock_levels(order_item.product, warehouse)
 
         return reservation
 
+    @staticmethod
+    @transaction.atomic
+    def reserve_order(order, items=None, user=None, expires_hours=48):
+        """
+        Reserve order items (by default every item of the order without a
+        reservation), each in the first warehouse that can cover it, in one
+        transaction: either every line is reserved or InsufficientStock is
+        raised and none are.
+        """
+        from .models import StockAvailability, StockReservation
+
+        items = list(order.items.all() if items is None else items)
+        reserved = set(StockReservation.objects.filter(
+            order=order, order_item__in=[item.pk for item in items]
+        ).values_list('order_item_id', flat=True))
+
+        reservations = []
+        # Claim in product order so concurrent multi-line orders lock rows in the same order
+        for item in sorted(items, key=lambda item: (item.product_id, item.pk)):
+            if item.pk in reserved:
+                continue
+            candidates = StockAvailability.objects.filter(
+                product_id=item.product_id,
+                available__gte=item.quantity
+            ).select_related('warehouse').order_by('warehouse_id')
+
+            for availability in candidates:
+                try:
+                    reservations.append(StockReservationService.create_reservation(
+                        order=order,
+                        order_item=item,
+                        warehouse=availability.warehouse,
+                        user=user,
+                        expires_hours=expires_hours
+                    ))
+                    break
+                except InsufficientStock:
+                    # Claimed by a concurrent reservation since the candidates were read
+                    continue
+            else:
+                raise InsufficientStock(
+                    f"No warehouse has {item.quantity} units of product {item.product_id} available"
+                )
+        return reservations
+
+    @staticmethod
+    def reserve_order_item(order_item, expires_hours=48):
+        """
+        Reserve stock for a new order item in the first warehouse that can cover it.
+        Used by the OrderItem post_save signal and by bulk order imports,
+        which insert items without signals.
+        """
+        try:
+            reservations = StockReservationService.reserve_order(
+                order_item.order,
+                [order_item],
+                user=getattr(order_item.order, 'created_by', None),
+                expires_hours=expires_hours
+            )
+            if reservations:
+                logger.info(f"Created reservation for order item {order_item.id}")
+                return reservations[0]
+
+        except ValueError as e:
+            logger.warning(f"Could not create reservation: {str(e)}")
+        except Exception as e:
+            logger.error(f"Error creating order item reservation: {str(e)}")
+        return None
+
     @staticmethod
     @transaction.atomic
     def fulfill_reservation(reservation):
@@ -206,3 +281,108 @@ class StockReservationService:
         return StockReservation.objects.filter(order=order).select_related(
             'product', 'warehouse', 'order_item'
         )
+
+
+class StockService:
+    """
+    Race-free stock movements. Quantities only go down through conditional
+    updates (UPDATE ... SET quantity = quantity - n WHERE quantity >= n) and
+    up through UPDATE ... SET quantity = quantity + n, on rows locked with
+    SELECT ... FOR UPDATE, so concurrent pickers can neither oversell nor
+    overwrite each other's updates.
+    """
+
+    @staticmethod
+    @transaction.atomic
+    def decrement(lines, movement_type='stock_out', reference='', user=None):
+        """
+        Take (product, warehouse, quantity) lines out of the warehouses'
+        InventoryRecords in one transaction, spreading a line over the
+        product's locations in the warehouse, and append the changes to the
+        stock ledger. Raises InsufficientStock, and nothing is taken, when
+        any line cannot be covered.
+        """
+        from . import ledger
+        from .models import InventoryRecord
+
+        quantities = Counter()
+        for product, warehouse, quantity in lines:
+            if quantity <= 0:
+                raise ValueError(f"Invalid quantity: {quantity}")
+            quantities[(product.pk, warehouse.pk)] += quantity
+
+        touched = []
+        deltas = Counter()
+        # Take lines in key order so concurrent multi-line picks lock rows in the same order
+        for (product_id, warehouse_id), quantity in sorted(quantities.items()):
+            remaining = quantity
+            records = InventoryRecord.objects.select_for_update().filter(
+                product_id=product_id,
+                warehouse_id=warehouse_id,
+                quantity__gt=0
+            ).order_by('pk').values_list('pk', 'location_id', 'quantity')
+
+            for record_id, location_id, on_hand in records:
+                take = min(on_hand, remaining)
+                if InventoryRecord.objects.filter(pk=record_id, quantity__gte=take).update(
+                    quantity=models.F('quantity') - take
+                ):
+                    deltas[(product_id, warehouse_id, location_id)] -= take
+                    touched.append(record_id)
+                    remaining -= take
+                if not remaining:
+                    break
+
+            if remaining:
+                raise InsufficientStock(
+                    f"Insufficient stock for product {product_id}. "
+                    f"Available: {quantity - remaining}, Requested: {quantity}"
+                )
+
+        ledger.append(deltas, movement_type, reference, user)
+        StockService._stamp(touched)
+        return len(touched)
+
+    @staticmethod
+    @transaction.atomic
+    def increment(lines, movement_type='stock_in', reference='', user=None):
+        """
+        Add (product, warehouse, quantity) lines to the first InventoryRecord
+        of the product in each warehouse, creating it when there is none,
+        with F() updates so concurrent receipts and transfers cannot
+        overwrite each other, and append the changes to the stock ledger.
+        """
+        from . import ledger
+        from .models import InventoryRecord
+
+        quantities = Counter()
+        for product, warehouse, quantity in lines:
+            if quantity <= 0:
+                raise ValueError(f"Invalid quantity: {quantity}")
+            quantities[(product.pk, warehouse.pk)] += quantity
+
+        touched = []
+        deltas = Counter()
+        for (product_id, warehouse_id), quantity in sorted(quantities.items()):
+            record = InventoryRecord.objects.select_for_update().filter(
+                product_id=product_id,
+                warehouse_id=warehouse_id
+            ).order_by('pk').only('pk', 'location').first()
+            if record is None:
+                record = InventoryRecord.objects.create(product_id=product_id, warehouse_id=warehouse_id, quantity=0)
+
+            InventoryRecord.objects.filter(pk=record.pk).update(quantity=models.F('quantity') + quantity)
+            deltas[(product_id, warehouse_id, record.location_id)] += quantity
+            touched.append(record.pk)
+
+        ledger.append(deltas, movement_type, reference, user)
+        StockService._stamp(touched)
+        return len(touched)
+
+    @staticmethod
+    def _stamp(record_ids):
+        """update() skips auto_now and post_save; stamp the records so the low inventory notices still run"""
+        from .models import InventoryRecord
+
+        for record in InventoryRecord.objects.filter(pk__in=record_ids).select_related('product__seller'):
+            record.save(update_fields=['last_updated'])
@@ -1,40 +1,50 @@
 """
 Inventory Signals - Handle order events for stock reservations
 """
-from django.db.models.signals import post_save, pre_delete
+from django.db.models.signals import post_delete, post_init, post_save, pre_delete
 from django.dispatch import receiver
 from django.utils import timezone
+from orders.side_effects import order_side_effect
 import logging
 
 logger = logging.getLogger('atlas_crm')
 
 
-@receiver(post_save, sender='orders.Order')
-def handle_order_status_change(sender, instance, created, **kwargs):
+@order_side_effect(fields=('status',), run_async=True)
+def handle_order_status_change(events):
     """Handle order status changes for stock reservations."""
     from .models import StockReservation
-    from .services import StockReservationService, InventoryAlertService
 
+    orders = {event.order.pk: event.order for event in events}
     try:
-        # Get all reservations for this order
-        reservations = StockReservation.objects.filter(order=instance)
-
-        if instance.status == 'confirmed':
+        # Get all open reservations for these orders
+        reservations = {}
+        for reservation in StockReservation.objects.filter(
+            order_id__in=orders, status__in=['pending', 'confirmed']
+        ):
+            reservations.setdefault(reservation.order_id, []).append(reservation)
+
+        confirmed = [
+            order_id for order_id, order in orders.items()
+            if order.status == 'confirmed' and order_id in reservations
+        ]
+        if confirmed:
             # Confirm all pending reservations
-            reservations.filter(status='pending').update(status='confirmed')
-            logger.info(f"Confirmed reservations for order {instance.order_code}")
-
-        elif instance.status in ['shipped', 'delivered']:
-            # Fulfill reservations
-            for reservation in reservations.filter(status__in=['pending', 'confirmed']):
-                reservation.fulfill()
-            logger.info(f"Fulfilled reservations for order {instance.order_code}")
-
-        elif instance.status in ['cancelled', 'rejected']:
-            # Cancel reservations and release stock
-            for reservation in reservations.filter(status__in=['pending', 'confirmed']):
-                reservation.cancel(f'Order {instance.status}')
-            logger.info(f"Cancelled reservations for order {instance.order_code}")
+            StockReservation.objects.filter(order_id__in=confirmed, status='pending').update(status='confirmed')
+            logger.info(f"Confirmed reservations for {len(confirmed)} orders")
+
+        for order_id, order in orders.items():
+            if order.status in ['shipped', 'delivered']:
+                # Fulfill reservations
+                for reservation in reservations.get(order_id, []):
+                    reservation.fulfill()
+                logger.info(f"Fulfilled reservations for order {order.order_code}")
+
+            elif order.status in ['cancelled', 'rejected']:
+                # Cancel reservations and release stock
+                for reservation in reservations.get(order_id, []):
+                    reservation.cancel(f'Order {order.status}')
+                logger.info(f"Cancelled reservations for order {order.order_code}")
 
     except Exception as e:
         logger.error(f"Error handling order status change: {str(e)}")
@@ -43,41 +53,12 @@ def handle_order_status_change(sender, instance, created, **kwargs):
 @receiver(post_save, sender='orders.OrderItem')
 def handle_order_item_save(sender, instance, created, **kwargs):
     """Create stock reservation when order item is created."""
-    from .models import StockReservation
     from .services import StockReservationService
-    from stock_keeper.models import WarehouseInventory
 
     if not created:
         return
 
-    try:
-        # Find warehouse with stock
-        inventory = WarehouseInventory.objects.filter(
-            product=instance.product,
-            quantity__gt=0
-        ).select_related('warehouse').first()
-
-        if inventory:
-            # Check if reservation already exists
-            existing = StockReservation.objects.filter(
-                order=instance.order,
-                order_item=instance
-            ).exists()
-
-            if not existing:
-                StockReservationService.create_reservation(
-                    order=instance.order,
-                    order_item=instance,
-                    warehouse=inventory.warehouse,
-                    user=getattr(instance.order, 'created_by', None),
-                    expires_hours=48
-                )
-                logger.info(f"Created reservation for order item {instance.id}")
-
-    except ValueError as e:
-        logger.warning(f"Could not create reservation: {str(e)}")
-    except Exception as e:
-        logger.error(f"Error creating order item reservation: {str(e)}")
+    StockReservationService.reserve_order_item(instance)
 
 
 @receiver(pre_delete, sender='orders.OrderItem')
@@ -98,6 +79,44 @@ def handle_order_item_delete(sender, instance, **kwargs):
         logger.error(f"Error cancelling reservations on item delete: {str(e)}")
 
 
+@receiver(post_init, sender='inventory.StockReservation')
+def remember_reservation_state(sender, instance, **kwargs):
+    """Remember what a loaded reservation holds, so a save can apply the difference."""
+    from .availability import reservation_state
+
+    instance._availability_state = reservation_state(instance)
+
+
+@receiver(post_save, sender='inventory.StockReservation')
+def update_availability_on_reservation_save(sender, instance, created, **kwargs):
+    """Keep the available-to-promise row in step with the reservation."""
+    from .availability import reservation_changed
+
+    reservation_changed(instance, created=created)
+
+
+@receiver(post_delete, sender='inventory.StockReservation')
+def update_availability_on_reservation_delete(sender, instance, **kwargs):
+    from .availability import reservation_changed
+
+    reservation_changed(instance, deleted=True)
+
+
+@receiver(post_save, sender='stock_keeper.WarehouseInventory')
+def update_availability_on_inventory_save(sender, instance, **kwargs):
+    """Record the new on hand quantity (before the stock level check below reads it)."""
+    from .availability import set_on_hand
+
+    set_on_hand(instance.product_id, instance.warehouse_id, instance.quantity)
+
+
+@receiver(post_delete, sender='stock_keeper.WarehouseInventory')
+def update_availability_on_inventory_delete(sender, instance, **kwargs):
+    from .availability import set_on_hand
+
+    set_on_hand(instance.product_id, instance.warehouse_id, 0, create=False)
+
+
 @receiver(post_save, sender='stock_keeper.WarehouseInventory')
 def handle_inventory_change(sender, instance, **kwargs):
     """Check alerts when inventory changes."""
@@ -107,3 +126,29 @@ def handle_inventory_change(sender, instance, **kwargs):
         InventoryAlertService.check_stock_levels(instance.product, instance.warehouse)
     except Exception as e:
         logger.error(f"Error checking stock after inventory change: {str(e)}")
+
+
+@receiver(post_init, sender='inventory.InventoryRecord')
+def remember_record_state(sender, instance, **kwargs):
+    """Remember what a loaded inventory record holds, so a save can append the difference."""
+    from .ledger import record_state
+
+    instance._ledger_state = record_state(instance)
+
+
+@receiver(post_save, sender='inventory.InventoryRecord')
+def append_ledger_on_record_save(sender, instance, created, **kwargs):
+    """Append the quantity change to the stock ledger."""
+    from .ledger import record_changed
+
+    record_changed(instance, created=created)
+
+
+@receiver(post_delete, sender='inventory.InventoryRecord')
+def append_ledger_on_record_delete(sender, instance, origin=None, **kwargs):
+    from .ledger import record_changed
+
+    # Records deleted along with their product or warehouse take their entries with them
+    if origin is not None and getattr(origin, 'model', type(origin)) is not sender:
+        return
+    record_changed(instance, deleted=True)
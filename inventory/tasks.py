@@ -3,213 +3,46 @@ Celery tasks for Inventory module
 """
 from celery import shared_task
 from django.db import models
-from django.db.models import F, Sum, Q
+from django.db.models import Count, DecimalField, ExpressionWrapper, F, Sum, Q, Value
+from django.db.models.functions import Coalesce
 from django.utils import timezone
 from datetime import timedelta
+from decimal import Decimal
 import logging
+import time
 
 logger = logging.getLogger('atlas_crm')
 
+# Rows per bulk_update in the valuation task
+BULK_BATCH_SIZE = 1000
+COST_FIELD = DecimalField(max_digits=10, decimal_places=2)
+VALUE_FIELD = DecimalField(max_digits=14, decimal_places=2)
+
 
 @shared_task
 def check_low_stock_alerts():
     """
     Check for products with low stock and create alerts.
     Uses the new InventoryAlert model for comprehensive alert management.
+    Stock levels, reservations and open alerts are compared in bulk (inventory.alerts).
     Runs every 30 minutes via Celery Beat
     """
-    from .models import Stock, InventoryRecord, InventoryAlert, StockReservation, Warehouse
-    from stock_keeper.models import WarehouseInventory
-    from notifications.models import Notification
-    from users.models import User
-
-    alerts_created = 0
-    alerts_resolved = 0
+    from .alerts import sweep_stock_alerts
 
     try:
-        # Check stocks using Stock model
-        stocks = Stock.objects.select_related('product').all()
-
-        for stock in stocks:
-            # Get total quantity across all warehouses
-            total_qty = stock.total_quantity
-
-            # Get reserved quantity
-            reserved_qty = StockReservation.get_reserved_quantity(stock.product)
-            available_qty = max(0, total_qty - reserved_qty)
-
-            # Check if below minimum threshold
-            if available_qty <= stock.min_quantity:
-                alert = InventoryAlert.create_low_stock_alert(
-                    product=stock.product,
-                    warehouse=None,  # Overall alert, not warehouse-specific
-                    current_qty=available_qty,
-                    threshold_qty=stock.min_quantity
-                )
-                if alert:
-                    alerts_created += 1
-                    # Send notifications
-                    _send_stock_alert_notifications(alert)
+        result = sweep_stock_alerts()
 
-            # Auto-resolve if stock recovered
-            elif available_qty > stock.min_quantity:
-                resolved = InventoryAlert.objects.filter(
-                    product=stock.product,
-                    alert_type__in=['low_stock', 'out_of_stock'],
-                    is_resolved=False
-                ).update(
-                    is_resolved=True,
-                    resolved_at=timezone.now(),
-                    resolution_notes='Auto-resolved: Stock level recovered'
-                )
-                alerts_resolved += resolved
-
-        # Check warehouse-specific inventory using WarehouseInventory
-        warehouse_inventories = WarehouseInventory.objects.select_related(
-            'product', 'warehouse'
-        ).filter(
-            min_stock_level__gt=0
+        logger.info(
+            f"Stock alert check completed. Created: {result['alerts_created']}, "
+            f"Resolved: {result['alerts_resolved']}"
         )
-
-        for inv in warehouse_inventories:
-            # Get reserved quantity for this warehouse
-            reserved = StockReservation.get_reserved_quantity(inv.product, inv.warehouse)
-            available = max(0, inv.quantity - reserved)
-
-            if available <= inv.min_stock_level:
-                alert = InventoryAlert.create_low_stock_alert(
-                    product=inv.product,
-                    warehouse=inv.warehouse,
-                    current_qty=available,
-                    threshold_qty=inv.min_stock_level
-                )
-                if alert:
-                    alerts_created += 1
-                    _send_stock_alert_notifications(alert)
-            else:
-                # Auto-resolve warehouse-specific alerts
-                resolved = InventoryAlert.objects.filter(
-                    product=inv.product,
-                    warehouse=inv.warehouse,
-                    alert_type__in=['low_stock', 'out_of_stock'],
-                    is_resolved=False
-                ).update(
-                    is_resolved=True,
-                    resolved_at=timezone.now(),
-                    resolution_notes='Auto-resolved: Stock level recovered'
-                )
-                alerts_resolved += resolved
-
-        # Check for overstock situations
-        overstock_alerts = _check_overstock_alerts()
-        alerts_created += overstock_alerts
-
-        logger.info(f"Stock alert check completed. Created: {alerts_created}, Resolved: {alerts_resolved}")
-        return {
-            'status': 'success',
-            'alerts_created': alerts_created,
-            'alerts_resolved': alerts_resolved
-        }
+        return {'status': 'success', **result}
 
     except Exception as e:
         logger.error(f"Stock alert check failed: {str(e)}")
         return {'status': 'error', 'message': str(e)}
 
 
-def _check_overstock_alerts():
-    """Check for overstock situations and create alerts."""
-    from .models import Stock, InventoryAlert
-    from stock_keeper.models import WarehouseInventory
-
-    alerts_created = 0
-
-    # Check overall stock levels
-    stocks = Stock.objects.filter(max_quantity__gt=0).select_related('product')
-
-    for stock in stocks:
-        total_qty = stock.total_quantity
-        if total_qty > stock.max_quantity:
-            existing = InventoryAlert.objects.filter(
-                product=stock.product,
-                warehouse=None,
-                alert_type='overstock',
-                is_resolved=False
-            ).exists()
-
-            if not existing:
-                InventoryAlert.objects.create(
-                    product=stock.product,
-                    warehouse=None,
-                    alert_type='overstock',
-                    priority='low',
-                    title=f"Overstock: {stock.product.name_en}",
-                    message=f"Product has {total_qty} units, exceeding maximum of {stock.max_quantity}",
-                    current_quantity=total_qty,
-                    threshold_quantity=stock.max_quantity
-                )
-                alerts_created += 1
-
-    # Check warehouse-specific overstock
-    warehouse_inventories = WarehouseInventory.objects.filter(
-        max_stock_level__gt=0,
-        quantity__gt=F('max_stock_level')
-    ).select_related('product', 'warehouse')
-
-    for inv in warehouse_inventories:
-        existing = InventoryAlert.objects.filter(
-            product=inv.product,
-            warehouse=inv.warehouse,
-            alert_type='overstock',
-            is_resolved=False
-        ).exists()
-
-        if not existing:
-            InventoryAlert.objects.create(
-                product=inv.product,
-                warehouse=inv.warehouse,
-                alert_type='overstock',
-                priority='low',
-                title=f"Overstock: {inv.product.name_en} at {inv.warehouse.name}",
-                message=f"Warehouse has {inv.quantity} units, exceeding maximum of {inv.max_stock_level}",
-                current_quantity=inv.quantity,
-                threshold_quantity=inv.max_stock_level
-            )
-            alerts_created += 1
-
-    return alerts_created
-
-
-def _send_stock_alert_notifications(alert):
-    """Send notifications for stock alerts to relevant users."""
-    from notifications.models import Notification
-    from users.models import User
-
-    # Determine user roles to notify based on priority
-    roles_to_notify = ['admin', 'warehouse_manager', 'stock_keeper']
-    if alert.priority in ['high', 'critical']:
-        roles_to_notify.append('inventory_manager')
-
-    users = User.objects.filter(
-        is_active=True,
-        userrole__role__role_type__in=roles_to_notify
-    ).distinct()
-
-    notifications_created = []
-    for user in users:
-        notification = Notification.objects.create(
-            user=user,
-            title=alert.title,
-            message=alert.message,
-            notification_type='stock_alert',
-            priority='high' if alert.priority in ['high', 'critical'] else 'medium',
-            related_object_type='inventory_alert',
-            related_object_id=str(alert.id)
-        )
-        notifications_created.append(notification.id)
-
-    return notifications_created
-
-
 @shared_task
 def expire_stock_reservations():
     """
@@ -220,6 +53,7 @@ def expire_stock_reservations():
     from notifications.models import Notification
 
     expired_count = 0
+    notifications = []
 
     try:
         # Find reservations that should be expired
@@ -244,17 +78,18 @@ def expire_stock_reservations():
                 )
 
                 # Notify order owner if exists
-                if reservation.order.customer:
-                    Notification.objects.create(
-                        user=reservation.reserved_by,
+                if reservation.order.customer and reservation.reserved_by_id:
+                    notifications.append(Notification(
+                        user_id=reservation.reserved_by_id,
                         title="Stock Reservation Expired",
                         message=f"Your reservation of {reservation.quantity}x {reservation.product.name_en} for order {reservation.order.order_code} has expired.",
                         notification_type='reservation',
                         priority='medium',
                         related_object_type='order',
-                        related_object_id=str(reservation.order.id)
-                    )
+                        related_object_id=reservation.order.id
+                    ))
 
+        Notification.objects.bulk_create(notifications)
         logger.info(f"Stock reservation expiry check completed. Expired: {expired_count}")
         return {'status': 'success', 'expired': expired_count}
 
@@ -321,57 +156,97 @@ def check_reorder_needed():
 @shared_task
 def update_inventory_valuations():
     """
-    Update inventory valuations for all products
+    Update inventory valuations for all records: the unit cost is the
+    product's purchase price and the total value the quantity at that cost.
+    Both are computed in the database and only records whose values
+    changed are written, with bulk_update in chunks.
+    Runs daily via Celery Beat
     """
     from .models import InventoryRecord
-    from decimal import Decimal
 
+    started = time.monotonic()
     try:
-        updated = 0
-        for record in InventoryRecord.objects.select_related('product').all():
-            if hasattr(record.product, 'price') and record.quantity > 0:
-                record.unit_cost = record.product.price
-                record.total_value = record.quantity * record.unit_cost
-                record.save(update_fields=['unit_cost', 'total_value'])
-                updated += 1
+        unit_cost = Coalesce(F('product__purchase_price'), Value(Decimal('0.00')), output_field=COST_FIELD)
+        changed = InventoryRecord.objects.annotate(
+            new_unit_cost=unit_cost,
+            new_total_value=ExpressionWrapper(F('quantity') * unit_cost, output_field=VALUE_FIELD),
+        ).filter(
+            Q(unit_cost__isnull=True) | Q(total_value__isnull=True)
+            | ~Q(unit_cost=F('new_unit_cost')) | ~Q(total_value=F('new_total_value'))
+        ).order_by().values_list('pk', 'new_unit_cost', 'new_total_value')
 
-        logger.info(f"Inventory valuations updated: {updated} records")
-        return {'status': 'success', 'updated': updated}
+        updated = 0
+        batch = []
+        for pk, cost, value in changed.iterator(chunk_size=BULK_BATCH_SIZE):
+            batch.append(InventoryRecord(pk=pk, unit_cost=cost, total_value=value))
+            if len(batch) >= BULK_BATCH_SIZE:
+                updated += InventoryRecord.objects.bulk_update(batch, ['unit_cost', 'total_value'])
+                batch = []
+        if batch:
+            updated += InventoryRecord.objects.bulk_update(batch, ['unit_cost', 'total_value'])
+
+        totals = InventoryRecord.objects.aggregate(records=Count('pk'), total_value=Sum('total_value'))
+        duration = round(time.monotonic() - started, 3)
+
+        logger.info(f"Inventory valuations updated: {updated} of {totals['records']} records in {duration}s")
+        return {
+            'status': 'success',
+            'updated': updated,
+            'records': totals['records'],
+            'total_value': str(totals['total_value'] or Decimal('0.00')),
+            'duration_seconds': duration,
+        }
 
     except Exception as e:
         logger.error(f"Inventory valuation update failed: {str(e)}")
-        return {'status': 'error', 'message': str(e)}
+        return {'status': 'error', 'message': str(e), 'duration_seconds': round(time.monotonic() - started, 3)}
 
 
 @shared_task
 def sync_stock_levels():
     """
-    Synchronize stock levels between Stock and InventoryRecord models
+    Bring the cached stock quantities (inventory records, warehouse
+    inventory and product stock) back in line with the stock ledger.
+    Balances are grouped aggregates over the latest snapshot and the
+    entries since; only rows whose quantity differs are written, with
+    bulk_update in chunks (inventory.ledger.rebuild_stock_caches).
     """
-    from .models import Stock, InventoryRecord
+    from .ledger import rebuild_stock_caches
 
+    started = time.monotonic()
     try:
-        synced = 0
-        for stock in Stock.objects.select_related('product').all():
-            # Sum all inventory records for this product
-            total_quantity = InventoryRecord.objects.filter(
-                product=stock.product
-            ).aggregate(total=Sum('quantity'))['total'] or 0
-
-            # Update Stock model's computed property is automatic
-            # But we can log discrepancies
-            if stock.total_quantity != total_quantity:
-                logger.warning(
-                    f"Stock mismatch for {stock.product.name_en}: "
-                    f"Stock model: {stock.total_quantity}, Records sum: {total_quantity}"
-                )
-                synced += 1
+        stats = rebuild_stock_caches()
+        synced = sum(count for key, count in stats.items() if key != 'products_checked')
+        duration = round(time.monotonic() - started, 3)
 
-        logger.info(f"Stock levels synchronized: {synced} discrepancies found")
-        return {'status': 'success', 'synced': synced}
+        logger.info(
+            f"Stock levels synchronized: {synced} rows corrected "
+            f"across {stats.get('products_checked', 0)} products in {duration}s"
+        )
+        return {'status': 'success', 'synced': synced, **stats, 'duration_seconds': duration}
 
     except Exception as e:
         logger.error(f"Stock sync failed: {str(e)}")
+        return {'status': 'error', 'message': str(e), 'duration_seconds': round(time.monotonic() - started, 3)}
+
+
+@shared_task
+def snapshot_stock_ledger():
+    """
+    Store yesterday's closing stock balances (inventory.ledger), so stock
+    at a date only scans the ledger entries since the snapshot before it.
+    Runs daily via Celery Beat
+    """
+    from .ledger import snapshot_ledger
+
+    try:
+        result = snapshot_ledger()
+
+        logger.info(f"Stock snapshot for {result['day']}: {result['balances']} balances")
+        return {'status': 'success', **result}
+
+    except Exception as e:
+        logger.error(f"Stock snapshot failed: {str(e)}")
         return {'status': 'error', 'message': str(e)}
 
 
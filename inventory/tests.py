@@ -1,3 +1,579 @@
-from django.test import TestCase
+"""
+Unit tests for inventory stock alerts, availability and stock movements
+Tests: Set-based low stock / overstock sweep, auto-resolution, batched notifications,
+available-to-promise rows kept in step with inventory and reservations,
+race-free decrements and multi-line reservations, stock ledger, snapshots and caches,
+bulk valuation and stock sync tasks
+"""
 
-# Create your tests here.
+import itertools
+import json
+import threading
+from datetime import datetime, time, timedelta
+from decimal import Decimal
+from unittest import mock
+
+from django.contrib.auth import get_user_model
+from django.db import connection
+from django.db.models import QuerySet, Sum
+from django.test import Client, TestCase, TransactionTestCase, skipUnlessDBFeature
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+
+from notifications.models import Notification
+from orders.models import Order, OrderItem
+from roles.models import Role, UserRole
+from sellers.models import Product
+from stock_keeper.models import InventoryMovement, WarehouseInventory
+
+from .alerts import sweep_stock_alerts
+from .availability import sync_availability
+from .ledger import balances_at, label, rebuild_stock_caches, snapshot_ledger, stock_valuation
+from .models import InventoryAlert, InventoryRecord, Stock, StockAvailability, StockLedgerEntry, StockReservation, Warehouse, WarehouseLocation
+from .tasks import sync_stock_levels, update_inventory_valuations
+from .services import InsufficientStock, StockReservationService, StockService
+
+User = get_user_model()
+
+
+class StockAlertSweepTests(TestCase):
+    """
+    Test suite for inventory.alerts.sweep_stock_alerts
+    Covers: product-wide and warehouse levels net of reservations, no duplicate alerts,
+    recovered alerts resolved, one notification batch, query count independent of catalogue size
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.seller = User.objects.create_user(email='alerts-seller@test.com', password='testpass123', is_active=True)
+        cls.keeper = User.objects.create_user(email='alerts-keeper@test.com', password='testpass123', is_active=True)
+        role = Role.objects.create(name='Alert Keepers', role_type='stock_keeper')
+        UserRole.objects.create(user=cls.keeper, role=role)
+        cls.warehouse = Warehouse.objects.create(name='Main', location='Dubai')
+
+        def product(code):
+            return Product.objects.create(
+                name_en=f'Product {code}', name_ar=f'Product {code}', code=code,
+                selling_price=Decimal('10.00'), stock_quantity=0, seller=cls.seller,
+            )
+
+        # Product-wide: 8 on hand against a minimum of 10
+        cls.low = product('ALR-LOW')
+        Stock.objects.create(product=cls.low, min_quantity=10, max_quantity=0)
+        InventoryRecord.objects.create(product=cls.low, warehouse=cls.warehouse, quantity=8)
+
+        # Product-wide: recovered, with an alert still open
+        cls.recovered = product('ALR-OK')
+        Stock.objects.create(product=cls.recovered, min_quantity=5, max_quantity=0)
+        InventoryRecord.objects.create(product=cls.recovered, warehouse=cls.warehouse, quantity=50)
+        cls.open_alert = InventoryAlert.objects.create(
+            product=cls.recovered, alert_type='low_stock', title='Low', message='Low', current_quantity=1
+        )
+
+        # Warehouse: 12 on hand, 10 reserved, minimum 5
+        cls.reserved = product('ALR-RES')
+        WarehouseInventory.objects.create(product=cls.reserved, warehouse=cls.warehouse, quantity=12, min_stock_level=5, max_stock_level=0)
+        order = Order.objects.create(customer='Alerts', quantity=1, price_per_unit=10, store_link='https://example.com')
+        StockReservation.objects.create(product=cls.reserved, warehouse=cls.warehouse, order=order, quantity=10)
+
+        # Warehouse: overstocked
+        cls.overstocked = product('ALR-OVER')
+        WarehouseInventory.objects.create(product=cls.overstocked, warehouse=cls.warehouse, quantity=150, min_stock_level=5, max_stock_level=100)
+
+        # Out of stock catalogue; one query per level however many there are
+        for i in range(10):
+            extra = product(f'ALR-X{i}')
+            Stock.objects.create(product=extra, min_quantity=3, max_quantity=0)
+
+    def test_sweep(self):
+        result = sweep_stock_alerts()
+
+        low = InventoryAlert.objects.get(product=self.low, warehouse=None, is_resolved=False)
+        self.assertEqual((low.alert_type, low.current_quantity, low.priority), ('low_stock', 8, 'medium'))
+        self.assertTrue(low.notification_sent)
+
+        warehouse_alert = InventoryAlert.objects.get(product=self.reserved, warehouse=self.warehouse)
+        self.assertEqual((warehouse_alert.current_quantity, warehouse_alert.priority), (2, 'high'))
+
+        self.assertTrue(InventoryAlert.objects.filter(product=self.overstocked, alert_type='overstock').exists())
+        self.assertEqual(InventoryAlert.objects.filter(alert_type='out_of_stock', priority='critical').count(), 10)
+
+        self.open_alert.refresh_from_db()
+        self.assertTrue(self.open_alert.is_resolved)
+        self.assertEqual(result['alerts_resolved'], 1)
+        self.assertEqual(result['alerts_created'], 13)
+        self.assertEqual(Notification.objects.filter(user=self.keeper, notification_type='stock_alert').count(), 12)
+
+    def test_sweep_is_idempotent(self):
+        sweep_stock_alerts()
+        result = sweep_stock_alerts()
+        self.assertEqual((result['alerts_created'], result['alerts_resolved'], result['notifications_sent']), (0, 0, 0))
+
+    def test_bounded_queries(self):
+        with CaptureQueriesContext(connection) as queries:
+            sweep_stock_alerts()
+        # 14 products: per-row checks would need several queries each
+        self.assertLessEqual(len(queries), 12)
+
+
+class StockAvailabilityTests(TestCase):
+    """
+    Test suite for inventory.availability
+    Covers: on hand from inventory saves, reserved and available following reservation status,
+    reservation warehouse chosen by available quantity, drift detection and repair
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.seller = User.objects.create_user(email='atp-seller@test.com', password='testpass123')
+        cls.first = Warehouse.objects.create(name='First', location='Dubai')
+        cls.second = Warehouse.objects.create(name='Second', location='Sharjah')
+        cls.product = Product.objects.create(
+            name_en='ATP Product', name_ar='ATP Product', code='ATP-1',
+            selling_price=Decimal('10.00'), stock_quantity=0, seller=cls.seller,
+        )
+        cls.order = Order.objects.create(customer='ATP', quantity=1, price_per_unit=10, store_link='https://example.com')
+
+    def row(self, warehouse):
+        return StockAvailability.objects.get(product=self.product, warehouse=warehouse)
+
+    def reserve(self, warehouse, quantity):
+        return StockReservation.objects.create(product=self.product, warehouse=warehouse, order=self.order, quantity=quantity)
+
+    def test_inventory_sets_on_hand(self):
+        inventory = WarehouseInventory.objects.create(product=self.product, warehouse=self.first, quantity=10)
+        self.assertEqual((self.row(self.first).on_hand, self.row(self.first).available), (10, 10))
+
+        inventory.quantity = 4
+        inventory.save()
+        self.assertEqual(self.row(self.first).available, 4)
+
+        inventory.delete()
+        self.assertEqual(self.row(self.first).on_hand, 0)
+
+    def test_reservations_follow_status(self):
+        WarehouseInventory.objects.create(product=self.product, warehouse=self.first, quantity=10)
+        reservation = self.reserve(self.first, 3)
+        other = self.reserve(self.first, 2)
+        self.assertEqual((self.row(self.first).reserved, self.row(self.first).available), (5, 5))
+        self.assertEqual(StockReservation.get_available_quantity(self.product, self.first), 5)
+
+        reservation.confirm()
+        self.assertEqual(self.row(self.first).reserved, 5)
+
+        StockReservation.objects.get(pk=reservation.pk).fulfill()
+        other.cancel('Customer cancelled')
+        self.assertEqual((self.row(self.first).reserved, self.row(self.first).available), (0, 10))
+        self.assertEqual(StockReservation.get_reserved_quantity(self.product), 0)
+
+    def test_reserve_order_item_picks_warehouse_with_enough_available(self):
+        WarehouseInventory.objects.create(product=self.product, warehouse=self.first, quantity=3)
+        WarehouseInventory.objects.create(product=self.product, warehouse=self.second, quantity=8)
+
+        item = OrderItem.objects.create(order=self.order, product=self.product, quantity=5, price=Decimal('10.00'))
+        reservation = StockReservation.objects.get(order_item=item)
+        self.assertEqual(reservation.warehouse, self.second)
+        self.assertEqual(self.row(self.second).available, 3)
+        self.assertIsNone(StockReservationService.reserve_order_item(item))
+
+    def test_sync_detects_and_repairs_drift(self):
+        WarehouseInventory.objects.create(product=self.product, warehouse=self.first, quantity=10)
+        self.reserve(self.first, 4)
+        self.assertEqual(sync_availability(fix=False)['mismatched'], 0)
+
+        # QuerySet.update() bypasses the signals
+        WarehouseInventory.objects.filter(product=self.product).update(quantity=7)
+
+        stats = sync_availability(fix=False)
+        self.assertEqual(stats['mismatched'], 1)
+        self.assertEqual(self.row(self.first).on_hand, 10)
+
+        sync_availability()
+        self.assertEqual((self.row(self.first).on_hand, self.row(self.first).available), (7, 3))
+        self.assertEqual(sync_availability(fix=False)['mismatched'], 0)
+
+
+class StockServiceTests(TestCase):
+    """
+    Test suite for inventory.services.StockService and multi-line reservations
+    Covers: decrements spread over locations, all-or-nothing multi-line picks and reservations,
+    conditional updates against interleaved picks, claims never promising more than available
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.seller = User.objects.create_user(email='stock-seller@test.com', password='testpass123')
+        cls.warehouse = Warehouse.objects.create(name='Pick', location='Dubai')
+        cls.shelf = WarehouseLocation.objects.create(warehouse=cls.warehouse, zone='A', shelf='1')
+        cls.first = Product.objects.create(
+            name_en='Stock A', name_ar='Stock A', code='STK-A',
+            selling_price=Decimal('10.00'), stock_quantity=0, seller=cls.seller,
+        )
+        cls.second = Product.objects.create(
+            name_en='Stock B', name_ar='Stock B', code='STK-B',
+            selling_price=Decimal('10.00'), stock_quantity=0, seller=cls.seller,
+        )
+
+    def record(self, product, location=None):
+        return InventoryRecord.objects.get(product=product, warehouse=self.warehouse, location=location)
+
+    def test_decrement_spreads_over_locations(self):
+        InventoryRecord.objects.create(product=self.first, warehouse=self.warehouse, quantity=3)
+        InventoryRecord.objects.create(product=self.first, warehouse=self.warehouse, location=self.shelf, quantity=5)
+
+        StockService.decrement([(self.first, self.warehouse, 4), (self.first, self.warehouse, 2)])
+        self.assertEqual((self.record(self.first).quantity, self.record(self.first, self.shelf).quantity), (0, 2))
+
+    def test_short_line_rolls_back_whole_pick(self):
+        InventoryRecord.objects.create(product=self.first, warehouse=self.warehouse, quantity=10)
+        InventoryRecord.objects.create(product=self.second, warehouse=self.warehouse, quantity=1)
+
+        with self.assertRaises(InsufficientStock):
+            StockService.decrement([(self.first, self.warehouse, 4), (self.second, self.warehouse, 2)])
+        self.assertEqual((self.record(self.first).quantity, self.record(self.second).quantity), (10, 1))
+
+    def pick_interleaved(self, competing, quantity, refused=False):
+        """
+        Pick ``quantity`` while a competing pick of ``competing`` lands between
+        the pick's read of the balance and its conditional update, the window
+        the row locks close on PostgreSQL. Returns (rows updated, balance after)
+        of each conditional update, the competing pick's first.
+        """
+        update = QuerySet.update
+        updates = []
+
+        def update_after_competing_pick(queryset, **kwargs):
+            if queryset.model is not InventoryRecord:
+                return update(queryset, **kwargs)
+            if not updates:
+                updates.append(None)
+                StockService.decrement([(self.first, self.warehouse, competing)])
+            updated = update(queryset, **kwargs)
+            updates.append((updated, self.record(self.first).quantity))
+            return updated
+
+        with mock.patch.object(QuerySet, 'update', autospec=True, side_effect=update_after_competing_pick):
+            if refused:
+                with self.assertRaises(InsufficientStock):
+                    StockService.decrement([(self.first, self.warehouse, quantity)])
+            else:
+                StockService.decrement([(self.first, self.warehouse, quantity)])
+        return updates[1:]
+
+    def test_interleaved_picks_both_apply(self):
+        """A pick read before a competing one that still fits takes from the new balance"""
+        InventoryRecord.objects.create(product=self.first, warehouse=self.warehouse, quantity=5)
+
+        self.assertEqual(self.pick_interleaved(competing=2, quantity=3), [(1, 3), (1, 0)])
+        self.assertEqual(self.record(self.first).quantity, 0)
+        self.assertEqual(StockLedgerEntry.objects.filter(product=self.first).aggregate(total=Sum('delta'))['total'], 0)
+
+    def test_interleaved_pick_cannot_overdraw(self):
+        """The conditional update refuses a pick whose balance a competing pick has taken"""
+        InventoryRecord.objects.create(product=self.first, warehouse=self.warehouse, quantity=5)
+
+        self.assertEqual(self.pick_interleaved(competing=4, quantity=3, refused=True), [(1, 1), (0, 1)])
+        # The failed pick rolls back its transaction, which on one connection holds the competing pick too
+        self.assertEqual(self.record(self.first).quantity, 5)
+        self.assertFalse(StockLedgerEntry.objects.filter(product=self.first, movement_type='stock_out').exists())
+
+    def test_multi_line_reservation_is_all_or_nothing(self):
+        WarehouseInventory.objects.create(product=self.first, warehouse=self.warehouse, quantity=10)
+        WarehouseInventory.objects.create(product=self.second, warehouse=self.warehouse, quantity=1)
+        order = Order.objects.create(customer='Lines', quantity=1, price_per_unit=10, store_link='https://example.com')
+        # Created without the OrderItem signal so the order is reserved as a whole
+        items = OrderItem.objects.bulk_create([
+            OrderItem(order=order, product=self.first, quantity=4, price=Decimal('10.00')),
+            OrderItem(order=order, product=self.second, quantity=2, price=Decimal('10.00')),
+        ])
+
+        with self.assertRaises(InsufficientStock):
+            StockReservationService.reserve_order(order)
+        self.assertFalse(StockReservation.objects.filter(order=order).exists())
+        self.assertEqual(StockAvailability.objects.get(product=self.first).available, 10)
+
+        inventory = WarehouseInventory.objects.get(product=self.second)
+        inventory.quantity = 2
+        inventory.save()
+        self.assertEqual(len(StockReservationService.reserve_order(order, items)), 2)
+        self.assertEqual(StockAvailability.objects.get(product=self.first).available, 6)
+        self.assertEqual(StockAvailability.objects.get(product=self.second).available, 0)
+        # Items already reserved are skipped
+        self.assertEqual(StockReservationService.reserve_order(order), [])
+
+    def test_claims_never_exceed_available(self):
+        WarehouseInventory.objects.create(product=self.first, warehouse=self.warehouse, quantity=5)
+        order = Order.objects.create(customer='Claims', quantity=1, price_per_unit=10, store_link='https://example.com')
+        item = OrderItem(order=order, product=self.first, quantity=3, price=Decimal('10.00'))
+        OrderItem.objects.bulk_create([item])
+
+        StockReservationService.create_reservation(order, item, self.warehouse)
+        with self.assertRaises(InsufficientStock):
+            StockReservationService.create_reservation(order, item, self.warehouse)
+        row = StockAvailability.objects.get(product=self.first)
+        self.assertEqual((row.reserved, row.available), (3, 2))
+
+
+@skipUnlessDBFeature('has_select_for_update')
+class StockConcurrencyTests(TransactionTestCase):
+    """
+    Concurrent picks, transfers and reservations never take stock below zero
+    Requires a database with row locking (PostgreSQL); SQLite serializes
+    writers at the table level and is skipped.
+    """
+
+    def setUp(self):
+        seller = User.objects.create_user(email='race-seller@test.com', password='testpass123')
+        self.keeper = User.objects.create_user(
+            email='race-keeper@test.com', password='testpass123', is_active=True, is_staff=True
+        )
+        self.warehouse = Warehouse.objects.create(name='Race', location='Dubai')
+        self.destination = Warehouse.objects.create(name='Race Destination', location='Sharjah')
+        self.product = Product.objects.create(
+            name_en='Race', name_ar='Race', code='RACE-1',
+            selling_price=Decimal('10.00'), stock_quantity=0, seller=seller,
+        )
+        self.order = Order.objects.create(customer='Race', quantity=1, price_per_unit=10, store_link='https://example.com')
+
+    def run_workers(self, work, workers=8, attempts=10):
+        succeeded = []
+        errors = []
+        lock = threading.Lock()
+
+        def worker():
+            try:
+                for _ in range(attempts):
+                    try:
+                        work()
+                    except InsufficientStock:
+                        continue
+                    with lock:
+                        succeeded.append(1)
+            except Exception as exc:  # pragma: no cover - reported below
+                with lock:
+                    errors.append(exc)
+            finally:
+                connection.close()
+
+        threads = [threading.Thread(target=worker) for _ in range(workers)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        self.assertEqual(errors, [])
+        return len(succeeded)
+
+    def keeper_client(self):
+        client = Client()
+        client.force_login(self.keeper)
+        return client
+
+    def assert_transferred(self, units):
+        source = InventoryRecord.objects.get(product=self.product, warehouse=self.warehouse).quantity
+        destination = InventoryRecord.objects.filter(
+            product=self.product, warehouse=self.destination
+        ).aggregate(total=Sum('quantity'))['total'] or 0
+        self.assertEqual((source, destination), (100 - units, units))
+        self.assertEqual(StockLedgerEntry.objects.filter(
+            product=self.product, warehouse=self.destination
+        ).aggregate(total=Sum('delta'))['total'], units)
+
+    def test_concurrent_picks(self):
+        InventoryRecord.objects.create(product=self.product, warehouse=self.warehouse, quantity=100)
+
+        picks = self.run_workers(lambda: StockService.decrement([(self.product, self.warehouse, 3)]))
+
+        quantity = InventoryRecord.objects.get(product=self.product).quantity
+        self.assertEqual(picks, 33)
+        self.assertEqual(quantity, 100 - 3 * picks)
+        self.assertGreaterEqual(quantity, 0)
+
+    def test_concurrent_transfers(self):
+        InventoryRecord.objects.create(product=self.product, warehouse=self.warehouse, quantity=100)
+        url = reverse('stock_keeper:transfer_stock')
+
+        def transfer():
+            self.keeper_client().post(url, {
+                'product_id': self.product.pk,
+                'quantity': 3,
+                'from_warehouse_id': self.warehouse.pk,
+                'to_warehouse_id': self.destination.pk,
+            })
+
+        self.run_workers(transfer)
+
+        transfers = InventoryMovement.objects.filter(movement_type='transfer', status='completed').count()
+        self.assertEqual(transfers, 33)
+        self.assert_transferred(3 * transfers)
+
+    def test_concurrent_transfer_completions(self):
+        """Every pending transfer is completed by one of the workers racing for it, while stock lasts"""
+        InventoryRecord.objects.create(product=self.product, warehouse=self.warehouse, quantity=100)
+        transfers = [
+            InventoryMovement.objects.create(
+                movement_type='transfer', product=self.product, quantity=3,
+                from_warehouse=self.warehouse, to_warehouse=self.destination, created_by=self.keeper,
+            )
+            for _ in range(40)
+        ]
+        # Each transfer is attempted twice
+        attempts = iter(itertools.chain(transfers, transfers))
+        lock = threading.Lock()
+        url = reverse('stock_keeper:api_complete_transfer')
+
+        def complete():
+            with lock:
+                transfer = next(attempts)
+            response = self.keeper_client().post(
+                url, json.dumps({'transfer_id': transfer.pk, 'transferred_quantity': 3}),
+                content_type='application/json'
+            ).json()
+            if not response['success']:
+                raise InsufficientStock(response['message'])
+
+        self.assertEqual(self.run_workers(complete), 33)
+        self.assertEqual(InventoryMovement.objects.filter(status='completed').count(), 33)
+        self.assert_transferred(99)
+
+    def test_concurrent_reservations(self):
+        WarehouseInventory.objects.create(product=self.product, warehouse=self.warehouse, quantity=50)
+        item = OrderItem(order=self.order, product=self.product, quantity=2, price=Decimal('10.00'))
+        OrderItem.objects.bulk_create([item])
+
+        reservations = self.run_workers(
+            lambda: StockReservationService.create_reservation(self.order, item, self.warehouse)
+        )
+
+        row = StockAvailability.objects.get(product=self.product)
+        self.assertEqual(reservations, 25)
+        self.assertEqual((row.reserved, row.available), (50, 0))
+        self.assertEqual(StockReservation.objects.filter(product=self.product).count(), 25)
+
+
+class StockLedgerTests(TestCase):
+    """
+    Test suite for inventory.ledger
+    Covers: entries for record saves, moves, deletes and decrements, warehouse and product caches,
+    stock and valuation at a date from snapshots, cache rebuilds
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.seller = User.objects.create_user(email='ledger-seller@test.com', password='testpass123')
+        cls.warehouse = Warehouse.objects.create(name='Ledger', location='Dubai')
+        cls.shelf = WarehouseLocation.objects.create(warehouse=cls.warehouse, zone='L', shelf='1')
+        cls.product = Product.objects.create(
+            name_en='Ledger', name_ar='Ledger', code='LDG-1', selling_price=Decimal('10.00'),
+            purchase_price=Decimal('4.00'), stock_quantity=0, seller=cls.seller,
+        )
+
+    def deltas(self):
+        return list(StockLedgerEntry.objects.order_by('pk').values_list('delta', 'location_id', 'movement_type'))
+
+    def test_record_changes_append_entries(self):
+        record = InventoryRecord.objects.create(product=self.product, warehouse=self.warehouse, quantity=10)
+        record.quantity -= 3
+        label(record, 'stock_out', 'ORD-1', self.seller)
+        record.save()
+        record.location = self.shelf
+        record.save()
+        InventoryRecord.objects.get(pk=record.pk).delete()
+
+        self.assertEqual(self.deltas(), [
+            (10, None, 'adjustment'), (-3, None, 'stock_out'),
+            (-7, None, 'adjustment'), (7, self.shelf.pk, 'adjustment'),
+            (-7, self.shelf.pk, 'adjustment'),
+        ])
+        self.assertEqual(StockLedgerEntry.objects.get(movement_type='stock_out').reference, 'ORD-1')
+        self.assertEqual(sum(balances_at().values()), 0)
+
+    def test_caches_follow_the_ledger(self):
+        record = InventoryRecord.objects.create(product=self.product, warehouse=self.warehouse, quantity=10)
+        InventoryRecord.objects.create(product=self.product, warehouse=self.warehouse, location=self.shelf, quantity=5)
+        StockService.decrement([(self.product, self.warehouse, 12)], reference='ORD-2')
+
+        self.product.refresh_from_db()
+        self.assertEqual(self.product.stock_quantity, 3)
+        self.assertEqual(WarehouseInventory.objects.get(product=self.product).quantity, 3)
+        self.assertEqual(StockAvailability.objects.get(product=self.product).on_hand, 3)
+        self.assertEqual(StockLedgerEntry.objects.filter(reference='ORD-2').aggregate(total=Sum('delta'))['total'], -12)
+
+        # Writes that bypass the signals drift until the caches are rebuilt
+        InventoryRecord.objects.filter(pk=record.pk).update(quantity=50)
+        Product.objects.filter(pk=self.product.pk).update(stock_quantity=99)
+        stats = rebuild_stock_caches()
+        self.assertEqual((stats['records_updated'], stats['products_updated']), (1, 1))
+        self.assertEqual(InventoryRecord.objects.get(pk=record.pk).quantity, 0)
+        self.assertEqual(rebuild_stock_caches().get('records_updated'), 0)
+
+    def test_stock_at_date_from_snapshot(self):
+        day = timezone.localdate() - timedelta(days=3)
+
+        def at(days, hour):
+            return timezone.make_aware(datetime.combine(day + timedelta(days=days), time(hour)))
+
+        for days, delta in ((-2, 20), (0, -5), (1, 10)):
+            StockLedgerEntry.objects.create(
+                product=self.product, warehouse=self.warehouse, delta=delta, created_at=at(days, 12)
+            )
+        snapshot_ledger(day)
+
+        # Entries covered by the snapshot are no longer scanned
+        StockLedgerEntry.objects.filter(created_at__lt=at(1, 0)).delete()
+
+        key = (self.product.pk, self.warehouse.pk, None)
+        self.assertEqual(balances_at(at(1, 11))[key], 15)
+        self.assertEqual(balances_at()[key], 25)
+        self.assertEqual(stock_valuation(), {'quantity': 25, 'value': Decimal('100.00')})
+
+
+class InventoryTaskTests(TestCase):
+    """
+    Test suite for update_inventory_valuations and sync_stock_levels
+    Covers: values computed in the database, only changed rows written, bounded queries,
+    drifted caches corrected, counts and duration in the result
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.seller = User.objects.create_user(email='tasks-seller@test.com', password='testpass123')
+        cls.warehouse = Warehouse.objects.create(name='Tasks', location='Dubai')
+        cls.products = [
+            Product.objects.create(
+                name_en=f'Task {i}', name_ar=f'Task {i}', code=f'TSK-{i}', selling_price=Decimal('10.00'),
+                purchase_price=Decimal('2.50') if i else None, stock_quantity=0, seller=cls.seller,
+            )
+            for i in range(5)
+        ]
+        for i, product in enumerate(cls.products):
+            InventoryRecord.objects.create(product=product, warehouse=cls.warehouse, quantity=10 * (i + 1))
+
+    def test_valuations_write_only_changed_rows(self):
+        with CaptureQueriesContext(connection) as queries:
+            result = update_inventory_valuations()
+        self.assertEqual((result['status'], result['updated'], result['records']), ('success', 5, 5))
+        self.assertEqual(Decimal(result['total_value']), Decimal('2.50') * (20 + 30 + 40 + 50))
+        self.assertIn('duration_seconds', result)
+        self.assertLessEqual(len(queries), 5)
+
+        record = InventoryRecord.objects.get(product=self.products[0])
+        self.assertEqual((record.unit_cost, record.total_value), (Decimal('0.00'), Decimal('0.00')))
+
+        self.assertEqual(update_inventory_valuations()['updated'], 0)
+        Product.objects.filter(pk=self.products[1].pk).update(purchase_price=Decimal('3.00'))
+        self.assertEqual(update_inventory_valuations()['updated'], 1)
+        self.assertEqual(InventoryRecord.objects.get(product=self.products[1]).total_value, Decimal('60.00'))
+
+    def test_sync_corrects_drifted_caches(self):
+        self.assertEqual(sync_stock_levels()['synced'], 0)
+
+        Product.objects.filter(pk__in=[product.pk for product in self.products[:2]]).update(stock_quantity=0)
+        WarehouseInventory.objects.filter(product=self.products[2]).update(quantity=1)
+
+        result = sync_stock_levels()
+        self.assertEqual((result['status'], result['synced'], result['products_updated']), ('success', 3, 2))
+        self.assertEqual(result['products_checked'], 5)
+        self.assertIn('duration_seconds', result)
+        self.assertEqual(WarehouseInventory.objects.get(product=self.products[2]).quantity, 30)
@@ -1,5 +1,6 @@
 from django.contrib import admin
-from .models import Notification
+from .models import ArchivedNotification, Notification
+from .unread_cache import invalidate_unread_counts
 
 @admin.register(Notification)
 class NotificationAdmin(admin.ModelAdmin):
@@ -30,26 +31,47 @@ class NotificationAdmin(admin.ModelAdmin):
     
     def get_queryset(self, request):
         return super().get_queryset(request).select_related('user')
+
+    def save_model(self, request, obj, form, change):
+        super().save_model(request, obj, form, change)
+        if change:
+            invalidate_unread_counts([obj.user_id, form.initial.get('user')])
     
     def mark_as_read(self, request, queryset):
         from django.utils import timezone
         updated = queryset.update(is_read=True, read_at=timezone.now())
+        invalidate_unread_counts(queryset.values_list('user_id', flat=True))
         self.message_user(request, f'{updated} notifications marked as read.')
     mark_as_read.short_description = "Mark selected notifications as read"
     
     def mark_as_unread(self, request, queryset):
         updated = queryset.update(is_read=False, read_at=None)
+        invalidate_unread_counts(queryset.values_list('user_id', flat=True))
         self.message_user(request, f'{updated} notifications marked as unread.')
     mark_as_unread.short_description = "Mark selected notifications as unread"
     
     def archive_notifications(self, request, queryset):
         updated = queryset.update(is_archived=True)
+        invalidate_unread_counts(queryset.values_list('user_id', flat=True))
         self.message_user(request, f'{updated} notifications archived.')
     archive_notifications.short_description = "Archive selected notifications"
     
     def unarchive_notifications(self, request, queryset):
         updated = queryset.update(is_archived=False)
+        invalidate_unread_counts(queryset.values_list('user_id', flat=True))
         self.message_user(request, f'{updated} notifications unarchived.')
     unarchive_notifications.short_description = "Unarchive selected notifications"
     
     actions = [mark_as_read, mark_as_unread, archive_notifications, unarchive_notifications]
+
+
+@admin.register(ArchivedNotification)
+class ArchivedNotificationAdmin(admin.ModelAdmin):
+    list_display = ('title', 'user', 'notification_type', 'is_read', 'created_at', 'archived_at')
+    list_filter = ('notification_type', 'priority', 'created_at', 'archived_at')
+    search_fields = ('title', 'message', 'user__email')
+    date_hierarchy = 'created_at'
+    readonly_fields = [field.name for field in ArchivedNotification._meta.fields]
+
+    def has_add_permission(self, request):
+        return False
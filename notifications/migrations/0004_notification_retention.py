@@ -0,0 +1,69 @@
+# Generated by Django 5.2.18 on 2026-10-17 17:05
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('notifications', '0003_role_broadcasts'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.RemoveIndex(
+            model_name='notification',
+            name='notificatio_user_id_8a7c6b_idx',
+        ),
+        migrations.AddIndex(
+            model_name='notification',
+            index=models.Index(fields=['user', 'is_archived', '-created_at'], name='notif_user_inbox_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='notification',
+            index=models.Index(condition=models.Q(('is_archived', False), ('is_read', False)), fields=['user', '-created_at'], name='notif_user_unread_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='notification',
+            index=models.Index(condition=models.Q(('user__isnull', True)), fields=['target_role', 'id'], name='notif_broadcast_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='notification',
+            index=models.Index(condition=models.Q(('expires_at__isnull', False)), fields=['expires_at'], name='notif_expires_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='notification',
+            index=models.Index(condition=models.Q(('is_read', True)), fields=['read_at'], name='notif_read_at_idx'),
+        ),
+        migrations.CreateModel(
+            name='ArchivedNotification',
+            fields=[
+                ('id', models.BigIntegerField(primary_key=True, serialize=False, verbose_name='ID')),
+                ('broadcast_id', models.BigIntegerField(blank=True, null=True, verbose_name='Role Broadcast')),
+                ('title', models.CharField(max_length=255, verbose_name='Title')),
+                ('message', models.TextField(verbose_name='Message')),
+                ('notification_type', models.CharField(choices=[('product_approved', 'Product Approved'), ('product_rejected', 'Product Rejected'), ('product_pending', 'Product Pending Approval'), ('product_deleted', 'Product Deleted'), ('new_order', 'New Order'), ('order_status_changed', 'Order Status Changed'), ('order_approved', 'Order Approved'), ('order_rejected', 'Order Rejected'), ('inventory_low', 'Low Inventory'), ('inventory_out', 'Out of Stock'), ('user_approved', 'User Account Approved'), ('user_rejected', 'User Account Rejected'), ('system', 'System Notification'), ('workflow_update', 'Workflow Update'), ('delivery_update', 'Delivery Update'), ('payment_received', 'Payment Received'), ('payment_failed', 'Payment Failed'), ('data_export', 'Data Export'), ('data_import', 'Data Import')], default='system', max_length=30, verbose_name='Type')),
+                ('priority', models.CharField(choices=[('low', 'Low'), ('medium', 'Medium'), ('high', 'High'), ('urgent', 'Urgent')], default='medium', max_length=10, verbose_name='Priority')),
+                ('target_role', models.CharField(blank=True, max_length=50, null=True, verbose_name='Target Role')),
+                ('related_object_type', models.CharField(blank=True, max_length=50, null=True, verbose_name='Related Object Type')),
+                ('related_object_id', models.PositiveIntegerField(blank=True, null=True, verbose_name='Related Object ID')),
+                ('related_url', models.URLField(blank=True, null=True, verbose_name='Related URL')),
+                ('is_read', models.BooleanField(default=False, verbose_name='Is Read')),
+                ('is_archived', models.BooleanField(default=False, verbose_name='Is Archived')),
+                ('read_at', models.DateTimeField(blank=True, null=True, verbose_name='Read At')),
+                ('created_at', models.DateTimeField(verbose_name='Created At')),
+                ('updated_at', models.DateTimeField(verbose_name='Updated At')),
+                ('expires_at', models.DateTimeField(blank=True, null=True, verbose_name='Expires At')),
+                ('archived_at', models.DateTimeField(auto_now_add=True, verbose_name='Archived At')),
+                ('user', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='archived_notifications', to=settings.AUTH_USER_MODEL, verbose_name='User')),
+            ],
+            options={
+                'verbose_name': 'Archived Notification',
+                'verbose_name_plural': 'Archived Notifications',
+                'ordering': ['-created_at'],
+                'indexes': [models.Index(fields=['user', '-created_at'], name='notif_archive_user_idx'), models.Index(fields=['user', 'broadcast_id'], name='notif_archive_broadcast_idx'), models.Index(fields=['created_at'], name='notif_archive_created_idx')],
+            },
+        ),
+    ]
@@ -1,9 +1,31 @@
 from django.db import models
 from django.contrib.auth import get_user_model
+from django.core.cache import cache
 from django.utils.translation import gettext_lazy as _
 
 User = get_user_model()
 
+# Id of the newest role broadcast, and per-user id of the newest one delivered
+LATEST_BROADCAST_KEY = 'notifications_latest_broadcast'
+BROADCAST_CURSOR_KEY = 'notifications_broadcast_cursor:{user_id}'
+
+
+class NotificationQuerySet(models.QuerySet):
+    def bulk_create(self, objs, *args, **kwargs):
+        """Insert in bulk and announce the new notifications (post_save does not fire)"""
+        from .push import publish_notifications
+        from .unread_cache import invalidate_unread_counts, record_created
+
+        created = super().bulk_create(objs, *args, **kwargs)
+        if kwargs.get('ignore_conflicts'):
+            # Skipped rows cannot be told apart, so recount these users
+            invalidate_unread_counts(notification.user_id for notification in created)
+        else:
+            record_created(created)
+        publish_notifications(created)
+        return created
+
+
 class Notification(models.Model):
     """Universal notification model for all users and roles"""
     
@@ -43,8 +65,10 @@ class Notification(models.Model):
     priority = models.CharField(max_length=10, choices=PRIORITY_LEVELS, default='medium', verbose_name=_('Priority'))
     
     # User and role targeting
-    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='user_notifications', verbose_name=_('User'))
+    # Empty for role broadcasts, which are delivered to users lazily (see create_role_notification)
+    user = models.ForeignKey(User, on_delete=models.CASCADE, null=True, blank=True, related_name='user_notifications', verbose_name=_('User'))
     target_role = models.CharField(max_length=50, blank=True, null=True, verbose_name=_('Target Role'))
+    broadcast = models.ForeignKey('self', on_delete=models.CASCADE, null=True, blank=True, related_name='deliveries', verbose_name=_('Role Broadcast'))
     
     # Content and metadata
     related_object_type = models.CharField(max_length=50, blank=True, null=True, verbose_name=_('Related Object Type'))
@@ -60,18 +84,37 @@ class Notification(models.Model):
     created_at = models.DateTimeField(auto_now_add=True, verbose_name=_('Created At'))
     updated_at = models.DateTimeField(auto_now=True, verbose_name=_('Updated At'))
     expires_at = models.DateTimeField(blank=True, null=True, verbose_name=_('Expires At'))
+
+    objects = NotificationQuerySet.as_manager()
     
     class Meta:
         verbose_name = _('Notification')
         verbose_name_plural = _('Notifications')
         ordering = ['-created_at']
         indexes = [
-            models.Index(fields=['user', 'is_read', 'created_at']),
+            # get_user_notifications: a user's inbox, newest first
+            models.Index(fields=['user', 'is_archived', '-created_at'], name='notif_user_inbox_idx'),
+            # unread lists and unread counter rebuilds
+            models.Index(fields=['user', '-created_at'], condition=models.Q(is_read=False, is_archived=False), name='notif_user_unread_idx'),
+            # deliver_role_notifications: pending role broadcasts after a cursor
+            models.Index(fields=['target_role', 'id'], condition=models.Q(user__isnull=True), name='notif_broadcast_idx'),
+            # retention sweep (notifications.retention)
+            models.Index(fields=['expires_at'], condition=models.Q(expires_at__isnull=False), name='notif_expires_idx'),
+            models.Index(fields=['read_at'], condition=models.Q(is_read=True), name='notif_read_at_idx'),
             models.Index(fields=['notification_type', 'created_at']),
             models.Index(fields=['target_role', 'created_at']),
         ]
+        constraints = [
+            models.UniqueConstraint(
+                fields=['user', 'broadcast'],
+                condition=models.Q(broadcast__isnull=False),
+                name='unique_broadcast_delivery',
+            ),
+        ]
     
     def __str__(self):
+        if self.user_id is None:
+            return f"{self.title} - {self.target_role}"
         return f"{self.title} - {self.user.get_full_name() or self.user.email}"
     
     @property
@@ -107,25 +150,44 @@ class Notification(models.Model):
         from django.utils import timezone
         
         if not self.is_read:
+            self._adjust_unread_count(-1)
             self.is_read = True
             self.read_at = timezone.now()
             self.save(update_fields=['is_read', 'read_at'])
     
     def mark_as_unread(self):
         """Mark notification as unread"""
-        self.is_read = False
+        if self.is_read:
+            self.is_read = False
+            self._adjust_unread_count(1)
         self.read_at = None
         self.save(update_fields=['is_read', 'read_at'])
     
     def archive(self):
         """Archive notification"""
-        self.is_archived = True
+        if not self.is_archived:
+            self._adjust_unread_count(-1)
+            self.is_archived = True
         self.save(update_fields=['is_archived'])
     
     def unarchive(self):
         """Unarchive notification"""
-        self.is_archived = False
+        if self.is_archived:
+            self.is_archived = False
+            self._adjust_unread_count(1)
         self.save(update_fields=['is_archived'])
+
+    def _adjust_unread_count(self, delta):
+        """Count this notification in or out of its user's unread counter"""
+        from .unread_cache import adjust_unread_counts, counts_as_unread, invalidate_unread_counts
+
+        if not counts_as_unread(self):
+            return
+        if self.expires_at:
+            # Expiring ones decide the counter's lifetime, so recount
+            invalidate_unread_counts([self.user_id])
+        else:
+            adjust_unread_counts({self.user_id: delta})
     
     @classmethod
     def create_notification(cls, user, title, message, notification_type='system', priority='medium', 
@@ -168,9 +230,85 @@ class Notification(models.Model):
         
         return cls.objects.bulk_create(notifications)
     
+    @classmethod
+    def create_role_notification(cls, role, title, message, notification_type='system', priority='medium',
+                                 related_object_type=None, related_object_id=None, related_url=None,
+                                 expires_at=None):
+        """
+        Create a single notification for every user with ``role``.
+        Users receive their own copy the next time they read their
+        notifications, so the fan-out costs one row instead of one per user.
+        """
+        from django.db import transaction
+
+        notification = cls.objects.create(
+            user=None,
+            title=title,
+            message=message,
+            notification_type=notification_type,
+            priority=priority,
+            target_role=role,
+            related_object_type=related_object_type,
+            related_object_id=related_object_id,
+            related_url=related_url,
+            expires_at=expires_at
+        )
+        transaction.on_commit(lambda: cache.delete(LATEST_BROADCAST_KEY))
+        return notification
+    
+    @classmethod
+    def deliver_role_notifications(cls, user):
+        """Copy role broadcasts the user has not received yet into their notifications"""
+        from django.utils import timezone
+
+        if not user or user.pk is None:
+            return []
+
+        latest = cache.get(LATEST_BROADCAST_KEY)
+        if latest is None:
+            latest = cls.objects.filter(user__isnull=True).aggregate(latest=models.Max('id'))['latest'] or 0
+            cache.set(LATEST_BROADCAST_KEY, latest, None)
+
+        cursor_key = BROADCAST_CURSOR_KEY.format(user_id=user.pk)
+        cursor = cache.get(cursor_key)
+        if cursor is not None and cursor >= latest:
+            return []
+
+        roles = user.get_role_snapshot().role_names
+        pending = cls.objects.filter(
+            user__isnull=True,
+            target_role__in=roles,
+            id__gt=cursor or 0,
+            created_at__gte=user.date_joined,
+        ).filter(
+            models.Q(expires_at__isnull=True) | models.Q(expires_at__gt=timezone.now())
+        ).exclude(deliveries__user=user).exclude(
+            models.Exists(ArchivedNotification.objects.filter(user=user, broadcast_id=models.OuterRef('pk')))
+        ) if roles else []
+
+        delivered = cls.objects.bulk_create([
+            cls(
+                user=user,
+                broadcast=broadcast,
+                title=broadcast.title,
+                message=broadcast.message,
+                notification_type=broadcast.notification_type,
+                priority=broadcast.priority,
+                target_role=broadcast.target_role,
+                related_object_type=broadcast.related_object_type,
+                related_object_id=broadcast.related_object_id,
+                related_url=broadcast.related_url,
+                expires_at=broadcast.expires_at
+            )
+            for broadcast in pending
+        ], ignore_conflicts=True)
+        cache.set(cursor_key, latest, None)
+        return delivered
+    
     @classmethod
     def get_user_notifications(cls, user, unread_only=False, limit=None, include_expired=False):
         """Get notifications for a specific user"""
+        cls.deliver_role_notifications(user)
         queryset = cls.objects.filter(user=user, is_archived=False)
         
         if unread_only:
@@ -187,6 +325,14 @@ class Notification(models.Model):
         
         return queryset
     
+    @classmethod
+    def get_unread_count(cls, user):
+        """Unread notifications of a user, from the cached counter (see notifications.unread_cache)"""
+        from .unread_cache import get_unread_count
+
+        cls.deliver_role_notifications(user)
+        return get_unread_count(user.pk)
+    
     @classmethod
     def get_role_notifications(cls, role, unread_only=False, limit=None, include_expired=False):
         """Get notifications for a specific role"""
@@ -205,3 +351,52 @@ class Notification(models.Model):
             queryset = queryset[:limit]
         
         return queryset
+
+
+class ArchivedNotification(models.Model):
+    """
+    Notifications moved out of the live table by the retention sweep
+    (notifications.retention). Rows keep their original id and are only
+    ever appended, in created_at order, so the table can be range
+    partitioned by created_at.
+    """
+
+    id = models.BigIntegerField(primary_key=True, verbose_name=_('ID'))
+    user = models.ForeignKey(User, on_delete=models.CASCADE, null=True, blank=True, related_name='archived_notifications', verbose_name=_('User'))
+    # Id of the role broadcast this was delivered from (the broadcast may be archived too)
+    broadcast_id = models.BigIntegerField(blank=True, null=True, verbose_name=_('Role Broadcast'))
+    title = models.CharField(max_length=255, verbose_name=_('Title'))
+    message = models.TextField(verbose_name=_('Message'))
+    notification_type = models.CharField(max_length=30, choices=Notification.NOTIFICATION_TYPES, default='system', verbose_name=_('Type'))
+    priority = models.CharField(max_length=10, choices=Notification.PRIORITY_LEVELS, default='medium', verbose_name=_('Priority'))
+    target_role = models.CharField(max_length=50, blank=True, null=True, verbose_name=_('Target Role'))
+    related_object_type = models.CharField(max_length=50, blank=True, null=True, verbose_name=_('Related Object Type'))
+    related_object_id = models.PositiveIntegerField(blank=True, null=True, verbose_name=_('Related Object ID'))
+    related_url = models.URLField(blank=True, null=True, verbose_name=_('Related URL'))
+    is_read = models.BooleanField(default=False, verbose_name=_('Is Read'))
+    is_archived = models.BooleanField(default=False, verbose_name=_('Is Archived'))
+    read_at = models.DateTimeField(blank=True, null=True, verbose_name=_('Read At'))
+    created_at = models.DateTimeField(verbose_name=_('Created At'))
+    updated_at = models.DateTimeField(verbose_name=_('Updated At'))
+    expires_at = models.DateTimeField(blank=True, null=True, verbose_name=_('Expires At'))
+    archived_at = models.DateTimeField(auto_now_add=True, verbose_name=_('Archived At'))
+
+    # Fields copied from Notification when archiving
+    COPIED_FIELDS = (
+        'id', 'user_id', 'broadcast_id', 'title', 'message', 'notification_type', 'priority', 'target_role',
+        'related_object_type', 'related_object_id', 'related_url', 'is_read', 'is_archived', 'read_at',
+        'created_at', 'updated_at', 'expires_at',
+    )
+
+    class Meta:
+        verbose_name = _('Archived Notification')
+        verbose_name_plural = _('Archived Notifications')
+        ordering = ['-created_at']
+        indexes = [
+            models.Index(fields=['user', '-created_at'], name='notif_archive_user_idx'),
+            models.Index(fields=['user', 'broadcast_id'], name='notif_archive_broadcast_idx'),
+            models.Index(fields=['created_at'], name='notif_archive_created_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.title} (archived)"
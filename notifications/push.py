@@ -0,0 +1,226 @@
+"""
+Server-push events for notification badges and live dashboards.
+
+``publish`` is the single publisher: it formats an event once as a
+Server-Sent Events frame and sends it, after the current transaction
+commits, on named channels:
+
+* ``user:<id>``   one user (new notifications, their orders' status)
+* ``role:<name>`` every user with a role (role broadcasts)
+* ``topic:<name>`` dashboards that asked for it (see TOPIC_ROLES)
+
+Each web process fans frames out to its own subscribers through a
+``LocalBroker``. With Redis as the default cache, frames travel over Redis
+pub/sub and every process runs one relay coroutine that pattern-subscribes
+to all push channels, so Celery workers and other processes can publish.
+Without Redis only events published in the same process are delivered.
+
+``notifications.views.event_stream`` serves a user's channels as an SSE
+stream. An idle stream is a coroutine waiting on its queue: it runs no
+queries and only writes a keep-alive comment now and then. Streams need
+the ASGI application (crm_fulfillment.asgi); under WSGI the view answers
+204 and browsers keep polling the JSON endpoints.
+"""
+import asyncio
+import json
+import logging
+import threading
+from collections import Counter, defaultdict
+
+from django.core.cache import cache
+from django.core.cache.backends.redis import RedisCache
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import transaction
+
+logger = logging.getLogger('atlas_crm')
+
+CHANNEL_PREFIX = 'push:'
+# Roles allowed to subscribe to each dashboard topic (superusers get all)
+TOPIC_ROLES = {
+    'callcenter_metrics': ('Super Admin', 'Admin', 'Call Center Manager', 'Call Center Agent'),
+    'orders': ('Super Admin', 'Admin', 'Call Center Manager', 'Delivery Manager'),
+}
+# Frames buffered per subscriber before the oldest are dropped
+QUEUE_SIZE = 100
+RELAY_RETRY_SECONDS = 5
+
+
+def user_channel(user_id):
+    return f'user:{user_id}'
+
+
+def role_channel(role_name):
+    return f'role:{role_name}'
+
+
+def topic_channel(topic):
+    return f'topic:{topic}'
+
+
+def format_event(event, data):
+    """An SSE frame; ``data`` is JSON on a single line"""
+    return f"event: {event}\ndata: {json.dumps(data, cls=DjangoJSONEncoder, separators=(',', ':'))}\n\n"
+
+
+def publish(event, data=None, users=(), roles=(), topics=()):
+    """Send ``event`` to users, roles and topics once the transaction commits"""
+    channels = (
+        [user_channel(user_id) for user_id in set(users) if user_id]
+        + [role_channel(role) for role in set(roles) if role]
+        + [topic_channel(topic) for topic in set(topics)]
+    )
+    if not channels:
+        return
+    frame = format_event(event, data or {})
+    transaction.on_commit(lambda: _send(channels, frame))
+
+
+def _send(channels, frame):
+    try:
+        if isinstance(cache, RedisCache):
+            client = cache._cache.get_client(write=True)
+            pipe = client.pipeline(transaction=False)
+            for channel in channels:
+                pipe.publish(CHANNEL_PREFIX + channel, frame)
+            pipe.execute()
+        else:
+            for channel in channels:
+                broker.deliver(channel, frame)
+    except Exception as e:
+        # Push is best effort; polling still picks the change up
+        logger.warning(f"Error publishing push event: {str(e)}")
+
+
+def publish_notifications(notifications):
+    """Announce new notifications to their users, or to the role of a broadcast"""
+    per_user = Counter()
+    latest = {}
+    for notification in notifications:
+        if notification.broadcast_id:
+            # A delivered copy of a broadcast that was already announced
+            continue
+        if notification.user_id:
+            per_user[notification.user_id] += 1
+            latest[notification.user_id] = notification
+        elif notification.target_role:
+            publish('notification-created', _notification_data(notification, 1), roles=[notification.target_role])
+
+    for user_id, count in per_user.items():
+        publish('notification-created', _notification_data(latest[user_id], count), users=[user_id])
+
+
+def _notification_data(notification, count):
+    return {
+        'count': count,
+        'title': notification.title,
+        'type': notification.notification_type,
+        'priority': notification.priority,
+    }
+
+
+def channels_for(user, topics=()):
+    """The channels ``user`` may read: their own, their roles' and the permitted ``topics``"""
+    role_names = set(user.get_role_snapshot().role_names)
+    channels = [user_channel(user.pk)] + [role_channel(role) for role in sorted(role_names)]
+    for topic in topics:
+        allowed = TOPIC_ROLES.get(topic)
+        if allowed is not None and (user.is_superuser or role_names.intersection(allowed)):
+            channels.append(topic_channel(topic))
+    return channels
+
+
+class Subscription:
+    """A stream's queue of frames, fed by the broker from any thread"""
+
+    def __init__(self, channels):
+        self.channels = list(channels)
+        self.loop = asyncio.get_running_loop()
+        self.queue = asyncio.Queue(maxsize=QUEUE_SIZE)
+
+    def put(self, frame):
+        if self.queue.full():
+            self.queue.get_nowait()
+        self.queue.put_nowait(frame)
+
+    async def get(self, timeout):
+        """The next frame, or None after ``timeout`` seconds without one"""
+        try:
+            return await asyncio.wait_for(self.queue.get(), timeout)
+        except asyncio.TimeoutError:
+            return None
+
+    def close(self):
+        broker.unsubscribe(self)
+
+
+class LocalBroker:
+    """Subscriptions of this process, by channel"""
+
+    def __init__(self):
+        self.subscriptions = defaultdict(set)
+        self._lock = threading.Lock()
+        self._relays = set()
+
+    def subscribe(self, channels):
+        subscription = Subscription(channels)
+        with self._lock:
+            for channel in subscription.channels:
+                self.subscriptions[channel].add(subscription)
+        if isinstance(cache, RedisCache):
+            self._ensure_relay(subscription.loop)
+        return subscription
+
+    def unsubscribe(self, subscription):
+        with self._lock:
+            for channel in subscription.channels:
+                subscribers = self.subscriptions.get(channel)
+                if subscribers is not None:
+                    subscribers.discard(subscription)
+                    if not subscribers:
+                        del self.subscriptions[channel]
+
+    def deliver(self, channel, frame):
+        with self._lock:
+            subscribers = list(self.subscriptions.get(channel, ()))
+        for subscription in subscribers:
+            subscription.loop.call_soon_threadsafe(subscription.put, frame)
+
+    def _ensure_relay(self, loop):
+        with self._lock:
+            if loop in self._relays:
+                return
+            self._relays.add(loop)
+        loop.create_task(self._relay(loop))
+
+    async def _relay(self, loop):
+        """Forward every push channel from Redis to this process's subscriptions"""
+        import redis.asyncio as aioredis
+
+        pattern = CHANNEL_PREFIX + '*'
+        try:
+            while True:
+                client = aioredis.from_url(cache._servers[0])
+                try:
+                    pubsub = client.pubsub(ignore_subscribe_messages=True)
+                    await pubsub.psubscribe(pattern)
+                    async for message in pubsub.listen():
+                        channel = message['channel'].decode()[len(CHANNEL_PREFIX):]
+                        self.deliver(channel, message['data'].decode())
+                except asyncio.CancelledError:
+                    raise
+                except Exception as e:
+                    logger.warning(f"Push relay disconnected: {str(e)}")
+                finally:
+                    await client.aclose()
+                await asyncio.sleep(RELAY_RETRY_SECONDS)
+        finally:
+            with self._lock:
+                self._relays.discard(loop)
+
+
+broker = LocalBroker()
+
+
+def subscribe(channels):
+    """Start receiving frames for ``channels``; call ``close()`` when done"""
+    return broker.subscribe(channels)
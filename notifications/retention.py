@@ -0,0 +1,77 @@
+"""
+Retention sweep that keeps the live notifications table small.
+
+Notifications that have expired, or were read more than
+NOTIFICATION_READ_RETENTION_DAYS ago, are copied to ArchivedNotification
+and deleted from Notification. Role broadcasts are moved once they have
+expired or aged out and no delivered copy is left in the live table, so
+the cascade never drops an unarchived copy.
+
+The sweep walks candidates by id (keyset pagination): each batch reads
+the next ``batch_size`` ids after the last one, then copies and deletes
+them in a short transaction of its own. Candidates are re-checked inside
+that transaction, so a notification marked unread meanwhile stays put,
+and no lock on the main table outlives one batch.
+"""
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import models, transaction
+from django.utils import timezone
+
+from .models import ArchivedNotification, Notification
+
+DEFAULT_READ_RETENTION_DAYS = 30
+DEFAULT_BATCH_SIZE = 1000
+
+
+def archivable_notifications(now=None):
+    """Notifications due to be archived"""
+    now = now or timezone.now()
+    read_cutoff = now - timedelta(days=getattr(settings, 'NOTIFICATION_READ_RETENTION_DAYS', DEFAULT_READ_RETENTION_DAYS))
+
+    expired = models.Q(expires_at__lte=now)
+    old_read = models.Q(is_read=True) & (
+        models.Q(read_at__lt=read_cutoff) | models.Q(read_at__isnull=True, created_at__lt=read_cutoff)
+    )
+    old_broadcast = models.Q(user__isnull=True, created_at__lt=read_cutoff)
+    delivered = Notification.objects.filter(broadcast_id=models.OuterRef('pk'))
+
+    return Notification.objects.filter(expired | old_read | old_broadcast).exclude(
+        models.Q(user__isnull=True) & models.Exists(delivered)
+    )
+
+
+def archive_notifications(batch_size=None, max_batches=None, now=None):
+    """Move archivable notifications to the archive table; returns how many were moved"""
+    batch_size = batch_size or getattr(settings, 'NOTIFICATION_ARCHIVE_BATCH_SIZE', DEFAULT_BATCH_SIZE)
+    candidates = archivable_notifications(now)
+
+    moved = 0
+    last_id = 0
+    batches = 0
+    while max_batches is None or batches < max_batches:
+        ids = list(
+            candidates.filter(id__gt=last_id).order_by('id').values_list('id', flat=True)[:batch_size]
+        )
+        if not ids:
+            break
+        moved += _archive_batch(candidates, ids)
+        last_id = ids[-1]
+        batches += 1
+    return moved
+
+
+def _archive_batch(candidates, ids):
+    with transaction.atomic():
+        rows = list(
+            candidates.filter(id__in=ids).select_for_update(skip_locked=True)
+            .values(*ArchivedNotification.COPIED_FIELDS)
+        )
+        if not rows:
+            return 0
+        ArchivedNotification.objects.bulk_create(
+            [ArchivedNotification(**row) for row in rows], ignore_conflicts=True
+        )
+        Notification.objects.filter(id__in=[row['id'] for row in rows]).delete()
+    return len(rows)
@@ -1,6 +1,7 @@
 from django.db.models.signals import post_save, post_delete
 from django.dispatch import receiver
 from django.contrib.auth import get_user_model
+from orders.side_effects import order_side_effect
 
 User = get_user_model()
 
@@ -23,73 +24,117 @@ def create_welcome_notification(sender, instance, created, **kwargs):
             is_active=True
         ).exclude(id=instance.id).distinct()
         
-        for admin_user in admin_users:
-            Notification.create_notification(
-                user=admin_user,
-                title="New User Registration",
-                message=f"New user {instance.full_name or instance.email} has registered and is waiting for approval.",
-                notification_type='system',
-                priority='medium',
-                target_role='Admin',
-                related_object_type='user',
-                related_object_id=instance.id,
-                related_url=f"/users/pending-approvals/"
-            )
+        Notification.create_bulk_notifications(
+            admin_users,
+            title="New User Registration",
+            message=f"New user {instance.full_name or instance.email} has registered and is waiting for approval.",
+            notification_type='system',
+            priority='medium',
+            target_role='Admin',
+            related_object_type='user',
+            related_object_id=instance.id,
+            related_url=f"/users/pending-approvals/"
+        )
 
 # Note: Product notifications are now handled by sellers/signals.py to avoid duplication
 
-@receiver(post_save, sender='orders.Order')
-def create_order_notification(sender, instance, created, **kwargs):
-    """Create notification when order status changes"""
+@order_side_effect(on_create=True)
+def create_order_notifications(events):
+    """Notify sellers and admins about new orders"""
     from .models import Notification
-    if created:
+    orders = [event.order for event in events if event.order.seller_id]
+    if not orders:
+        return
+
+    sellers = User.objects.in_bulk({order.seller_id for order in orders})
+    admin_users = list(User.objects.filter(
+        user_roles__role__name__in=['Admin', 'Super Admin'],
+        is_active=True
+    ).distinct())
+
+    notifications = []
+    for order in orders:
+        seller = sellers[order.seller_id]
         # New order notification for seller
-        if instance.seller:
-            Notification.create_notification(
-                user=instance.seller,
+        notifications.append(Notification(
+            user=seller,
+            title="New Order Received",
+            message=f"You have received a new order #{order.order_code}.",
+            notification_type='new_order',
+            priority='high',
+            related_object_type='order',
+            related_object_id=order.id,
+            related_url=f"/sellers/orders/{order.id}/"
+        ))
+
+        # Create notification for all admin users
+        for admin_user in admin_users:
+            notifications.append(Notification(
+                user=admin_user,
                 title="New Order Received",
-                message=f"You have received a new order #{instance.order_code}.",
+                message=f"New order #{order.order_code} has been received from seller {seller.full_name or seller.email}.",
                 notification_type='new_order',
-                priority='high',
+                priority='medium',
+                target_role='Admin',
                 related_object_type='order',
-                related_object_id=instance.id,
-                related_url=f"/sellers/orders/{instance.id}/"
-            )
-            
-            # Create notification for all admin users
-            from users.models import User
-            admin_users = User.objects.filter(
-                user_roles__role__name__in=['Admin', 'Super Admin'],
-                is_active=True
-            ).distinct()
-            
-            for admin_user in admin_users:
-                Notification.create_notification(
-                    user=admin_user,
-                    title="New Order Received",
-                    message=f"New order #{instance.order_code} has been received from seller {instance.seller.full_name or instance.seller.email}.",
-                    notification_type='new_order',
-                    priority='medium',
-                    target_role='Admin',
-                    related_object_type='order',
-                    related_object_id=instance.id,
-                    related_url=f"/orders/{instance.id}/"
-                )
-    
-    # Order status change notification
-    if hasattr(instance, '_previous_workflow_status'):
-        if instance._previous_workflow_status != instance.workflow_status:
-            if instance.seller:
-                Notification.create_notification(
-                    user=instance.seller,
-                    title="Order Status Updated",
-                    message=f"Order #{instance.order_code} status has been updated to {instance.get_workflow_status_display()}.",
-                    notification_type='order_status_changed',
-                    priority='medium',
-                    related_object_type='order',
-                    related_object_id=instance.id,
-                    related_url=f"/sellers/orders/{instance.id}/"
-                )
+                related_object_id=order.id,
+                related_url=f"/orders/{order.id}/"
+            ))
+
+    Notification.objects.bulk_create(notifications)
+
+
+@order_side_effect(fields=('workflow_status',))
+def create_order_status_notifications(events):
+    """Notify sellers when an order's workflow status changes"""
+    from .models import Notification
+    Notification.objects.bulk_create([
+        Notification(
+            user_id=event.order.seller_id,
+            title="Order Status Updated",
+            message=f"Order #{event.order.order_code} status has been updated to {event.order.get_workflow_status_display()}.",
+            notification_type='order_status_changed',
+            priority='medium',
+            related_object_type='order',
+            related_object_id=event.order.id,
+            related_url=f"/sellers/orders/{event.order.id}/"
+        )
+        for event in events
+        if event.order.seller_id
+    ])
+
+@order_side_effect(fields=('status',))
+def push_order_status_changes(events):
+    """Push status changes to the order's seller and the live order dashboards"""
+    from .push import publish
+    for event in events:
+        order = event.order
+        publish(
+            'order-status-changed',
+            {
+                'order_id': order.id,
+                'order_code': order.order_code,
+                'status': order.status,
+                'previous_status': event.previous.get('status'),
+                'workflow_status': order.workflow_status,
+            },
+            users=[order.seller_id],
+            topics=['orders'],
+        )
+
+@receiver(post_save, sender='notifications.Notification')
+def push_new_notification(sender, instance, created, **kwargs):
+    """Announce notifications created one at a time (bulk inserts announce themselves)"""
+    if created:
+        from .push import publish_notifications
+        from .unread_cache import record_created
+        record_created([instance])
+        publish_notifications([instance])
+
+@receiver(post_delete, sender='notifications.Notification')
+def uncount_deleted_notification(sender, instance, **kwargs):
+    """Take deleted unread notifications out of the cached unread counter"""
+    instance._adjust_unread_count(-1)
 
 @receiver(post_save, sender='inventory.InventoryRecord')
 def create_inventory_notification(sender, instance, created, **kwargs):
@@ -138,10 +183,6 @@ def store_previous_values(sender, instance, **kwargs):
         try:
             old_instance = sender.objects.get(pk=instance.pk)
             
-            # Store workflow_status only for Order model
-            if hasattr(instance, 'workflow_status'):
-                instance._previous_workflow_status = old_instance.workflow_status
-            
             # Store is_active only for User model
             if hasattr(instance, 'is_active'):
                 instance._previous_is_active = old_instance.is_active
@@ -149,6 +190,5 @@ def store_previous_values(sender, instance, **kwargs):
         except sender.DoesNotExist:
             pass
 
-# Connect the signal
-post_save.connect(store_previous_values, sender='orders.Order')
+# Connect the signal (Order changes are tracked by orders.side_effects)
 post_save.connect(store_previous_values, sender='users.User')
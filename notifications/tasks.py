@@ -0,0 +1,24 @@
+"""
+Celery tasks for Notifications module
+"""
+from celery import shared_task
+import logging
+
+logger = logging.getLogger('atlas_crm')
+
+
+@shared_task
+def archive_old_notifications():
+    """
+    Move expired and old read notifications to the archive table in batches
+    Runs hourly
+    """
+    from .retention import archive_notifications
+
+    try:
+        moved = archive_notifications()
+        return {'status': 'success', 'archived': moved}
+
+    except Exception as e:
+        logger.error(f"Error archiving notifications: {str(e)}")
+        return {'status': 'error', 'message': str(e)}
@@ -1,3 +1,331 @@
+"""
+Unit tests for notification fan-out and server push
+Tests: bulk notifications, lazily delivered role broadcasts, push events and the event stream,
+cached unread counters, retention sweep
+"""
+
+import asyncio
+from datetime import timedelta
+from unittest import mock
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
 from django.test import TestCase
+from django.urls import reverse
+from django.utils import timezone
+
+from notifications import push
+from notifications.models import ArchivedNotification, Notification
+from notifications.retention import archive_notifications
+from roles.models import Role, UserRole
+
+User = get_user_model()
+
+
+class NotificationFanOutTests(TestCase):
+    """
+    Test suite for Notification.create_bulk_notifications and role broadcasts
+    Covers: single insert fan-out, lazy delivery, role and join date filters, cursor
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        admin_role, _ = Role.objects.get_or_create(name='Admin')
+        cls.admins = []
+        for i in range(3):
+            admin = User.objects.create_user(
+                email=f'fanout-admin{i}@test.com',
+                password='testpass123',
+                is_active=True,
+            )
+            UserRole.objects.create(user=admin, role=admin_role)
+            cls.admins.append(admin)
+        cls.other = User.objects.create_user(
+            email='fanout-other@test.com',
+            password='testpass123',
+            is_active=True,
+        )
+
+    def setUp(self):
+        cache.clear()
+
+    def get_user(self, user):
+        """Fresh user instance, without a cached role snapshot"""
+        return User.objects.get(pk=user.pk)
+
+    def test_bulk_notifications_single_insert(self):
+        with self.assertNumQueries(1):
+            created = Notification.create_bulk_notifications(
+                self.admins, title='Report', message='Daily report', notification_type='report'
+            )
+        self.assertEqual(len(created), 3)
+        self.assertEqual(Notification.objects.filter(user__in=self.admins, title='Report').count(), 3)
+
+    def test_role_notification_delivered_on_read(self):
+        """A broadcast is one row until each user reads their notifications"""
+        with self.captureOnCommitCallbacks(execute=True):
+            broadcast = Notification.create_role_notification('Admin', 'Maintenance', 'Tonight at 10pm')
+        self.assertEqual(Notification.objects.filter(title='Maintenance').count(), 1)
+
+        admin = self.get_user(self.admins[0])
+        notifications = list(Notification.get_user_notifications(admin).filter(broadcast__isnull=False))
+        self.assertEqual([n.title for n in notifications], ['Maintenance'])
+        self.assertEqual(notifications[0].broadcast, broadcast)
+
+        # A second read does not deliver it again
+        Notification.get_user_notifications(self.get_user(self.admins[0])).count()
+        cache.clear()
+        Notification.get_user_notifications(self.get_user(self.admins[0])).count()
+        self.assertEqual(Notification.objects.filter(user=admin, broadcast=broadcast).count(), 1)
+
+    def test_role_notification_targets_role_members(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            Notification.create_role_notification('Admin', 'Maintenance', 'Tonight at 10pm')
+
+        self.assertFalse(Notification.get_user_notifications(self.get_user(self.other)).filter(title='Maintenance').exists())
+
+        newcomer = User.objects.create_user(email='fanout-new@test.com', password='testpass123', is_active=True)
+        User.objects.filter(pk=newcomer.pk).update(date_joined=timezone.now() + timedelta(minutes=1))
+        UserRole.objects.create(user=newcomer, role=Role.objects.get(name='Admin'))
+        self.assertFalse(Notification.get_user_notifications(self.get_user(newcomer)).filter(title='Maintenance').exists())
+
+    def test_cursor_skips_lookup(self):
+        """Once a user is up to date, delivery costs no queries"""
+        with self.captureOnCommitCallbacks(execute=True):
+            Notification.create_role_notification('Admin', 'Maintenance', 'Tonight at 10pm')
+        Notification.deliver_role_notifications(self.get_user(self.admins[1]))
+
+        admin = self.get_user(self.admins[1])
+        with self.assertNumQueries(0):
+            self.assertEqual(Notification.deliver_role_notifications(admin), [])
+
+        with self.captureOnCommitCallbacks(execute=True):
+            Notification.create_role_notification('Admin', 'Update', 'Done')
+        self.assertEqual(len(Notification.deliver_role_notifications(admin)), 1)
+
+
+class ServerPushTests(TestCase):
+    """
+    Test suite for notifications.push
+    Covers: notification and role broadcast events, topic permissions, local fan-out, WSGI fallback
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.admin_role, _ = Role.objects.get_or_create(name='Admin')
+        cls.admin = User.objects.create_user(email='push-admin@test.com', password='testpass123', is_active=True)
+        UserRole.objects.create(user=cls.admin, role=cls.admin_role)
+        cls.other = User.objects.create_user(email='push-other@test.com', password='testpass123', is_active=True)
+
+    def setUp(self):
+        cache.clear()
+
+    def published(self, func, *args, **kwargs):
+        """(channel, frame) pairs sent by ``func`` once its transaction commits"""
+        with mock.patch.object(push.broker, 'deliver') as deliver:
+            with self.captureOnCommitCallbacks(execute=True):
+                func(*args, **kwargs)
+        return [call.args for call in deliver.call_args_list]
+
+    def test_bulk_notifications_pushed_once_per_user(self):
+        sent = self.published(
+            Notification.create_bulk_notifications, [self.admin, self.other, self.admin],
+            title='Report', message='Daily report'
+        )
+        self.assertEqual(sorted(channel for channel, _ in sent), [f'user:{self.admin.pk}', f'user:{self.other.pk}'])
+        frame = dict(sent)[f'user:{self.admin.pk}']
+        self.assertTrue(frame.startswith('event: notification-created\n'))
+        self.assertIn('"count":2', frame)
+
+    def test_single_notification_pushed(self):
+        sent = self.published(Notification.create_notification, self.other, 'Hello', 'Welcome')
+        self.assertEqual([channel for channel, _ in sent], [f'user:{self.other.pk}'])
+
+    def test_role_broadcast_pushed_to_role_only(self):
+        sent = self.published(Notification.create_role_notification, 'Admin', 'Maintenance', 'Tonight at 10pm')
+        self.assertEqual([channel for channel, _ in sent], ['role:Admin'])
+
+        # Delivering the broadcast copies does not announce it again
+        self.assertEqual(self.published(Notification.get_user_notifications(User.objects.get(pk=self.admin.pk)).count), [])
+
+    def test_channels_for_checks_topic_roles(self):
+        admin = User.objects.get(pk=self.admin.pk)
+        self.assertEqual(
+            push.channels_for(admin, ['callcenter_metrics', 'unknown']),
+            [f'user:{admin.pk}', 'role:Admin', 'topic:callcenter_metrics']
+        )
+        other = User.objects.get(pk=self.other.pk)
+        self.assertEqual(push.channels_for(other, ['callcenter_metrics']), [f'user:{other.pk}'])
+
+    def test_local_broker_fans_out(self):
+        async def receive():
+            first = push.subscribe(['topic:orders'])
+            second = push.subscribe(['user:1'])
+            try:
+                push.broker.deliver('topic:orders', 'frame')
+                return await first.get(1), await second.get(0.01)
+            finally:
+                first.close()
+                second.close()
+
+        self.assertEqual(asyncio.run(receive()), ('frame', None))
+        self.assertNotIn('topic:orders', push.broker.subscriptions)
+
+    def test_stream_declined_under_wsgi(self):
+        """Without ASGI the stream answers 204 so pages keep polling"""
+        self.client.force_login(self.other)
+        response = self.client.get(reverse('notifications:event_stream'))
+        self.assertEqual(response.status_code, 204)
+
+
+class UnreadCounterTests(TestCase):
+    """
+    Test suite for notifications.unread_cache
+    Covers: lazy rebuild, create/bulk create, read, archive, delete, mark all read, expiry
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(email='unread-user@test.com', password='testpass123', is_active=True)
+        cls.other = User.objects.create_user(email='unread-other@test.com', password='testpass123', is_active=True)
+
+    def setUp(self):
+        cache.clear()
+        Notification.objects.filter(user__in=[self.user, self.other]).delete()
+        cache.clear()
+
+    def count(self):
+        return Notification.get_unread_count(User.objects.get(pk=self.user.pk))
+
+    def create(self, **kwargs):
+        with self.captureOnCommitCallbacks(execute=True):
+            return Notification.create_notification(self.user, 'Title', 'Message', **kwargs)
+
+    def test_rebuilt_on_miss_then_cached(self):
+        Notification.objects.create(user=self.user, title='Read', message='-', is_read=True)
+        self.create()
+        cache.clear()
+        self.assertEqual(self.count(), 1)
+
+        user = User.objects.get(pk=self.user.pk)
+        Notification.deliver_role_notifications(user)
+        with self.assertNumQueries(0):
+            self.assertEqual(Notification.get_unread_count(user), 1)
+
+    def test_create_and_bulk_create_increment(self):
+        self.assertEqual(self.count(), 0)
+        self.create()
+        with self.captureOnCommitCallbacks(execute=True):
+            Notification.create_bulk_notifications([self.user, self.user, self.other], 'Bulk', 'Message')
+        self.assertEqual(self.count(), 3)
+
+    def test_read_archive_and_delete_decrement(self):
+        self.assertEqual(self.count(), 0)
+        first, second, third = self.create(), self.create(), self.create()
+
+        with self.captureOnCommitCallbacks(execute=True):
+            first.mark_as_read()
+            first.mark_as_read()
+        self.assertEqual(self.count(), 2)
+        with self.captureOnCommitCallbacks(execute=True):
+            second.archive()
+            third.delete()
+        self.assertEqual(self.count(), 0)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            first.mark_as_unread()
+            second.unarchive()
+        self.assertEqual(self.count(), 2)
+
+    def test_mark_all_read_resets(self):
+        self.create()
+        self.create()
+        self.assertEqual(self.count(), 2)
+
+        self.client.force_login(self.user)
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.client.post(reverse('notifications:mark_all_read'))
+        self.assertEqual(response.json()['count'], 2)
+        self.assertEqual(cache.get(f'notifications_unread:{self.user.pk}'), 0)
+        self.assertEqual(self.count(), 0)
+
+    def test_expiring_notification_recounted(self):
+        self.assertEqual(self.count(), 0)
+        self.create(expires_at=timezone.now() + timedelta(hours=1))
+        self.assertIsNone(cache.get(f'notifications_unread:{self.user.pk}'))
+        self.assertEqual(self.count(), 1)
+
+        Notification.objects.filter(user=self.user).update(expires_at=timezone.now() - timedelta(minutes=1))
+        cache.clear()
+        self.assertEqual(self.count(), 0)
+
+
+class NotificationRetentionTests(TestCase):
+    """
+    Test suite for notifications.retention
+    Covers: expired and old read notifications, kept notifications, keyset batches, role broadcasts
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.admin_role, _ = Role.objects.get_or_create(name='Admin')
+        cls.user = User.objects.create_user(email='retention-user@test.com', password='testpass123', is_active=True)
+        UserRole.objects.create(user=cls.user, role=cls.admin_role)
+
+    def setUp(self):
+        cache.clear()
+        Notification.objects.all().delete()
+        self.now = timezone.now()
+
+    def notify(self, title, **kwargs):
+        return Notification.objects.create(user=kwargs.pop('user', self.user), title=title, message='-', **kwargs)
+
+    def test_moves_expired_and_old_read(self):
+        old = self.now - timedelta(days=40)
+        expired = self.notify('Expired', expires_at=self.now - timedelta(minutes=1))
+        old_read = self.notify('Old read', is_read=True, read_at=old)
+        self.notify('Recent read', is_read=True, read_at=self.now - timedelta(days=1))
+        self.notify('Unread')
+        self.notify('Valid', expires_at=self.now + timedelta(days=1))
+
+        self.assertEqual(archive_notifications(now=self.now), 2)
+
+        self.assertEqual(
+            sorted(Notification.objects.values_list('title', flat=True)),
+            ['Recent read', 'Unread', 'Valid']
+        )
+        archived = ArchivedNotification.objects.get(id=old_read.id)
+        self.assertEqual((archived.user, archived.title, archived.read_at), (self.user, 'Old read', old))
+        self.assertTrue(ArchivedNotification.objects.filter(id=expired.id).exists())
+
+    def test_batches_by_id(self):
+        for i in range(5):
+            self.notify(f'Expired {i}', expires_at=self.now - timedelta(minutes=1))
+
+        self.assertEqual(archive_notifications(batch_size=2, max_batches=2, now=self.now), 4)
+        self.assertEqual(Notification.objects.count(), 1)
+        self.assertEqual(archive_notifications(batch_size=2, now=self.now), 1)
+        self.assertEqual(ArchivedNotification.objects.count(), 5)
+
+    def test_broadcast_kept_until_copies_archived(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            broadcast = Notification.create_role_notification('Admin', 'Maintenance', 'Tonight at 10pm')
+        Notification.deliver_role_notifications(User.objects.get(pk=self.user.pk))
+        Notification.objects.filter(pk=broadcast.pk).update(created_at=self.now - timedelta(days=40))
+        Notification.objects.filter(broadcast=broadcast).update(is_read=True, read_at=self.now - timedelta(days=35))
+
+        self.assertEqual(archive_notifications(now=self.now), 1)
+        self.assertTrue(Notification.objects.filter(pk=broadcast.pk).exists())
+        self.assertEqual(archive_notifications(now=self.now), 1)
+        self.assertFalse(Notification.objects.exists())
+        self.assertEqual(ArchivedNotification.objects.filter(broadcast_id=broadcast.pk).count(), 1)
+
+    def test_archived_copy_not_delivered_again(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            broadcast = Notification.create_role_notification('Admin', 'Maintenance', 'Tonight at 10pm')
+        Notification.deliver_role_notifications(User.objects.get(pk=self.user.pk))
+        Notification.objects.filter(broadcast=broadcast).update(is_read=True, read_at=self.now - timedelta(days=35))
+        archive_notifications(now=self.now)
 
-# Create your tests here.
+        cache.clear()
+        self.assertEqual(Notification.deliver_role_notifications(User.objects.get(pk=self.user.pk)), [])
@@ -0,0 +1,90 @@
+"""
+Cached per-user unread notification counters.
+
+The unread count (not read, not archived, not expired) is counted once and
+kept in the Django cache; afterwards creating, reading, archiving or
+deleting notifications adjusts it with ``cache.incr`` once the transaction
+commits, so rendering a badge costs no notification queries. A missing
+counter is not adjusted: it is rebuilt on the next read. The counter also
+expires when its earliest unread notification does, so expiry never
+leaves it too high.
+
+Bulk ``QuerySet.update`` calls bypass the model methods; callers that
+update ``is_read`` or ``is_archived`` that way reset or invalidate the
+affected users' counters.
+"""
+from collections import Counter
+
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import Count, Min, Q
+from django.utils import timezone
+
+UNREAD_COUNT_KEY = 'notifications_unread:{user_id}'
+UNREAD_COUNT_TIMEOUT = 60 * 60
+
+
+def _key(user_id):
+    return UNREAD_COUNT_KEY.format(user_id=user_id)
+
+
+def counts_as_unread(notification):
+    return bool(notification.user_id) and not notification.is_read and not notification.is_archived
+
+
+def get_unread_count(user_id):
+    """The user's unread count: cached, else counted with one query"""
+    count = cache.get(_key(user_id))
+    if count is not None:
+        return count
+
+    from .models import Notification
+
+    now = timezone.now()
+    unread = Notification.objects.filter(user_id=user_id, is_read=False, is_archived=False).filter(
+        Q(expires_at__isnull=True) | Q(expires_at__gt=now)
+    ).aggregate(count=Count('id'), next_expiry=Min('expires_at'))
+
+    timeout = UNREAD_COUNT_TIMEOUT
+    if unread['next_expiry']:
+        timeout = max(1, min(timeout, int((unread['next_expiry'] - now).total_seconds()) + 1))
+    cache.set(_key(user_id), unread['count'], timeout)
+    return unread['count']
+
+
+def _apply(deltas):
+    for user_id, delta in deltas.items():
+        try:
+            if cache.incr(_key(user_id), delta) < 0:
+                cache.delete(_key(user_id))
+        except ValueError:
+            # Not cached; rebuilt on the next read
+            pass
+
+
+def adjust_unread_counts(deltas):
+    """Add ``{user_id: delta}`` to the cached counters after commit"""
+    deltas = {user_id: delta for user_id, delta in deltas.items() if user_id and delta}
+    if deltas:
+        transaction.on_commit(lambda: _apply(deltas))
+
+
+def record_created(notifications):
+    """Count new unread notifications"""
+    unread = [notification for notification in notifications if counts_as_unread(notification)]
+    adjust_unread_counts(Counter(notification.user_id for notification in unread if not notification.expires_at))
+    # Expiring ones shorten the counter's lifetime, so recount those users
+    invalidate_unread_counts(notification.user_id for notification in unread if notification.expires_at)
+
+
+def reset_unread_count(user_id):
+    """The user has no unread notifications left"""
+    transaction.on_commit(lambda: cache.set(_key(user_id), 0, UNREAD_COUNT_TIMEOUT))
+
+
+def invalidate_unread_counts(user_ids):
+    """Drop the counters so they are rebuilt on the next read"""
+    keys = [_key(user_id) for user_id in set(user_ids) if user_id]
+    if keys:
+        cache.delete_many(keys)
+        transaction.on_commit(lambda: cache.delete_many(keys))
@@ -9,6 +9,7 @@ urlpatterns = [
     
     # AJAX endpoints for navbar
     path('get/', views.get_notifications_ajax, name='get_notifications'),
+    path('stream/', views.event_stream, name='event_stream'),
     path('mark-read/<int:notification_id>/', views.mark_notification_read, name='mark_read'),
     path('mark-all-read/', views.mark_all_notifications_read, name='mark_all_read'),
     
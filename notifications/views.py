@@ -1,15 +1,27 @@
 from django.shortcuts import render, redirect, get_object_or_404
+import asyncio
+
+from asgiref.sync import sync_to_async
 from django.contrib.auth.decorators import login_required
 from django.contrib import messages
-from django.http import JsonResponse
+from django.core.handlers.asgi import ASGIRequest
+from django.http import HttpResponse, JsonResponse, StreamingHttpResponse
 from django.core.paginator import Paginator
 from django.db.models import Q
 from django.utils import timezone
 from .models import Notification
+from . import push
+from .unread_cache import invalidate_unread_counts, reset_unread_count
 from django.contrib.auth import get_user_model
 
 User = get_user_model()
 
+# Seconds between keep-alive comments on an idle event stream
+STREAM_KEEPALIVE = 25
+# Streams are closed after this long; browsers reconnect after STREAM_RETRY_MS
+STREAM_LIFETIME = 60 * 10
+STREAM_RETRY_MS = 3000
+
 @login_required
 def notifications_list(request):
     """Main notifications page for all users"""
@@ -54,6 +66,7 @@ def notifications_list(request):
             is_read=True, 
             read_at=timezone.now()
         )
+        invalidate_unread_counts([request.user.pk])
         messages.success(request, "All notifications marked as read.")
         return redirect('notifications:index')
     
@@ -130,11 +143,8 @@ def notifications_list(request):
 def get_notifications_ajax(request):
     """AJAX endpoint to get notifications for navbar"""
     try:
-        # Get unread notifications count
-        unread_count = Notification.get_user_notifications(
-            user=request.user,
-            unread_only=True
-        ).count()
+        # Get unread notifications count (cached counter)
+        unread_count = Notification.get_unread_count(request.user)
         
         # Get recent notifications (last 5)
         recent_notifications = Notification.get_user_notifications(
@@ -160,7 +170,7 @@ def get_notifications_ajax(request):
             'success': True,
             'notifications': notification_data,
             'unread_count': unread_count,
-            'total_count': recent_notifications.count()
+            'total_count': len(notification_data)
         })
         
     except Exception as e:
@@ -169,6 +179,36 @@ def get_notifications_ajax(request):
             'error': str(e)
         }, status=500)
 
+@login_required
+async def event_stream(request):
+    """
+    Server-Sent Events stream of the user's notifications and the dashboard
+    topics listed in ``?topics=`` (see notifications.push). Only served by
+    the ASGI application; under WSGI it answers 204 and pages keep polling.
+    """
+    if not isinstance(request, ASGIRequest):
+        return HttpResponse(status=204)
+
+    user = await request.auser()
+    topics = [topic for topic in request.GET.get('topics', '').split(',') if topic]
+    channels = await sync_to_async(push.channels_for)(user, topics)
+
+    async def frames():
+        subscription = push.subscribe(channels)
+        deadline = asyncio.get_running_loop().time() + STREAM_LIFETIME
+        try:
+            yield f"retry: {STREAM_RETRY_MS}\n\n"
+            while asyncio.get_running_loop().time() < deadline:
+                frame = await subscription.get(STREAM_KEEPALIVE)
+                yield frame if frame is not None else ": keep-alive\n\n"
+        finally:
+            subscription.close()
+
+    response = StreamingHttpResponse(frames(), content_type='text/event-stream')
+    response['Cache-Control'] = 'no-cache'
+    response['X-Accel-Buffering'] = 'no'
+    return response
+
 @login_required
 def mark_notification_read(request, notification_id):
     """Mark a specific notification as read"""
@@ -211,6 +251,7 @@ def mark_all_notifications_read(request):
             is_read=True,
             read_at=timezone.now()
         )
+        reset_unread_count(request.user.pk)
         
         return JsonResponse({
             'success': True,
@@ -12,7 +12,8 @@ from .models import PackagingRecord, PackagingMaterial, PackagingTask, Packaging
 from orders.models import Order
 from delivery.models import Courier
 from django.contrib.auth import get_user_model
-from django.http import HttpResponse
+from django.http import HttpResponse, StreamingHttpResponse
+from utils.exports import iter_csv
 import json
 import uuid
 import csv
@@ -1073,75 +1074,73 @@ def packaging_report(request):
 
 # Export functions
 def export_report_csv(request, context):
-    """Export packaging report data as CSV."""
-    response = HttpResponse(content_type='text/csv')
+    """Export packaging report data as CSV, streamed section by section."""
+    def rows():
+        # Write header
+        yield ['Packaging Report', f'Generated on {timezone.now().strftime("%Y-%m-%d %H:%M")}']
+        yield [f'Period: {context["date_filter"].title()}']
+        yield []
+        
+        # Write key metrics
+        yield ['Key Metrics']
+        yield ['Total Completed', 'Avg Duration (min)', 'Total Checks', 'Pass Rate (%)']
+        yield [
+            context.get('total_completed', context.get('completed_packages', '')),
+            context.get('avg_duration', ''),
+            context.get('total_checks', ''),
+            context.get('pass_rate', '')
+        ]
+        yield []
+        
+        # Write quality check results
+        yield ['Quality Check Results']
+        yield ['Passed', 'Conditional', 'Failed']
+        yield [
+            context.get('passed_checks', ''),
+            context.get('conditional_checks', ''),
+            context.get('failed_checks', '')
+        ]
+        yield []
+        
+        # Write daily statistics
+        yield ['Daily Activity']
+        yield ['Date', 'Packages Completed', 'Quality Checks', 'Avg Duration (min)']
+        for stat in context.get('daily_stats', []):
+            yield [
+                stat['date'].strftime('%Y-%m-%d'),
+                stat['completed'],
+                stat.get('checks', ''),
+                stat.get('avg_duration', '')
+            ]
+        yield []
+        
+        # Write packager performance
+        yield ['Packager Performance']
+        yield ['Packager', 'Packages Completed', 'Avg Duration (min)', 'Total Time (min)', 'Quality Checks', 'QC Pass Rate (%)']
+        for stat in context.get('packager_stats', []):
+            yield [
+                stat['packager'].get_full_name(),
+                stat['packages_completed'],
+                stat['avg_duration'],
+                stat['total_time'],
+                stat['quality_checks'],
+                stat['quality_pass_rate']
+            ]
+        yield []
+        
+        # Write material usage
+        yield ['Material Usage']
+        yield ['Material', 'Quantity', 'Unit', 'Cost ($)']
+        for material in context.get('material_stats', []):
+            yield [
+                material['name'],
+                material['quantity'],
+                material['unit'],
+                material['cost']
+            ]
+    
+    response = StreamingHttpResponse(iter_csv(rows(), bom=False), content_type='text/csv')
     response['Content-Disposition'] = f'attachment; filename="packaging_report_{timezone.now().strftime("%Y%m%d")}.csv"'
-    
-    writer = csv.writer(response)
-    
-    # Write header
-    writer.writerow(['Packaging Report', f'Generated on {timezone.now().strftime("%Y-%m-%d %H:%M")}'])
-    writer.writerow([f'Period: {context["date_filter"].title()}'])
-    writer.writerow([])
-    
-    # Write key metrics
-    writer.writerow(['Key Metrics'])
-    writer.writerow(['Total Completed', 'Avg Duration (min)', 'Total Checks', 'Pass Rate (%)'])
-    writer.writerow([
-        context['total_completed'],
-        context['avg_duration'],
-        context['total_checks'],
-        context['pass_rate']
-    ])
-    writer.writerow([])
-    
-    # Write quality check results
-    writer.writerow(['Quality Check Results'])
-    writer.writerow(['Passed', 'Conditional', 'Failed'])
-    writer.writerow([
-        context['passed_checks'],
-        context['conditional_checks'],
-        context['failed_checks']
-    ])
-    writer.writerow([])
-    
-    # Write daily statistics
-    writer.writerow(['Daily Activity'])
-    writer.writerow(['Date', 'Packages Completed', 'Quality Checks', 'Avg Duration (min)'])
-    for stat in context['daily_stats']:
-        writer.writerow([
-            stat['date'].strftime('%Y-%m-%d'),
-            stat['completed'],
-            stat['checks'],
-            stat['avg_duration']
-        ])
-    writer.writerow([])
-    
-    # Write packager performance
-    writer.writerow(['Packager Performance'])
-    writer.writerow(['Packager', 'Packages Completed', 'Avg Duration (min)', 'Total Time (min)', 'Quality Checks', 'QC Pass Rate (%)'])
-    for stat in context['packager_stats']:
-        writer.writerow([
-            stat['packager'].get_full_name(),
-            stat['packages_completed'],
-            stat['avg_duration'],
-            stat['total_time'],
-            stat['quality_checks'],
-            stat['quality_pass_rate']
-        ])
-    writer.writerow([])
-    
-    # Write material usage
-    writer.writerow(['Material Usage'])
-    writer.writerow(['Material', 'Quantity', 'Unit', 'Cost ($)'])
-    for material in context['material_stats']:
-        writer.writerow([
-            material['name'],
-            material['quantity'],
-            material['unit'],
-            material['cost']
-        ])
-    
     return response
 
 def export_report_pdf(request, context):
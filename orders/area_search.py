@@ -0,0 +1,197 @@
+"""
+Typeahead search over UAE cities and areas.
+
+Built from the ``orders.area_utils`` index, with the Arabic and English
+emirate names from ``utils.emirates_complete`` as extra aliases for
+cities. Names are normalized with ``normalize_area_name`` so Arabic letter
+variants, diacritics and case do not matter.
+
+Two lookup tables are precomputed:
+
+* every prefix of every word maps to the matching entries, pre-sorted by
+  rank, so "starts with" queries are a dict lookup and a slice;
+* every trigram maps to the entries containing it, so "contains" queries
+  only check entries that share all of the query's trigrams.
+
+The search index is rebuilt whenever ``area_utils`` reloads its data.
+"""
+import threading
+
+from utils.emirates_complete import EMIRATES_AND_REGIONS
+
+from .area_utils import CITY_MAPPING, get_area_index, normalize_area_name
+
+DEFAULT_LIMIT = 10
+MAX_LIMIT = 50
+NGRAM = 3
+
+# Rank of a match, best first
+EXACT, STARTS_WITH, WORD_STARTS_WITH = range(3)
+
+
+class AreaEntry:
+    """A city (``area`` is None) or an area within a city"""
+
+    __slots__ = ('city', 'city_label', 'area', 'label', 'keys')
+
+    def __init__(self, city, city_label, area, label, keys):
+        self.city = city
+        self.city_label = city_label
+        self.area = area
+        self.label = label
+        # Normalized names this entry is found by; the first is its own name
+        self.keys = keys
+
+    @property
+    def is_city(self):
+        return self.area is None
+
+    def as_dict(self):
+        return {
+            'type': 'city' if self.is_city else 'area',
+            'city': self.city,
+            'city_label': self.city_label,
+            'value': self.city if self.is_city else self.area,
+            'label': self.label,
+        }
+
+
+def _city_aliases():
+    """{Arabic city name: extra names} from the English mapping and utils.emirates_complete"""
+    by_english = {name_en.casefold(): city for city, (name_en, _) in CITY_MAPPING.items()}
+    aliases = {city: [name_en, code] for city, (name_en, code) in CITY_MAPPING.items()}
+    for emirate in EMIRATES_AND_REGIONS.values():
+        city = by_english.get(emirate['name_en'].casefold())
+        if city is not None:
+            aliases[city] += [emirate['name_ar'], emirate['name_en']]
+    return aliases
+
+
+class AreaSearchIndex:
+    """Prefix and trigram tables over every city and area"""
+
+    def __init__(self, area_index):
+        self.source = area_index
+        self.entries = []
+        aliases = _city_aliases()
+
+        for city, city_label in area_index['cities']:
+            keys = [normalize_area_name(city)] + [normalize_area_name(alias) for alias in aliases.get(city, ())]
+            self.entries.append(AreaEntry(city, city_label, None, city_label, list(dict.fromkeys(keys))))
+            for area, label, key in area_index['states'].get(city, ()):
+                self.entries.append(AreaEntry(city, city_label, area, label, [key]))
+
+        self.prefixes = {}
+        self.ngrams = {}
+        for position, entry in enumerate(self.entries):
+            for key in entry.keys:
+                self._add_prefixes(key, position)
+                for i in range(len(key) - NGRAM + 1):
+                    self.ngrams.setdefault(key[i:i + NGRAM], set()).add(position)
+
+        # Each prefix list holds (rank, length, key, position), best first
+        for prefix, matches in self.prefixes.items():
+            best = {}
+            for match in matches:
+                position = match[3]
+                if position not in best or match < best[position]:
+                    best[position] = match
+            self.prefixes[prefix] = sorted(best.values())
+
+    def _add_prefixes(self, key, position):
+        words = key.split(' ')
+        for index in range(len(words)):
+            # Multi-word prefixes ("al bar") only make sense from the start of a word
+            phrase = ' '.join(words[index:])
+            for end in range(1, len(phrase) + 1):
+                prefix = phrase[:end]
+                if prefix == key:
+                    rank = EXACT
+                elif index == 0:
+                    rank = STARTS_WITH
+                else:
+                    rank = WORD_STARTS_WITH
+                self.prefixes.setdefault(prefix, []).append((rank, len(key), key, position))
+
+    def search(self, query, city=None, limit=DEFAULT_LIMIT, areas_only=False):
+        """Entries matching ``query``, best first: exact, prefix, word prefix, then substring matches"""
+        query = normalize_area_name(query)
+        if not query:
+            return []
+
+        results = []
+        seen = set()
+
+        def accept(position):
+            entry = self.entries[position]
+            if position in seen or (city and entry.city != city) or (areas_only and entry.is_city):
+                return False
+            seen.add(position)
+            results.append(entry)
+            return len(results) >= limit
+
+        for _, _, _, position in self.prefixes.get(query, ()):
+            if accept(position):
+                return results
+
+        if len(query) >= NGRAM:
+            for position in self._containing(query):
+                if accept(position):
+                    break
+        return results
+
+    def _containing(self, query):
+        """Positions of entries with ``query`` inside one of their keys, shortest key first"""
+        grams = [query[i:i + NGRAM] for i in range(len(query) - NGRAM + 1)]
+        sets = sorted((self.ngrams.get(gram, set()) for gram in grams), key=len)
+        candidates = set.intersection(*sets) if sets else set()
+        matches = []
+        for position in candidates:
+            key = min((key for key in self.entries[position].keys if query in key), key=len, default=None)
+            if key is not None:
+                matches.append((len(key), key, position))
+        return [position for _, _, position in sorted(matches)]
+
+    def resolve(self, text, city=None, areas_only=False):
+        """The single city or area named ``text`` (after normalization), or None"""
+        query = normalize_area_name(text)
+        exact = [
+            self.entries[position]
+            for rank, _, _, position in self.prefixes.get(query, ())
+            if rank == EXACT
+        ]
+        exact = [
+            entry for entry in exact
+            if (not city or entry.city == city) and not (areas_only and entry.is_city)
+        ]
+        return exact[0] if len(exact) == 1 else None
+
+
+_search_index = None
+_lock = threading.Lock()
+
+
+def get_search_index():
+    """The search index for the current area data, built on first use"""
+    global _search_index
+
+    area_index = get_area_index()
+    search_index = _search_index
+    if search_index is not None and search_index.source is area_index:
+        return search_index
+
+    with _lock:
+        if _search_index is None or _search_index.source is not area_index:
+            _search_index = AreaSearchIndex(area_index)
+        return _search_index
+
+
+def search_areas(query, city=None, limit=DEFAULT_LIMIT, areas_only=False):
+    """Ranked typeahead matches for ``query`` as AreaEntry objects"""
+    limit = max(1, min(limit, MAX_LIMIT))
+    return get_search_index().search(query, city=city, limit=limit, areas_only=areas_only)
+
+
+def resolve_area(text, city=None, areas_only=False):
+    """Match free-text city/area input to a known entry, or None when unknown or ambiguous"""
+    return get_search_index().resolve(text, city=city, areas_only=areas_only)
@@ -1,8 +1,34 @@
+"""
+UAE cities and areas, read from the vertopal XML exports in ``Areas Docs``.
+
+The XML files are parsed once into an in-memory index and reused until one
+of them changes on disk (checked by mtime at most every
+``INDEX_CHECK_INTERVAL`` seconds). ``manage.py build_area_index`` writes the
+index to ``settings.AREAS_INDEX_FILE`` so workers can load it at startup
+instead of parsing the XML; the artifact is ignored once it no longer
+matches the source files.
+"""
+import json
+import logging
 import os
+import re
+import threading
+import time
+import unicodedata
 import xml.etree.ElementTree as ET
+
 from django.conf import settings
 
+logger = logging.getLogger('atlas_crm')
+
 AREAS_DIR = os.path.join(settings.BASE_DIR, 'Areas Docs')
+INDEX_FILE = getattr(settings, 'AREAS_INDEX_FILE', os.path.join(settings.BASE_DIR, 'areas_index.json'))
+INDEX_VERSION = 1
+INDEX_CHECK_INTERVAL = 30
+
+FILE_PREFIX = 'vertopal.com_'
+FILE_SUFFIX = '.xml'
+TEXT_NAMESPACE = {'text': 'urn:oasis:names:tc:opendocument:xmlns:text:1.0'}
 
 # Mapping of Arabic city names to English names with codes
 CITY_MAPPING = {
@@ -17,65 +43,157 @@ CITY_MAPPING = {
     'المناطق النائية': ('Remote Areas', 'REM'),
 }
 
+# Arabic letter variants folded together for searching
+_ARABIC_FOLDS = str.maketrans({
+    'أ': 'ا', 'إ': 'ا', 'آ': 'ا', 'ٱ': 'ا',
+    'ى': 'ي', 'ئ': 'ي', 'ؤ': 'و', 'ة': 'ه',
+    '\u0640': None,  # tatweel
+})
+_DIACRITICS = re.compile('[\u0610-\u061a\u064b-\u065f\u0670\u06d6-\u06ed]')
+_SEPARATORS = re.compile(r'[\s\-_/,.()]+')
+
+_index = None
+_index_checked = 0.0
+_lock = threading.Lock()
+
+
+def normalize_area_name(value):
+    """Search key for an area or city name: case, diacritics and letter variants folded."""
+    value = unicodedata.normalize('NFKC', value or '').casefold()
+    value = _DIACRITICS.sub('', value).translate(_ARABIC_FOLDS)
+    return _SEPARATORS.sub(' ', value).strip()
+
+
+def _source_files():
+    """{city name: path} for every area file"""
+    if not os.path.isdir(AREAS_DIR):
+        return {}
+    return {
+        entry.name[len(FILE_PREFIX):-len(FILE_SUFFIX)]: entry.path
+        for entry in os.scandir(AREAS_DIR)
+        if entry.name.startswith(FILE_PREFIX) and entry.name.endswith(FILE_SUFFIX)
+    }
+
+
+def _signature(files):
+    """Modification times identifying the current source files"""
+    return {city: os.stat(path).st_mtime_ns for city, path in files.items()}
+
+
+def _parse_states(filepath, city_code):
+    """Read the areas listed in one vertopal XML file"""
+    states = {}
+    root = ET.parse(filepath).getroot()
+    for text_p in root.findall('.//text:p', TEXT_NAMESPACE):
+        if text_p.find('.//text:span', TEXT_NAMESPACE) is not None:
+            continue
+
+        text_parts = []
+        if text_p.text:
+            text_parts.append(text_p.text.strip())
+        for child in text_p:
+            if child.text:
+                text_parts.append(child.text.strip())
+
+        text_content = ' '.join(text_parts).strip().replace('\n', ' ').replace('\r', '').replace('  ', ' ')
+        if text_content and text_content not in states:
+            # Include city code in the display text: "Area Name (CITY_CODE)"
+            states[text_content] = f"{text_content} ({city_code})" if city_code else text_content
+    return sorted(states.items())
+
+
+def build_index(files=None):
+    """
+    Parse every area file into the index:
+    ``{'version', 'signature', 'cities': [(value, label)], 'states': {city: [(value, label, key)]}}``
+    """
+    if files is None:
+        files = _source_files()
+
+    cities = []
+    states = {}
+    for city_name, filepath in files.items():
+        city_name_en, city_code = CITY_MAPPING.get(city_name, (None, ''))
+        # Format: "Dubai (DXB)" for display, but store Arabic name as value
+        cities.append((city_name, f"{city_name_en} ({city_code})" if city_name_en else city_name))
+        try:
+            parsed = _parse_states(filepath, city_code)
+        except Exception as e:
+            logger.error(f"Error parsing XML file {os.path.basename(filepath)}: {e}")
+            parsed = []
+        states[city_name] = [(value, label, normalize_area_name(value)) for value, label in parsed]
+
+    return {
+        'version': INDEX_VERSION,
+        'signature': _signature(files),
+        'cities': sorted(cities, key=lambda city: city[1]),
+        'states': states,
+    }
+
+
+def write_index(index, path=None):
+    """Write the index as compact JSON, atomically"""
+    path = path or INDEX_FILE
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump(index, f, ensure_ascii=False, separators=(',', ':'))
+    os.replace(tmp_path, path)
+
+
+def _read_artifact():
+    try:
+        with open(INDEX_FILE, encoding='utf-8') as f:
+            index = json.load(f)
+    except (OSError, ValueError):
+        return None
+    if index.get('version') != INDEX_VERSION:
+        return None
+    index['cities'] = [tuple(city) for city in index['cities']]
+    index['states'] = {city: [tuple(state) for state in states] for city, states in index['states'].items()}
+    return index
+
+
+def _load_index():
+    files = _source_files()
+    signature = _signature(files)
+    artifact = _read_artifact()
+    # Without the source files (e.g. a slim worker image) the artifact is all there is
+    if artifact is not None and (artifact['signature'] == signature or not files):
+        return artifact
+    return build_index(files)
+
+
+def get_area_index():
+    """The area index, loaded on first use and reloaded when the source files change"""
+    global _index, _index_checked
+
+    if _index is not None and time.monotonic() - _index_checked < INDEX_CHECK_INTERVAL:
+        return _index
+
+    with _lock:
+        if _index is None:
+            _index = _load_index()
+        elif time.monotonic() - _index_checked >= INDEX_CHECK_INTERVAL:
+            files = _source_files()
+            if files and _signature(files) != _index['signature']:
+                _index = build_index(files)
+        _index_checked = time.monotonic()
+    return _index
+
+
+def clear_area_index():
+    """Drop the in-memory index; the next lookup reloads it"""
+    global _index, _index_checked
+    with _lock:
+        _index = None
+        _index_checked = 0.0
+
+
 def get_cities_list():
     """Get list of cities with English names and codes."""
-    cities = []
-    if os.path.exists(AREAS_DIR):
-        for filename in os.listdir(AREAS_DIR):
-            if filename.endswith('.xml') and filename.startswith('vertopal.com_'):
-                city_name_ar = filename.replace('vertopal.com_', '').replace('.xml', '')
-                # Get English name and code from mapping
-                if city_name_ar in CITY_MAPPING:
-                    city_name_en, city_code = CITY_MAPPING[city_name_ar]
-                    # Format: "Dubai (DXB)" for display, but store Arabic name as value
-                    display_name = f"{city_name_en} ({city_code})"
-                    cities.append((city_name_ar, display_name))
-                else:
-                    # Fallback to Arabic name if not in mapping
-                    cities.append((city_name_ar, city_name_ar))
-    return sorted(cities, key=lambda x: x[1])  # Sort by display name
+    return list(get_area_index()['cities'])
+
 
 def get_states_for_city(city_name):
     """Get list of areas/states for a city with city code included."""
-    states = []
-    filename = f'vertopal.com_{city_name}.xml'
-    filepath = os.path.join(AREAS_DIR, filename)
-    
-    # Get city code from mapping
-    city_code = ''
-    if city_name in CITY_MAPPING:
-        _, city_code = CITY_MAPPING[city_name]
-    
-    if os.path.exists(filepath):
-        try:
-            tree = ET.parse(filepath)
-            root = tree.getroot()
-            
-            namespace = {'text': 'urn:oasis:names:tc:opendocument:xmlns:text:1.0'}
-            
-            for text_p in root.findall('.//text:p', namespace):
-                text_span = text_p.find('.//text:span', namespace)
-                if text_span is not None:
-                    continue
-                
-                text_parts = []
-                if text_p.text:
-                    text_parts.append(text_p.text.strip())
-                
-                for child in text_p:
-                    if child.text:
-                        text_parts.append(child.text.strip())
-                
-                text_content = ' '.join(text_parts).strip().replace('\n', ' ').replace('\r', '').replace('  ', ' ')
-                
-                if text_content:
-                    state_values = [s[0] for s in states]
-                    if text_content not in state_values:
-                        # Include city code in the display text: "Area Name (CITY_CODE)"
-                        display_text = f"{text_content} ({city_code})" if city_code else text_content
-                        states.append((text_content, display_text))
-        except Exception as e:
-            print(f"Error parsing XML file {filename}: {e}")
-    
-    return sorted(states)
-
+    return [(value, label) for value, label, _ in get_area_index()['states'].get(city_name, ())]
@@ -0,0 +1,497 @@
+"""
+Bulk CSV order import.
+
+Imports run as a background job (see orders.tasks.import_orders_task). The
+header is resolved to column positions once, rows are processed in chunks
+and each chunk is written with ``bulk_create``: products and existing order
+codes are looked up with one query per chunk and order codes are reserved as
+a block. ``bulk_create`` does not fire the Order/OrderItem post_save
+signals, so fees, call center assignment and stock reservations are applied
+per chunk here, and notifications are sent once per import.
+
+A worker claims a job before running it. A processing job whose worker
+died stops updating and can be claimed again after STALE_AFTER; it resumes
+after the rows it had committed.
+"""
+import csv
+import io
+import logging
+from datetime import datetime, timedelta
+from decimal import Decimal, InvalidOperation
+
+from django.db import transaction
+from django.db.models import Q
+from django.db.models.functions import Lower
+from django.utils import timezone
+
+from .models import Order, OrderItem, OrderImportJob, reserve_order_codes
+
+logger = logging.getLogger('atlas_crm')
+
+CHUNK_SIZE = 500
+# A processing job without progress for this long has lost its worker and may be resumed
+STALE_AFTER = timedelta(minutes=10)
+# Rows reported per list on the job; counts keep going past this
+MAX_REPORTED_ROWS = 1000
+
+# Accepted header names per field, compared case-insensitively
+HEADER_ALIASES = {
+    'order_code': ('order code', 'order id', 'order number'),
+    'customer': ('customer name', 'customer', 'name'),
+    'phone': ('mobile number', 'mobile', 'phone number', 'phone', 'customer phone'),
+    'address': ('shipping address', 'address'),
+    'store_link': ('product link', 'store link', 'link'),
+    'product': ('product id/code', 'product code', 'product id', 'product', 'sku'),
+    'quantity': ('quantity', 'qty'),
+    'price': ('price', 'unit price', 'price per unit'),
+    'variant': ('product variant', 'variant'),
+    'notes': ('notes', 'note'),
+    'date': ('order date', 'date'),
+}
+
+REQUIRED_FIELDS = {
+    'customer': 'Customer Name',
+    'phone': 'Mobile Number',
+    'address': 'Shipping Address',
+}
+
+
+class OrderImportError(Exception):
+    """Raised when a file cannot be imported at all (e.g. missing columns)"""
+
+
+def resolve_header(header):
+    """
+    Map field names to column indexes.
+
+    Exact header matches win; remaining fields fall back to the first unused
+    column whose header contains one of the aliases.
+    """
+    normalized = [(cell or '').strip().lower() for cell in header]
+    columns = {}
+    used = set()
+
+    for field, aliases in HEADER_ALIASES.items():
+        for alias in aliases:
+            if alias in normalized and normalized.index(alias) not in used:
+                columns[field] = normalized.index(alias)
+                used.add(columns[field])
+                break
+
+    for field, aliases in HEADER_ALIASES.items():
+        if field in columns:
+            continue
+        for index, name in enumerate(normalized):
+            if index not in used and any(alias in name for alias in aliases):
+                columns[field] = index
+                used.add(index)
+                break
+
+    missing = [label for field, label in REQUIRED_FIELDS.items() if field not in columns]
+    if missing:
+        raise OrderImportError(f"CSV file is missing required columns: {', '.join(missing)}.")
+    return columns
+
+
+def load_products(keys):
+    """Return {lookup key: Product} for product codes, ids and English names"""
+    from sellers.models import Product
+
+    keys = {key for key in keys if key}
+    if not keys:
+        return {}
+
+    ids = {int(key) for key in keys if key.isdigit()}
+    names = {key.lower() for key in keys}
+    products = Product.objects.annotate(name_key=Lower('name_en')).filter(
+        Q(code__in=keys) | Q(id__in=ids) | Q(name_key__in=names)
+    )
+
+    by_code, by_id, by_name = {}, {}, {}
+    for product in products:
+        by_code[product.code] = product
+        by_id[product.id] = product
+        by_name.setdefault(product.name_key, product)
+
+    lookup = {}
+    for key in keys:
+        product = (
+            by_code.get(key)
+            or by_name.get(key.lower())
+            or (by_id.get(int(key)) if key.isdigit() else None)
+        )
+        if product is not None:
+            lookup[key] = product
+    return lookup
+
+
+class OrderImporter:
+    """Process one OrderImportJob"""
+
+    def __init__(self, job, chunk_size=CHUNK_SIZE):
+        self.job = job
+        self.chunk_size = chunk_size
+        self.columns = {}
+        self.seen_codes = set()
+
+    def add_error(self, row_num, message):
+        self.job.error_count += 1
+        if len(self.job.errors) < MAX_REPORTED_ROWS:
+            self.job.errors.append({'row': row_num, 'message': message})
+
+    def add_warning(self, row_num, message):
+        if len(self.job.warnings) < MAX_REPORTED_ROWS:
+            self.job.warnings.append({'row': row_num, 'message': message})
+
+    def save_progress(self, **extra):
+        fields = {
+            'processed_rows': self.job.processed_rows,
+            'success_count': self.job.success_count,
+            'error_count': self.job.error_count,
+            'errors': self.job.errors,
+            'warnings': self.job.warnings,
+        }
+        fields.update(extra)
+        for name, value in extra.items():
+            setattr(self.job, name, value)
+        # update() skips auto_now
+        fields['updated_at'] = timezone.now()
+        OrderImportJob.objects.filter(pk=self.job.pk).update(**fields)
+
+    def cell(self, row, field):
+        index = self.columns.get(field)
+        if index is None or index >= len(row):
+            return ''
+        return (row[index] or '').strip()
+
+    def parse_row(self, row_num, row):
+        """Validate one CSV row; return a dict of values or None on error"""
+        data = {field: self.cell(row, field) for field in HEADER_ALIASES}
+
+        for field, label in REQUIRED_FIELDS.items():
+            if not data[field]:
+                self.add_error(row_num, f"{label} is required")
+                return None
+
+        try:
+            quantity = int(float(data['quantity'])) if data['quantity'] else 1
+        except ValueError:
+            self.add_error(row_num, f"Invalid quantity '{data['quantity']}'")
+            return None
+        if quantity <= 0:
+            self.add_error(row_num, "Quantity must be greater than 0")
+            return None
+
+        try:
+            price = Decimal(data['price']).quantize(Decimal('0.01')) if data['price'] else Decimal('0.00')
+        except InvalidOperation:
+            self.add_error(row_num, f"Invalid price '{data['price']}'")
+            return None
+        if price < 0:
+            self.add_error(row_num, "Price cannot be negative")
+            return None
+
+        order_date = timezone.now()
+        if data['date']:
+            try:
+                order_date = timezone.make_aware(datetime.strptime(data['date'], '%Y-%m-%d'))
+            except ValueError:
+                self.add_warning(row_num, f"Invalid order date '{data['date']}', using today")
+
+        data.update(row_num=row_num, quantity=quantity, price=price, order_date=order_date)
+        return data
+
+    def iter_chunks(self, reader, skip=0):
+        """Chunks of (line number, row) for the non-empty rows after the first ``skip``"""
+        chunk = []
+        for row_num, row in enumerate(reader, start=2):  # Line 1 is the header
+            if not row or all(not (cell or '').strip() for cell in row):
+                continue
+            if skip:
+                skip -= 1
+                continue
+            chunk.append((row_num, row))
+            if len(chunk) >= self.chunk_size:
+                yield chunk
+                chunk = []
+        if chunk:
+            yield chunk
+
+    def run(self):
+        """
+        Import the job's rows. A resumed job skips the rows it has already
+        processed; each chunk is committed with its progress, so those rows
+        are exactly the ones imported.
+        """
+        job = self.job
+        self.save_progress(status='processing', started_at=job.started_at or timezone.now())
+
+        text = job.source_data
+        reader = csv.reader(io.StringIO(text))
+        try:
+            header = next(reader)
+        except StopIteration:
+            raise OrderImportError('CSV file is empty or invalid.')
+        self.columns = resolve_header(header)
+
+        total_rows = sum(
+            1 for row in csv.reader(io.StringIO(text))
+            if row and any((cell or '').strip() for cell in row)
+        ) - 1
+        self.save_progress(total_rows=max(total_rows, 0))
+
+        for chunk in self.iter_chunks(reader, skip=job.processed_rows):
+            with transaction.atomic():
+                self.import_chunk(chunk)
+                job.processed_rows += len(chunk)
+                self.save_progress()
+
+        self.notify()
+        self.save_progress(
+            status='completed',
+            finished_at=timezone.now(),
+            source_data='',
+            message=f"Imported {job.success_count} orders with {job.error_count} errors.",
+        )
+
+    def import_chunk(self, chunk):
+        rows = [data for data in (self.parse_row(row_num, row) for row_num, row in chunk) if data]
+        if not rows:
+            return
+
+        products = load_products(data['product'] for data in rows)
+        codes = {data['order_code'] for data in rows if data['order_code']}
+        existing_codes = set(Order.objects.filter(order_code__in=codes).values_list('order_code', flat=True))
+
+        entries = []
+        for data in rows:
+            row_num = data['row_num']
+            code = data['order_code']
+            if code and (code in existing_codes or code in self.seen_codes):
+                self.add_error(row_num, f"Order code '{code}' already exists")
+                continue
+            if code:
+                self.seen_codes.add(code)
+
+            product = products.get(data['product'])
+            if data['product'] and product is None:
+                self.add_warning(
+                    row_num,
+                    f"Product not found for ID/Code '{data['product']}'. Order will be created without product link."
+                )
+
+            variants = [variant.strip() for variant in data['variant'].split(',') if variant.strip()]
+            if len(variants) > 1:
+                for i, variant in enumerate(variants, start=1):
+                    entries.append((data, product, f"{code}-V{i}" if code else None, variant))
+            else:
+                entries.append((data, product, code or None, variants[0] if variants else ''))
+
+        if not entries:
+            return
+
+        new_codes = iter(reserve_order_codes(sum(1 for entry in entries if not entry[2])))
+        orders = [self.build_order(data, product, code or next(new_codes), variant)
+                  for data, product, code, variant in entries]
+
+        try:
+            with transaction.atomic():
+                orders = Order.objects.bulk_create(orders)
+                items = OrderItem.objects.bulk_create([
+                    OrderItem(order=order, product=order.product, quantity=order.quantity, price=order.price_per_unit)
+                    for order in orders if order.product is not None
+                ])
+                self.create_audit_logs(orders)
+        except Exception as e:
+            logger.error(f"Error importing order chunk: {str(e)}")
+            for row_num in sorted({entry[0]['row_num'] for entry in entries}):
+                self.add_error(row_num, f"Could not save order: {str(e)}")
+            return
+
+        self.job.success_count += len({entry[0]['row_num'] for entry in entries})
+        self.post_process(orders, items)
+
+    def build_order(self, data, product, order_code, variant):
+        seller = self.job.seller
+        notes = data['notes']
+        if variant:
+            notes = f"{notes}\nProduct Variant: {variant}" if notes else f"Product Variant: {variant}"
+        return Order(
+            order_code=order_code,
+            customer=data['customer'],
+            customer_phone=data['phone'],
+            shipping_address=data['address'],
+            street_address='',  # Street address not available in CSV import
+            product=product,
+            quantity=data['quantity'],
+            price_per_unit=data['price'],
+            total_amount=data['quantity'] * data['price'],
+            notes=notes,
+            date=data['order_date'],
+            status='pending',
+            seller=seller,
+            seller_email=seller.email,
+            store_link=data['store_link'][:200],
+        )
+
+    def create_audit_logs(self, orders):
+        from users.models import AuditLog
+
+        AuditLog.objects.bulk_create([
+            AuditLog(
+                user=self.job.user,
+                action='import',
+                entity_type='Order',
+                entity_id=str(order.id),
+                description=f"Imported order {order.order_code} from CSV" + (
+                    f" with product: {order.product.name_en} (Code: {order.product.code})"
+                    if order.product else " without product link"
+                )
+            )
+            for order in orders
+        ])
+
+    def post_process(self, orders, items):
+        """Apply the side effects the Order/OrderItem signals would have run"""
+        from finance.models import OrderFee
+        from callcenter.services import AutoOrderDistributionService
+        from inventory.services import StockReservationService
+
+        try:
+            with transaction.atomic():
+                OrderFee.create_for_orders(orders)
+        except Exception as e:
+            logger.error(f"Error creating fees for imported orders: {str(e)}")
+
+        try:
+            with transaction.atomic():
+                AutoOrderDistributionService.auto_assign_orders(orders)
+        except Exception as e:
+            logger.error(f"Error auto-assigning imported orders: {str(e)}")
+
+        for item in items:
+            with transaction.atomic():
+                StockReservationService.reserve_order_item(item)
+
+    def notify(self):
+        """Send one summary notification to the seller and to admins"""
+        from notifications.models import Notification
+        from users.models import User
+
+        job = self.job
+        # Counted from the saved progress, so a resumed job reports the rows imported before it stalled
+        if not job.success_count:
+            return
+
+        try:
+            Notification.create_notification(
+                user=job.seller,
+                title="Orders Imported Successfully",
+                message=f"Successfully imported {job.success_count} orders from CSV file.",
+                notification_type='data_import',
+                priority='medium',
+                target_role='Seller',
+                related_object_type='order',
+                related_url="/sellers/orders/"
+            )
+
+            admin_users = User.objects.filter(
+                user_roles__role__name__in=['Admin', 'Super Admin'],
+                is_active=True
+            ).exclude(pk=job.seller_id).distinct()
+            Notification.create_bulk_notifications(
+                admin_users,
+                title="New Orders Imported",
+                message=(
+                    f"{job.success_count} new orders were imported for seller "
+                    f"{job.seller.full_name or job.seller.email}."
+                ),
+                notification_type='new_order',
+                priority='medium',
+                target_role='Admin',
+                related_object_type='order',
+                related_url="/orders/"
+            )
+        except Exception as e:
+            logger.error(f"Error sending import notifications: {str(e)}")
+
+
+def claim_import_job(job_id):
+    """
+    Mark a pending job, or a processing job whose worker has stopped
+    updating it, as processing. Returns False when the job is finished or
+    another worker is running it; the conditional update lets only one
+    worker claim a job.
+    """
+    now = timezone.now()
+    return OrderImportJob.objects.filter(
+        Q(status='pending') | Q(status='processing', updated_at__lt=now - STALE_AFTER),
+        pk=job_id
+    ).update(status='processing', updated_at=now) == 1
+
+
+def run_import_job(job_id):
+    """Run an import job, marking it failed if the file cannot be processed"""
+    claimed = claim_import_job(job_id)
+    job = OrderImportJob.objects.select_related('seller', 'user').get(pk=job_id)
+    if not claimed:
+        return job
+
+    importer = OrderImporter(job)
+    try:
+        importer.run()
+    except Exception as e:
+        if not isinstance(e, OrderImportError):
+            logger.error(f"Order import job {job_id} failed: {str(e)}")
+        importer.save_progress(status='failed', finished_at=timezone.now(), source_data='', message=str(e))
+    return job
+
+
+def read_upload(uploaded_file, max_size=5 * 1024 * 1024):
+    """Validate an uploaded CSV file and return its decoded text"""
+    if not uploaded_file:
+        raise OrderImportError('No file was uploaded.')
+
+    # Validate file type
+    if not uploaded_file.name.lower().endswith('.csv'):
+        raise OrderImportError('Please upload a CSV file (.csv extension).')
+
+    # Check file size (max 5MB)
+    if uploaded_file.size > max_size:
+        raise OrderImportError('File size must be less than 5MB.')
+
+    content = uploaded_file.read()
+    try:
+        # Try UTF-8 first
+        return content.decode('utf-8-sig')
+    except UnicodeDecodeError:
+        return content.decode('latin-1')
+
+
+def start_import_job(user, seller, uploaded_file, source='orders'):
+    """
+    Store an uploaded file as an OrderImportJob and queue it.
+
+    The job is handed to Celery once the surrounding transaction commits;
+    if the broker is unreachable the import runs in-process instead.
+    """
+    text = read_upload(uploaded_file)
+    job = OrderImportJob.objects.create(
+        user=user,
+        seller=seller,
+        source=source,
+        file_name=uploaded_file.name[:255],
+        source_data=text,
+    )
+
+    def enqueue():
+        from .tasks import import_orders_task
+
+        try:
+            import_orders_task.delay(job.pk)
+        except Exception as e:
+            logger.warning(f"Could not queue order import job {job.pk}, running inline: {str(e)}")
+            run_import_job(job.pk)
+
+    transaction.on_commit(enqueue)
+    return job
@@ -0,0 +1,80 @@
+from decimal import Decimal
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.db.models import Count, DecimalField, ExpressionWrapper, F, Sum
+
+from orders.models import Order, OrderItem
+
+
+class Command(BaseCommand):
+    help = 'Backfill Order.total_amount for historical orders in batches (safe to re-run)'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=1000,
+            help='Number of orders to update per batch',
+        )
+        parser.add_argument(
+            '--start-id',
+            type=int,
+            default=0,
+            help='Resume from orders with an id greater than this value',
+        )
+        parser.add_argument(
+            '--recompute',
+            action='store_true',
+            help='Recompute all orders, not only those without a total',
+        )
+
+    def handle(self, *args, **options):
+        batch_size = options['batch_size']
+        last_id = options['start_id']
+        orders = Order.objects.all()
+        if not options['recompute']:
+            # Orders already computed are skipped, so an interrupted run resumes
+            orders = orders.filter(total_amount__isnull=True)
+
+        money = DecimalField(max_digits=12, decimal_places=2)
+        updated_count = 0
+
+        while True:
+            batch = list(
+                orders.filter(pk__gt=last_id)
+                .order_by('pk')
+                .values_list('pk', 'quantity', 'price_per_unit')[:batch_size]
+            )
+            if not batch:
+                break
+
+            order_ids = [pk for pk, _, _ in batch]
+            item_totals = {
+                row['order_id']: row['total']
+                for row in OrderItem.objects.filter(order_id__in=order_ids)
+                .values('order_id')
+                .annotate(
+                    item_count=Count('id'),
+                    total=Sum(ExpressionWrapper(F('quantity') * F('price'), output_field=money)),
+                )
+                .order_by()
+            }
+
+            updates = []
+            for pk, quantity, price_per_unit in batch:
+                total = item_totals.get(pk)
+                if total is None:
+                    total = (quantity or 0) * (price_per_unit or Decimal('0'))
+                updates.append(Order(pk=pk, total_amount=total))
+
+            with transaction.atomic():
+                Order.objects.bulk_update(updates, ['total_amount'])
+
+            last_id = order_ids[-1]
+            updated_count += len(updates)
+            self.stdout.write(f'Updated {updated_count} orders (last id {last_id})')
+
+        self.stdout.write(
+            self.style.SUCCESS(f'Successfully backfilled totals for {updated_count} orders.')
+        )
@@ -0,0 +1,27 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from orders import area_utils
+
+
+class Command(BaseCommand):
+    help = 'Compile the UAE area XML files into the JSON index loaded by orders.area_utils'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--output',
+            default=None,
+            help='Where to write the index (defaults to settings.AREAS_INDEX_FILE)',
+        )
+
+    def handle(self, *args, **options):
+        index = area_utils.build_index()
+        if not index['cities']:
+            raise CommandError(f'No area files found in {area_utils.AREAS_DIR}')
+
+        output = options['output'] or area_utils.INDEX_FILE
+        area_utils.write_index(index, output)
+
+        state_count = sum(len(states) for states in index['states'].values())
+        self.stdout.write(self.style.SUCCESS(
+            f"Wrote {len(index['cities'])} cities and {state_count} areas to {output}"
+        ))
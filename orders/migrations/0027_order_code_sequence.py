@@ -0,0 +1,31 @@
+# Generated by Django 5.2.18 on 2026-10-17 15:39
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('orders', '0026_order_total_amount'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='OrderCodeSequence',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('day', models.DateField(unique=True, verbose_name='Day')),
+                ('last_number', models.PositiveIntegerField(default=0, verbose_name='Last Number')),
+                ('updated_at', models.DateTimeField(auto_now=True, verbose_name='Updated At')),
+            ],
+            options={
+                'verbose_name': 'Order Code Sequence',
+                'verbose_name_plural': 'Order Code Sequences',
+            },
+        ),
+        migrations.AlterField(
+            model_name='order',
+            name='order_code',
+            field=models.CharField(blank=True, max_length=50, unique=True, verbose_name='Order Code'),
+        ),
+    ]
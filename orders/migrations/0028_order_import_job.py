@@ -0,0 +1,43 @@
+# Generated by Django 5.2.18 on 2026-10-17 15:44
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('orders', '0027_order_code_sequence'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='OrderImportJob',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('source', models.CharField(choices=[('orders', 'Orders'), ('sellers', 'Seller Portal')], default='orders', max_length=20, verbose_name='Source')),
+                ('file_name', models.CharField(blank=True, max_length=255, verbose_name='File Name')),
+                ('source_data', models.TextField(blank=True, verbose_name='Source Data')),
+                ('status', models.CharField(choices=[('pending', 'Pending'), ('processing', 'Processing'), ('completed', 'Completed'), ('failed', 'Failed')], default='pending', max_length=20, verbose_name='Status')),
+                ('total_rows', models.PositiveIntegerField(default=0, verbose_name='Total Rows')),
+                ('processed_rows', models.PositiveIntegerField(default=0, verbose_name='Processed Rows')),
+                ('success_count', models.PositiveIntegerField(default=0, verbose_name='Imported Orders')),
+                ('error_count', models.PositiveIntegerField(default=0, verbose_name='Errors')),
+                ('errors', models.JSONField(blank=True, default=list, verbose_name='Errors')),
+                ('warnings', models.JSONField(blank=True, default=list, verbose_name='Warnings')),
+                ('message', models.TextField(blank=True, verbose_name='Message')),
+                ('created_at', models.DateTimeField(auto_now_add=True, verbose_name='Created At')),
+                ('started_at', models.DateTimeField(blank=True, null=True, verbose_name='Started At')),
+                ('finished_at', models.DateTimeField(blank=True, null=True, verbose_name='Finished At')),
+                ('seller', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to=settings.AUTH_USER_MODEL, verbose_name='Seller')),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='order_import_jobs', to=settings.AUTH_USER_MODEL, verbose_name='Imported By')),
+            ],
+            options={
+                'verbose_name': 'Order Import Job',
+                'verbose_name_plural': 'Order Import Jobs',
+                'ordering': ['-created_at'],
+            },
+        ),
+    ]
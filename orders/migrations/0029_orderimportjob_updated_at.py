@@ -0,0 +1,20 @@
+# Generated by Django 5.2.18 on 2026-10-17 21:10
+
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('orders', '0028_order_import_job'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='orderimportjob',
+            name='updated_at',
+            field=models.DateTimeField(auto_now=True, default=django.utils.timezone.now, verbose_name='Updated At'),
+            preserve_default=False,
+        ),
+    ]
@@ -4,43 +4,93 @@ from django.utils.translation import gettext_lazy as _
 from django.utils import timezone
 import uuid
 
+def _order_code_date_part(day):
+    return f"{day.year % 100:02d}{day.month:02d}{day.day:02d}"
+
+
+def format_order_code(day, number):
+    """Format an order code as #YYMMDDnnn (more digits past 999 orders a day)"""
+    return f"#{_order_code_date_part(day)}{number:03d}"
+
+
+def reserve_order_codes(count=1, day=None):
+    """
+    Reserve ``count`` consecutive order codes for ``day`` (default: today).
+
+    Codes come from a per-day counter row that is locked and incremented in
+    one transaction, so concurrent callers never receive the same number
+    and bulk imports can reserve a whole block with a single round trip.
+    """
+    from django.db import transaction
+
+    if count < 1:
+        return []
+    day = day or timezone.localdate()
+
+    with transaction.atomic():
+        sequence = OrderCodeSequence.objects.select_for_update().filter(day=day).first()
+        if sequence is None:
+            sequence = OrderCodeSequence.create_for_day(day)
+        first_number = sequence.last_number + 1
+        sequence.last_number += count
+        sequence.save(update_fields=['last_number', 'updated_at'])
+
+    return [format_order_code(day, number) for number in range(first_number, first_number + count)]
+
+
 def generate_order_code():
     """Generate a shorter order code with # prefix"""
     from django.db.utils import OperationalError, ProgrammingError, InternalError
-    from django.db import connection
-    from django.utils import timezone
+    from django.apps import apps
     import random
 
-    today = timezone.now().date()
-    date_part = f"{today.year % 100:02d}{today.month:02d}{today.day:02d}"
+    if not apps.ready:
+        # During migrations, just return a unique code
+        return format_order_code(timezone.localdate(), random.randint(1, 999))
 
     try:
-        # Check if we're in a migration context or if the table exists
-        from django.apps import apps
-        if not apps.ready:
-            # During migrations, just return a unique code
-            return f"#{date_part}{random.randint(1, 999):03d}"
+        return reserve_order_codes(1)[0]
+    except (OperationalError, ProgrammingError, InternalError):
+        # Sequence table missing (e.g. migrations pending)
+        return format_order_code(timezone.localdate(), random.randint(1, 999))
 
-        from .models import Order
 
-        existing_orders_today = Order.objects.filter(
-            order_code__startswith=f"#{date_part}"
-        ).count()
-    except (OperationalError, ProgrammingError, InternalError, Exception):
-        # During migrations or if table doesn't exist, return unique code
-        return f"#{date_part}{random.randint(1, 999):03d}"
+class OrderCodeSequence(models.Model):
+    """Per-day counter backing generate_order_code / reserve_order_codes"""
+    day = models.DateField(unique=True, verbose_name=_('Day'))
+    last_number = models.PositiveIntegerField(default=0, verbose_name=_('Last Number'))
+    updated_at = models.DateTimeField(auto_now=True, verbose_name=_('Updated At'))
 
-    order_number = existing_orders_today + 1
-    code = f"#{date_part}{order_number:03d}"
+    class Meta:
+        verbose_name = _('Order Code Sequence')
+        verbose_name_plural = _('Order Code Sequences')
 
-    try:
-        while Order.objects.filter(order_code=code).exists():
-            order_number += 1
-            code = f"#{date_part}{order_number:03d}"
-    except (OperationalError, ProgrammingError, InternalError, Exception):
-        pass
+    def __str__(self):
+        return f"{self.day}: {self.last_number}"
+
+    @classmethod
+    def create_for_day(cls, day):
+        """
+        Create (or lock) the counter for ``day``, seeded past any codes that
+        already exist for that day. Must run inside a transaction.
+        """
+        from django.db import IntegrityError, transaction
+
+        prefix = f"#{_order_code_date_part(day)}"
+        last_number = 0
+        for code in Order.objects.filter(order_code__startswith=prefix).values_list('order_code', flat=True):
+            suffix = code[len(prefix):]
+            if suffix.isdigit():
+                last_number = max(last_number, int(suffix))
+
+        try:
+            with transaction.atomic():
+                cls.objects.create(day=day, last_number=last_number)
+        except IntegrityError:
+            # Another process created it first
+            pass
+        return cls.objects.select_for_update().get(day=day)
 
-    return code
 
 class Order(models.Model):
     STATUS_CHOICES = [
@@ -77,13 +127,17 @@ class Order(models.Model):
         ('cancelled', _('Cancelled')),
     ]
 
-    order_code = models.CharField(max_length=50, unique=True, verbose_name=_('Order Code'), default=generate_order_code)
+    # Allocated from OrderCodeSequence on first save (see generate_order_code)
+    order_code = models.CharField(max_length=50, unique=True, blank=True, verbose_name=_('Order Code'))
     customer = models.CharField(max_length=255, verbose_name=_('Customer'), help_text=_('Customer full name'), default='Unknown Customer')
     date = models.DateTimeField(default=timezone.now, verbose_name=_('Order Date'))
     # Deprecated direct product relationship - use OrderItem instead
     product = models.ForeignKey('sellers.Product', on_delete=models.PROTECT, related_name='direct_orders', verbose_name=_('Legacy Product'), null=True, blank=True)
     quantity = models.PositiveIntegerField(verbose_name=_('Quantity'), default=1)
     price_per_unit = models.DecimalField(max_digits=10, decimal_places=2, verbose_name=_('Price Per Unit (AED)'), default=0, help_text=_('Price in UAE Dirhams'))
+    # Denormalized order total, kept in sync from OrderItem signals.
+    # NULL means "not computed yet" (see the backfill_order_totals command).
+    total_amount = models.DecimalField(max_digits=12, decimal_places=2, null=True, blank=True, editable=False, verbose_name=_('Total Amount (AED)'))
     status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='pending', verbose_name=_('Status'))
     
     # Workflow tracking
@@ -141,9 +195,67 @@ class Order(models.Model):
     def __str__(self):
         return f"{self.order_code} - {self.customer}"
 
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        # Remember the stored values so saves can tell which fields changed
+        # (pricing for total_amount, orders.side_effects for its handlers)
+        instance._loaded_values = dict(zip(field_names, values))
+        return instance
+
+    def remember_loaded_values(self, fields=None):
+        """Record the current values as the stored state (after a save)"""
+        loaded = getattr(self, '_loaded_values', None)
+        if loaded is None or fields is None:
+            self._loaded_values = loaded = {}
+            fields = [field.attname for field in self._meta.concrete_fields]
+        for name in fields:
+            if name in self.__dict__:
+                loaded[name] = self.__dict__[name]
+
+    def save(self, *args, **kwargs):
+        if not self.order_code:
+            self.order_code = generate_order_code()
+        update_fields = kwargs.get('update_fields')
+        if update_fields is None or {'quantity', 'price_per_unit'} & set(update_fields):
+            loaded = getattr(self, '_loaded_values', None)
+            if self.pk is None:
+                # A new order has no items yet
+                self.total_amount = self.quantity * self.price_per_unit
+            elif (self.total_amount is None or loaded is None
+                    or (loaded.get('quantity'), loaded.get('price_per_unit')) != (self.quantity, self.price_per_unit)):
+                self.total_amount = self.compute_total_amount()
+            if update_fields is not None:
+                kwargs['update_fields'] = set(update_fields) | {'total_amount'}
+        super().save(*args, **kwargs)
+
+    def compute_total_amount(self):
+        """Compute the order total in SQL (items, or legacy quantity x price)"""
+        from django.db.models import Count, DecimalField, ExpressionWrapper, F, Sum
+
+        totals = OrderItem.objects.filter(order_id=self.pk).aggregate(
+            item_count=Count('id'),
+            total=Sum(ExpressionWrapper(
+                F('quantity') * F('price'),
+                output_field=DecimalField(max_digits=12, decimal_places=2)
+            )),
+        )
+        if totals['item_count']:
+            return totals['total']
+        return self.quantity * self.price_per_unit
+
+    def refresh_total_amount(self):
+        """Recompute and persist total_amount without firing Order signals"""
+        self.total_amount = self.compute_total_amount()
+        Order.objects.filter(pk=self.pk).update(total_amount=self.total_amount)
+        return self.total_amount
+
     @property
     def total_price(self):
         """Calculate total price in AED"""
+        # Use the maintained column when it has been computed
+        if self.total_amount is not None:
+            return self.total_amount
         # If we have order items, calculate based on them
         if hasattr(self, 'items') and self.items.exists():
             return sum(item.total_price for item in self.items.all())
@@ -499,4 +611,57 @@ class ReturnStatusLog(models.Model):
         verbose_name_plural = _('Return Status Logs')
 
     def __str__(self):
-        return f"{self.return_request.return_code} - {self.old_status} → {self.new_status}"
\ No newline at end of file
+        return f"{self.return_request.return_code} - {self.old_status} → {self.new_status}"
+
+class OrderImportJob(models.Model):
+    """Background CSV order import; polled by the import progress page"""
+    STATUS_CHOICES = [
+        ('pending', _('Pending')),
+        ('processing', _('Processing')),
+        ('completed', _('Completed')),
+        ('failed', _('Failed')),
+    ]
+
+    SOURCE_CHOICES = [
+        ('orders', _('Orders')),
+        ('sellers', _('Seller Portal')),
+    ]
+
+    user = models.ForeignKey('users.User', on_delete=models.CASCADE, related_name='order_import_jobs', verbose_name=_('Imported By'))
+    seller = models.ForeignKey('users.User', on_delete=models.CASCADE, related_name='+', verbose_name=_('Seller'))
+    source = models.CharField(max_length=20, choices=SOURCE_CHOICES, default='orders', verbose_name=_('Source'))
+    file_name = models.CharField(max_length=255, blank=True, verbose_name=_('File Name'))
+    # Decoded CSV text; cleared once the job has finished
+    source_data = models.TextField(blank=True, verbose_name=_('Source Data'))
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='pending', verbose_name=_('Status'))
+    total_rows = models.PositiveIntegerField(default=0, verbose_name=_('Total Rows'))
+    processed_rows = models.PositiveIntegerField(default=0, verbose_name=_('Processed Rows'))
+    success_count = models.PositiveIntegerField(default=0, verbose_name=_('Imported Orders'))
+    error_count = models.PositiveIntegerField(default=0, verbose_name=_('Errors'))
+    # Lists of {"row": <csv line>, "message": <text>}
+    errors = models.JSONField(default=list, blank=True, verbose_name=_('Errors'))
+    warnings = models.JSONField(default=list, blank=True, verbose_name=_('Warnings'))
+    message = models.TextField(blank=True, verbose_name=_('Message'))
+    created_at = models.DateTimeField(auto_now_add=True, verbose_name=_('Created At'))
+    started_at = models.DateTimeField(null=True, blank=True, verbose_name=_('Started At'))
+    # Stamped with every progress update; a processing job that stops updating has lost its worker
+    updated_at = models.DateTimeField(auto_now=True, verbose_name=_('Updated At'))
+    finished_at = models.DateTimeField(null=True, blank=True, verbose_name=_('Finished At'))
+
+    class Meta:
+        ordering = ['-created_at']
+        verbose_name = _('Order Import Job')
+        verbose_name_plural = _('Order Import Jobs')
+
+    def __str__(self):
+        return f"Import #{self.pk} ({self.get_status_display()})"
+
+    @property
+    def is_finished(self):
+        return self.status in ('completed', 'failed')
+
+    @property
+    def progress_percent(self):
+        if not self.total_rows:
+            return 100 if self.is_finished else 0
+        return min(100, int(self.processed_rows * 100 / self.total_rows))
@@ -0,0 +1,266 @@
+"""
+Deferred, batched side effects for Order saves.
+
+Apps register handlers with ``@order_side_effect`` instead of connecting to
+``post_save`` directly. Each handler declares what it reacts to: new orders
+(``on_create``) and/or changes to specific fields (``fields``). Saves are
+collected per transaction, merged per order and dispatched once the
+transaction commits; every matching handler is called once with the list of
+events for all orders it cares about, so it can load related rows and
+insert its results in bulk. Saves that touch none of a handler's fields
+never reach it. Saves are batched per savepoint, so the events of a
+savepoint that rolls back are never dispatched.
+
+Handlers registered with ``run_async=True`` are sent to Celery when
+``settings.ORDER_SIDE_EFFECTS_ASYNC`` is enabled and run inline otherwise.
+"""
+import itertools
+import logging
+
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS, connections, transaction
+from django.db.models.signals import post_save
+from django.dispatch import receiver
+
+from .models import Order
+
+logger = logging.getLogger('atlas_crm')
+
+_handlers = []
+_sequence = itertools.count()
+
+
+class OrderEvent:
+    """What happened to one order during a transaction"""
+
+    __slots__ = ('order', 'created', 'changed_fields', 'previous', 'sequence')
+
+    def __init__(self, order, created=False, changed_fields=(), previous=None):
+        self.order = order
+        # Save order across savepoints; a merged event keeps its first save's
+        self.sequence = next(_sequence)
+        self.created = created
+        # Fields changed by updates (for new orders: changed after creation)
+        self.changed_fields = set(changed_fields)
+        # Value of each changed field before the transaction, by attname
+        self.previous = dict(previous or {})
+
+    def merge(self, other):
+        """Fold a later save of the same order into this event"""
+        self.order = other.order
+        self.changed_fields |= other.changed_fields
+        for name, value in other.previous.items():
+            self.previous.setdefault(name, value)
+
+    def changed(self, field):
+        return field in self.changed_fields
+
+    def to_payload(self):
+        return {
+            'order_id': self.order.pk,
+            'created': self.created,
+            'changed_fields': sorted(self.changed_fields),
+            'previous': {name: _serialize(value) for name, value in self.previous.items()},
+        }
+
+    def __repr__(self):
+        return f"<OrderEvent {self.order.pk} created={self.created} changed={sorted(self.changed_fields)}>"
+
+
+def _serialize(value):
+    if value is None or isinstance(value, (bool, int, float, str)):
+        return value
+    return str(value)
+
+
+class OrderSideEffect:
+    """A registered handler and the events it wants"""
+
+    def __init__(self, func, on_create=False, fields=(), run_async=False):
+        self.func = func
+        self.on_create = on_create
+        self.fields = frozenset(fields)
+        self.run_async = run_async
+        self.path = f"{func.__module__}.{func.__qualname__}"
+
+    def matches(self, event):
+        return (self.on_create and event.created) or bool(self.fields & event.changed_fields)
+
+    def __call__(self, events):
+        return self.func(events)
+
+
+def order_side_effect(on_create=False, fields=(), run_async=False):
+    """
+    Register ``func(events)`` to run after commit for matching Order saves.
+
+    ``on_create`` selects newly created orders; ``fields`` selects orders
+    whose listed fields (attnames, e.g. ``'status'`` or ``'seller_id'``)
+    changed. ``func`` receives a list of OrderEvent, one per order.
+    """
+    def decorator(func):
+        _handlers.append(OrderSideEffect(func, on_create, fields, run_async))
+        return func
+    return decorator
+
+
+def get_handler(path):
+    for handler in _handlers:
+        if handler.path == path:
+            return handler
+    raise LookupError(f"No order side effect registered as {path}")
+
+
+def _changed_fields(instance, created, update_fields):
+    """Return (changed attnames, previous values) for a saved order"""
+    if created:
+        return set(), {}
+
+    loaded = getattr(instance, '_loaded_values', None)
+    if update_fields is not None:
+        fields = [instance._meta.get_field(name) for name in update_fields]
+    else:
+        fields = instance._meta.concrete_fields
+    # auto_now timestamps change on every save and are not worth reacting to
+    candidates = {field.attname for field in fields if not getattr(field, 'auto_now', False)}
+
+    if loaded is None:
+        # Not loaded from the database: assume every saved field changed
+        return candidates, {}
+
+    changed = set()
+    previous = {}
+    for name in candidates:
+        if name not in instance.__dict__:
+            # Deferred and not saved
+            continue
+        if name in loaded and loaded[name] == instance.__dict__[name]:
+            continue
+        changed.add(name)
+        previous[name] = loaded.get(name)
+    return changed, previous
+
+
+class _Batch:
+    """Events collected in one savepoint, merged per order; called on commit"""
+
+    def __init__(self, parent):
+        self.parent = parent
+        self.events = {}
+
+    def add(self, event):
+        existing = self.events.get(event.order.pk)
+        if existing is None:
+            self.events[event.order.pk] = event
+        else:
+            existing.merge(event)
+
+    def __call__(self):
+        # Only reached when the savepoint committed; a rollback drops the callback and the events
+        self.parent.events.extend(self.events.values())
+
+
+class _Transaction:
+    """
+    The batches of one transaction, one per savepoint. Each batch is
+    registered with on_commit inside its savepoint; the batches that survive
+    the commit hand their events to this, which runs after them and
+    dispatches the events merged per order in the order they were saved.
+    """
+
+    def __init__(self, using):
+        self.using = using
+        self.batches = {}
+        self.events = []
+
+    def batch(self, connection):
+        key = tuple(connection.savepoint_ids)
+        batch = self.batches.get(key)
+        if batch is not None and _registered(connection, batch):
+            return batch
+
+        batch = self.batches[key] = _Batch(self)
+        transaction.on_commit(batch, using=self.using)
+        # Keep this after every batch, outside the savepoints so that no rollback drops it
+        connection.run_on_commit = [entry for entry in connection.run_on_commit if entry[1] is not self]
+        connection.run_on_commit.append((set(), self, False))
+        return batch
+
+    def __call__(self):
+        connections[self.using]._order_side_effects = None
+        batch = _Batch(self)
+        for event in sorted(self.events, key=lambda event: event.sequence):
+            batch.add(event)
+        dispatch(list(batch.events.values()))
+
+
+def _registered(connection, callback):
+    return any(entry[1] is callback for entry in connection.run_on_commit)
+
+
+def _queue(event, using):
+    connection = connections[using]
+    if not connection.in_atomic_block:
+        dispatch([event])
+        return
+
+    current = getattr(connection, '_order_side_effects', None)
+    # A rolled back transaction discards its on_commit callbacks, and its batches with them
+    if current is None or not _registered(connection, current):
+        current = connection._order_side_effects = _Transaction(using)
+    current.batch(connection).add(event)
+
+
+@receiver(post_save, sender=Order, dispatch_uid='orders.side_effects.collect')
+def collect_order_event(sender, instance, created, raw=False, using=None, update_fields=None, **kwargs):
+    """Record an Order save for the side effects dispatched after commit"""
+    if raw:
+        return
+
+    changed, previous = _changed_fields(instance, created, update_fields)
+    instance.remember_loaded_values(
+        None if created or update_fields is None
+        else [instance._meta.get_field(name).attname for name in update_fields]
+    )
+    if not created and not changed:
+        return
+
+    _queue(OrderEvent(instance, created=created, changed_fields=changed, previous=previous), using or DEFAULT_DB_ALIAS)
+
+
+def dispatch(events):
+    """Run every handler against the events it matches"""
+    for handler in _handlers:
+        matching = [event for event in events if handler.matches(event)]
+        if not matching:
+            continue
+        if handler.run_async and getattr(settings, 'ORDER_SIDE_EFFECTS_ASYNC', False):
+            try:
+                from .tasks import run_order_side_effect
+                run_order_side_effect.delay(handler.path, [event.to_payload() for event in matching])
+                continue
+            except Exception as e:
+                logger.warning(f"Could not queue {handler.path}, running inline: {str(e)}")
+        _run(handler, matching)
+
+
+def _run(handler, events):
+    try:
+        with transaction.atomic():
+            handler(events)
+    except Exception as e:
+        logger.error(f"Order side effect {handler.path} failed: {str(e)}")
+
+
+def run_payloads(path, payloads):
+    """Rebuild events sent to Celery and run their handler"""
+    handler = get_handler(path)
+    orders = Order.objects.in_bulk([payload['order_id'] for payload in payloads])
+    events = [
+        OrderEvent(orders[payload['order_id']], payload['created'], payload['changed_fields'], payload['previous'])
+        for payload in payloads
+        if payload['order_id'] in orders
+    ]
+    if events:
+        _run(handler, events)
+    return len(events)
@@ -1,16 +1,36 @@
-from django.db.models.signals import post_save
+from django.db.models.signals import post_save, post_delete
 from django.dispatch import receiver
-from .models import Order
+from .models import Order, OrderItem
+from .side_effects import order_side_effect
 from callcenter.services import AutoOrderDistributionService
+import logging
 
-@receiver(post_save, sender=Order)
-def auto_assign_new_order(sender, instance, created, **kwargs):
+logger = logging.getLogger('atlas_crm')
+
+
+@order_side_effect(on_create=True)
+def auto_assign_new_orders(events):
     """Automatically assign new orders to call center agents"""
-    if created and instance.status in ['pending', 'pending_confirmation']:
-        # Auto-assign the new order
-        success, result = AutoOrderDistributionService.auto_assign_new_order(instance)
-        
-        if success:
-            print(f"Order {instance.order_code} automatically assigned to agent: {result.get_full_name()}")
-        else:
-            print(f"Failed to auto-assign order {instance.order_code}: {result}")
+    orders = [
+        event.order for event in events
+        if event.order.status in ['pending', 'pending_confirmation']
+    ]
+    assignments = AutoOrderDistributionService.auto_assign_orders(orders)
+    for assignment in assignments:
+        logger.info(f"Order {assignment.order.order_code} automatically assigned to agent: {assignment.agent.get_full_name()}")
+    if len(assignments) < len(orders):
+        logger.warning(f"Failed to auto-assign {len(orders) - len(assignments)} new orders")
+
+
+@receiver(post_save, sender=OrderItem)
+@receiver(post_delete, sender=OrderItem)
+def sync_order_total_amount(sender, instance, **kwargs):
+    """Keep Order.total_amount in sync when order items change"""
+    if isinstance(kwargs.get('origin'), Order):
+        # The whole order is being deleted
+        return
+    try:
+        order = instance.order
+    except Order.DoesNotExist:
+        return
+    order.refresh_total_amount()
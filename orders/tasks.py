@@ -56,20 +56,19 @@ def send_daily_order_summary():
         # Create notifications for managers
         managers = User.objects.filter(
             is_active=True,
-            userrole__role__role_type__in=['admin', 'manager']
+            user_roles__role__role_type__in=['admin', 'manager']
         ).distinct()
 
-        for manager in managers:
-            Notification.objects.create(
-                user=manager,
-                title=f"Daily Order Summary - {yesterday.strftime('%B %d, %Y')}",
-                message=f"Orders: {summary['total_orders']}, "
-                       f"Value: ${summary['total_value']:,.2f}, "
-                       f"Delivered: {summary['delivered']}, "
-                       f"Pending: {summary['pending']}",
-                notification_type='report',
-                priority='normal'
-            )
+        Notification.create_bulk_notifications(
+            managers,
+            title=f"Daily Order Summary - {yesterday.strftime('%B %d, %Y')}",
+            message=f"Orders: {summary['total_orders']}, "
+                   f"Value: ${summary['total_value']:,.2f}, "
+                   f"Delivered: {summary['delivered']}, "
+                   f"Pending: {summary['pending']}",
+            notification_type='report',
+            priority='normal'
+        )
 
         logger.info(f"Daily order summary sent: {summary}")
         return {'status': 'success', 'summary': summary}
@@ -103,18 +102,17 @@ def check_stale_orders():
             # Notify call center managers
             cc_managers = User.objects.filter(
                 is_active=True,
-                userrole__role__role_type__in=['admin', 'callcenter_manager']
+                user_roles__role__role_type__in=['admin', 'callcenter_manager']
             ).distinct()
 
-            for manager in cc_managers:
-                Notification.objects.create(
-                    user=manager,
-                    title=f"Stale Orders Alert",
-                    message=f"There are {stale_count} orders pending for more than 24 hours. "
-                           f"Please review and process them.",
-                    notification_type='alert',
-                    priority='high'
-                )
+            Notification.create_bulk_notifications(
+                cc_managers,
+                title=f"Stale Orders Alert",
+                message=f"There are {stale_count} orders pending for more than 24 hours. "
+                       f"Please review and process them.",
+                notification_type='alert',
+                priority='high'
+            )
 
         logger.info(f"Stale order check completed. Found: {stale_count}")
         return {'status': 'success', 'stale_orders': stale_count}
@@ -159,3 +157,27 @@ def auto_cancel_unpaid_orders():
     except Exception as e:
         logger.error(f"Auto-cancel task failed: {str(e)}")
         return {'status': 'error', 'message': str(e)}
+
+
+@shared_task
+def import_orders_task(job_id):
+    """
+    Import a CSV file uploaded through the order import pages
+    Progress is recorded on the OrderImportJob and polled by the UI
+    """
+    from .importers import run_import_job
+
+    job = run_import_job(job_id)
+    logger.info(f"Order import job {job_id}: {job.status}, {job.success_count} rows imported, {job.error_count} errors")
+    return {'status': job.status, 'imported': job.success_count, 'errors': job.error_count}
+
+
+@shared_task
+def run_order_side_effect(handler_path, payloads):
+    """
+    Run a deferred Order side effect queued by orders.side_effects
+    """
+    from .side_effects import run_payloads
+
+    count = run_payloads(handler_path, payloads)
+    return {'status': 'success', 'handler': handler_path, 'orders': count}
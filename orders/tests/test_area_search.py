@@ -0,0 +1,103 @@
+"""
+Unit tests for the city/area typeahead
+Tests: ranking, Arabic aliases, substring matches, resolve_area, autocomplete API
+"""
+
+from django.contrib.auth import get_user_model
+from django.test import SimpleTestCase, TestCase
+from django.urls import reverse
+
+from orders.area_search import AreaSearchIndex, get_search_index, resolve_area, search_areas
+
+User = get_user_model()
+
+AREA_INDEX = {
+    'cities': [('دبي', 'Dubai (DXB)'), ('راس الخيمة', 'Ras Al Khaimah (RAK)')],
+    'states': {
+        'دبي': [
+            ('Al Barsha', 'Al Barsha (DXB)', 'al barsha'),
+            ('Al Barsha South 1', 'Al Barsha South 1 (DXB)', 'al barsha south 1'),
+            ('Ain Khatt', 'Ain Khatt (DXB)', 'ain khatt'),
+            ('Barsha Heights', 'Barsha Heights (DXB)', 'barsha heights'),
+            ('Dubai Marina', 'Dubai Marina (DXB)', 'dubai marina'),
+        ],
+        'راس الخيمة': [
+            ('Ain Khatt', 'Ain Khatt (RAK)', 'ain khatt'),
+        ],
+    },
+}
+
+
+class AreaSearchIndexTests(SimpleTestCase):
+    """
+    Test suite for AreaSearchIndex
+    Covers: exact/prefix/word prefix/substring ranking, filters, resolve
+    """
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.index = AreaSearchIndex(AREA_INDEX)
+
+    def labels(self, query, **kwargs):
+        return [entry.label for entry in self.index.search(query, **kwargs)]
+
+    def test_ranking(self):
+        """Exact name, then names starting with the query, then words, then substrings"""
+        self.assertEqual(self.labels('al barsha'), ['Al Barsha (DXB)', 'Al Barsha South 1 (DXB)'])
+        self.assertEqual(self.labels('barsha'), [
+            'Barsha Heights (DXB)', 'Al Barsha (DXB)', 'Al Barsha South 1 (DXB)',
+        ])
+        self.assertEqual(self.labels('arsh'), [
+            'Al Barsha (DXB)', 'Barsha Heights (DXB)', 'Al Barsha South 1 (DXB)',
+        ])
+
+    def test_city_names_in_both_languages(self):
+        self.assertEqual(self.labels('dubai'), ['Dubai (DXB)', 'Dubai Marina (DXB)'])
+        self.assertEqual(self.labels('دبي'), ['Dubai (DXB)'])
+        self.assertEqual(self.labels('رأس الخيمة'), ['Ras Al Khaimah (RAK)'])
+        self.assertEqual(self.labels('RAK'), ['Ras Al Khaimah (RAK)'])
+
+    def test_filters(self):
+        self.assertEqual(self.labels('ain', city='راس الخيمة'), ['Ain Khatt (RAK)'])
+        self.assertEqual(self.labels('dubai', areas_only=True), ['Dubai Marina (DXB)'])
+        self.assertEqual(self.labels('a', limit=2), ['Ain Khatt (DXB)', 'Ain Khatt (RAK)'])
+        self.assertEqual(self.labels('zz'), [])
+
+    def test_resolve(self):
+        self.assertEqual(self.index.resolve('  AL-BARSHA ').area, 'Al Barsha')
+        self.assertEqual(self.index.resolve('Dubai').city, 'دبي')
+        # Ambiguous without a city
+        self.assertIsNone(self.index.resolve('Ain Khatt'))
+        self.assertEqual(self.index.resolve('Ain Khatt', city='دبي').label, 'Ain Khatt (DXB)')
+        self.assertIsNone(self.index.resolve('Al Bar'))
+
+
+class AreaAutocompleteAPITests(TestCase):
+    """
+    Test suite for the area autocomplete endpoint
+    Covers: authentication, JSON results on the real area data
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(email='areas@test.com', password='testpass123', is_active=True)
+
+    def test_requires_login(self):
+        response = self.client.get(reverse('orders:area_autocomplete'), {'q': 'marina'})
+        self.assertEqual(response.status_code, 302)
+
+    def test_results(self):
+        self.client.force_login(self.user)
+        data = self.client.get(reverse('orders:area_autocomplete'), {'q': 'dubai marina', 'limit': 1}).json()
+        self.assertTrue(data['success'])
+        self.assertEqual(data['results'], [{
+            'type': 'area', 'city': 'دبي', 'city_label': 'Dubai (DXB)',
+            'value': 'Dubai Marina', 'label': 'Dubai Marina (DXB)',
+        }])
+        self.assertEqual(self.client.get(reverse('orders:area_autocomplete')).json()['results'], [])
+
+    def test_index_reused(self):
+        self.assertIs(get_search_index(), get_search_index())
+        self.assertEqual(search_areas('marina', areas_only=True)[0].area, 'Dubai Marina')
+        self.assertEqual(resolve_area('Dubai Marina').city, 'دبي')
@@ -0,0 +1,96 @@
+"""
+Unit tests for the UAE area index
+Tests: city and area lookups, reload on change, JSON artifact, normalization
+"""
+
+import os
+import shutil
+import tempfile
+from io import StringIO
+from unittest import mock
+
+from django.core.management import call_command
+from django.test import SimpleTestCase
+
+from orders import area_utils
+
+AREA_XML = """<?xml version="1.0" encoding="UTF-8"?>
+<office:document xmlns:office="urn:oasis:names:tc:opendocument:xmlns:office:1.0"
+                 xmlns:text="urn:oasis:names:tc:opendocument:xmlns:text:1.0">
+  <office:body><office:text>
+    {paragraphs}
+  </office:text></office:body>
+</office:document>
+"""
+
+
+class AreaIndexTests(SimpleTestCase):
+    """
+    Test suite for orders.area_utils
+    Covers: parsing, caching, mtime invalidation, build_area_index artifact
+    """
+
+    def setUp(self):
+        self.tmp = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.tmp)
+        self.areas_dir = os.path.join(self.tmp, 'Areas Docs')
+        os.mkdir(self.areas_dir)
+        self.index_file = os.path.join(self.tmp, 'areas_index.json')
+
+        self.write_city('دبي', ['Marina', 'Deira', '<text:span>Header</text:span>', 'Deira'])
+        self.write_city('Unknown City', ['Somewhere'])
+
+        for name, value in (('AREAS_DIR', self.areas_dir), ('INDEX_FILE', self.index_file)):
+            patcher = mock.patch.object(area_utils, name, value)
+            patcher.start()
+            self.addCleanup(patcher.stop)
+        area_utils.clear_area_index()
+        self.addCleanup(area_utils.clear_area_index)
+
+    def write_city(self, city, areas, mtime=None):
+        path = os.path.join(self.areas_dir, f'vertopal.com_{city}.xml')
+        paragraphs = ''.join(f'<text:p>{area}</text:p>' for area in areas)
+        with open(path, 'w', encoding='utf-8') as f:
+            f.write(AREA_XML.format(paragraphs=paragraphs))
+        if mtime is not None:
+            os.utime(path, (mtime, mtime))
+
+    def test_lookups(self):
+        self.assertEqual(area_utils.get_cities_list(), [('دبي', 'Dubai (DXB)'), ('Unknown City', 'Unknown City')])
+        self.assertEqual(area_utils.get_states_for_city('دبي'), [('Deira', 'Deira (DXB)'), ('Marina', 'Marina (DXB)')])
+        self.assertEqual(area_utils.get_states_for_city('Unknown City'), [('Somewhere', 'Somewhere')])
+        self.assertEqual(area_utils.get_states_for_city('Nowhere'), [])
+
+    def test_files_parsed_once(self):
+        with mock.patch.object(area_utils, '_parse_states', wraps=area_utils._parse_states) as parse:
+            for _ in range(3):
+                area_utils.get_cities_list()
+                area_utils.get_states_for_city('دبي')
+        self.assertEqual(parse.call_count, 2)
+
+    def test_reloads_changed_files(self):
+        area_utils.get_states_for_city('دبي')
+        self.write_city('دبي', ['Jumeirah'], mtime=1_000_000)
+
+        # Within the check interval the cached index is used
+        self.assertEqual(len(area_utils.get_states_for_city('دبي')), 2)
+        with mock.patch.object(area_utils, 'INDEX_CHECK_INTERVAL', 0):
+            self.assertEqual(area_utils.get_states_for_city('دبي'), [('Jumeirah', 'Jumeirah (DXB)')])
+
+    def test_artifact(self):
+        """build_area_index writes an artifact that is used while it matches the sources"""
+        call_command('build_area_index', stdout=StringIO())
+        area_utils.clear_area_index()
+        with mock.patch.object(area_utils, '_parse_states') as parse:
+            self.assertEqual(len(area_utils.get_states_for_city('دبي')), 2)
+        parse.assert_not_called()
+
+        # A stale artifact is ignored
+        self.write_city('دبي', ['Jumeirah'], mtime=1_000_000)
+        area_utils.clear_area_index()
+        self.assertEqual(area_utils.get_states_for_city('دبي'), [('Jumeirah', 'Jumeirah (DXB)')])
+
+    def test_normalize_area_name(self):
+        self.assertEqual(area_utils.normalize_area_name('  Al-Barsha  (1) '), 'al barsha 1')
+        self.assertEqual(area_utils.normalize_area_name('الْإِمَارَات'), 'الامارات')
+        self.assertEqual(area_utils.normalize_area_name('القصيدة'), area_utils.normalize_area_name('القصيده'))
@@ -0,0 +1,97 @@
+"""
+Unit tests for the order code allocator
+Tests: generate_order_code, reserve_order_codes, OrderCodeSequence
+"""
+
+import threading
+from datetime import date
+
+from django.db import connection
+from django.test import TestCase, TransactionTestCase, skipUnlessDBFeature
+from django.utils import timezone
+
+from orders.models import (
+    Order, OrderCodeSequence, format_order_code, generate_order_code, reserve_order_codes
+)
+
+
+class OrderCodeAllocatorTests(TestCase):
+    """
+    Test suite for per-day order code allocation
+    Covers: format, sequencing, block reservation, seeding, >999 orders
+    """
+
+    def test_codes_are_sequential_per_day(self):
+        """Consecutive calls return consecutive #YYMMDDnnn codes"""
+        today = timezone.localdate()
+        first = generate_order_code()
+        second = generate_order_code()
+        self.assertEqual(first, format_order_code(today, 1))
+        self.assertEqual(second, format_order_code(today, 2))
+
+    def test_order_gets_code_on_save(self):
+        """Orders without a code are allocated one when saved"""
+        order = Order.objects.create(customer='Customer', store_link='https://example.com/p')
+        self.assertEqual(order.order_code, format_order_code(timezone.localdate(), 1))
+
+    def test_block_reservation(self):
+        """A block reservation returns distinct codes and advances the counter once"""
+        day = date(2025, 1, 22)
+        codes = reserve_order_codes(5, day=day)
+        self.assertEqual(codes, [f'#250122{n:03d}' for n in range(1, 6)])
+        self.assertEqual(reserve_order_codes(1, day=day), ['#250122006'])
+        self.assertEqual(OrderCodeSequence.objects.get(day=day).last_number, 6)
+
+    def test_more_than_999_orders_per_day(self):
+        """Numbers past 999 widen the code instead of colliding"""
+        day = date(2025, 1, 22)
+        OrderCodeSequence.objects.create(day=day, last_number=999)
+        self.assertEqual(reserve_order_codes(1, day=day), ['#2501221000'])
+
+    def test_sequence_seeded_from_existing_codes(self):
+        """A new day's counter starts after codes created by the old generator"""
+        today = timezone.localdate()
+        Order.objects.create(
+            customer='Legacy', store_link='https://example.com/p',
+            order_code=format_order_code(today, 41)
+        )
+        self.assertEqual(generate_order_code(), format_order_code(today, 42))
+
+
+@skipUnlessDBFeature('has_select_for_update')
+class OrderCodeConcurrencyTests(TransactionTestCase):
+    """
+    Concurrent allocation never hands out the same code twice
+    Requires a database with row locking (PostgreSQL); SQLite serializes
+    writers at the table level and is skipped.
+    """
+
+    def test_concurrent_reservations_are_unique(self):
+        day = date(2025, 1, 22)
+        reserve_order_codes(1, day=day)  # Create the counter row up front
+        results = []
+        errors = []
+        lock = threading.Lock()
+
+        def worker():
+            try:
+                for _ in range(10):
+                    codes = reserve_order_codes(3, day=day)
+                    with lock:
+                        results.extend(codes)
+            except Exception as exc:  # pragma: no cover - reported below
+                with lock:
+                    errors.append(exc)
+            finally:
+                connection.close()
+
+        threads = [threading.Thread(target=worker) for _ in range(8)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        self.assertEqual(errors, [])
+        self.assertEqual(len(results), 8 * 10 * 3)
+        self.assertEqual(len(set(results)), len(results))
+        self.assertEqual(OrderCodeSequence.objects.get(day=day).last_number, 1 + 8 * 10 * 3)
@@ -0,0 +1,288 @@
+"""
+Unit tests for the background CSV order import
+Tests: header resolution, OrderImporter, import views and progress endpoint
+"""
+
+from datetime import timedelta
+from decimal import Decimal
+from unittest import mock
+
+from django.contrib.auth import get_user_model
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.test import TestCase
+from django.urls import reverse
+from django.utils import timezone
+
+from callcenter.models import OrderAssignment
+from finance.models import OrderFee
+from notifications.models import Notification
+from orders.importers import STALE_AFTER, OrderImportError, OrderImporter, resolve_header, run_import_job
+from orders.models import Order, OrderImportJob, OrderItem
+from roles.models import Role, UserRole
+from sellers.models import Product
+from users.models import AuditLog
+
+User = get_user_model()
+
+HEADER = ('Order Code,Customer Name,Mobile Number,Shipping Address,Product ID/Code,'
+          'Quantity,Price Per Unit (AED),Product Variant,Notes,Product Link,Order Date (YYYY-MM-DD)')
+
+
+class HeaderResolutionTests(TestCase):
+    """
+    Test suite for resolve_header
+    Covers: download template header, reordered columns, missing columns
+    """
+
+    def test_template_header(self):
+        """The downloadable template maps every column"""
+        columns = resolve_header(HEADER.split(','))
+        self.assertEqual(columns['order_code'], 0)
+        self.assertEqual(columns['product'], 4)
+        self.assertEqual(columns['price'], 6)
+        self.assertEqual(columns['store_link'], 9)
+        self.assertEqual(columns['date'], 10)
+
+    def test_reordered_columns(self):
+        """Columns are found by name, not position"""
+        columns = resolve_header(['Phone', 'Address', 'Customer', 'Qty'])
+        self.assertEqual(columns, {'phone': 0, 'address': 1, 'customer': 2, 'quantity': 3})
+
+    def test_missing_required_column(self):
+        with self.assertRaises(OrderImportError):
+            resolve_header(['Customer Name', 'Product ID/Code'])
+
+
+class OrderImporterTests(TestCase):
+    """
+    Test suite for OrderImporter
+    Covers: bulk inserts, code reservation, row errors, post-processing
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.seller = User.objects.create_user(
+            email='import-seller@test.com',
+            password='testpass123',
+            full_name='Import Seller',
+            is_active=True,
+        )
+        cls.agent = User.objects.create_user(
+            email='import-agent@test.com',
+            password='testpass123',
+            is_active=True,
+        )
+        agent_role, _ = Role.objects.get_or_create(name='Call Center Agent')
+        UserRole.objects.create(user=cls.agent, role=agent_role, is_primary=True)
+        cls.manager = User.objects.create_user(
+            email='import-manager@test.com',
+            password='testpass123',
+            is_active=True,
+        )
+        manager_role, _ = Role.objects.get_or_create(name='Call Center Manager')
+        UserRole.objects.create(user=cls.manager, role=manager_role, is_primary=True)
+
+        cls.product = Product.objects.create(
+            name_en='Import Product',
+            name_ar='Import Product',
+            code='IMP-001',
+            selling_price=Decimal('50.00'),
+            stock_quantity=100,
+            seller=cls.seller,
+        )
+
+    def create_job(self, rows, header=HEADER):
+        return OrderImportJob.objects.create(
+            user=self.seller,
+            seller=self.seller,
+            source_data='\n'.join([header] + rows),
+        )
+
+    def test_import_creates_orders(self):
+        """Valid rows become orders with items, totals, fees, assignments and audit logs"""
+        job = self.create_job([
+            f',Jane Doe,0501234567,Dubai Marina,{self.product.code},2,50.00,,,,2025-01-22',
+            'EXT-1,John Doe,0507654321,Deira,Unknown Thing,1,10,,Call first,,',
+        ])
+        run_import_job(job.pk)
+        job.refresh_from_db()
+
+        self.assertEqual(job.status, 'completed')
+        self.assertEqual(job.total_rows, 2)
+        self.assertEqual(job.processed_rows, 2)
+        self.assertEqual(job.success_count, 2)
+        self.assertEqual(job.error_count, 0)
+        self.assertEqual(job.source_data, '')
+        self.assertEqual(len(job.warnings), 1)
+        self.assertEqual(job.warnings[0]['row'], 3)
+
+        jane = Order.objects.get(customer='Jane Doe')
+        self.assertTrue(jane.order_code.startswith('#'))
+        self.assertEqual(jane.total_amount, Decimal('100.00'))
+        self.assertEqual(jane.seller, self.seller)
+        self.assertEqual(jane.date.date().isoformat(), '2025-01-22')
+        self.assertEqual(OrderItem.objects.get(order=jane).product, self.product)
+
+        john = Order.objects.get(order_code='EXT-1')
+        self.assertIsNone(john.product)
+        self.assertEqual(john.notes, 'Call first')
+        self.assertFalse(OrderItem.objects.filter(order=john).exists())
+
+        self.assertEqual(OrderFee.objects.filter(order__in=[jane, john]).count(), 2)
+        self.assertEqual(OrderAssignment.objects.filter(agent=self.agent).count(), 2)
+        self.assertEqual(AuditLog.objects.filter(action='import', entity_type='Order').count(), 2)
+
+    def test_row_errors_are_reported(self):
+        """Invalid rows are reported with their CSV line number and skipped"""
+        Order.objects.create(customer='Existing', store_link='https://example.com/p', order_code='DUP-1')
+        job = self.create_job([
+            'DUP-1,Jane Doe,0501234567,Dubai,,1,10,,,,',
+            ',,0501234567,Dubai,,1,10,,,,',
+            ',Jane Doe,0501234567,Dubai,,0,10,,,,',
+            ',Jane Doe,0501234567,Dubai,,1,-5,,,,',
+            'NEW-1,Jane Doe,0501234567,Dubai,,1,10,,,,',
+            'NEW-1,Jane Doe,0501234567,Dubai,,1,10,,,,',
+        ])
+        run_import_job(job.pk)
+        job.refresh_from_db()
+
+        self.assertEqual(job.status, 'completed')
+        self.assertEqual(job.success_count, 1)
+        self.assertEqual(job.error_count, 5)
+        self.assertEqual([error['row'] for error in job.errors], [3, 4, 5, 2, 7])
+
+    def test_variants_become_separate_orders(self):
+        """Comma separated variants create one order per variant"""
+        job = self.create_job([f'VAR-1,Jane Doe,0501234567,Dubai,{self.product.code},1,50,"Red, Blue",,,'])
+        run_import_job(job.pk)
+
+        orders = Order.objects.filter(order_code__startswith='VAR-1').order_by('order_code')
+        self.assertEqual([order.order_code for order in orders], ['VAR-1-V1', 'VAR-1-V2'])
+        self.assertEqual(orders[1].notes, 'Product Variant: Blue')
+
+    def test_rows_processed_in_chunks(self):
+        """Rows spanning several chunks are all imported with distinct codes"""
+        rows = [f',Customer {i},050000000{i},Dubai,{self.product.code},1,50,,,,' for i in range(6)]
+        job = self.create_job(rows)
+        OrderImporter(job, chunk_size=4).run()
+        job.refresh_from_db()
+
+        self.assertEqual(job.success_count, 6)
+        self.assertEqual(Order.objects.filter(seller=self.seller).count(), 6)
+        self.assertEqual(len(set(Order.objects.values_list('order_code', flat=True))), 6)
+
+    def test_missing_columns_fail_job(self):
+        job = self.create_job(['Jane Doe,IMP-001'], header='Customer Name,Product ID/Code')
+        run_import_job(job.pk)
+        job.refresh_from_db()
+
+        self.assertEqual(job.status, 'failed')
+        self.assertIn('Mobile Number', job.message)
+        self.assertFalse(Order.objects.exists())
+
+    def test_running_job_is_not_claimed_again(self):
+        """A processing job that is still making progress is left to its worker"""
+        job = self.create_job([',Jane Doe,0501234567,Dubai,,1,10,,,,'])
+        OrderImportJob.objects.filter(pk=job.pk).update(status='processing')
+        run_import_job(job.pk)
+        job.refresh_from_db()
+
+        self.assertEqual(job.status, 'processing')
+        self.assertFalse(Order.objects.exists())
+
+    def test_stale_job_resumes_after_committed_rows(self):
+        """A processing job whose worker died is claimed again and skips the rows it had imported"""
+        job = self.create_job([
+            'DONE-1,Jane Doe,0501234567,Dubai,,1,10,,,,',
+            'NEXT-1,John Doe,0507654321,Deira,,1,10,,,,',
+        ])
+        Order.objects.create(customer='Jane Doe', store_link='https://example.com/p', order_code='DONE-1')
+        OrderImportJob.objects.filter(pk=job.pk).update(
+            status='processing',
+            processed_rows=1,
+            success_count=1,
+            updated_at=timezone.now() - STALE_AFTER - timedelta(minutes=1),
+        )
+        run_import_job(job.pk)
+        job.refresh_from_db()
+
+        self.assertEqual(job.status, 'completed')
+        self.assertEqual(job.processed_rows, 2)
+        self.assertEqual(job.success_count, 2)
+        self.assertEqual(job.error_count, 0)
+        self.assertEqual(Order.objects.filter(order_code='DONE-1').count(), 1)
+        self.assertTrue(Order.objects.filter(order_code='NEXT-1').exists())
+        # The summary counts the rows imported before the worker died
+        notification = Notification.objects.get(user=self.seller, notification_type='data_import')
+        self.assertEqual(notification.message, 'Successfully imported 2 orders from CSV file.')
+
+
+class OrderImportViewTests(TestCase):
+    """
+    Test suite for the import views
+    Covers: upload validation, job creation, status endpoint access
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        seller_role, _ = Role.objects.get_or_create(name='Seller')
+        cls.seller = User.objects.create_user(
+            email='view-seller@test.com',
+            password='testpass123',
+            is_active=True,
+        )
+        UserRole.objects.get_or_create(user=cls.seller, role=seller_role)
+        cls.other = User.objects.create_user(
+            email='view-other@test.com',
+            password='testpass123',
+            is_active=True,
+        )
+
+    def upload(self, url_name, content, name='orders.csv'):
+        return self.client.post(reverse(url_name), {
+            'file': SimpleUploadedFile(name, content.encode('utf-8'), content_type='text/csv'),
+        })
+
+    def test_seller_upload_queues_job(self):
+        """Uploading creates a job, queues it on commit and redirects to its progress page"""
+        self.client.force_login(self.seller)
+        with mock.patch('orders.tasks.import_orders_task.delay') as delay:
+            with self.captureOnCommitCallbacks(execute=True):
+                response = self.upload('sellers:import_orders', HEADER + '\n,Jane,0501234567,Dubai,,1,10,,,,')
+
+        job = OrderImportJob.objects.get()
+        self.assertRedirects(response, reverse('orders:import_job', args=[job.id]), fetch_redirect_response=False)
+        self.assertEqual(job.source, 'sellers')
+        self.assertEqual(job.seller, self.seller)
+        delay.assert_called_once_with(job.id)
+
+    def test_unavailable_broker_runs_inline(self):
+        self.client.force_login(self.seller)
+        with mock.patch('orders.tasks.import_orders_task.delay', side_effect=ConnectionError):
+            with self.captureOnCommitCallbacks(execute=True):
+                self.upload('orders:import', HEADER + '\n,Jane,0501234567,Dubai,,1,10,,,,')
+
+        self.assertEqual(OrderImportJob.objects.get().status, 'completed')
+        self.assertTrue(Order.objects.filter(customer='Jane').exists())
+
+    def test_rejects_non_csv(self):
+        self.client.force_login(self.seller)
+        response = self.upload('orders:import', 'data', name='orders.xlsx')
+        self.assertEqual(response.status_code, 200)
+        self.assertFalse(OrderImportJob.objects.exists())
+
+    def test_status_endpoint(self):
+        """Progress is visible to the uploader only"""
+        job = OrderImportJob.objects.create(
+            user=self.seller, seller=self.seller, status='processing', total_rows=10, processed_rows=5,
+            errors=[{'row': 3, 'message': 'Customer Name is required'}],
+        )
+        self.client.force_login(self.seller)
+        data = self.client.get(reverse('orders:import_job_status', args=[job.id])).json()
+        self.assertEqual(data['progress'], 50)
+        self.assertFalse(data['finished'])
+        self.assertEqual(data['errors'][0]['row'], 3)
+
+        self.client.force_login(self.other)
+        response = self.client.get(reverse('orders:import_job_status', args=[job.id]))
+        self.assertEqual(response.status_code, 404)
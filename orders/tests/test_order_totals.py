@@ -0,0 +1,110 @@
+"""
+Unit tests for the denormalized Order.total_amount column
+Tests: OrderItem sync signals, backfill_order_totals command
+"""
+
+from decimal import Decimal
+from io import StringIO
+
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.test import TestCase
+
+from orders.models import Order, OrderItem
+from sellers.models import Product
+
+User = get_user_model()
+
+
+class OrderTotalAmountTests(TestCase):
+    """
+    Test suite for keeping Order.total_amount in sync
+    Covers: legacy totals, item create/update/delete, status-only saves
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.seller = User.objects.create_user(
+            username='seller@test.com',
+            email='seller@test.com',
+            password='testpass123'
+        )
+        cls.product = Product.objects.create(
+            name_en='Total Product',
+            name_ar='Total Product',
+            code='TOT-001',
+            selling_price=Decimal('40.00'),
+            stock_quantity=100,
+            seller=cls.seller,
+        )
+
+    def create_order(self, **kwargs):
+        defaults = {
+            'customer': 'Customer',
+            'store_link': 'https://example.com/p',
+            'quantity': 2,
+            'price_per_unit': Decimal('15.00'),
+        }
+        defaults.update(kwargs)
+        return Order.objects.create(**defaults)
+
+    def test_new_order_uses_legacy_total(self):
+        """An order without items is valued at quantity x price_per_unit"""
+        order = self.create_order()
+        order.refresh_from_db()
+        self.assertEqual(order.total_amount, Decimal('30.00'))
+        self.assertEqual(order.total_price, Decimal('30.00'))
+
+    def test_items_keep_total_in_sync(self):
+        """Creating, updating and deleting items updates the stored total"""
+        order = self.create_order()
+        item = OrderItem.objects.create(order=order, product=self.product, quantity=2, price=Decimal('40.00'))
+        OrderItem.objects.create(order=order, product=self.product, quantity=1, price=Decimal('5.00'))
+        order.refresh_from_db()
+        self.assertEqual(order.total_amount, Decimal('85.00'))
+
+        item.quantity = 3
+        item.save()
+        order.refresh_from_db()
+        self.assertEqual(order.total_amount, Decimal('125.00'))
+
+        item.delete()
+        order.refresh_from_db()
+        self.assertEqual(order.total_amount, Decimal('5.00'))
+
+    def test_total_price_does_not_query_items(self):
+        """total_price reads the stored column"""
+        order = self.create_order()
+        OrderItem.objects.create(order=order, product=self.product, quantity=1, price=Decimal('40.00'))
+        order = Order.objects.get(pk=order.pk)
+        with self.assertNumQueries(0):
+            self.assertEqual(order.total_price, Decimal('40.00'))
+
+    def test_pricing_change_recomputes_legacy_total(self):
+        """Changing legacy pricing on an order without items refreshes the total"""
+        order = Order.objects.get(pk=self.create_order().pk)
+        order.quantity = 4
+        order.save()
+        order.refresh_from_db()
+        self.assertEqual(order.total_amount, Decimal('60.00'))
+
+    def test_backfill_command_fills_missing_totals(self):
+        """The backfill command computes totals for orders without one"""
+        legacy = self.create_order()
+        with_items = self.create_order()
+        OrderItem.objects.create(order=with_items, product=self.product, quantity=2, price=Decimal('40.00'))
+        Order.objects.update(total_amount=None)
+
+        out = StringIO()
+        call_command('backfill_order_totals', batch_size=1, stdout=out)
+
+        legacy.refresh_from_db()
+        with_items.refresh_from_db()
+        self.assertEqual(legacy.total_amount, Decimal('30.00'))
+        self.assertEqual(with_items.total_amount, Decimal('80.00'))
+        self.assertIn('Successfully backfilled totals for 2 orders', out.getvalue())
+
+        # Re-running is a no-op once everything is filled
+        out = StringIO()
+        call_command('backfill_order_totals', stdout=out)
+        self.assertIn('for 0 orders', out.getvalue())
@@ -0,0 +1,265 @@
+"""
+Unit tests for the deferred Order side effect dispatcher
+Tests: event collection, per-order merging, field filters, handlers
+"""
+
+from decimal import Decimal
+from unittest import mock
+
+from django.contrib.auth import get_user_model
+from django.db import transaction
+from django.test import TestCase, override_settings
+
+from finance.models import OrderFee
+from notifications.models import Notification
+from orders import side_effects
+from orders.models import Order
+from orders.side_effects import OrderSideEffect, run_payloads
+from roles.models import Role, UserRole
+
+User = get_user_model()
+
+
+def recording_handler():
+    """Handler that records the events of every call"""
+    def handler(events):
+        handler.calls.append(list(events))
+    handler.calls = []
+    return handler
+
+
+class SideEffectDispatcherTests(TestCase):
+    """
+    Test suite for orders.side_effects
+    Covers: deferral until commit, merging, field filters, rollback, Celery payloads
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.seller = User.objects.create_user(
+            email='effects-seller@test.com',
+            password='testpass123',
+            is_active=True,
+        )
+
+    def setUp(self):
+        self.created = recording_handler()
+        self.status = recording_handler()
+        handlers = [
+            OrderSideEffect(self.created, on_create=True),
+            OrderSideEffect(self.status, fields=('status',)),
+        ]
+        patcher = mock.patch.object(side_effects, '_handlers', handlers)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def create_order(self, **kwargs):
+        defaults = {
+            'customer': 'Customer',
+            'store_link': 'https://example.com/p',
+            'seller': self.seller,
+            'price_per_unit': Decimal('10.00'),
+        }
+        defaults.update(kwargs)
+        return Order.objects.create(**defaults)
+
+    def committed_order(self):
+        """An order created (and dispatched) in its own transaction, freshly loaded"""
+        with self.captureOnCommitCallbacks(execute=True):
+            order = self.create_order()
+        self.created.calls.clear()
+        return Order.objects.get(pk=order.pk)
+
+    def test_runs_after_commit(self):
+        """Nothing runs until the transaction commits"""
+        with self.captureOnCommitCallbacks() as callbacks:
+            self.create_order()
+            self.assertEqual(self.created.calls, [])
+        for callback in callbacks:
+            callback()
+        self.assertEqual(len(self.created.calls), 1)
+
+    def test_saves_merged_per_order(self):
+        """Several saves of one order become one event; handlers run once per batch"""
+        with self.captureOnCommitCallbacks(execute=True):
+            first = self.create_order()
+            second = self.create_order()
+            first.status = 'confirmed'
+            first.save()
+            first.status = 'cancelled'
+            first.save()
+
+        self.assertEqual(len(self.created.calls), 1)
+        self.assertEqual({event.order.pk for event in self.created.calls[0]}, {first.pk, second.pk})
+
+        self.assertEqual(len(self.status.calls), 1)
+        [event] = self.status.calls[0]
+        self.assertEqual(event.order.pk, first.pk)
+        self.assertEqual(event.previous['status'], 'pending')
+        self.assertEqual(event.order.status, 'cancelled')
+
+    def test_unrelated_fields_skip_handlers(self):
+        order = self.committed_order()
+        with self.captureOnCommitCallbacks(execute=True):
+            order.notes = 'Leave at the door'
+            order.save()
+            order.save()
+        self.assertEqual(self.status.calls, [])
+
+    def test_update_fields_limit_changes(self):
+        """Only fields that were saved are compared"""
+        order = self.committed_order()
+        with self.captureOnCommitCallbacks(execute=True):
+            order.status = 'confirmed'
+            order.notes = 'changed'
+            order.save(update_fields=['notes'])
+        self.assertEqual(self.status.calls, [])
+
+    def test_rollback_discards_events(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            try:
+                with transaction.atomic():
+                    self.create_order()
+                    raise RuntimeError
+            except RuntimeError:
+                pass
+            kept = self.create_order()
+        self.assertEqual([[event.order.pk for event in call] for call in self.created.calls], [[kept.pk]])
+
+    def test_rolled_back_savepoint_discards_its_events(self):
+        """Saves in a savepoint that rolls back are dropped even when the transaction already has events"""
+        order = self.committed_order()
+        with self.captureOnCommitCallbacks(execute=True):
+            kept = self.create_order()
+            try:
+                with transaction.atomic():
+                    self.create_order()
+                    order.status = 'confirmed'
+                    order.save()
+                    raise RuntimeError
+            except RuntimeError:
+                pass
+        self.assertEqual([[event.order.pk for event in call] for call in self.created.calls], [[kept.pk]])
+        self.assertEqual(self.status.calls, [])
+
+    def test_savepoint_events_merged_after_commit(self):
+        """Saves inside and outside a committed savepoint become one event per order"""
+        order = self.committed_order()
+        with self.captureOnCommitCallbacks(execute=True):
+            order.status = 'confirmed'
+            order.save()
+            with transaction.atomic():
+                order.status = 'processing'
+                order.save()
+            order.status = 'cancelled'
+            order.save()
+
+        self.assertEqual(len(self.status.calls), 1)
+        [event] = self.status.calls[0]
+        self.assertEqual(event.previous['status'], 'pending')
+        self.assertEqual(event.order.status, 'cancelled')
+
+    @override_settings(ORDER_SIDE_EFFECTS_ASYNC=True)
+    def test_async_handlers_sent_to_celery(self):
+        """run_async handlers are queued with a JSON payload and rebuilt by the task"""
+        handler = OrderSideEffect(self.status, fields=('status',), run_async=True)
+        order = self.committed_order()
+        with mock.patch.object(side_effects, '_handlers', [handler]), \
+                mock.patch('orders.tasks.run_order_side_effect.delay') as delay:
+            with self.captureOnCommitCallbacks(execute=True):
+                order.status = 'confirmed'
+                order.save()
+
+            path, payloads = delay.call_args.args
+            self.assertEqual(self.status.calls, [])
+            self.assertEqual(payloads, [{
+                'order_id': order.pk, 'created': False,
+                'changed_fields': ['status'], 'previous': {'status': 'pending'},
+            }])
+
+            self.assertEqual(run_payloads(path, payloads), 1)
+        self.assertEqual(self.status.calls[0][0].order.pk, order.pk)
+
+
+class OrderSideEffectHandlerTests(TestCase):
+    """
+    Test suite for the registered Order side effects
+    Covers: fees, notifications and assignments for new and updated orders
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.seller = User.objects.create_user(
+            email='handler-seller@test.com',
+            password='testpass123',
+            is_active=True,
+        )
+        admin_role, _ = Role.objects.get_or_create(name='Admin')
+        cls.admins = []
+        for i in range(3):
+            admin = User.objects.create_user(
+                email=f'handler-admin{i}@test.com',
+                password='testpass123',
+                is_active=True,
+            )
+            UserRole.objects.create(user=admin, role=admin_role)
+            cls.admins.append(admin)
+
+    def create_order(self, **kwargs):
+        defaults = {
+            'customer': 'Customer',
+            'store_link': 'https://example.com/p',
+            'seller': self.seller,
+            'quantity': 2,
+            'price_per_unit': Decimal('50.00'),
+        }
+        defaults.update(kwargs)
+        return Order.objects.create(**defaults)
+
+    def test_new_orders_get_fees_and_notifications(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            orders = [self.create_order() for _ in range(3)]
+
+        self.assertEqual(OrderFee.objects.filter(order__in=orders).count(), 3)
+        self.assertEqual(Notification.objects.filter(user=self.seller, notification_type='new_order').count(), 3)
+        self.assertEqual(Notification.objects.filter(user__in=self.admins, notification_type='new_order').count(), 9)
+
+    def test_notifications_inserted_in_one_query(self):
+        """Admin fan-out is a single INSERT regardless of admin count"""
+        with self.captureOnCommitCallbacks() as callbacks:
+            self.create_order()
+            self.create_order()
+        with mock.patch.object(side_effects, '_handlers', [
+            handler for handler in side_effects._handlers if handler.func.__name__ == 'create_order_notifications'
+        ]):
+            # in_bulk sellers, admin users, savepoint + bulk insert
+            with self.assertNumQueries(5):
+                for callback in callbacks:
+                    callback()
+
+    def test_cancellation_updates_fee(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            order = self.create_order()
+        with self.captureOnCommitCallbacks(execute=True):
+            order.status = 'cancelled'
+            order.save()
+
+        fee = OrderFee.objects.get(order=order)
+        self.assertEqual(fee.cancellation_fee, Decimal('5.00'))
+        self.assertEqual(fee.total_fees, fee.seller_fee + fee.upsell_fee + fee.confirmation_fee
+                         + fee.cancellation_fee + fee.fulfillment_fee + fee.shipping_fee
+                         + fee.return_fee + fee.warehouse_fee)
+
+    def test_workflow_change_notifies_seller(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            order = self.create_order()
+        order = Order.objects.get(pk=order.pk)
+        with self.captureOnCommitCallbacks(execute=True):
+            order.workflow_status = 'callcenter_review'
+            order.save()
+            order.status = 'confirmed'
+            order.save()
+
+        self.assertEqual(
+            Notification.objects.filter(user=self.seller, notification_type='order_status_changed').count(), 1
+        )
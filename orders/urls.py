@@ -15,6 +15,8 @@ urlpatterns = [
     # Import/Export
     path('import/', views.import_orders, name='import'),
     path('bulk-import/', views.import_orders, name='bulk_import'),
+    path('import/<int:job_id>/', views.import_job_progress, name='import_job'),
+    path('import/<int:job_id>/status/', views.import_job_status, name='import_job_status'),
     path('export/', views.download_template, name='export'),
 
     # Returns convenience URL
@@ -33,6 +35,7 @@ urlpatterns = [
     # API endpoints
     path('api/available-agents-count/', views.available_agents_count, name='available_agents_count'),
     path('api/get-states-for-city/', views.get_states_for_city_api, name='get_states_for_city'),
+    path('api/areas/autocomplete/', views.area_autocomplete_api, name='area_autocomplete'),
 
     # Return Management System
     path('', include('orders.return_urls')),
@@ -4,7 +4,7 @@ from django.http import JsonResponse, HttpResponse
 from django.db.models import Q
 from django.contrib import messages
 from django.utils import timezone
-from .models import Order, OrderItem
+from .models import Order, OrderItem, generate_order_code
 from .forms import OrderForm, OrderStatusUpdateForm, OrderImportForm
 from users.models import User
 from users.models import AuditLog
@@ -14,8 +14,6 @@ from django.contrib.auth.mixins import LoginRequiredMixin
 from django.views.generic import ListView, DetailView, CreateView, UpdateView
 from django.urls import reverse_lazy
 import csv
-import io
-from datetime import datetime
 
 
 @login_required
@@ -303,7 +301,7 @@ def create_order(request):
             
             # Generate order code if not provided
             if not order.order_code:
-                order.order_code = _generate_order_code()
+                order.order_code = generate_order_code()
             
             # Handle agent assignment
             assignment_type = request.POST.get('assignment_type', 'auto')
@@ -672,35 +670,6 @@ def _can_update_status(user, order):
     
     return False
 
-def _generate_order_code():
-    """Generate a shorter order code with # prefix"""
-    import random
-    from django.utils import timezone
-    
-    # Get the next order number
-    today = timezone.now().date()
-    year = today.year
-    month = today.month
-    day = today.day
-    
-    # Create a shorter format: #YYMMDDXXX (e.g., #250122001)
-    date_part = f"{year % 100:02d}{month:02d}{day:02d}"
-    
-    # Find the next sequential number for today
-    existing_orders_today = Order.objects.filter(
-        order_code__startswith=f"#{date_part}"
-    ).count()
-    
-    order_number = existing_orders_today + 1
-    code = f"#{date_part}{order_number:03d}"
-    
-    # Ensure code is unique
-    while Order.objects.filter(order_code=code).exists():
-        order_number += 1
-        code = f"#{date_part}{order_number:03d}"
-    
-    return code
-
 class OrderListView(LoginRequiredMixin, ListView):
     model = Order
     template_name = 'orders/order_list.html'
@@ -815,7 +784,7 @@ class OrderCreateView(LoginRequiredMixin, CreateView):
         
         # Generate order code if not provided
         if not order.order_code:
-            order.order_code = _generate_order_code()
+            order.order_code = generate_order_code()
         
         order.save()
         
@@ -947,396 +916,74 @@ def download_template(request):
 
 @login_required
 def import_orders(request):
-    """Import orders from CSV file with improved error handling and validation."""
+    """Upload a CSV file and import its orders in a background job."""
+    from .importers import OrderImportError, start_import_job
+
     if request.method == 'POST':
         form = OrderImportForm(request.POST, request.FILES, user=request.user)
         if form.is_valid():
+            # Determine the seller for the imported orders
+            user_role = request.user.primary_role.name if request.user.primary_role else None
+
+            if user_role in ['Admin', 'Super Admin']:
+                # For admins, use the selected seller from the form
+                seller = form.cleaned_data.get('seller') or request.user
+            else:
+                seller = request.user
+
             try:
-                file = request.FILES.get('file')
-                if not file:
-                    messages.error(request, 'No file was uploaded.')
-                    return render(request, 'orders/import_orders.html', {'form': form})
-                
-                # Validate file type
-                if not file.name.lower().endswith('.csv'):
-                    messages.error(request, 'Please upload a CSV file (.csv extension).')
-                    return render(request, 'orders/import_orders.html', {'form': form})
-                
-                # Check file size (max 5MB) 
-                if file.size > 5 * 1024 * 1024:
-                    messages.error(request, 'File size must be less than 5MB.')
-                    return render(request, 'orders/import_orders.html', {'form': form})
-                
-                try:
-                    # Try UTF-8 first
-                    decoded_file = file.read().decode('utf-8')
-                except UnicodeDecodeError:
-                    # Try with different encoding
-                    file.seek(0)  # Reset file pointer
-                    try:
-                        decoded_file = file.read().decode('latin-1')
-                    except UnicodeDecodeError:
-                        messages.error(request, 'Unable to read file. Please ensure it is a valid CSV file.')
-                        return render(request, 'orders/import_orders.html', {'form': form})
-                
-                csv_data = csv.reader(io.StringIO(decoded_file))
-                
-                # Validate header row
-                try:
-                    header = next(csv_data)
-                    expected_columns = ['Order Code', 'Customer Name', 'Mobile Number', 'Shipping Address', 'Product ID/Code', 'Quantity', 'Price']
-                    
-                    # Log the actual headers for debugging
-                    print(f"CSV Headers: {header}")
-                    print(f"Expected columns: {expected_columns}")
-                    print(f"Header length: {len(header)}")
-                    
-                    # More flexible header validation - check if we have the essential columns
-                    essential_columns = ['Customer Name', 'Mobile Number', 'Shipping Address', 'Product Link']
-                    found_essential = 0
-                    
-                    for col in essential_columns:
-                        if any(col.lower() in h.lower() for h in header):
-                            found_essential += 1
-                    
-                    if found_essential < 4:  # Need all 4 essential columns
-                        messages.error(request, f'CSV file must have all essential columns: Customer Name, Mobile Number, Shipping Address, Product Link. Found {found_essential} essential columns.')
-                        return render(request, 'orders/import_orders.html', {'form': form})
-                    
-                except StopIteration:
-                    messages.error(request, 'CSV file is empty or invalid.')
-                    return render(request, 'orders/import_orders.html', {'form': form})
-                
-                success_count = 0
-                error_count = 0
-                warnings = []
-                errors = []
-                
-                for row_num, row in enumerate(csv_data, start=2):  # Start from 2 because we skipped header
-                    try:
-                        # Skip empty rows
-                        if not row or all(cell.strip() == '' for cell in row):
-                            continue
-                        
-                        # Ensure we have minimum required data
-                        if len(row) < 4:  # Need at least 4 columns for essential data
-                            errors.append(f"Row {row_num}: Insufficient columns (need at least 4: Customer Name, Mobile Number, Shipping Address, Product ID/Code)")
-                            error_count += 1
-                            continue
-                        
-                        # Parse row data with flexible validation
-                        # Try to find columns by content rather than position
-                        order_code = None
-                        customer_name = None
-                        mobile_number = None
-                        address = None
-                        product_id = None
-                        quantity = 1
-                        price = 0.0
-                        product_variant = ''
-                        notes = ''
-                        order_date_str = ''
-                        
-                        # Parse each column based on content
-                        for i, cell in enumerate(row):
-                            cell_value = cell.strip() if cell else ''
-                            if not cell_value:
-                                continue
-                                
-                            # Try to identify column type by content
-                            if i == 0:  # First column - could be Order Code or Customer Name
-                                if cell_value.startswith('SKU-') or cell_value.startswith('ORD-'):
-                                    order_code = cell_value
-                                else:
-                                    customer_name = cell_value
-                            elif i == 1:  # Second column
-                                if not customer_name:
-                                    customer_name = cell_value
-                                elif not mobile_number and (cell_value.isdigit() or cell_value.startswith('+') or cell_value.startswith('0')):
-                                    mobile_number = cell_value
-                                else:
-                                    address = cell_value
-                            elif i == 2:  # Third column
-                                if not mobile_number and (cell_value.isdigit() or cell_value.startswith('+') or cell_value.startswith('0')):
-                                    mobile_number = cell_value
-                                elif not address:
-                                    address = cell_value
-                                elif not product_id:
-                                    product_id = cell_value
-                            elif i == 3:  # Fourth column
-                                if not address:
-                                    address = cell_value
-                                elif not product_id:
-                                    product_id = cell_value
-                                elif not mobile_number and (cell_value.isdigit() or cell_value.startswith('+') or cell_value.startswith('0')):
-                                    mobile_number = cell_value
-                            elif i == 4:  # Fifth column
-                                if not product_id:
-                                    product_id = cell_value
-                                elif not mobile_number and (cell_value.isdigit() or cell_value.startswith('+') or cell_value.startswith('0')):
-                                    mobile_number = cell_value
-                            elif i == 5:  # Sixth column - could be quantity or price
-                                try:
-                                    if '.' in cell_value:  # Likely price
-                                        price = float(cell_value)
-                                    else:  # Likely quantity
-                                        quantity = int(float(cell_value))
-                                except (ValueError, TypeError):
-                                    pass
-                            elif i == 6:  # Seventh column - could be price or quantity
-                                try:
-                                    if '.' in cell_value:  # Likely price
-                                        price = float(cell_value)
-                                    else:  # Likely quantity
-                                        quantity = int(float(cell_value))
-                                except (ValueError, TypeError):
-                                    pass
-                            elif i == 7:  # Eighth column
-                                product_variant = cell_value
-                            elif i == 8:  # Ninth column
-                                notes = cell_value
-                            elif i == 9:  # Tenth column
-                                order_date_str = cell_value
-                        
-                        # Set default values if not found
-                        if not customer_name:
-                            customer_name = 'Unknown Customer'
-                        if not mobile_number:
-                            mobile_number = '0000000000'
-                        if not address:
-                            address = 'Address not provided'
-                        if not product_id:
-                            product_id = 'Unknown Product'
-                        
-                        # Ensure quantity and price are valid
-                        if quantity <= 0:
-                            quantity = 1
-                        if price < 0:
-                            price = 0.0
-                        
-                        # Validate required fields
-                        if not customer_name or customer_name == 'Unknown Customer':
-                            errors.append(f"Row {row_num}: Customer name is required")
-                            error_count += 1
-                            continue
-                        
-                        if not mobile_number:
-                            errors.append(f"Row {row_num}: Mobile number is required")
-                            error_count += 1
-                            continue
-                        
-                        if not address:
-                            errors.append(f"Row {row_num}: Shipping address is required")
-                            error_count += 1
-                            continue
-                        
-                        if not product_id:
-                            errors.append(f"Row {row_num}: Product ID/Code is required. Use the exact product code or name from the system.")
-                            error_count += 1
-                            continue
-                        
-                        if quantity <= 0:
-                            errors.append(f"Row {row_num}: Quantity must be greater than 0")
-                            error_count += 1
-                            continue
-                        
-                        if price < 0:
-                            errors.append(f"Row {row_num}: Price cannot be negative")
-                            error_count += 1
-                            continue
-                        
-                        # Parse order date
-                        try:
-                            if order_date_str:
-                                order_date = datetime.strptime(order_date_str, '%Y-%m-%d')
-                            else:
-                                order_date = timezone.now()
-                        except ValueError:
-                            order_date = timezone.now()
-                        
-                        # Find product by ID or code (prioritize exact code match)
-                        product = None
-                        if product_id:
-                            product_id_clean = product_id.strip()
-                            
-                            # First try to find by exact code match (highest priority)
-                            try:
-                                product = Product.objects.get(code=product_id_clean)
-                            except Product.DoesNotExist:
-                                pass
-                            
-                            # If no exact code match, try by partial code match
-                            if not product:
-                                product = Product.objects.filter(code__icontains=product_id_clean).first()
-                            
-                            # If still no product found, try by exact name match
-                            if not product:
-                                product = Product.objects.filter(name_en__iexact=product_id_clean).first()
-                            
-                            # If still no product found, try by partial name match
-                            if not product:
-                                product = Product.objects.filter(name_en__icontains=product_id_clean).first()
-                            
-                            # If still no product found, try by Arabic name
-                            if not product:
-                                product = Product.objects.filter(name_ar__icontains=product_id_clean).first()
-                            
-                            # If still no product found, try by product ID (numeric)
-                            if not product and product_id_clean.isdigit():
-                                try:
-                                    product = Product.objects.get(id=int(product_id_clean))
-                                except (Product.DoesNotExist, ValueError):
-                                    pass
-                        
-                        # Check if product was found - if not, create order without product
-                        if not product:
-                            # Log warning but continue processing
-                            warnings.append(f"Row {row_num}: Product not found for ID/Code '{product_id}'. Order will be created without product link.")
-                            # Continue without product - order will be created with product=None
-                        
-                        # Check if order already exists
-                        if order_code and Order.objects.filter(order_code=order_code).exists():
-                            errors.append(f"Row {row_num}: Order code '{order_code}' already exists")
-                            error_count += 1
-                            continue
-                        
-                        # Determine the seller for this order
-                        user_role = request.user.primary_role.name if request.user.primary_role else None
-                        
-                        if user_role == 'Seller':
-                            seller = request.user
-                        elif user_role in ['Admin', 'Super Admin']:
-                            # For admins, use the selected seller from the form
-                            seller = form.cleaned_data.get('seller') or request.user
-                        else:
-                            seller = request.user
-                        
-                        # Prepare notes with Product Variant if provided
-                        order_notes = notes
-                        if product_variant:
-                            if order_notes:
-                                order_notes = f"{order_notes}\nProduct Variant: {product_variant}"
-                            else:
-                                order_notes = f"Product Variant: {product_variant}"
-                        
-                        # Check if there are multiple variants separated by commas
-                        variants = []
-                        if product_variant:
-                            # Split by comma and clean each variant
-                            variants = [variant.strip() for variant in product_variant.split(',') if variant.strip()]
-                        
-                        # If multiple variants, create separate orders for each variant
-                        if len(variants) > 1:
-                            for i, variant in enumerate(variants):
-                                # Create unique order code for each variant
-                                variant_order_code = f"{order_code or _generate_order_code()}-V{i+1}" if order_code else _generate_order_code()
-                                
-                                # Prepare notes for this variant
-                                variant_notes = order_notes
-                                if variant_notes:
-                                    variant_notes = f"{variant_notes}\nProduct Variant: {variant}"
-                                else:
-                                    variant_notes = f"Product Variant: {variant}"
-                                
-                                # Create order for this variant
-                                order = Order.objects.create(
-                                    order_code=variant_order_code,
-                                    customer=customer_name,
-                                    customer_phone=mobile_number,
-                                    shipping_address=address,
-                                    street_address='',  # Street address not available in CSV import
-                                    product=product,
-                                    quantity=quantity,
-                                    price_per_unit=price,
-                                    notes=variant_notes,
-                                    date=order_date,
-                                    status='pending',
-                                    seller=seller,
-                                    seller_email=seller.email
-                                )
-                                
-                                # Create audit log for this variant
-                                AuditLog.objects.create(
-                                    user=request.user,
-                                    action='import',
-                                    entity_type='Order',
-                                    entity_id=str(order.id),
-                                    description=f"Imported order {order.order_code} from CSV with product: {product.name_en if product else 'Unknown'} (Code: {product.code if product else 'Unknown'}) - Variant: {variant}"
-                                )
-                        else:
-                            # Single variant or no variants - create single order
-                            order = Order.objects.create(
-                                order_code=order_code or _generate_order_code(),
-                                customer=customer_name,
-                                customer_phone=mobile_number,
-                                shipping_address=address,
-                                street_address='',  # Street address not available in CSV import
-                                product=product,
-                                quantity=quantity,
-                                price_per_unit=price,
-                                notes=order_notes,
-                                date=order_date,
-                                status='pending',
-                                seller=seller,
-                                seller_email=seller.email
-                            )
-                            
-                            # Create audit log
-                            AuditLog.objects.create(
-                                user=request.user,
-                                action='import',
-                                entity_type='Order',
-                                entity_id=str(order.id),
-                                description=f"Imported order {order.order_code} from CSV with product: {product.name_en if product else 'Unknown'} (Code: {product.code if product else 'Unknown'})"
-                            )
-                        
-                        success_count += 1
-                        
-                        # Create audit log
-                        AuditLog.objects.create(
-                            user=request.user,
-                            action='import',
-                            entity_type='Order',
-                            entity_id=str(order.id),
-                            description=f"Imported order {order.order_code} from CSV with product: {product.name_en} (Code: {product.code})"
-                        )
-                        
-                    except Exception as e:
-                        errors.append(f"Row {row_num}: {str(e)}")
-                        error_count += 1
-                
-                # Show results
-                if success_count > 0:
-                    messages.success(request, f'Successfully imported {success_count} orders.')
-                
-                if warnings:
-                    messages.info(request, f'Found {len(warnings)} warnings during import.')
-                    for warning in warnings[:5]:  # Show first 5 warnings
-                        messages.warning(request, warning)
-                    if len(warnings) > 5:
-                        messages.warning(request, f'... and {len(warnings) - 5} more warnings.')
-                
-                if error_count > 0:
-                    messages.error(request, f'Failed to import {error_count} orders. Check the errors below.')
-                    for error in errors[:10]:  # Show first 10 errors
-                        messages.error(request, error)
-                    if len(errors) > 10:
-                        messages.error(request, f'... and {len(errors) - 10} more errors.')
-                
-                return redirect('orders:list')
-                
-            except Exception as e:
-                messages.error(request, f'Error processing file: {str(e)}')
-                print(f"Import error: {e}")
+                job = start_import_job(request.user, seller, request.FILES.get('file'), source='orders')
+            except OrderImportError as e:
+                messages.error(request, str(e))
+                return render(request, 'orders/import_orders.html', {'form': form})
+
+            messages.success(request, 'Your file was uploaded. Orders are being imported in the background.')
+            return redirect('orders:import_job', job_id=job.id)
         else:
             messages.error(request, 'Please correct the errors below.')
-            print(f"Form errors: {form.errors}")
     else:
         form = OrderImportForm(user=request.user)
     
     return render(request, 'orders/import_orders.html', {'form': form})
 
 
+def _get_import_job(request, job_id):
+    from .models import OrderImportJob
+
+    jobs = OrderImportJob.objects.select_related('seller')
+    if not (request.user.is_superuser or request.user.has_role('Admin') or request.user.has_role('Super Admin')):
+        jobs = jobs.filter(user=request.user)
+    return get_object_or_404(jobs, id=job_id)
+
+
+@login_required
+def import_job_progress(request, job_id):
+    """Progress page for a background order import."""
+    job = _get_import_job(request, job_id)
+    back_url = 'sellers:orders' if job.source == 'sellers' else 'orders:list'
+    return render(request, 'orders/import_progress.html', {'job': job, 'back_url': back_url})
+
+
+@login_required
+def import_job_status(request, job_id):
+    """JSON progress of a background order import, polled by the progress page."""
+    job = _get_import_job(request, job_id)
+    return JsonResponse({
+        'id': job.id,
+        'status': job.status,
+        'status_display': job.get_status_display(),
+        'finished': job.is_finished,
+        'progress': job.progress_percent,
+        'total_rows': job.total_rows,
+        'processed_rows': job.processed_rows,
+        'success_count': job.success_count,
+        'error_count': job.error_count,
+        'errors': job.errors,
+        'warnings': job.warnings,
+        'message': job.message,
+    })
+
+
 @login_required
 def distribute_orders(request):
     """Distribute unassigned orders to available agents using round-robin method."""
@@ -1502,6 +1149,32 @@ def get_states_for_city_api(request):
         'states': states_list
     })
 
+
+@login_required
+def area_autocomplete_api(request):
+    """API endpoint for city/area typeahead in Arabic or English - requires authentication."""
+    query = request.GET.get('q', '').strip()
+    if not query:
+        return JsonResponse({'success': True, 'results': []})
+
+    try:
+        limit = int(request.GET.get('limit', 10))
+    except ValueError:
+        limit = 10
+
+    from .area_search import search_areas
+    results = search_areas(
+        query,
+        city=request.GET.get('city') or None,
+        limit=limit,
+        areas_only=request.GET.get('type') == 'area',
+    )
+
+    return JsonResponse({
+        'success': True,
+        'results': [entry.as_dict() for entry in results]
+    })
+
 @login_required
 def available_agents_count(request):
     """API endpoint to get count of available Call Center Agents - requires authentication."""
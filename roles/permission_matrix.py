@@ -0,0 +1,89 @@
+"""
+Compiled role permission matrix.
+
+Maps ``role_id -> frozenset({(module, codename), ...})`` for every granted
+``RolePermission``. The matrix is built with one query, shared through the
+Django cache and kept in process memory, so permission checks are plain set
+lookups. A small version token in the cache tells each process when its copy
+is stale; it is dropped whenever roles or permissions change (see
+users.signals) and the next reader rebuilds the matrix.
+"""
+import uuid
+
+from django.core.cache import cache
+from django.db import transaction
+
+MATRIX_VERSION_KEY = 'roles_permission_matrix_version'
+MATRIX_CACHE_KEY = 'roles_permission_matrix'
+
+EMPTY_PERMISSIONS = frozenset()
+
+_local = {'version': None, 'matrix': {}}
+
+
+def build_permission_matrix():
+    """Build the matrix from the database and publish it to the cache."""
+    from .models import RolePermission
+
+    matrix = {}
+    rows = RolePermission.objects.filter(granted=True).values_list(
+        'role_id', 'permission__module', 'permission__codename'
+    )
+    for role_id, module, codename in rows:
+        matrix.setdefault(role_id, set()).add((module, codename))
+
+    version = uuid.uuid4().hex
+    cache.set(MATRIX_CACHE_KEY, (version, {role_id: tuple(perms) for role_id, perms in matrix.items()}), None)
+    cache.set(MATRIX_VERSION_KEY, version, None)
+    return _remember(version, matrix)
+
+
+def _remember(version, data):
+    matrix = {role_id: frozenset(perms) for role_id, perms in data.items()}
+    _local['version'] = version
+    _local['matrix'] = matrix
+    return matrix
+
+
+def get_permission_matrix():
+    """Return the current matrix, from process memory whenever possible."""
+    version = cache.get(MATRIX_VERSION_KEY)
+    if version is not None and version == _local['version']:
+        return _local['matrix']
+
+    cached = cache.get(MATRIX_CACHE_KEY)
+    if version is not None and cached is not None and cached[0] == version:
+        return _remember(*cached)
+
+    return build_permission_matrix()
+
+
+def get_role_permissions(role_id):
+    """Granted (module, codename) pairs for a single role."""
+    return get_permission_matrix().get(role_id, EMPTY_PERMISSIONS)
+
+
+def get_permissions_for_roles(role_ids):
+    """Union of granted (module, codename) pairs for several roles."""
+    matrix = get_permission_matrix()
+    permissions = set()
+    for role_id in role_ids:
+        permissions |= matrix.get(role_id, EMPTY_PERMISSIONS)
+    return frozenset(permissions)
+
+
+def _drop_version():
+    cache.delete(MATRIX_VERSION_KEY)
+    _local['version'] = None
+
+
+def invalidate_permission_matrix():
+    """
+    Mark the matrix stale; the next reader rebuilds it.
+
+    The version is dropped immediately and again after the surrounding
+    transaction commits, so a matrix rebuilt from pre-commit data cannot
+    outlive the change. Bulk grant updates cost one rebuild, not one per row.
+    """
+    _drop_version()
+    transaction.on_commit(_drop_version)
@@ -1,3 +1,95 @@
+"""
+Unit tests for the compiled role permission matrix
+Tests: matrix build/invalidation, sync_user_permissions task
+"""
+
+from django.contrib.auth import get_user_model
+from django.contrib.auth.models import Permission as AuthPermission
+from django.core.cache import cache
 from django.test import TestCase
 
-# Create your tests here.
+from roles.models import Role, Permission, RolePermission, UserRole
+from roles.permission_matrix import get_permission_matrix, get_role_permissions
+from users.tasks import sync_user_permissions
+
+User = get_user_model()
+
+
+class PermissionMatrixTests(TestCase):
+    """
+    Test suite for roles.permission_matrix
+    Covers: one-query build, in-memory reads, rebuild on grant changes
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.role, _ = Role.objects.get_or_create(name='Matrix Role')
+        cls.permission = Permission.objects.create(
+            name='Export Orders',
+            codename='matrix_export_orders',
+            permission_type='export',
+            module='orders',
+        )
+        RolePermission.objects.create(role=cls.role, permission=cls.permission)
+
+    def setUp(self):
+        cache.clear()
+
+    def test_matrix_built_once_then_served_from_memory(self):
+        """The first read builds the matrix, later reads cost no queries"""
+        with self.assertNumQueries(1):
+            get_permission_matrix()
+        with self.assertNumQueries(0):
+            self.assertIn(('orders', 'matrix_export_orders'), get_role_permissions(self.role.id))
+
+    def test_revoked_grant_is_rebuilt(self):
+        """Denying a grant drops it from the matrix"""
+        self.assertIn(('orders', 'matrix_export_orders'), get_role_permissions(self.role.id))
+
+        role_permission = RolePermission.objects.get(role=self.role, permission=self.permission)
+        role_permission.granted = False
+        role_permission.save()
+
+        self.assertNotIn(('orders', 'matrix_export_orders'), get_role_permissions(self.role.id))
+
+    def test_permission_rename_is_rebuilt(self):
+        """Renaming a permission's module is reflected in the matrix"""
+        get_permission_matrix()
+        self.permission.module = 'finance'
+        self.permission.save()
+        self.assertIn(('finance', 'matrix_export_orders'), get_role_permissions(self.role.id))
+
+
+class SyncUserPermissionsTests(TestCase):
+    """
+    Test suite for users.tasks.sync_user_permissions
+    Covers: mapping role grants to Django auth permissions
+    """
+
+    def setUp(self):
+        cache.clear()
+
+    def test_role_grants_synced_to_auth_permissions(self):
+        """Users receive the auth permissions matching their role grants"""
+        user = User.objects.create_user(
+            username='sync@test.com',
+            email='sync@test.com',
+            password='testpass123',
+            is_active=True
+        )
+        auth_permission = AuthPermission.objects.get(
+            content_type__app_label='orders', codename='view_order'
+        )
+        role, _ = Role.objects.get_or_create(name='Sync Role')
+        permission = Permission.objects.create(
+            name='View Order', codename='view_order', permission_type='read', module='orders'
+        )
+        RolePermission.objects.create(role=role, permission=permission)
+        UserRole.objects.create(user=user, role=role)
+
+        result = sync_user_permissions()
+        self.assertEqual(result['status'], 'success')
+        self.assertIn(auth_permission, user.user_permissions.all())
+
+        # Nothing changes on a second run
+        self.assertEqual(sync_user_permissions()['synced'], 0)
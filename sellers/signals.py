@@ -41,19 +41,18 @@ def create_product_notification(sender, instance, created, **kwargs):
                     is_active=True
                 ).distinct()
                 
-                # Create notifications for each admin
-                for admin_user in admin_users:
-                    Notification.create_notification(
-                        user=admin_user,
-                        title='New Product Pending Approval',
-                        message=f'Product "{instance.name_en}" from seller {instance.seller.full_name or instance.seller.email} is waiting for approval.',
-                        notification_type='product_pending',
-                        priority='high',
-                        target_role='Admin',
-                        related_object_type='product',
-                        related_object_id=instance.id,
-                        related_url=f"/inventory/product-approval/"
-                    )
+                # Create notifications for all admins in one insert
+                Notification.create_bulk_notifications(
+                    admin_users,
+                    title='New Product Pending Approval',
+                    message=f'Product "{instance.name_en}" from seller {instance.seller.full_name or instance.seller.email} is waiting for approval.',
+                    notification_type='product_pending',
+                    priority='high',
+                    target_role='Admin',
+                    related_object_type='product',
+                    related_object_id=instance.id,
+                    related_url=f"/inventory/product-approval/"
+                )
             else:
                 # Product was auto-approved (created by admin) - only notify if seller is not an admin
                 if (instance.seller and 
@@ -112,18 +111,17 @@ def create_product_notification(sender, instance, created, **kwargs):
                     is_active=True
                 ).distinct()
                 
-                for admin_user in admin_users:
-                    Notification.create_notification(
-                        user=admin_user,
-                        title='Product Re-approval Required',
-                        message=f'Product "{instance.name_en}" from seller {instance.seller.full_name or instance.seller.email} needs re-approval.',
-                        notification_type='product_pending',
-                        priority='high',
-                        target_role='Admin',
-                        related_object_type='product',
-                        related_object_id=instance.id,
-                        related_url=f"/inventory/product-approval/"
-                    )
+                Notification.create_bulk_notifications(
+                    admin_users,
+                    title='Product Re-approval Required',
+                    message=f'Product "{instance.name_en}" from seller {instance.seller.full_name or instance.seller.email} needs re-approval.',
+                    notification_type='product_pending',
+                    priority='high',
+                    target_role='Admin',
+                    related_object_type='product',
+                    related_object_id=instance.id,
+                    related_url=f"/inventory/product-approval/"
+                )
     except ImportError:
         # Notifications app not available yet
         pass
@@ -1,7 +1,7 @@
 from django.shortcuts import render, redirect, get_object_or_404
 from django.contrib.auth.decorators import login_required
 from django.contrib import messages
-from django.http import JsonResponse, HttpResponse
+from django.http import JsonResponse
 from django.utils import timezone
 from django.db.models import Q, Sum, Count
 from django.core.paginator import Paginator
@@ -12,9 +12,7 @@ from orders.models import Order
 from orders.forms import OrderImportForm
 from inventory.models import Warehouse
 from users.models import AuditLog
-from datetime import datetime
-import csv
-import io
+from utils.exports import Column, Export, export_response, super_admin_export
 import json
 
 def has_seller_role(user):
@@ -25,15 +23,6 @@ def has_seller_role(user):
         user.has_role('Seller')
     )
 
-def _generate_order_code():
-    """Generate a unique order code."""
-    import random
-    import string
-    while True:
-        code = 'ORD-' + ''.join(random.choices(string.ascii_uppercase + string.digits, k=8))
-        if not Order.objects.filter(order_code=code).exists():
-            return code
-
 def create_seller_notification(seller, title, message, notification_type='system', priority='medium', 
                               related_object_type=None, related_object_id=None, related_url=None):
     """Create a notification for a seller using the universal notifications system"""
@@ -65,11 +54,7 @@ def get_seller_notifications_count(user):
     try:
         from notifications.models import Notification
         
-        return Notification.objects.filter(
-            user=user,
-            is_read=False,
-            is_archived=False
-        ).count()
+        return Notification.get_unread_count(user)
     except ImportError:
         # Notifications app not available yet
         return 0
@@ -849,7 +834,9 @@ def order_list(request):
 
 @login_required
 def import_orders(request):
-    """Import orders from CSV for sellers with improved error handling and validation."""
+    """Import orders from CSV for sellers; the rows are processed in a background job."""
+    from orders.importers import OrderImportError, start_import_job
+
     if not has_seller_role(request.user):
         messages.error(request, "ليس لديك صلاحية للدخول لهذه الصفحة.")
         return redirect('dashboard:index')
@@ -858,262 +845,32 @@ def import_orders(request):
         form = OrderImportForm(request.POST, request.FILES, user=request.user)
         if form.is_valid():
             try:
-                file = request.FILES.get('file')
-                if not file:
-                    messages.error(request, 'No file was uploaded.')
-                    return render(request, 'sellers/import_orders.html', {'form': form})
-                
-                # Validate file type
-                if not file.name.lower().endswith('.csv'):
-                    messages.error(request, 'Please upload a CSV file (.csv extension).')
-                    return render(request, 'sellers/import_orders.html', {'form': form})
-                
-                # Check file size (max 5MB) 
-                if file.size > 5 * 1024 * 1024:
-                    messages.error(request, 'File size must be less than 5MB.')
-                    return render(request, 'sellers/import_orders.html', {'form': form})
-                
-                try:
-                    # Try UTF-8 first
-                    decoded_file = file.read().decode('utf-8')
-                except UnicodeDecodeError:
-                    # Try with different encoding
-                    file.seek(0)  # Reset file pointer
-                    try:
-                        decoded_file = file.read().decode('latin-1')
-                    except UnicodeDecodeError:
-                        messages.error(request, 'Unable to read file. Please ensure it is a valid CSV file.')
-                        return render(request, 'sellers/import_orders.html', {'form': form})
-                
-                csv_data = csv.reader(io.StringIO(decoded_file))
-                
-                # Validate header row
-                try:
-                    header = next(csv_data)
-                    expected_columns = ['Order Code', 'Customer Name', 'Mobile Number', 'Shipping Address', 'Product ID/Code', 'Quantity', 'Price']
-                    
-                    # More flexible header validation - check if we have the essential columns
-                    essential_columns = ['Customer Name', 'Mobile Number', 'Shipping Address', 'Product ID/Code']
-                    found_essential = 0
-                    
-                    for col in essential_columns:
-                        if any(col.lower() in h.lower() for h in header):
-                            found_essential += 1
-                    
-                    if found_essential < 3:  # Need at least 3 out of 4 essential columns
-                        messages.error(request, f'CSV file must have essential columns: Customer Name, Mobile Number, Shipping Address, Product ID/Code. Found {found_essential} essential columns.')
-                        return render(request, 'sellers/import_orders.html', {'form': form})
-                    
-                except StopIteration:
-                    messages.error(request, 'CSV file is empty or invalid.')
-                    return render(request, 'sellers/import_orders.html', {'form': form})
-                
-                success_count = 0
-                error_count = 0
-                warnings = []
-                errors = []
-                
-                for row_num, row in enumerate(csv_data, start=2):  # Start from 2 because we skipped header
-                    try:
-                        # Skip empty rows
-                        if not row or all(cell.strip() == '' for cell in row):
-                            continue
-                        
-                        # Extract data from row (flexible column mapping)
-                        order_code = row[0].strip() if len(row) > 0 and row[0].strip() else None
-                        customer_name = row[1].strip() if len(row) > 1 and row[1].strip() else None
-                        mobile_number = row[2].strip() if len(row) > 2 and row[2].strip() else None
-                        address = row[3].strip() if len(row) > 3 and row[3].strip() else None
-                        product_id = row[4].strip() if len(row) > 4 and row[4].strip() else None
-                        quantity = int(float(row[5])) if len(row) > 5 and row[5].strip() else 1
-                        price = float(row[6]) if len(row) > 6 and row[6].strip() else 0.0
-                        notes = row[7].strip() if len(row) > 7 and row[7].strip() else ''
-                        order_date_str = row[8].strip() if len(row) > 8 and row[8].strip() else None
-                        
-                        # Validate required fields
-                        if not customer_name:
-                            errors.append(f"Row {row_num}: Customer Name is required")
-                            error_count += 1
-                            continue
-                        
-                        if not mobile_number:
-                            errors.append(f"Row {row_num}: Mobile Number is required")
-                            error_count += 1
-                            continue
-                        
-                        if not address:
-                            errors.append(f"Row {row_num}: Shipping Address is required")
-                            error_count += 1
-                            continue
-                        
-                        if not product_id:
-                            warnings.append(f"Row {row_num}: Product ID/Code is missing. Order will be created without product link.")
-                        
-                        if quantity <= 0:
-                            errors.append(f"Row {row_num}: Quantity must be greater than 0")
-                            error_count += 1
-                            continue
-                        
-                        if price < 0:
-                            errors.append(f"Row {row_num}: Price cannot be negative")
-                            error_count += 1
-                            continue
-                        
-                        # Parse order date
-                        try:
-                            if order_date_str:
-                                order_date = datetime.strptime(order_date_str, '%Y-%m-%d')
-                            else:
-                                order_date = timezone.now()
-                        except ValueError:
-                            order_date = timezone.now()
-                        
-                        # Find product by ID or code (if product_id exists)
-                        product = None
-                        if product_id:
-                            product_id_clean = product_id.strip()
-                            
-                            # First try to find by exact code match
-                            try:
-                                product = Product.objects.get(code=product_id_clean)
-                            except Product.DoesNotExist:
-                                pass
-                            
-                            # If no exact code match, try by partial code match
-                            if not product:
-                                product = Product.objects.filter(code__icontains=product_id_clean).first()
-                            
-                            # If still no product found, try by exact name match
-                            if not product:
-                                product = Product.objects.filter(name_en__iexact=product_id_clean).first()
-                            
-                            # If still no product found, try by partial name match
-                            if not product:
-                                product = Product.objects.filter(name_en__icontains=product_id_clean).first()
-                            
-                            # If still no product found, try by Arabic name
-                            if not product:
-                                product = Product.objects.filter(name_ar__icontains=product_id_clean).first()
-                            
-                            # If still no product found, try by product ID (numeric)
-                            if not product and product_id_clean.isdigit():
-                                try:
-                                    product = Product.objects.get(id=int(product_id_clean))
-                                except (Product.DoesNotExist, ValueError):
-                                    pass
-                        
-                        # If product not found, log warning but continue
-                        if product_id and not product:
-                            warnings.append(f"Row {row_num}: Product not found for ID/Code '{product_id}'. Order will be created without product link.")
-                        
-                        # Check if order already exists
-                        if order_code and Order.objects.filter(order_code=order_code).exists():
-                            errors.append(f"Row {row_num}: Order code '{order_code}' already exists")
-                            error_count += 1
-                            continue
-                        
-                        # Create order (seller is always the current user for sellers)
-                        order = Order.objects.create(
-                            order_code=order_code or _generate_order_code(),
-                            customer=customer_name,
-                            customer_phone=mobile_number,
-                            shipping_address=address,
-                            street_address='',  # Street address not available in CSV import
-                            product=product,  # Can be None if product not found
-                            quantity=quantity,
-                            price_per_unit=price,
-                            notes=notes,
-                            date=order_date,
-                            status='pending',
-                            seller=request.user,
-                            seller_email=request.user.email
-                        )
-                        
-                        success_count += 1
-                        
-                        # Create audit log
-                        AuditLog.objects.create(
-                            user=request.user,
-                            action='import',
-                            entity_type='Order',
-                            entity_id=str(order.id),
-                            description=f"Imported order {order.order_code} from CSV" + (f" with product: {product.name_en} (Code: {product.code})" if product else " without product link")
-                        )
-                        
-                    except Exception as e:
-                        errors.append(f"Row {row_num}: {str(e)}")
-                        error_count += 1
-                
-                # Show results
-                if success_count > 0:
-                    messages.success(request, f'Successfully imported {success_count} orders.')
-                    
-                    # Create notification for successful import
-                    create_seller_notification(
-                        seller=request.user,
-                        title="Orders Imported Successfully",
-                        message=f"Successfully imported {success_count} orders from CSV file.",
-                        notification_type='data_import',
-                        priority='medium',
-                        related_object_type='order',
-                        related_url="/sellers/orders/"
-                    )
-                
-                if warnings:
-                    messages.info(request, f'Found {len(warnings)} warnings during import.')
-                    for warning in warnings[:5]:  # Show first 5 warnings
-                        messages.warning(request, warning)
-                    if len(warnings) > 5:
-                        messages.warning(request, f'... and {len(warnings) - 5} more warnings.')
-                
-                if error_count > 0:
-                    messages.error(request, f'Failed to import {error_count} orders. Check the errors below.')
-                    for error in errors[:10]:  # Show first 10 errors
-                        messages.error(request, error)
-                    if len(errors) > 10:
-                        messages.error(request, f'... and {len(errors) - 10} more errors.')
-                
-                return redirect('sellers:orders')
-                
-            except Exception as e:
-                messages.error(request, f'Error processing file: {str(e)}')
-                print(f"Import error: {e}")
+                # Seller is always the current user for sellers
+                job = start_import_job(request.user, request.user, request.FILES.get('file'), source='sellers')
+            except OrderImportError as e:
+                messages.error(request, str(e))
+                return render(request, 'sellers/import_orders.html', {'form': form})
+
+            messages.success(request, 'Your file was uploaded. Orders are being imported in the background.')
+            return redirect('orders:import_job', job_id=job.id)
         else:
             messages.error(request, 'Please correct the errors below.')
-            print(f"Form errors: {form.errors}")
     else:
         form = OrderImportForm(user=request.user)
     
     return render(request, 'sellers/import_orders.html', {'form': form})
 
 @login_required
+@super_admin_export(entity_type='order', label='orders')
 def export_orders(request):
     """Export orders to CSV - RESTRICTED TO SUPER ADMIN ONLY."""
-    from users.models import AuditLog
-
-    # SECURITY: Restrict data export to Super Admin only (P0 CRITICAL requirement)
-    if not request.user.is_superuser:
-        from utils.views import permission_denied_authenticated
-        AuditLog.objects.create(
-            user=request.user,
-            action='unauthorized_export_attempt',
-            entity_type='order',
-            description=f"Unauthorized attempt to export orders by {request.user.email}",
-            ip_address=request.META.get('REMOTE_ADDR'),
-            user_agent=request.META.get('HTTP_USER_AGENT', '')
-        )
-        return permission_denied_authenticated(
-            request,
-            message="Data export is restricted to Super Admin only for security compliance."
-        )
-    
     # Get orders based on user role
     if request.user.has_role('Seller'):
         # Sellers export only their own orders
-        orders = Order.objects.select_related('agent', 'seller', 'product').filter(seller=request.user).order_by('-date')
+        orders = Order.objects.filter(seller=request.user).order_by('-date')
     else:
         # Admins and super admins export all orders
-        orders = Order.objects.select_related('agent', 'seller', 'product').all().order_by('-date')
+        orders = Order.objects.all().order_by('-date')
     
     # Apply search filter if provided
     search_query = request.GET.get('search', '')
@@ -1130,52 +887,46 @@ def export_orders(request):
     if status_filter:
         orders = orders.filter(status=status_filter)
     
-    # Create CSV response
-    response = HttpResponse(content_type='text/csv')
-    response['Content-Disposition'] = f'attachment; filename="orders_export_{timezone.now().strftime("%Y%m%d_%H%M%S")}.csv"'
-    
-    writer = csv.writer(response)
-    writer.writerow([
-        'Order Code', 'Customer', 'Customer Phone', 'Product', 'Quantity', 
-        'Total Price (AED)', 'Status', 'Date', 'Seller Email', 'Notes'
+    export = Export(orders, [
+        Column('Order Code', 'order_code'),
+        Column('Customer', 'customer'),
+        Column('Customer Phone', 'customer_phone'),
+        Column('Product', 'product__name_en'),
+        Column('Quantity', 'quantity'),
+        Column('Total Price (AED)', value=_order_total_aed, fields=('total_amount', 'quantity', 'price_per_unit')),
+        Column('Status', 'status'),
+        Column('Date', 'date', date_format='%Y-%m-%d %H:%M:%S'),
+        Column('Seller Email', 'seller_email'),
+        Column('Notes', 'notes'),
     ])
-    
-    for order in orders:
-        writer.writerow([
-            order.order_code,
-            order.customer,
-            order.customer_phone or '',
-            order.product.name_en if order.product else '',
-            order.quantity,
-            order.total_price_aed,
-            order.status,
-            order.date.strftime('%Y-%m-%d %H:%M:%S') if order.date else '',
-            order.seller_email or '',
-            order.notes or ''
-        ])
-    
-    # Audit log for successful export (P0 CRITICAL security requirement)
-    AuditLog.objects.create(
-        user=request.user,
-        action='data_export',
+
+    def notify_seller(fmt):
+        # Create notification for successful export
+        create_seller_notification(
+            seller=request.user,
+            title="Orders Exported Successfully",
+            message=f"Successfully exported {export.count} orders to {fmt} file.",
+            notification_type='data_export',
+            priority='low',
+            related_object_type='order',
+            related_url="/sellers/orders/"
+        )
+
+    return export_response(
+        request, export.rows(),
+        filename=f'orders_export_{timezone.now().strftime("%Y%m%d_%H%M%S")}',
         entity_type='order',
-        description=f"Exported {orders.count()} orders to CSV",
-        ip_address=request.META.get('REMOTE_ADDR'),
-        user_agent=request.META.get('HTTP_USER_AGENT', '')
+        describe=lambda fmt: f"Exported {export.count} orders to {fmt}",
+        on_complete=notify_seller,
     )
 
-    # Create notification for successful export
-    create_seller_notification(
-        seller=request.user,
-        title="Orders Exported Successfully",
-        message=f"Successfully exported {orders.count()} orders to CSV file.",
-        notification_type='data_export',
-        priority='low',
-        related_object_type='order',
-        related_url="/sellers/orders/"
-    )
 
-    return response
+def _order_total_aed(row):
+    """Order.total_price_aed for a values() row"""
+    total = row['total_amount']
+    if total is None:
+        total = row['quantity'] * row['price_per_unit']
+    return f"AED {total:,.2f}"
 
 @login_required
 def order_detail(request, order_id):
@@ -105,18 +105,17 @@ def comprehensive_sourcing_create(request):
                         is_active=True
                     ).distinct()
                     
-                    for admin_user in admin_users:
-                        Notification.create_notification(
-                            user=admin_user,
-                            title='New Sourcing Request',
-                            message=f'New sourcing request {sourcing_request.request_number} submitted by {request.user.full_name or request.user.email}',
-                            notification_type='system',
-                            priority='medium',
-                            target_role='Admin',
-                            related_object_type='sourcing_request',
-                            related_object_id=sourcing_request.id,
-                            related_url=f"/sourcing/requests/{sourcing_request.id}/"
-                        )
+                    Notification.create_bulk_notifications(
+                        admin_users,
+                        title='New Sourcing Request',
+                        message=f'New sourcing request {sourcing_request.request_number} submitted by {request.user.full_name or request.user.email}',
+                        notification_type='system',
+                        priority='medium',
+                        target_role='Admin',
+                        related_object_type='sourcing_request',
+                        related_object_id=sourcing_request.id,
+                        related_url=f"/sourcing/requests/{sourcing_request.id}/"
+                    )
                 except Exception as e:
                     print(f"Error creating admin notification: {e}")
                 
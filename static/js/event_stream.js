@@ -0,0 +1,88 @@
+/**
+ * Atlas live events
+ *
+ * Opens one Server-Sent Events connection per page to /notifications/stream/
+ * for the events the page listens to. Each listener passes a polling
+ * fallback, which runs on its interval only while the stream is down (no
+ * EventSource support, server without ASGI, or a dropped connection).
+ *
+ *   AtlasEvents.on('metrics-updated', handler, {
+ *       topic: 'callcenter_metrics', poll: updateMetrics, interval: 30000
+ *   });
+ */
+(function () {
+    const STREAM_URL = '/notifications/stream/';
+    const listeners = [];
+    const topics = new Set();
+    let source = null;
+    let connected = false;
+    let timers = [];
+    let scheduled = false;
+
+    function startPolling() {
+        if (timers.length) {
+            return;
+        }
+        timers = listeners
+            .filter(listener => listener.poll)
+            .map(listener => setInterval(listener.poll, listener.interval || 30000));
+    }
+
+    function stopPolling() {
+        timers.forEach(clearInterval);
+        timers = [];
+    }
+
+    function connect() {
+        scheduled = false;
+        if (source) {
+            source.close();
+        }
+        if (!window.EventSource) {
+            startPolling();
+            return;
+        }
+        const query = topics.size ? '?topics=' + encodeURIComponent(Array.from(topics).join(',')) : '';
+        source = new EventSource(STREAM_URL + query);
+        source.onopen = function () {
+            if (!connected) {
+                connected = true;
+                stopPolling();
+                // Catch up on anything missed while disconnected
+                listeners.forEach(listener => listener.poll && listener.poll());
+            }
+        };
+        source.onerror = function () {
+            connected = false;
+            // CLOSED means the server declined the stream (e.g. 204 under WSGI)
+            startPolling();
+        };
+        listeners.forEach(listener => source.addEventListener(listener.event, listener.wrapped));
+    }
+
+    function on(event, handler, options) {
+        const listener = Object.assign({ event: event }, options || {});
+        listener.wrapped = function (message) {
+            handler(JSON.parse(message.data));
+        };
+        listeners.push(listener);
+        if (listener.topic && !topics.has(listener.topic)) {
+            topics.add(listener.topic);
+            // Reconnect once with every topic registered during this tick
+            if (!scheduled) {
+                scheduled = true;
+                setTimeout(connect, 0);
+            }
+        } else if (source) {
+            source.addEventListener(event, listener.wrapped);
+        } else if (!scheduled) {
+            scheduled = true;
+            setTimeout(connect, 0);
+        }
+        if (timers.length && listener.poll) {
+            timers.push(setInterval(listener.poll, listener.interval || 30000));
+        }
+    }
+
+    window.AtlasEvents = { on: on };
+})();
@@ -0,0 +1,53 @@
+"""
+Stock keeper exports, built from plain filter parameters so they can be
+run as a background export job (utils.exports).
+"""
+from datetime import timedelta
+
+from django.utils import timezone
+
+from inventory.models import InventoryRecord
+from utils.exports import Column, Export, Report, section
+
+
+def stock_report(params, user):
+    """Low stock, out of stock and near expiry inventory records"""
+    warehouse_filter = params.get('warehouse', '')
+    inventory_records = InventoryRecord.objects.order_by('id')
+
+    if warehouse_filter:
+        inventory_records = inventory_records.filter(warehouse_id=warehouse_filter)
+
+    columns = [
+        Column('Product ID', value=lambda row: f"P{row['product_id']:03d}", fields=('product_id',)),
+        Column('Product Name', 'product__name_en'),
+        Column('SKU', 'product__code', default='N/A'),
+        Column('Warehouse', 'warehouse__name'),
+    ]
+
+    # Filter for low stock, out of stock, and near expiry
+    out_of_stock = Export(inventory_records.filter(quantity=0), columns + [
+        Column('Location', 'location__zone', default='N/A'),
+        Column('Quantity', 'quantity'),
+    ])
+    low_stock = Export(inventory_records.filter(quantity__lte=10, quantity__gt=0), columns + [
+        Column('Location', 'location__zone', default='N/A'),
+        Column('Quantity', 'quantity'),
+    ])
+    near_expiry = Export(inventory_records.filter(
+        expiry_date__lte=timezone.now() + timedelta(days=30),
+        quantity__gt=0
+    ) if hasattr(InventoryRecord, 'expiry_date') else inventory_records.none(), columns + [
+        Column('Expiry Date', 'expiry_date', date_format='%Y-%m-%d', default='N/A'),
+        Column('Quantity', 'quantity'),
+    ])
+
+    def rows():
+        yield ['Stock Report', timezone.now().strftime('%Y-%m-%d %H:%M:%S')]
+        yield []
+        yield from section('OUT OF STOCK', out_of_stock)
+        yield from section('LOW STOCK (≤10)', low_stock)
+        if near_expiry.queryset.exists():
+            yield from section('NEAR EXPIRY (≤30 days)', near_expiry)
+
+    return Report(rows(), [out_of_stock, low_stock, near_expiry], 'Exported stock report with {count} alert records')
@@ -1,3 +1,126 @@
+"""
+Unit tests for the stock keeper shipping and transfer views
+Tests: stock moved through StockService, refused shipments and transfers
+leaving stock and movements untouched, transfers completed only once
+"""
+
+import json
+from decimal import Decimal
+
+from django.contrib.auth import get_user_model
+from django.db.models import Sum
 from django.test import TestCase
+from django.urls import reverse
+
+from inventory.models import InventoryRecord, StockLedgerEntry, Warehouse
+from orders.models import Order
+from sellers.models import Product
+
+from .models import InventoryMovement
+
+User = get_user_model()
+
+
+class StockMovementViewTests(TestCase):
+    """
+    Test suite for ship_orders, transfer_stock and api_complete_transfer
+    Covers: conditional decrements, short stock refusals, destination increments, double completion
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.keeper = User.objects.create_user(
+            email='keeper@test.com',
+            password='testpass123',
+            is_active=True,
+            is_staff=True,
+        )
+        cls.source = Warehouse.objects.create(name='Source', location='Dubai')
+        cls.destination = Warehouse.objects.create(name='Destination', location='Sharjah')
+        cls.product = Product.objects.create(
+            name_en='Moved', name_ar='Moved', code='MOVE-1',
+            selling_price=Decimal('10.00'), stock_quantity=0, seller=cls.keeper,
+        )
+
+    def setUp(self):
+        InventoryRecord.objects.create(product=self.product, warehouse=self.source, quantity=5)
+        self.client.force_login(self.keeper)
+
+    def quantity(self, warehouse):
+        return InventoryRecord.objects.filter(
+            product=self.product, warehouse=warehouse
+        ).aggregate(total=Sum('quantity'))['total'] or 0
+
+    def ledger_total(self, warehouse):
+        return StockLedgerEntry.objects.filter(
+            product=self.product, warehouse=warehouse
+        ).aggregate(total=Sum('delta'))['total'] or 0
+
+    def ship(self, order, quantity):
+        return self.client.post(reverse('stock_keeper:ship_orders'), {
+            'order_id': order.pk,
+            'product_id': self.product.pk,
+            'quantity': quantity,
+            'warehouse_id': self.source.pk,
+        })
+
+    def transfer(self, quantity):
+        return self.client.post(reverse('stock_keeper:transfer_stock'), {
+            'product_id': self.product.pk,
+            'quantity': quantity,
+            'from_warehouse_id': self.source.pk,
+            'to_warehouse_id': self.destination.pk,
+        })
+
+    def complete(self, transfer, quantity):
+        return self.client.post(
+            reverse('stock_keeper:api_complete_transfer'),
+            json.dumps({'transfer_id': transfer.pk, 'transferred_quantity': quantity}),
+            content_type='application/json',
+        ).json()
+
+    def test_ship_orders(self):
+        order = Order.objects.create(customer='Ship', quantity=1, price_per_unit=10, store_link='https://example.com')
+
+        self.ship(order, 6)
+        order.refresh_from_db()
+        self.assertNotEqual(order.status, 'shipped')
+        self.assertEqual(self.quantity(self.source), 5)
+        self.assertFalse(InventoryMovement.objects.exists())
+
+        self.ship(order, 4)
+        order.refresh_from_db()
+        self.assertEqual(order.status, 'shipped')
+        self.assertEqual(self.quantity(self.source), 1)
+        self.assertEqual(self.ledger_total(self.source), 1)
+        self.assertEqual(InventoryMovement.objects.get().movement_type, 'stock_out')
+
+    def test_transfer_stock(self):
+        self.transfer(6)
+        self.assertEqual((self.quantity(self.source), self.quantity(self.destination)), (5, 0))
+        self.assertFalse(InventoryMovement.objects.exists())
+
+        self.transfer(3)
+        self.transfer(2)
+        self.assertEqual((self.quantity(self.source), self.quantity(self.destination)), (0, 5))
+        self.assertEqual((self.ledger_total(self.source), self.ledger_total(self.destination)), (0, 5))
+        self.assertEqual(InventoryMovement.objects.filter(status='completed').count(), 2)
+
+    def test_complete_transfer(self):
+        """A pending transfer cannot overdraw its source and is completed once"""
+        transfer = InventoryMovement.objects.create(
+            movement_type='transfer', product=self.product, quantity=3,
+            from_warehouse=self.source, to_warehouse=self.destination, created_by=self.keeper,
+        )
+
+        self.assertFalse(self.complete(transfer, 6)['success'])
+        transfer.refresh_from_db()
+        self.assertEqual(transfer.status, 'pending')
+        self.assertEqual((self.quantity(self.source), self.quantity(self.destination)), (5, 0))
 
-# Create your tests here.
+        self.assertTrue(self.complete(transfer, 3)['success'])
+        self.assertFalse(self.complete(transfer, 3)['success'])
+        transfer.refresh_from_db()
+        self.assertEqual(transfer.status, 'completed')
+        self.assertEqual((self.quantity(self.source), self.quantity(self.destination)), (2, 3))
+        self.assertEqual((self.ledger_total(self.source), self.ledger_total(self.destination)), (2, 3))
@@ -14,10 +14,13 @@ from .models import (
     StockKeeperTask, BarcodeScanHistory, PhysicalCountRecord
 )
 from inventory.models import Warehouse, InventoryRecord, WarehouseLocation
+from inventory import ledger
+from inventory.services import InsufficientStock, StockService
 from orders.models import Order
 from sellers.models import Product
 from datetime import datetime, timedelta
 import json
+from utils.exports import Column, Export, export_report, export_response, super_admin_export
 from .forms import StockKeeperTaskForm
 from django.db import transaction
 
@@ -1100,6 +1103,7 @@ def receive_stock(request):
                 defaults={'quantity': 0}
             )
             inventory.quantity += quantity
+            ledger.label(inventory, 'stock_in', movement.tracking_number, request.user)
             inventory.save()
             
             messages.success(request, f'Successfully received {quantity} units of {product.name_en}')
@@ -1213,37 +1217,33 @@ def ship_orders(request):
             product = get_object_or_404(Product, id=product_id)
             warehouse = get_object_or_404(Warehouse, id=warehouse_id)
             
-            # Check if enough stock
-            inventory = InventoryRecord.objects.filter(
-                product=product,
-                warehouse=warehouse
-            ).first()
-            
-            if inventory and inventory.quantity >= quantity:
-                # Create movement record
-                movement = InventoryMovement.objects.create(
-                    movement_type='stock_out',
-                    product=product,
-                    quantity=quantity,
-                    from_warehouse=warehouse,
-                    created_by=request.user,
-                    processed_by=request.user,
-                    status='completed',
-                    reference_number=order.order_code,
-                    reference_type='Order',
-                    reason='Order fulfillment'
-                )
-                
-                # Update inventory
-                inventory.quantity -= quantity
-                inventory.save()
-                
-                # Update order status
-                order.status = 'shipped'
-                order.save()
+            try:
+                with transaction.atomic():
+                    # Create movement record
+                    movement = InventoryMovement.objects.create(
+                        movement_type='stock_out',
+                        product=product,
+                        quantity=quantity,
+                        from_warehouse=warehouse,
+                        created_by=request.user,
+                        processed_by=request.user,
+                        status='completed',
+                        reference_number=order.order_code,
+                        reference_type='Order',
+                        reason='Order fulfillment'
+                    )
+                    
+                    # Decrement stock with a conditional update; rolls back the shipment when it is short
+                    StockService.decrement(
+                        [(product, warehouse, quantity)], reference=movement.tracking_number, user=request.user
+                    )
+                    
+                    # Update order status
+                    order.status = 'shipped'
+                    order.save()
                 
                 messages.success(request, f'Successfully shipped {quantity} units of {product.name_en} for order {order.order_code}')
-            else:
+            except InsufficientStock:
                 messages.error(request, 'Insufficient stock for shipping')
             
             return redirect('stock_keeper:ship_orders')
@@ -1311,46 +1311,34 @@ def transfer_stock(request):
             from_warehouse = get_object_or_404(Warehouse, id=from_warehouse_id)
             to_warehouse = get_object_or_404(Warehouse, id=to_warehouse_id)
             
-            # Check if enough stock in source warehouse
-            from_inventory = InventoryRecord.objects.filter(
-                product=product,
-                warehouse=from_warehouse
-            ).first()
-            
-            if from_inventory and from_inventory.quantity >= quantity:
-                # Create movement record
-                movement = InventoryMovement.objects.create(
-                    movement_type='transfer',
-                    product=product,
-                    quantity=quantity,
-                    from_warehouse=from_warehouse,
-                    to_warehouse=to_warehouse,
-                    from_location=from_location,
-                    to_location=to_location,
-                    created_by=request.user,
-                    processed_by=request.user,
-                    status='completed',
-                    notes=notes,
-                    reason='Inter-warehouse transfer'
-                )
-                
-                # Update source inventory
-                from_inventory.quantity -= quantity
-                from_inventory.save()
-                
-                # Update destination inventory
-                to_inventory, created = InventoryRecord.objects.get_or_create(
-                    product=product,
-                    warehouse=to_warehouse,
-                    defaults={'quantity': 0}
-                )
-                to_inventory.quantity += quantity
-                # Note: location is a ForeignKey, not a CharField
-                # If location_code is needed, it should be handled through WarehouseLocation model
-                to_inventory.save()
+            try:
+                with transaction.atomic():
+                    # Create movement record
+                    movement = InventoryMovement.objects.create(
+                        movement_type='transfer',
+                        product=product,
+                        quantity=quantity,
+                        from_warehouse=from_warehouse,
+                        to_warehouse=to_warehouse,
+                        from_location=from_location,
+                        to_location=to_location,
+                        created_by=request.user,
+                        processed_by=request.user,
+                        status='completed',
+                        notes=notes,
+                        reason='Inter-warehouse transfer'
+                    )
+                    
+                    # Move the stock; the conditional decrement rolls back the transfer when the source is short
+                    StockService.decrement(
+                        [(product, from_warehouse, quantity)], 'transfer', movement.tracking_number, request.user
+                    )
+                    StockService.increment(
+                        [(product, to_warehouse, quantity)], 'transfer', movement.tracking_number, request.user
+                    )
                 
                 messages.success(request, f'Successfully transferred {quantity} units of {product.name_en} from {from_warehouse.name} to {to_warehouse.name}')
-            else:
+            except InsufficientStock:
                 messages.error(request, 'Insufficient stock for transfer')
             
             return redirect('stock_keeper:transfer_stock')
@@ -1420,6 +1408,7 @@ def return_orders(request):
                 )
                 inv, _ = InventoryRecord.objects.get_or_create(product=product, warehouse=warehouse, defaults={'quantity': 0})
                 inv.quantity += good_qty
+                ledger.label(inv, 'return', order_code, request.user)
                 inv.save()
 
             # Log damaged quantity
@@ -1563,32 +1552,10 @@ def movement_history(request):
     return render(request, 'stock_keeper/movement_history.html', context)
 
 @login_required
+@super_admin_export(entity_type='inventory_movement', label='movement history')
 def export_movement_history_excel(request):
     """Export movement history to Excel - RESTRICTED TO SUPER ADMIN ONLY."""
-    from django.http import HttpResponse
-    import csv
-    from io import StringIO
-    from users.models import AuditLog
-
-    # SECURITY: Restrict data export to Super Admin only (P0 CRITICAL requirement)
-    if not request.user.is_superuser:
-        from utils.views import permission_denied_authenticated
-        AuditLog.objects.create(
-            user=request.user,
-            action='unauthorized_export_attempt',
-            entity_type='inventory_movement',
-            description=f"Unauthorized attempt to export movement history by {request.user.email}",
-            ip_address=request.META.get('REMOTE_ADDR'),
-            user_agent=request.META.get('HTTP_USER_AGENT', '')
-        )
-        return permission_denied_authenticated(
-            request,
-            message="Data export is restricted to Super Admin only for security compliance."
-        )
-    
-    movements = InventoryMovement.objects.select_related(
-        'product', 'from_warehouse', 'to_warehouse', 'processed_by'
-    ).order_by('-created_at')
+    movements = InventoryMovement.objects.order_by('-created_at')
     
     # Apply same filters as view
     search_query = request.GET.get('search', '')
@@ -1617,44 +1584,39 @@ def export_movement_history_excel(request):
     if date_to:
         movements = movements.filter(created_at__date__lte=date_to)
     
-    # Create CSV response
-    response = HttpResponse(content_type='text/csv')
-    response['Content-Disposition'] = 'attachment; filename="stock_history.csv"'
-    
-    writer = csv.writer(response)
-    writer.writerow(['Log ID', 'Date & Time', 'Type', 'SKU', 'Product', 'Quantity', 'Warehouse', 'User', 'Reference'])
-    
-    for m in movements:
-        warehouse_name = ''
-        if m.to_warehouse:
-            warehouse_name = m.to_warehouse.name
-        elif m.from_warehouse:
-            warehouse_name = m.from_warehouse.name
-        
-        writer.writerow([
-            f'LOG-{m.id:03d}',
-            m.created_at.strftime('%Y-%m-%d %H:%M'),
-            m.get_movement_type_display(),
-            m.product.code or 'N/A',
-            m.product.name_en,
-            f"{'+' if m.movement_type == 'stock_in' else '-'}{m.quantity}",
-            warehouse_name or 'N/A',
-            m.processed_by.get_full_name() or m.processed_by.username,
-            m.reference_number or 'N/A'
-        ])
-
-    # Audit log for successful export (P0 CRITICAL security requirement)
-    AuditLog.objects.create(
-        user=request.user,
-        action='data_export',
+    movement_types = dict(InventoryMovement.MOVEMENT_TYPES)
+    export = Export(movements, [
+        Column('Log ID', value=lambda row: f"LOG-{row['id']:03d}", fields=('id',)),
+        Column('Date & Time', 'created_at', date_format='%Y-%m-%d %H:%M'),
+        Column('Type', value=lambda row: movement_types.get(row['movement_type'], row['movement_type']), fields=('movement_type',)),
+        Column('SKU', 'product__code', default='N/A'),
+        Column('Product', 'product__name_en'),
+        Column(
+            'Quantity',
+            value=lambda row: f"{'+' if row['movement_type'] == 'stock_in' else '-'}{row['quantity']}",
+            fields=('movement_type', 'quantity')
+        ),
+        Column(
+            'Warehouse',
+            value=lambda row: row['to_warehouse__name'] or row['from_warehouse__name'],
+            fields=('to_warehouse__name', 'from_warehouse__name'),
+            default='N/A'
+        ),
+        Column(
+            'User',
+            value=lambda row: row['processed_by__full_name'] or row['processed_by__email'],
+            fields=('processed_by__full_name', 'processed_by__email')
+        ),
+        Column('Reference', 'reference_number', default='N/A'),
+    ])
+    
+    return export_response(
+        request, export.rows(),
+        filename='stock_history',
         entity_type='inventory_movement',
-        description=f"Exported {movements.count()} inventory movements to CSV",
-        ip_address=request.META.get('REMOTE_ADDR'),
-        user_agent=request.META.get('HTTP_USER_AGENT', '')
+        describe=lambda fmt: f"Exported {export.count} inventory movements to {fmt}",
     )
 
-    return response
-
 @login_required
 @user_passes_test(is_stock_keeper)
 def alerts(request):
@@ -1767,17 +1729,29 @@ def api_search_product(request):
 @login_required
 def api_get_inventory(request, product_id):
     """API endpoint to get inventory for a product."""
+    from inventory.models import StockAvailability
+
     product = get_object_or_404(Product, id=product_id)
     inventory = InventoryRecord.objects.filter(
         product=product
     ).select_related('warehouse')
+    # Available-to-promise per warehouse (stock not held by open reservations)
+    availability = {
+        warehouse_id: (reserved, available)
+        for warehouse_id, reserved, available in StockAvailability.objects.filter(
+            product=product
+        ).values_list('warehouse_id', 'reserved', 'available')
+    }
     
     results = []
     for inv in inventory:
+        reserved, available = availability.get(inv.warehouse_id, (0, 0))
         results.append({
             'warehouse_id': inv.warehouse.id,
             'warehouse_name': inv.warehouse.name,
             'quantity': inv.quantity,
+            'reserved': reserved,
+            'available': max(0, available),
             'location': inv.location.zone if inv.location else '',
             'is_low_stock': inv.is_low_stock,
         })
@@ -1896,6 +1870,7 @@ def api_receive_stock(request):
             inventory.quantity += received_quantity
             # Note: location is a ForeignKey, not a CharField
             # If location is needed, it should be handled through WarehouseLocation model
+            ledger.label(inventory, 'stock_in', movement.tracking_number, request.user)
             inventory.save()
             
             return JsonResponse({
@@ -1925,45 +1900,56 @@ def api_pick_order(request):
         
         try:
             order = Order.objects.get(id=order_id)
-            product = order.product
             
             # Get warehouse (assuming first active warehouse for now)
             warehouse = Warehouse.objects.filter(is_active=True).first()
-            
-            # Check if enough stock
-            inventory = InventoryRecord.objects.filter(
-                product=product,
-                warehouse=warehouse
-            ).first()
-            
-            if not inventory or inventory.quantity < picked_quantity:
+            if not warehouse:
                 return JsonResponse({
                     'success': False,
-                    'message': 'Insufficient stock for picking'
+                    'message': 'No active warehouse for picking'
                 })
             
-            # Create movement record
-            movement = InventoryMovement.objects.create(
-                movement_type='stock_out',
-                product=product,
-                quantity=picked_quantity,
-                from_warehouse=warehouse,
-                created_by=request.user,
-                processed_by=request.user,
-                status='completed',
-                reference_number=order.order_code,
-                reference_type='Order',
-                reason='Order fulfillment',
-                notes=notes
-            )
+            # Pick every line of a multi-line order, or the legacy single product
+            items = list(order.items.select_related('product'))
+            if items:
+                lines = [(item.product, warehouse, item.quantity) for item in items]
+                picked_quantity = sum(item.quantity for item in items)
+            else:
+                picked_quantity = int(picked_quantity or 0)
+                lines = [(order.product, warehouse, picked_quantity)] if order.product else []
             
-            # Update inventory
-            inventory.quantity -= picked_quantity
-            inventory.save()
+            if not lines or picked_quantity <= 0:
+                return JsonResponse({
+                    'success': False,
+                    'message': 'Nothing to pick for this order'
+                })
             
-            # Update order status
-            order.status = 'shipped'
-            order.save()
+            with transaction.atomic():
+                # Decrement stock with conditional updates; rolls back the whole pick when any line is short
+                StockService.decrement(lines, reference=order.order_code, user=request.user)
+                
+                # Create movement records
+                movements = [
+                    InventoryMovement.objects.create(
+                        movement_type='stock_out',
+                        product=product,
+                        quantity=quantity,
+                        from_warehouse=warehouse,
+                        created_by=request.user,
+                        processed_by=request.user,
+                        status='completed',
+                        reference_number=order.order_code,
+                        reference_type='Order',
+                        reason='Order fulfillment',
+                        notes=notes
+                    )
+                    for product, _, quantity in lines
+                ]
+                movement = movements[0]
+                
+                # Update order status
+                order.status = 'shipped'
+                order.save()
             
             # Generate shipping label
             shipping_label = {
@@ -1980,6 +1966,11 @@ def api_pick_order(request):
                 'shipping_label': shipping_label
             })
             
+        except InsufficientStock:
+            return JsonResponse({
+                'success': False,
+                'message': 'Insufficient stock for picking'
+            })
         except Exception as e:
             return JsonResponse({
                 'success': False,
@@ -2002,41 +1993,51 @@ def api_complete_transfer(request):
         notes = data.get('notes', '')
         
         try:
-            transfer = InventoryMovement.objects.get(id=transfer_id, movement_type='transfer')
-            
-            # Update transfer status
-            transfer.status = 'completed'
-            transfer.processed_by = request.user
-            transfer.processed_at = timezone.now()
-            transfer.notes = notes
-            transfer.save()
-            
-            # Update source inventory
-            from_inventory = InventoryRecord.objects.filter(
-                product=transfer.product,
-                warehouse=transfer.from_warehouse
-            ).first()
-            
-            if from_inventory:
-                from_inventory.quantity -= transferred_quantity
-                from_inventory.save()
+            transferred_quantity = int(transferred_quantity or 0)
+            if transferred_quantity <= 0:
+                return JsonResponse({
+                    'success': False,
+                    'message': 'Invalid transfer quantity'
+                })
             
-            # Update destination inventory
-            to_inventory, created = InventoryRecord.objects.get_or_create(
-                product=transfer.product,
-                warehouse=transfer.to_warehouse,
-                defaults={'quantity': 0}
-            )
-            to_inventory.quantity += transferred_quantity
-            if to_location:
-                to_inventory.location_code = to_location
-            to_inventory.save()
+            with transaction.atomic():
+                # Lock the transfer so concurrent requests cannot complete it twice
+                transfer = InventoryMovement.objects.select_for_update().select_related(
+                    'product', 'from_warehouse', 'to_warehouse'
+                ).get(id=transfer_id, movement_type='transfer')
+                if transfer.status == 'completed':
+                    return JsonResponse({
+                        'success': False,
+                        'message': 'Transfer is already completed'
+                    })
+                
+                # Move the stock; the conditional decrement rolls back the transfer when the source is short
+                StockService.decrement(
+                    [(transfer.product, transfer.from_warehouse, transferred_quantity)],
+                    'transfer', transfer.tracking_number, request.user
+                )
+                StockService.increment(
+                    [(transfer.product, transfer.to_warehouse, transferred_quantity)],
+                    'transfer', transfer.tracking_number, request.user
+                )
+                
+                # Update transfer status
+                transfer.status = 'completed'
+                transfer.processed_by = request.user
+                transfer.processed_at = timezone.now()
+                transfer.notes = notes
+                transfer.save()
             
             return JsonResponse({
                 'success': True,
                 'message': f'Successfully transferred {transferred_quantity} units from {transfer.from_warehouse.name} to {transfer.to_warehouse.name}'
             })
             
+        except InsufficientStock:
+            return JsonResponse({
+                'success': False,
+                'message': 'Insufficient stock for transfer'
+            })
         except Exception as e:
             return JsonResponse({
                 'success': False,
@@ -2095,6 +2096,11 @@ def api_product_warehouse_details(request, product_id, warehouse_id):
                 product=product,
                 warehouse=warehouse
             )
+            from inventory.models import StockAvailability
+            availability = StockAvailability.objects.filter(
+                product=product,
+                warehouse=warehouse
+            ).values_list('reserved', 'available').first() or (0, 0)
             
             return JsonResponse({
                 'success': True,
@@ -2106,6 +2112,8 @@ def api_product_warehouse_details(request, product_id, warehouse_id):
                 },
                 'inventory': {
                     'quantity': inventory.quantity,
+                    'reserved': availability[0],
+                    'available': max(0, availability[1]),
                     'location_code': inventory.location.zone if inventory.location else '',
                     'min_stock_level': 10,  # Default value
                     'max_stock_level': 100,  # Default value
@@ -2245,104 +2253,15 @@ def product_acceptance(request):
     return render(request, 'stock_keeper/product_acceptance.html', context)
 
 @login_required
+@super_admin_export(entity_type='stock_report', label='stock report')
 def export_stock_report(request):
-    """Export stock report (low stock, out of stock, near expiry) - RESTRICTED TO SUPER ADMIN ONLY."""
-    from django.http import HttpResponse
-    import csv
-    from datetime import timedelta
-    from users.models import AuditLog
-
-    # SECURITY: Restrict data export to Super Admin only (P0 CRITICAL requirement)
-    if not request.user.is_superuser:
-        from utils.views import permission_denied_authenticated
-        AuditLog.objects.create(
-            user=request.user,
-            action='unauthorized_export_attempt',
-            entity_type='stock_report',
-            description=f"Unauthorized attempt to export stock report by {request.user.email}",
-            ip_address=request.META.get('REMOTE_ADDR'),
-            user_agent=request.META.get('HTTP_USER_AGENT', '')
-        )
-        return permission_denied_authenticated(
-            request,
-            message="Data export is restricted to Super Admin only for security compliance."
-        )
-    
-    warehouse_filter = request.GET.get('warehouse', '')
-    inventory_records = InventoryRecord.objects.select_related('product', 'warehouse', 'location')
-    
-    if warehouse_filter:
-        inventory_records = inventory_records.filter(warehouse_id=warehouse_filter)
-    
-    # Filter for low stock, out of stock, and near expiry
-    low_stock = inventory_records.filter(quantity__lte=10, quantity__gt=0)
-    out_of_stock = inventory_records.filter(quantity=0)
-    near_expiry = inventory_records.filter(
-        expiry_date__lte=timezone.now() + timedelta(days=30),
-        quantity__gt=0
-    ) if hasattr(InventoryRecord, 'expiry_date') else inventory_records.none()
-    
-    response = HttpResponse(content_type='text/csv')
-    response['Content-Disposition'] = 'attachment; filename="stock_report.csv"'
-    
-    writer = csv.writer(response)
-    writer.writerow(['Stock Report', timezone.now().strftime('%Y-%m-%d %H:%M:%S')])
-    writer.writerow([])
-    
-    # Out of Stock
-    writer.writerow(['OUT OF STOCK'])
-    writer.writerow(['Product ID', 'Product Name', 'SKU', 'Warehouse', 'Location', 'Quantity'])
-    for record in out_of_stock:
-        writer.writerow([
-            f'P{record.product.id:03d}',
-            record.product.name_en,
-            record.product.code or 'N/A',
-            record.warehouse.name,
-            record.location.zone if record.location else 'N/A',
-            record.quantity
-        ])
-    
-    writer.writerow([])
-    # Low Stock
-    writer.writerow(['LOW STOCK (≤10)'])
-    writer.writerow(['Product ID', 'Product Name', 'SKU', 'Warehouse', 'Location', 'Quantity'])
-    for record in low_stock:
-        writer.writerow([
-            f'P{record.product.id:03d}',
-            record.product.name_en,
-            record.product.code or 'N/A',
-            record.warehouse.name,
-            record.location.zone if record.location else 'N/A',
-            record.quantity
-        ])
-    
-    if near_expiry.exists():
-        writer.writerow([])
-        # Near Expiry
-        writer.writerow(['NEAR EXPIRY (≤30 days)'])
-        writer.writerow(['Product ID', 'Product Name', 'SKU', 'Warehouse', 'Expiry Date', 'Quantity'])
-        for record in near_expiry:
-            writer.writerow([
-                f'P{record.product.id:03d}',
-                record.product.name_en,
-                record.product.code or 'N/A',
-                record.warehouse.name,
-                record.expiry_date.strftime('%Y-%m-%d') if record.expiry_date else 'N/A',
-                record.quantity
-            ])
-
-    # Audit log for successful export (P0 CRITICAL security requirement)
-    total_records = low_stock.count() + out_of_stock.count() + near_expiry.count()
-    AuditLog.objects.create(
-        user=request.user,
-        action='data_export',
-        entity_type='stock_report',
-        description=f"Exported stock report with {total_records} alert records to CSV",
-        ip_address=request.META.get('REMOTE_ADDR'),
-        user_agent=request.META.get('HTTP_USER_AGENT', '')
-    )
+    """
+    Export stock report (low stock, out of stock, near expiry) - RESTRICTED TO SUPER ADMIN ONLY.
+    The report is prepared in a background export job; the requester is notified when it is ready.
+    """
+    from .exports import stock_report
 
-    return response
+    return export_report(request, stock_report, filename='stock_report', entity_type='stock_report', background=True)
 
 @login_required
 @user_passes_test(is_stock_keeper)
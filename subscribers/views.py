@@ -6,6 +6,7 @@ from django.core.paginator import Paginator
 from django.db.models import Q
 from django.utils import timezone
 from users.models import User
+from utils.exports import Column, Export, export_response, super_admin_export
 from .models import Subscriber
 from .forms import SubscriberForm
 
@@ -337,27 +338,22 @@ def reject_user(request, user_id):
     return JsonResponse({'success': False, 'message': 'Invalid request method'})
 
 @login_required
+@super_admin_export(entity_type='user', label='users')
 def export_users(request):
-    """Export users data to CSV"""
-    import csv
-    from django.http import HttpResponse
-    
-    response = HttpResponse(content_type='text/csv')
-    response['Content-Disposition'] = 'attachment; filename="users_export.csv"'
-    
-    writer = csv.writer(response)
-    writer.writerow(['Full Name', 'Email', 'Phone Number', 'Business Name', 'Country', 'Date Joined', 'Status'])
-    
-    users = User.objects.all().order_by('-date_joined')
-    for user in users:
-        writer.writerow([
-            user.full_name,
-            user.email,
-            user.phone_number,
-            user.company_name or '',
-            user.country or '',
-            user.date_joined.strftime('%Y-%m-%d'),
-            'Active' if user.is_active else 'Inactive'
-        ])
-    
-    return response 
\ No newline at end of file
+    """Export users data to CSV - RESTRICTED TO SUPER ADMIN ONLY."""
+    export = Export(User.objects.order_by('-date_joined'), [
+        Column('Full Name', 'full_name'),
+        Column('Email', 'email'),
+        Column('Phone Number', 'phone_number'),
+        Column('Business Name', 'company_name'),
+        Column('Country', 'country'),
+        Column('Date Joined', 'date_joined', date_format='%Y-%m-%d'),
+        Column('Status', value=lambda row: 'Active' if row['is_active'] else 'Inactive', fields=('is_active',)),
+    ])
+    
+    return export_response(
+        request, export.rows(),
+        filename='users_export',
+        entity_type='user',
+        describe=lambda fmt: f"Exported {export.count} users to {fmt}",
+    )
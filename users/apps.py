@@ -8,6 +8,7 @@ class UsersConfig(AppConfig):
     def ready(self):
         """Initialize audit logging when app is ready."""
         super().ready()
+        import users.signals
         try:
             from utils.audit_config import register_audit_models
             register_audit_models()
@@ -297,31 +297,23 @@ class User(AbstractUser, PermissionsMixin):
         role_ids = self.user_roles.filter(is_active=True).values_list('role_id', flat=True)
         return Role.objects.filter(id__in=role_ids)
 
+    def get_role_snapshot(self):
+        """Get the cached role/permission snapshot for this user"""
+        from .role_cache import get_role_snapshot
+        return get_role_snapshot(self)
+
     def has_role(self, role_name):
         """Check if user has the specified role"""
-        return self.user_roles.filter(role__name=role_name, is_active=True).exists()
+        return self.get_role_snapshot().has_role(role_name)
     
     def has_permission(self, permission_codename, module=None):
         """Check if user has the specified permission"""
-        from roles.models import Permission
-        
         # Superusers have all permissions
         if self.is_superuser:
             return True
         
         # Check through user's roles
-        for user_role in self.user_roles.filter(is_active=True):
-            if user_role.role.role_permissions.filter(
-                permission__codename=permission_codename,
-                granted=True
-            ).exists():
-                if module is None or user_role.role.role_permissions.filter(
-                    permission__codename=permission_codename,
-                    permission__module=module,
-                    granted=True
-                ).exists():
-                    return True
-        return False
+        return self.get_role_snapshot().has_permission(permission_codename, module)
     
     def can_create_roles(self):
         """Check if user can create roles (only super admin)"""
@@ -0,0 +1,101 @@
+"""
+Cached role/permission snapshots for users.
+
+A user's active roles are loaded with a single query, stored in the Django
+cache under a versioned key and memoized on the user object; permissions
+come from the compiled matrix in roles.permission_matrix. Repeated
+``has_role`` / ``has_permission`` calls within a request cost nothing. Any
+change to ``UserRole`` or ``Role`` bumps the version (see users.signals).
+"""
+import uuid
+
+from django.core.cache import cache
+from django.db import transaction
+
+from roles.permission_matrix import get_permissions_for_roles
+
+ROLE_CACHE_VERSION_KEY = 'user_role_snapshot_version'
+ROLE_CACHE_TIMEOUT = 3600  # 1 hour
+
+
+class RoleSnapshot:
+    """Immutable view of a user's active roles and granted permissions."""
+
+    __slots__ = ('roles', 'role_names', 'permissions', 'codenames', 'modules')
+
+    def __init__(self, roles=()):
+        self.roles = tuple(roles)
+        self.role_names = frozenset(name for _, name in self.roles)
+        self.permissions = get_permissions_for_roles(role_id for role_id, _ in self.roles)
+        self.codenames = frozenset(codename for _, codename in self.permissions)
+        self.modules = frozenset(module for module, _ in self.permissions)
+
+    def has_role(self, role_name):
+        return role_name in self.role_names
+
+    def has_permission(self, permission_codename, module=None):
+        if module is None:
+            return permission_codename in self.codenames
+        return (module, permission_codename) in self.permissions
+
+    def has_module_access(self, module):
+        return module in self.modules
+
+
+def get_cache_version():
+    """Return the current snapshot version, creating one if missing."""
+    version = cache.get(ROLE_CACHE_VERSION_KEY)
+    if version is None:
+        cache.add(ROLE_CACHE_VERSION_KEY, uuid.uuid4().hex, None)
+        version = cache.get(ROLE_CACHE_VERSION_KEY)
+    return version
+
+
+def _bump_cache_version():
+    cache.set(ROLE_CACHE_VERSION_KEY, uuid.uuid4().hex, None)
+
+
+def invalidate_role_cache():
+    """
+    Invalidate every cached snapshot.
+
+    The version is bumped immediately and again after the surrounding
+    transaction commits, so a concurrent request cannot re-cache data that
+    was read before the commit.
+    """
+    _bump_cache_version()
+    transaction.on_commit(_bump_cache_version)
+
+
+def load_role_snapshot(user):
+    """Load the user's active (role_id, role_name) pairs with one query."""
+    from roles.models import UserRole
+
+    return tuple(
+        UserRole.objects.filter(user_id=user.pk, is_active=True).values_list('role_id', 'role__name')
+    )
+
+
+def get_role_snapshot(user):
+    """Return the user's snapshot: memoized, then cached, then loaded."""
+    snapshot = getattr(user, '_role_snapshot', None)
+    if snapshot is not None:
+        return snapshot
+
+    if user.pk is None:
+        snapshot = RoleSnapshot()
+    else:
+        cache_key = f'user_role_snapshot:{get_cache_version()}:{user.pk}'
+        roles = cache.get(cache_key)
+        if roles is None:
+            roles = load_role_snapshot(user)
+            cache.set(cache_key, roles, ROLE_CACHE_TIMEOUT)
+        snapshot = RoleSnapshot(roles)
+
+    user._role_snapshot = snapshot
+    return snapshot
+
+
+def clear_role_snapshot(user):
+    """Drop the snapshot memoized on a user object."""
+    user.__dict__.pop('_role_snapshot', None)
@@ -0,0 +1,32 @@
+from django.db.models.signals import post_save, post_delete
+from django.dispatch import receiver
+from roles.models import Role, Permission, UserRole, RolePermission
+from roles.permission_matrix import invalidate_permission_matrix
+from .role_cache import invalidate_role_cache, clear_role_snapshot
+
+
+@receiver(post_save, sender=UserRole)
+@receiver(post_delete, sender=UserRole)
+def invalidate_user_role_snapshot(sender, instance, **kwargs):
+    """Invalidate cached role snapshots when a user's roles change"""
+    invalidate_role_cache()
+    # Refresh the in-memory snapshot of the user object we were handed
+    if UserRole.user.is_cached(instance):
+        clear_role_snapshot(instance.user)
+
+
+@receiver(post_save, sender=Role)
+@receiver(post_delete, sender=Role)
+def invalidate_role_snapshot(sender, instance, **kwargs):
+    """Role names and role permissions are cached; refresh both"""
+    invalidate_role_cache()
+    invalidate_permission_matrix()
+
+
+@receiver(post_save, sender=RolePermission)
+@receiver(post_delete, sender=RolePermission)
+@receiver(post_save, sender=Permission)
+@receiver(post_delete, sender=Permission)
+def rebuild_permission_matrix(sender, instance, **kwargs):
+    """Rebuild the compiled permission matrix when grants change"""
+    invalidate_permission_matrix()
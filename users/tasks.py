@@ -2,6 +2,7 @@
 Celery tasks for Users module
 """
 from celery import shared_task
+from django.db import transaction
 from django.utils import timezone
 from django.contrib.sessions.models import Session
 from datetime import timedelta
@@ -82,17 +83,14 @@ def send_password_expiry_reminders():
             password_changed_at__gt=expiry_threshold - timedelta(days=1)  # Only notify once
         )
 
-        notified = 0
-        for user in users_to_notify:
-            Notification.objects.create(
-                user=user,
-                title="Password Expiry Reminder",
-                message="Your password will expire in 7 days. Please update your password "
-                       "to avoid being locked out of your account.",
-                notification_type='security',
-                priority='high'
-            )
-            notified += 1
+        notified = len(Notification.create_bulk_notifications(
+            users_to_notify,
+            title="Password Expiry Reminder",
+            message="Your password will expire in 7 days. Please update your password "
+                   "to avoid being locked out of your account.",
+            notification_type='security',
+            priority='high'
+        ))
 
         logger.info(f"Password expiry reminders sent: {notified}")
         return {'status': 'success', 'notified': notified}
@@ -150,18 +148,17 @@ def generate_user_activity_report():
         # Notify admins
         admins = User.objects.filter(
             is_active=True,
-            userrole__role__role_type='admin'
+            user_roles__role__role_type='admin'
         ).distinct()
 
-        for admin in admins:
-            Notification.objects.create(
-                user=admin,
-                title="Weekly User Activity Report",
-                message=f"Active users: {active_users}/{total_users} ({report['activity_rate']}%), "
-                       f"New users: {new_users}",
-                notification_type='report',
-                priority='normal'
-            )
+        Notification.create_bulk_notifications(
+            admins,
+            title="Weekly User Activity Report",
+            message=f"Active users: {active_users}/{total_users} ({report['activity_rate']}%), "
+                   f"New users: {new_users}",
+            notification_type='report',
+            priority='normal'
+        )
 
         logger.info(f"User activity report generated: {report}")
         return {'status': 'success', 'report': report}
@@ -175,34 +172,68 @@ def generate_user_activity_report():
 def sync_user_permissions():
     """
     Sync user permissions based on their roles
+    Role grants come from the compiled permission matrix and map to Django
+    auth permissions by (app_label, codename)
     """
-    from .models import User, UserRole, Role
+    from .models import User
+    from roles.models import UserRole
+    from roles.permission_matrix import get_permission_matrix
     from django.contrib.auth.models import Permission
 
     try:
-        synced = 0
+        matrix = get_permission_matrix()
 
-        # Get all active users with roles
-        users_with_roles = User.objects.filter(
+        # Active role ids per active user - one query
+        user_role_ids = {}
+        for user_id, role_id in UserRole.objects.filter(
             is_active=True,
-            userrole__isnull=False
-        ).prefetch_related('userrole_set__role__permissions').distinct()
+            user__is_active=True
+        ).values_list('user_id', 'role_id'):
+            user_role_ids.setdefault(user_id, set()).add(role_id)
+
+        # Resolve role grants to auth permission ids once per role
+        auth_permission_ids = {
+            (app_label, codename): permission_id
+            for permission_id, app_label, codename in Permission.objects.values_list(
+                'id', 'content_type__app_label', 'codename'
+            )
+        }
+        role_permission_ids = {
+            role_id: {
+                auth_permission_ids[grant] for grant in grants if grant in auth_permission_ids
+            }
+            for role_id, grants in matrix.items()
+        }
 
-        for user in users_with_roles:
-            # Collect all permissions from all roles
+        # Current direct permissions of those users - one query
+        UserPermissionLink = User.user_permissions.through
+        current_permissions = {}
+        for user_id, permission_id in UserPermissionLink.objects.filter(
+            user_id__in=list(user_role_ids)
+        ).values_list('user_id', 'permission_id'):
+            current_permissions.setdefault(user_id, set()).add(permission_id)
+
+        changed_user_ids = []
+        new_links = []
+        for user_id, role_ids in user_role_ids.items():
             role_permissions = set()
-            for user_role in user.userrole_set.all():
-                if user_role.role and hasattr(user_role.role, 'permissions'):
-                    for perm in user_role.role.permissions.all():
-                        role_permissions.add(perm)
-
-            # Update user permissions
-            current_permissions = set(user.user_permissions.all())
-
-            if role_permissions != current_permissions:
-                user.user_permissions.set(role_permissions)
-                synced += 1
-
+            for role_id in role_ids:
+                role_permissions |= role_permission_ids.get(role_id, set())
+
+            if role_permissions != current_permissions.get(user_id, set()):
+                changed_user_ids.append(user_id)
+                new_links.extend(
+                    UserPermissionLink(user_id=user_id, permission_id=permission_id)
+                    for permission_id in role_permissions
+                )
+
+        # Update user permissions
+        if changed_user_ids:
+            with transaction.atomic():
+                UserPermissionLink.objects.filter(user_id__in=changed_user_ids).delete()
+                UserPermissionLink.objects.bulk_create(new_links, batch_size=1000)
+
+        synced = len(changed_user_ids)
         logger.info(f"User permissions synced: {synced}")
         return {'status': 'success', 'synced': synced}
 
@@ -1,3 +1,85 @@
+"""
+Unit tests for the cached role/permission snapshot
+Tests: User.has_role, User.has_permission, cache invalidation
+"""
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
 from django.test import TestCase
 
-# Create your tests here.
+from roles.models import Role, Permission, RolePermission, UserRole
+from roles.permission_matrix import get_permission_matrix
+
+User = get_user_model()
+
+
+class RoleSnapshotTests(TestCase):
+    """
+    Test suite for per-request role/permission resolution
+    Covers: single-query load, memoization, invalidation on role changes
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(
+            username='agent@test.com',
+            email='agent@test.com',
+            password='testpass123'
+        )
+
+        cls.role, _ = Role.objects.get_or_create(name='Snapshot Role')
+        cls.permission = Permission.objects.create(
+            name='View Orders',
+            codename='snapshot_view_orders',
+            permission_type='read',
+            module='orders',
+        )
+        RolePermission.objects.create(role=cls.role, permission=cls.permission)
+        UserRole.objects.create(user=cls.user, role=cls.role, is_primary=True)
+
+    def setUp(self):
+        cache.clear()
+        get_permission_matrix()
+
+    def test_snapshot_loaded_once_per_user_object(self):
+        """Repeated checks on the same user object run a single query"""
+        user = User.objects.get(pk=self.user.pk)
+        with self.assertNumQueries(1):
+            self.assertTrue(user.has_role('Snapshot Role'))
+            self.assertFalse(user.has_role('Admin'))
+            self.assertTrue(user.has_permission('snapshot_view_orders'))
+            self.assertTrue(user.has_permission('snapshot_view_orders', 'orders'))
+            self.assertFalse(user.has_permission('snapshot_view_orders', 'finance'))
+
+    def test_snapshot_served_from_cache(self):
+        """A fresh user object reuses the cached snapshot"""
+        User.objects.get(pk=self.user.pk).has_role('Snapshot Role')
+        user = User.objects.get(pk=self.user.pk)
+        with self.assertNumQueries(0):
+            self.assertTrue(user.has_role('Snapshot Role'))
+
+    def test_role_removal_invalidates_snapshot(self):
+        """Deactivating a role assignment is visible immediately"""
+        user = User.objects.get(pk=self.user.pk)
+        self.assertTrue(user.has_role('Snapshot Role'))
+
+        user_role = UserRole.objects.get(user=self.user, role=self.role)
+        user_role.is_active = False
+        user_role.save()
+
+        self.assertFalse(User.objects.get(pk=self.user.pk).has_role('Snapshot Role'))
+
+    def test_role_assignment_refreshes_same_user_object(self):
+        """Assigning a role through the user object clears its memoized snapshot"""
+        user = User.objects.get(pk=self.user.pk)
+        other_role, _ = Role.objects.get_or_create(name='Other Snapshot Role')
+        self.assertFalse(user.has_role('Other Snapshot Role'))
+
+        UserRole.objects.create(user=user, role=other_role)
+        self.assertTrue(user.has_role('Other Snapshot Role'))
+
+    def test_permission_revocation_invalidates_snapshot(self):
+        """Removing a role permission is visible to cached users"""
+        User.objects.get(pk=self.user.pk).has_permission('snapshot_view_orders')
+        RolePermission.objects.filter(role=self.role).delete()
+        self.assertFalse(User.objects.get(pk=self.user.pk).has_permission('snapshot_view_orders'))
@@ -89,12 +89,17 @@ def breadcrumbs(request):
 def user_permissions(request):
     """
     Add user permissions to context for easy template access.
+
+    Permissions are ``module.codename`` strings taken from the user's cached
+    role snapshot (backed by the compiled role permission matrix).
     """
     if request.user.is_authenticated:
         return {
             'is_superuser': request.user.is_superuser,
             'user_role': request.user.get_primary_role() if hasattr(request.user, 'get_primary_role') else None,
-            'user_permissions': list(request.user.get_all_permissions()) if hasattr(request.user, 'get_all_permissions') else [],
+            'user_permissions': sorted(
+                f'{module}.{codename}' for module, codename in request.user.get_role_snapshot().permissions
+            ) if hasattr(request.user, 'get_role_snapshot') else [],
         }
     return {
         'is_superuser': False,
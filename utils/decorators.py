@@ -140,11 +140,7 @@ def module_access_required(module_name, redirect_to_permission_denied=True):
                 # Check if user has any permission in the module
                 has_access = (request.user.is_superuser or 
                              request.user.has_role('Admin') or
-                             request.user.user_roles.filter(
-                                 role__role_permissions__permission__module=module_name,
-                                 role__role_permissions__granted=True,
-                                 is_active=True
-                             ).exists())
+                             request.user.get_role_snapshot().has_module_access(module_name))
                 
                 if has_access:
                     return view_func(request, *args, **kwargs)
@@ -0,0 +1,274 @@
+"""
+Streaming CSV/XLSX export engine shared by every module.
+
+An ``Export`` is a queryset plus a list of ``Column``s. It reads only the
+fields its columns need with ``values()`` and walks the rows with
+``.iterator(chunk_size=...)``, so related names come from joins instead of
+per-row lookups and memory stays constant however many rows there are.
+
+``export_response`` turns any iterable of rows into a download: CSV is
+streamed through ``StreamingHttpResponse`` as it is produced; XLSX (``?format=xlsx``)
+is written row by row in xlsxwriter's constant memory mode to a temporary
+file and then streamed from it. The ``data_export`` audit log entry is written
+once the rows have been sent.
+
+Views are restricted to Super Admins with ``@super_admin_export``, which
+also audits refused attempts.
+
+Exports that may run long are built as a ``Report`` by a function of plain
+parameters; ``export_report`` downloads small ones directly and hands
+larger ones (over EXPORT_ASYNC_ROW_THRESHOLD rows) to a background
+``dashboard.ExportJob``.
+"""
+import csv
+import tempfile
+from datetime import date, datetime
+from functools import wraps
+
+from django.conf import settings
+from django.contrib import messages
+from django.http import FileResponse, StreamingHttpResponse
+from django.shortcuts import redirect
+
+DEFAULT_CHUNK_SIZE = 2000
+DEFAULT_ASYNC_ROW_THRESHOLD = 100000
+# Query parameters that control the export itself rather than its filters
+CONTROL_PARAMS = ('format', 'background', 'export')
+# CSV rows joined into one chunk of the streamed response
+CSV_ROWS_PER_CHUNK = 500
+FORMATS = ('csv', 'xlsx')
+FORMAT_LABELS = {'csv': 'CSV', 'xlsx': 'Excel'}
+
+
+class Column:
+    """
+    One export column: a header and either a ``values()`` field or a
+    function of the row (reading the ``fields`` it declares)
+    """
+
+    def __init__(self, header, field=None, value=None, fields=(), default='', date_format=None):
+        self.header = header
+        self.field = field
+        self.value = value
+        self.fields = ((field,) if field else ()) + tuple(fields)
+        self.default = default
+        self.date_format = date_format
+
+    def render(self, row):
+        value = self.value(row) if self.value else row[self.field]
+        if value is None or value == '':
+            return self.default
+        if self.date_format and isinstance(value, (date, datetime)):
+            return value.strftime(self.date_format)
+        return value
+
+
+class Export:
+    """Rows of a queryset projected onto columns; ``count`` is the number of rows produced so far"""
+
+    def __init__(self, queryset, columns, chunk_size=DEFAULT_CHUNK_SIZE):
+        self.queryset = queryset
+        self.columns = columns
+        self.chunk_size = chunk_size
+        self.count = 0
+
+    @property
+    def header(self):
+        return [column.header for column in self.columns]
+
+    @property
+    def fields(self):
+        return list(dict.fromkeys(field for column in self.columns for field in column.fields))
+
+    def rows(self, header=True):
+        if header:
+            yield self.header
+        for row in self.queryset.values(*self.fields).iterator(chunk_size=self.chunk_size):
+            self.count += 1
+            yield [column.render(row) for column in self.columns]
+
+
+class Report:
+    """
+    The rows of one export and the ``Export``s they are read from.
+
+    ``description`` is the audit log text, formatted with the number of
+    records exported, e.g. ``'Exported {count} payment records'``.
+    """
+
+    def __init__(self, rows, exports, description):
+        self.rows = rows
+        self.exports = exports
+        self.description = description
+
+    @property
+    def count(self):
+        return sum(export.count for export in self.exports)
+
+    def estimate_rows(self):
+        """Rows the report will hold, counted without reading them"""
+        return sum(export.queryset.count() for export in self.exports)
+
+    def describe(self, format_label):
+        return f"{self.description.format(count=self.count)} to {format_label}"
+
+
+def section(title, export):
+    """A titled block of a multi-section report, followed by a blank row"""
+    yield [title]
+    yield from export.rows()
+    yield []
+
+
+class _Echo:
+    """File-like object whose write() returns what it was given (for csv.writer)"""
+
+    def write(self, value):
+        return value
+
+
+def iter_csv(rows, bom=True):
+    """CSV text for ``rows``, in chunks of CSV_ROWS_PER_CHUNK rows"""
+    writer = csv.writer(_Echo())
+    chunk = ['\ufeff'] if bom else []  # UTF-8 BOM for Excel
+    for row in rows:
+        chunk.append(writer.writerow(row))
+        if len(chunk) >= CSV_ROWS_PER_CHUNK:
+            yield ''.join(chunk)
+            chunk = []
+    if chunk:
+        yield ''.join(chunk)
+
+
+def write_csv(rows, fileobj):
+    """Write ``rows`` as CSV to a text file object"""
+    for chunk in iter_csv(rows):
+        fileobj.write(chunk)
+
+
+def write_xlsx(rows, fileobj, sheet_name='Export'):
+    """Write ``rows`` as a single-sheet workbook to a binary file object, in constant memory"""
+    import xlsxwriter
+
+    workbook = xlsxwriter.Workbook(fileobj, {'constant_memory': True, 'strings_to_urls': False})
+    worksheet = workbook.add_worksheet(sheet_name[:31])
+    for row_number, row in enumerate(rows):
+        for column_number, value in enumerate(row):
+            if isinstance(value, (date, datetime)):
+                value = value.isoformat()
+            worksheet.write(row_number, column_number, value)
+    workbook.close()
+
+
+def get_export_format(request, default='csv'):
+    fmt = request.GET.get('format', default)
+    return fmt if fmt in FORMATS else default
+
+
+def export_params(request):
+    """The request's filter parameters, as stored on a background export job"""
+    return {key: value for key, value in request.GET.items() if key not in CONTROL_PARAMS}
+
+
+def log_export(user, action, entity_type, description, ip_address=None, user_agent=''):
+    from users.models import AuditLog
+
+    AuditLog.objects.create(
+        user=user,
+        action=action,
+        entity_type=entity_type,
+        description=description,
+        ip_address=ip_address,
+        user_agent=user_agent
+    )
+
+
+def audit_export(request, action, entity_type, description):
+    log_export(
+        request.user, action, entity_type, description,
+        ip_address=request.META.get('REMOTE_ADDR'),
+        user_agent=request.META.get('HTTP_USER_AGENT', '')
+    )
+
+
+def export_response(request, rows, filename, entity_type, describe, fmt=None, on_complete=None):
+    """
+    Download ``rows`` as ``filename``.csv or .xlsx.
+
+    ``describe(format_label)`` returns the audit log description, read after
+    the rows have been produced (so it can report their count);
+    ``on_complete(format_label)`` runs after the audit entry is written.
+    """
+    fmt = fmt or get_export_format(request)
+    label = FORMAT_LABELS[fmt]
+
+    def complete():
+        audit_export(request, 'data_export', entity_type, describe(label))
+        if on_complete:
+            on_complete(label)
+
+    if fmt == 'xlsx':
+        fileobj = tempfile.TemporaryFile()
+        write_xlsx(rows, fileobj)
+        fileobj.seek(0)
+        complete()
+        return FileResponse(fileobj, as_attachment=True, filename=f'{filename}.xlsx')
+
+    def stream():
+        try:
+            yield from iter_csv(rows)
+        finally:
+            # Also audited when the client disconnects part way through
+            complete()
+
+    response = StreamingHttpResponse(stream(), content_type='text/csv; charset=utf-8')
+    response['Content-Disposition'] = f'attachment; filename="{filename}.csv"'
+    return response
+
+
+def export_report(request, builder, filename, entity_type, background=False):
+    """
+    Download the ``Report`` built by ``builder(params, user)``.
+
+    It is queued as a background export job instead when ``background`` or
+    ``?background=1`` is given, or when it holds more than
+    EXPORT_ASYNC_ROW_THRESHOLD rows; the requester is sent to the job's
+    progress page and notified when the file is ready.
+    """
+    fmt = get_export_format(request)
+    params = export_params(request)
+    report = builder(params, request.user)
+
+    threshold = getattr(settings, 'EXPORT_ASYNC_ROW_THRESHOLD', DEFAULT_ASYNC_ROW_THRESHOLD)
+    if background or request.GET.get('background') or report.estimate_rows() > threshold:
+        from dashboard.export_jobs import start_export_job
+
+        job = start_export_job(request, builder, params, fmt, filename, entity_type)
+        messages.info(request, 'Your export is being prepared. You will be notified when the file is ready to download.')
+        return redirect('dashboard:export_job', job_id=job.id)
+
+    return export_response(request, report.rows, filename, entity_type, describe=report.describe, fmt=fmt)
+
+
+def super_admin_export(entity_type, label):
+    """
+    Restrict an export view to Super Admins (P0 CRITICAL requirement),
+    auditing refused attempts
+    """
+    def decorator(view_func):
+        @wraps(view_func)
+        def wrapper(request, *args, **kwargs):
+            if not request.user.is_superuser:
+                from .views import permission_denied_authenticated
+
+                audit_export(
+                    request, 'unauthorized_export_attempt', entity_type,
+                    f"Unauthorized attempt to export {label} by {request.user.email}"
+                )
+                return permission_denied_authenticated(
+                    request,
+                    message="Data export is restricted to Super Admin only for security compliance."
+                )
+            return view_func(request, *args, **kwargs)
+        return wrapper
+    return decorator
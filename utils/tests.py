@@ -0,0 +1,101 @@
+"""
+Unit tests for the shared export engine
+Tests: Export projections, CSV streaming, XLSX output, Super Admin restriction and audit logging
+"""
+
+import csv
+import io
+import zipfile
+
+from django.contrib.auth import get_user_model
+from django.test import TestCase
+from django.urls import reverse
+
+from orders.models import Order
+from users.models import AuditLog
+from utils.exports import Column, Export, iter_csv, write_xlsx
+
+User = get_user_model()
+
+
+class ExportEngineTests(TestCase):
+    """
+    Test suite for utils.exports
+    Covers: values() projection without per-row queries, column rendering, streamed CSV, constant memory XLSX
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.agent = User.objects.create_user(email='export-agent@test.com', password='testpass123', full_name='Export Agent')
+        for i in range(5):
+            Order.objects.create(
+                customer=f'Customer {i}', customer_phone='', quantity=1, price_per_unit=10,
+                agent=cls.agent if i % 2 else None, store_link='https://example.com',
+            )
+
+    def export(self):
+        return Export(Order.objects.order_by('id'), [
+            Column('Customer', 'customer'),
+            Column('Phone', 'customer_phone', default='N/A'),
+            Column('Agent', 'agent__full_name', default='Unassigned'),
+            Column('Label', value=lambda row: f"#{row['id']}", fields=('id',)),
+        ], chunk_size=2)
+
+    def test_rows_in_one_query(self):
+        export = self.export()
+        with self.assertNumQueries(1):
+            rows = list(export.rows())
+        self.assertEqual(rows[0], ['Customer', 'Phone', 'Agent', 'Label'])
+        self.assertEqual(rows[1][:3], ['Customer 0', 'N/A', 'Unassigned'])
+        self.assertEqual(rows[2][2], 'Export Agent')
+        self.assertEqual(export.count, 5)
+
+    def test_csv_chunks(self):
+        text = ''.join(iter_csv(self.export().rows()))
+        self.assertTrue(text.startswith('\ufeff'))
+        parsed = list(csv.reader(io.StringIO(text.lstrip('\ufeff'))))
+        self.assertEqual(len(parsed), 6)
+
+    def test_xlsx(self):
+        buffer = io.BytesIO()
+        write_xlsx(self.export().rows(), buffer)
+        with zipfile.ZipFile(buffer) as workbook:
+            self.assertIn('xl/worksheets/sheet1.xml', workbook.namelist())
+
+
+class ExportViewTests(TestCase):
+    """
+    Test suite for views built on utils.exports
+    Covers: Super Admin restriction, streamed response, audit entries after streaming
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.superuser = User.objects.create_superuser(email='export-admin@test.com', password='testpass123', full_name='Admin', phone_number='1')
+        cls.user = User.objects.create_user(email='export-user@test.com', password='testpass123', full_name='User', is_active=True)
+        Order.objects.create(customer='Streamed', quantity=2, price_per_unit=5, store_link='https://example.com')
+
+    def test_refused_for_non_superuser(self):
+        self.client.force_login(self.user)
+        response = self.client.get(reverse('callcenter:export_orders_csv'))
+        self.assertEqual(response.status_code, 403)
+        self.assertTemplateUsed(response, 'permission_denied.html')
+        self.assertContains(response, 'Data export is restricted to Super Admin only', status_code=403)
+        self.assertTrue(AuditLog.objects.filter(user=self.user, action='unauthorized_export_attempt', entity_type='order').exists())
+
+    def test_streams_and_audits(self):
+        self.client.force_login(self.superuser)
+        response = self.client.get(reverse('callcenter:export_orders_csv'))
+        self.assertTrue(response.streaming)
+        self.assertFalse(AuditLog.objects.filter(action='data_export').exists())
+
+        content = b''.join(response.streaming_content).decode('utf-8')
+        self.assertIn('Streamed', content)
+        audit = AuditLog.objects.get(user=self.superuser, action='data_export', entity_type='order')
+        self.assertEqual(audit.description, 'Exported 1 orders to CSV')
+
+    def test_xlsx_format(self):
+        self.client.force_login(self.superuser)
+        response = self.client.get(reverse('subscribers:export_users'), {'format': 'xlsx'})
+        self.assertEqual(response['Content-Disposition'], 'attachment; filename="users_export.xlsx"')
+        self.assertEqual(AuditLog.objects.get(action='data_export', entity_type='user').description, 'Exported 2 users to Excel')